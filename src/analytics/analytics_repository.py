@@ -2,6 +2,7 @@ from __future__ import annotations
 from typing import Tuple, List
 from datetime import date
 from src.database.database import get_db_connection
+from src.database.rango_fechas import condicion_rango, rango_semiabierto
 
 # Repository: ONLY aggregated SELECT queries
 
@@ -12,9 +13,9 @@ def ingresos_animales(fecha_inicio: str, fecha_fin: str) -> float:
             """
             SELECT COALESCE(SUM(precio_total), 0)
             FROM venta
-            WHERE DATE(fecha) BETWEEN ? AND ?
+            WHERE fecha >= ? AND fecha < ?
             """,
-            (fecha_inicio, fecha_fin),
+            rango_semiabierto(fecha_inicio, fecha_fin),
         )
         return float(cur.fetchone()[0])
 
@@ -31,9 +32,9 @@ def costos_nomina(fecha_inicio: str, fecha_fin: str) -> float:
             """
             SELECT COALESCE(SUM(total_pagado), 0)
             FROM pago_nomina
-            WHERE DATE(fecha_pago) BETWEEN ? AND ?
+            WHERE fecha_pago >= ? AND fecha_pago < ?
             """,
-            (fecha_inicio, fecha_fin),
+            rango_semiabierto(fecha_inicio, fecha_fin),
         )
         return float(cur.fetchone()[0])
 
@@ -45,9 +46,9 @@ def costos_insumos(fecha_inicio: str, fecha_fin: str) -> float:
             """
             SELECT COALESCE(SUM(costo_total), 0)
             FROM movimiento_insumo
-            WHERE DATE(fecha_movimiento) BETWEEN ? AND ?
+            WHERE fecha_movimiento >= ? AND fecha_movimiento < ?
             """,
-            (fecha_inicio, fecha_fin),
+            rango_semiabierto(fecha_inicio, fecha_fin),
         )
         return float(cur.fetchone()[0])
 
@@ -59,9 +60,9 @@ def produccion_leche_total(fecha_inicio: str, fecha_fin: str) -> float:
             """
             SELECT COALESCE(SUM(litros_manana + litros_tarde + litros_noche), 0)
             FROM produccion_leche
-            WHERE DATE(fecha) BETWEEN ? AND ?
+            WHERE fecha >= ? AND fecha < ?
             """,
-            (fecha_inicio, fecha_fin),
+            rango_semiabierto(fecha_inicio, fecha_fin),
         )
         return float(cur.fetchone()[0])
 
@@ -79,30 +80,31 @@ def mortalidad_periodo(fecha_inicio: str, fecha_fin: str) -> int:
         cur.execute(
             """
             SELECT COUNT(*) FROM muerte
-            WHERE DATE(fecha) BETWEEN ? AND ?
+            WHERE fecha >= ? AND fecha < ?
             """,
-            (fecha_inicio, fecha_fin),
+            rango_semiabierto(fecha_inicio, fecha_fin),
         )
         return int(cur.fetchone()[0])
 
 
 def gestaciones_periodo(fecha_inicio: str, fecha_fin: str) -> Tuple[int, int]:
+    rango = rango_semiabierto(fecha_inicio, fecha_fin)
     with get_db_connection() as conn:
         cur = conn.cursor()
         cur.execute(
             """
             SELECT COUNT(*) FROM servicio
-            WHERE DATE(fecha_servicio) BETWEEN ? AND ? AND estado = 'Servida'
+            WHERE fecha_servicio >= ? AND fecha_servicio < ? AND estado = 'Servida'
             """,
-            (fecha_inicio, fecha_fin),
+            rango,
         )
         servidas = int(cur.fetchone()[0])
         cur.execute(
             """
             SELECT COUNT(*) FROM servicio
-            WHERE DATE(fecha_parto_real) BETWEEN ? AND ? AND estado = 'Parida'
+            WHERE fecha_parto_real >= ? AND fecha_parto_real < ? AND estado = 'Parida'
             """,
-            (fecha_inicio, fecha_fin),
+            rango,
         )
         paridas = int(cur.fetchone()[0])
         return servidas, paridas
@@ -116,10 +118,10 @@ def promedio_intervalo_partos_dias(fecha_inicio: str, fecha_fin: str) -> float |
             SELECT id_hembra, MIN(fecha_parto_real), MAX(fecha_parto_real)
             FROM servicio
             WHERE fecha_parto_real IS NOT NULL
-              AND DATE(fecha_parto_real) BETWEEN ? AND ?
+              AND fecha_parto_real >= ? AND fecha_parto_real < ?
             GROUP BY id_hembra
             """,
-            (fecha_inicio, fecha_fin),
+            rango_semiabierto(fecha_inicio, fecha_fin),
         )
         rows = cur.fetchall()
         if not rows:
@@ -128,8 +130,8 @@ def promedio_intervalo_partos_dias(fecha_inicio: str, fecha_fin: str) -> float |
         diffs = []
         for _, fmin, fmax in rows:
             try:
-                dmin = datetime.date.fromisoformat(fmin)
-                dmax = datetime.date.fromisoformat(fmax)
+                dmin = datetime.date.fromisoformat(fmin[:10])
+                dmax = datetime.date.fromisoformat(fmax[:10])
                 delta = (dmax - dmin).days
                 if delta > 0:
                     diffs.append(delta)
@@ -143,12 +145,12 @@ def monthly_sum(table: str, column: str, fecha_inicio: str, fecha_fin: str) -> L
         cur = conn.cursor()
         cur.execute(
             f"""
-            SELECT strftime('%Y-%m', fecha) AS ym, SUM({column})
+            SELECT substr(fecha, 1, 7) AS ym, SUM({column})
             FROM {table}
-            WHERE DATE(fecha) BETWEEN ? AND ?
+            WHERE {condicion_rango('fecha')}
             GROUP BY ym
             ORDER BY ym
             """,
-            (fecha_inicio, fecha_fin),
+            rango_semiabierto(fecha_inicio, fecha_fin),
         )
         return [(r[0], float(r[1]) if r[1] else 0) for r in cur.fetchall()]
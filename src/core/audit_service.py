@@ -9,42 +9,25 @@ from __future__ import annotations
 from datetime import datetime
 from typing import Optional
 import logging
+import sqlite3
 
 from src.database.database import get_db_connection
+from src.database.migraciones import ESQUEMA_AUDIT_LOG
 
 logger = logging.getLogger("audit_service")
 
-# Asegurar esquema en arranque
+# El esquema se crea con las migraciones versionadas (versiones_esquema, paso 3);
+# ensure_audit_schema() queda para BD que no pasaron por el arranque normal
 
 def ensure_audit_schema() -> None:
     try:
         with get_db_connection() as conn:
-            cur = conn.cursor()
-            cur.execute(
-                """
-                CREATE TABLE IF NOT EXISTS audit_log (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    usuario TEXT,
-                    fecha TEXT NOT NULL,
-                    modulo TEXT NOT NULL,
-                    accion TEXT NOT NULL,
-                    entidad TEXT,
-                    resultado TEXT NOT NULL,
-                    mensaje TEXT
-                )
-                """
-            )
-            cur.execute(
-                "CREATE INDEX IF NOT EXISTS idx_audit_fecha ON audit_log(fecha)"
-            )
+            conn.executescript(ESQUEMA_AUDIT_LOG)
             conn.commit()
     except Exception as e:
         logger.error(f"No se pudo asegurar esquema audit_log: {e}")
 
 
-ensure_audit_schema()
-
-
 def log_event(
     *,
     usuario: Optional[str],
@@ -60,23 +43,43 @@ def log_event(
     accion: "CREAR" | "EDITAR" | "ELIMINAR" | "EXPORTAR" | "CIERRE"
     """
     try:
-        with get_db_connection() as conn:
-            cur = conn.cursor()
-            cur.execute(
-                """
-                INSERT INTO audit_log (usuario, fecha, modulo, accion, entidad, resultado, mensaje)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-                """,
-                (
-                    usuario,
-                    datetime.now().isoformat(timespec="seconds"),
-                    modulo,
-                    accion,
-                    entidad,
-                    resultado,
-                    mensaje,
-                ),
-            )
-            conn.commit()
+        _insertar_evento(usuario, modulo, accion, entidad, resultado, mensaje)
+    except sqlite3.OperationalError as e:
+        if "no such table" not in str(e):
+            logger.error(f"Error registrando auditoría: {e}")
+            return
+        ensure_audit_schema()
+        try:
+            _insertar_evento(usuario, modulo, accion, entidad, resultado, mensaje)
+        except Exception as e2:
+            logger.error(f"Error registrando auditoría: {e2}")
     except Exception as e:
         logger.error(f"Error registrando auditoría: {e}")
+
+
+def _insertar_evento(
+    usuario: Optional[str],
+    modulo: str,
+    accion: str,
+    entidad: Optional[str],
+    resultado: str,
+    mensaje: Optional[str],
+) -> None:
+    with get_db_connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            INSERT INTO audit_log (usuario, fecha, modulo, accion, entidad, resultado, mensaje)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                usuario,
+                datetime.now().isoformat(timespec="seconds"),
+                modulo,
+                accion,
+                entidad,
+                resultado,
+                mensaje,
+            ),
+        )
+        conn.commit()
@@ -0,0 +1,495 @@
+"""
+Motor de backups en caliente e incrementales
+
+- Copia con la API de backup de SQLite (sqlite3.Connection.backup): lee una
+  instantánea consistente que incluye las páginas aún no volcadas del WAL,
+  a diferencia de copiar el archivo .db con shutil/zipfile.
+- Copia por pasos de N páginas, con callback de progreso, en un hilo aparte
+  para no bloquear la interfaz.
+- Almacén direccionado por contenido: la instantánea se parte en bloques
+  alineados a páginas, cada bloque se guarda una sola vez bajo su SHA-256
+  (backup/objetos/ab/abcd...) y cada backup es un manifiesto JSON con la
+  lista de bloques.
+- Costo incremental:
+  * Sin cambios en la BD desde el último backup de este proceso (PRAGMA
+    data_version de una conexión monitor + tamaño/mtime del .db y el -wal)
+    no se lee la BD: el manifiesto nuevo reutiliza la lista de bloques.
+  * Con cambios se guarda la instantánea anterior (backup/instantanea/) y
+    cada bloque se compara byte a byte con el mismo rango de páginas de
+    ella; solo los bloques distintos se hashean, comprimen y escriben.
+  SQLite no informa qué páginas cambiaron, así que un backup con cambios
+  sigue copiando todas las páginas con la API de backup: la lectura crece
+  con el tamaño de la BD, el hash, la compresión y la escritura con lo
+  modificado. La instantánea anterior ocupa en disco lo mismo que la BD.
+- Retención por cantidad de manifiestos + recolección de bloques huérfanos.
+
+Estructura en disco:
+    backup/
+        manifiestos/backup_20250101_120000_cierre_app.json
+        objetos/3f/3fa4...e1
+        instantanea/backup_20250101_120000_cierre_app.db
+"""
+
+from __future__ import annotations
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import zlib
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger("backup_engine")
+
+# 1: sha256 del archivo completo; 2: sha256 de la lista de digests de bloques
+FORMATO_MANIFIESTO = 2
+PAGINAS_POR_PASO = 256
+PAGINAS_POR_BLOQUE = 64
+NIVEL_COMPRESION = 1
+CARPETA_MANIFIESTOS = "manifiestos"
+CARPETA_OBJETOS = "objetos"
+CARPETA_INSTANTANEA = "instantanea"
+RETENCION_POR_DEFECTO = 10
+
+# progreso(copiadas, total) en páginas
+ProgresoCallback = Callable[[int, int], None]
+
+
+@dataclass
+class TareaBackup:
+    """Estado de un backup en segundo plano, consultable desde el hilo de la UI."""
+    motivo: str
+    copiadas: int = 0
+    total: int = 0
+    resultado: Optional[Path] = None
+    error: Optional[BaseException] = None
+    terminado: threading.Event = field(default_factory=threading.Event)
+
+    @property
+    def fraccion(self) -> float:
+        return self.copiadas / self.total if self.total else 0.0
+
+    def esperar(self, timeout: Optional[float] = None) -> Optional[Path]:
+        """Bloquea hasta que termine; relanza el error del hilo si lo hubo."""
+        self.terminado.wait(timeout)
+        if self.error is not None:
+            raise self.error
+        return self.resultado
+
+
+class MotorBackup:
+    """Backups incrementales de una BD SQLite en un almacén por contenido."""
+
+    def __init__(
+        self,
+        db_path: Path | str,
+        backup_dir: Path | str,
+        paginas_por_paso: int = PAGINAS_POR_PASO,
+        paginas_por_bloque: int = PAGINAS_POR_BLOQUE,
+    ):
+        self.db_path = Path(db_path)
+        self.backup_dir = Path(backup_dir)
+        self.paginas_por_paso = paginas_por_paso
+        self.paginas_por_bloque = paginas_por_bloque
+        self._lock = threading.Lock()
+        self._tarea_activa: Optional[TareaBackup] = None
+        self._monitor: Optional[sqlite3.Connection] = None
+        self._ultimo: Optional[Tuple[Path, tuple]] = None  # (manifiesto, huella de la BD al copiarlo)
+
+    @property
+    def dir_manifiestos(self) -> Path:
+        return self.backup_dir / CARPETA_MANIFIESTOS
+
+    @property
+    def dir_objetos(self) -> Path:
+        return self.backup_dir / CARPETA_OBJETOS
+
+    @property
+    def dir_instantanea(self) -> Path:
+        return self.backup_dir / CARPETA_INSTANTANEA
+
+    # ------------------------------------------------------------------
+    # Creación
+    # ------------------------------------------------------------------
+    def crear_backup(
+        self,
+        motivo: str,
+        usuario: Optional[str] = None,
+        progreso: Optional[ProgresoCallback] = None,
+    ) -> Path:
+        """
+        Crea un backup incremental y retorna la ruta de su manifiesto.
+
+        La copia de páginas se hace por pasos; entre pasos SQLite libera el
+        bloqueo de lectura, así que la app puede seguir escribiendo. Si la BD
+        no cambió desde el último backup no se copia (ver docstring del módulo).
+        """
+        with self._lock:
+            return self._crear_backup(motivo, usuario, progreso)
+
+    def crear_backup_async(
+        self,
+        motivo: str,
+        usuario: Optional[str] = None,
+        progreso: Optional[ProgresoCallback] = None,
+        retencion: Optional[int] = None,
+    ) -> TareaBackup:
+        """
+        Lanza el backup en un hilo daemon y retorna su TareaBackup.
+
+        Si ya hay un backup en curso se retorna esa misma tarea. La UI debe
+        consultar tarea.fraccion / tarea.terminado con after(); los callbacks
+        de progreso corren en el hilo del backup. Con retencion, tras un backup
+        exitoso se aplica aplicar_retencion(retencion) en el mismo hilo.
+        """
+        with self._lock:
+            if self._tarea_activa is not None and not self._tarea_activa.terminado.is_set():
+                return self._tarea_activa
+            tarea = TareaBackup(motivo=motivo)
+            self._tarea_activa = tarea
+
+        def _progreso(copiadas: int, total: int) -> None:
+            tarea.copiadas, tarea.total = copiadas, total
+            if progreso:
+                progreso(copiadas, total)
+
+        def _ejecutar() -> None:
+            try:
+                tarea.resultado = self.crear_backup(motivo, usuario, _progreso)
+                if retencion is not None:
+                    eliminados = self.aplicar_retencion(retencion)
+                    if eliminados:
+                        logger.info(f"Bloques huérfanos eliminados: {eliminados}")
+            except BaseException as e:  # se relanza en tarea.esperar()
+                tarea.error = e
+                logger.error(f"Error en backup en segundo plano: {e}")
+            finally:
+                tarea.terminado.set()
+
+        threading.Thread(target=_ejecutar, name=f"backup-{motivo}", daemon=True).start()
+        return tarea
+
+    def _crear_backup(self, motivo: str, usuario: Optional[str], progreso: Optional[ProgresoCallback]) -> Path:
+        if not self.db_path.exists():
+            raise FileNotFoundError(f"No existe la base de datos: {self.db_path}")
+        self.dir_manifiestos.mkdir(parents=True, exist_ok=True)
+        self.dir_objetos.mkdir(parents=True, exist_ok=True)
+
+        ts = datetime.now()
+        user_part = f"_{usuario}" if usuario else ""
+        nombre = f"backup_{ts.strftime('%Y%m%d_%H%M%S')}_{motivo}{user_part}"
+
+        # La huella se toma antes de copiar: un commit durante la copia la cambia
+        huella = self._huella()
+        if self._ultimo is not None and self._ultimo[1] == huella and self._ultimo[0].exists():
+            ruta = self._repetir_manifiesto(self._ultimo[0], nombre, ts, motivo, usuario, progreso)
+            self._ultimo = (ruta, huella)
+            return ruta
+
+        staging = self.backup_dir / f".{nombre}.tmp"
+        try:
+            page_size = self._copiar_instantanea(staging, progreso)
+            bloques, nuevos, bytes_nuevos = self._almacenar_bloques(staging, page_size, self._instantanea_previa())
+            tamano = staging.stat().st_size
+
+            manifiesto = {
+                "formato": FORMATO_MANIFIESTO,
+                "creado": ts.isoformat(timespec="seconds"),
+                "motivo": motivo,
+                "usuario": usuario,
+                "db_nombre": self.db_path.name,
+                "page_size": page_size,
+                "tamano_bloque": page_size * self.paginas_por_bloque,
+                "tamano": tamano,
+                "sha256": _sha_bloques(bloques),
+                "bloques": bloques,
+            }
+            ruta = self._escribir_manifiesto(nombre, manifiesto)
+            self._guardar_instantanea(staging, ruta)
+        finally:
+            _eliminar(staging)
+        self._ultimo = (ruta, huella)
+
+        logger.info(
+            f"Backup {ruta.name}: {len(bloques)} bloques, {nuevos} nuevos "
+            f"({bytes_nuevos / 1024:.1f} KB escritos de {tamano / 1024:.1f} KB)"
+        )
+        return ruta
+
+    def _huella(self) -> tuple:
+        """data_version de la conexión monitor + (inode, tamaño, mtime) del .db y el -wal."""
+        if self._monitor is None:
+            self._monitor = sqlite3.connect(self.db_path, check_same_thread=False)
+        version = self._monitor.execute("PRAGMA data_version").fetchone()[0]
+        estados = []
+        for ruta in (self.db_path, self.db_path.with_name(self.db_path.name + "-wal")):
+            try:
+                st = ruta.stat()
+                estados.append((st.st_ino, st.st_size, st.st_mtime_ns))
+            except FileNotFoundError:
+                estados.append(None)
+        return version, tuple(estados)
+
+    def _cerrar_monitor(self) -> None:
+        if self._monitor is not None:
+            self._monitor.close()
+            self._monitor = None
+        self._ultimo = None
+
+    def _repetir_manifiesto(
+        self,
+        anterior: Path,
+        nombre: str,
+        ts: datetime,
+        motivo: str,
+        usuario: Optional[str],
+        progreso: Optional[ProgresoCallback],
+    ) -> Path:
+        """BD sin cambios: manifiesto nuevo con los bloques del anterior, sin leer la BD."""
+        manifiesto = self.leer_manifiesto(anterior)
+        manifiesto.update(creado=ts.isoformat(timespec="seconds"), motivo=motivo, usuario=usuario)
+        ruta = self._escribir_manifiesto(nombre, manifiesto)
+        instantanea = self.dir_instantanea / f"{anterior.stem}.db"
+        if instantanea.exists():
+            os.replace(instantanea, self.dir_instantanea / f"{ruta.stem}.db")
+        if progreso:
+            paginas = manifiesto["tamano"] // manifiesto["page_size"]
+            progreso(paginas, paginas)
+        logger.info(f"Backup {ruta.name}: BD sin cambios desde {anterior.name}, sin copiar páginas")
+        return ruta
+
+    def _escribir_manifiesto(self, nombre: str, manifiesto: Dict) -> Path:
+        ruta = self._ruta_libre(nombre)
+        tmp = ruta.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(manifiesto, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, ruta)
+        return ruta
+
+    def _instantanea_previa(self) -> Optional[Tuple[Path, Dict]]:
+        """Instantánea del último backup con cambios y su manifiesto (None si falta alguno)."""
+        if not self.dir_instantanea.exists():
+            return None
+        for instantanea in sorted(self.dir_instantanea.glob("*.db"), key=lambda p: p.stat().st_mtime, reverse=True):
+            manifiesto = self.dir_manifiestos / f"{instantanea.stem}.json"
+            try:
+                return instantanea, self.leer_manifiesto(manifiesto)
+            except (OSError, ValueError):
+                continue
+        return None
+
+    def _guardar_instantanea(self, staging: Path, manifiesto: Path) -> None:
+        """Conserva la copia recién almacenada para comparar el próximo backup."""
+        self.dir_instantanea.mkdir(exist_ok=True)
+        destino = self.dir_instantanea / f"{manifiesto.stem}.db"
+        os.replace(staging, destino)
+        for vieja in self.dir_instantanea.glob("*.db"):
+            if vieja != destino:
+                _eliminar(vieja)
+
+    def _copiar_instantanea(self, staging: Path, progreso: Optional[ProgresoCallback]) -> int:
+        """Copia la BD viva a staging con la API de backup; retorna page_size."""
+        origen = sqlite3.connect(self.db_path, check_same_thread=False)
+        try:
+            destino = sqlite3.connect(staging)
+            try:
+                def _cb(status: int, remaining: int, total: int) -> None:
+                    if progreso:
+                        progreso(total - remaining, total)
+
+                origen.backup(destino, pages=self.paginas_por_paso, progress=_cb)
+                # La copia hereda journal_mode=wal del origen: volver a rollback
+                # para que el archivo quede autocontenido.
+                destino.execute("PRAGMA journal_mode=DELETE")
+                page_size = destino.execute("PRAGMA page_size").fetchone()[0]
+            finally:
+                destino.close()
+        finally:
+            origen.close()
+        return int(page_size)
+
+    def _almacenar_bloques(self, staging: Path, page_size: int, anterior: Optional[Tuple[Path, Dict]]):
+        """
+        Guarda los bloques de staging que no estén en el almacén.
+
+        Un bloque idéntico (byte a byte) al mismo rango de la instantánea
+        anterior reutiliza su digest sin hashearlo.
+        """
+        tamano_bloque = page_size * self.paginas_por_bloque
+        previos: List[str] = []
+        f_previa = None
+        if anterior is not None and anterior[1].get("tamano_bloque") == tamano_bloque:
+            previos = anterior[1]["bloques"]
+            f_previa = open(anterior[0], "rb")
+        bloques: List[str] = []
+        nuevos = bytes_nuevos = 0
+        try:
+            with open(staging, "rb") as f:
+                while True:
+                    datos = f.read(tamano_bloque)
+                    if not datos:
+                        break
+                    previo = f_previa.read(tamano_bloque) if f_previa else b""
+                    i = len(bloques)
+                    if i < len(previos) and previo == datos and self._ruta_objeto(previos[i]).exists():
+                        bloques.append(previos[i])
+                        continue
+                    digest = hashlib.sha256(datos).hexdigest()
+                    bloques.append(digest)
+                    ruta = self._ruta_objeto(digest)
+                    if ruta.exists():
+                        continue
+                    ruta.parent.mkdir(exist_ok=True)
+                    comprimido = zlib.compress(datos, NIVEL_COMPRESION)
+                    tmp = ruta.with_name(ruta.name + ".tmp")
+                    tmp.write_bytes(comprimido)
+                    os.replace(tmp, ruta)
+                    nuevos += 1
+                    bytes_nuevos += len(comprimido)
+        finally:
+            if f_previa:
+                f_previa.close()
+        return bloques, nuevos, bytes_nuevos
+
+    def _ruta_objeto(self, digest: str) -> Path:
+        return self.dir_objetos / digest[:2] / digest
+
+    def _ruta_libre(self, nombre: str) -> Path:
+        ruta = self.dir_manifiestos / f"{nombre}.json"
+        n = 1
+        while ruta.exists():
+            ruta = self.dir_manifiestos / f"{nombre}_{n}.json"
+            n += 1
+        return ruta
+
+    # ------------------------------------------------------------------
+    # Consulta y restauración
+    # ------------------------------------------------------------------
+    def listar_backups(self) -> List[Path]:
+        """Manifiestos ordenados del más reciente al más antiguo."""
+        if not self.dir_manifiestos.exists():
+            return []
+        return sorted(self.dir_manifiestos.glob("backup_*.json"), key=lambda p: p.stat().st_mtime, reverse=True)
+
+    def ultimo_backup(self) -> Optional[datetime]:
+        backups = self.listar_backups()
+        if not backups:
+            return None
+        return datetime.fromtimestamp(backups[0].stat().st_mtime)
+
+    @staticmethod
+    def leer_manifiesto(manifiesto: Path | str) -> Dict:
+        return json.loads(Path(manifiesto).read_text(encoding="utf-8"))
+
+    def restaurar(self, manifiesto: Path | str, destino: Path | str | None = None) -> Path:
+        """
+        Reconstruye la BD de un manifiesto en destino (por defecto db_path).
+
+        Verifica el SHA-256 de cada bloque, el checksum del manifiesto
+        (archivo completo en formato 1, lista de digests en formato 2) y el
+        tamaño antes de reemplazar el archivo. Si el destino es la BD de la
+        app, cerrar antes las conexiones del pool (database.cerrar_conexiones);
+        los -wal/-shm previos se eliminan porque pertenecen al archivo
+        reemplazado.
+        """
+        datos = self.leer_manifiesto(manifiesto)
+        destino = Path(destino) if destino else self.db_path
+        if destino == self.db_path:
+            with self._lock:
+                self._cerrar_monitor()
+        por_archivo = datos.get("formato", 1) == 1
+        destino.parent.mkdir(parents=True, exist_ok=True)
+        tmp = destino.with_name(destino.name + ".restaurando")
+        sha_total = hashlib.sha256()
+        try:
+            with open(tmp, "wb") as f:
+                for digest in datos["bloques"]:
+                    bloque = zlib.decompress(self._ruta_objeto(digest).read_bytes())
+                    if hashlib.sha256(bloque).hexdigest() != digest:
+                        raise ValueError(f"Bloque corrupto en el almacén: {digest}")
+                    if por_archivo:
+                        sha_total.update(bloque)
+                    f.write(bloque)
+            esperado = sha_total.hexdigest() if por_archivo else _sha_bloques(datos["bloques"])
+            if esperado != datos["sha256"] or tmp.stat().st_size != datos["tamano"]:
+                raise ValueError(f"Checksum no coincide al restaurar {Path(manifiesto).name}")
+            for sufijo in ("-wal", "-shm"):
+                _eliminar(destino.with_name(destino.name + sufijo))
+            os.replace(tmp, destino)
+        finally:
+            _eliminar(tmp)
+        logger.info(f"BD restaurada desde {Path(manifiesto).name} en {destino}")
+        return destino
+
+    # ------------------------------------------------------------------
+    # Retención
+    # ------------------------------------------------------------------
+    def aplicar_retencion(self, retencion: int) -> int:
+        """Deja los N manifiestos más recientes y borra los bloques huérfanos.
+
+        Retorna la cantidad de bloques eliminados.
+        """
+        with self._lock:
+            for viejo in self.listar_backups()[retencion:]:
+                _eliminar(viejo)
+                logger.info(f"Backup antiguo eliminado: {viejo.name}")
+            return self._recolectar_huerfanos()
+
+    def _recolectar_huerfanos(self) -> int:
+        referenciados: Set[str] = set()
+        for manifiesto in self.listar_backups():
+            try:
+                referenciados.update(self.leer_manifiesto(manifiesto)["bloques"])
+            except Exception as e:
+                # Ante un manifiesto ilegible no se borra nada
+                logger.warning(f"Manifiesto ilegible {manifiesto.name}, se omite la limpieza: {e}")
+                return 0
+        eliminados = 0
+        if self.dir_objetos.exists():
+            for obj in self.dir_objetos.glob("*/*"):
+                if obj.name not in referenciados:
+                    _eliminar(obj)
+                    eliminados += 1
+        return eliminados
+
+
+def _sha_bloques(bloques: List[str]) -> str:
+    """Checksum del manifiesto (formato 2): SHA-256 de los digests en orden."""
+    return hashlib.sha256("".join(bloques).encode("ascii")).hexdigest()
+
+
+def _eliminar(ruta: Path) -> None:
+    try:
+        ruta.unlink()
+    except FileNotFoundError:
+        pass
+
+
+_motores: Dict[Path, MotorBackup] = {}
+_motores_lock = threading.Lock()
+
+
+def directorio_backups() -> Path:
+    """Carpeta de backups de la aplicación (config.BACKUP_DIR, que Ajustes puede cambiar)."""
+    try:
+        from config import config as app_config
+        return Path(app_config.BACKUP_DIR)
+    except Exception:
+        base = os.getenv("LOCALAPPDATA") or os.getenv("APPDATA") or str(Path.home())
+        return Path(base) / "FincaFacil" / "backup"
+
+
+def get_backup_engine(backup_dir: Path | str | None = None) -> MotorBackup:
+    """Motor sobre la BD de la app; uno por carpeta de backups (por defecto config.BACKUP_DIR)."""
+    carpeta = Path(backup_dir) if backup_dir else directorio_backups()
+    clave = carpeta.resolve()
+    with _motores_lock:
+        motor = _motores.get(clave)
+        if motor is None:
+            from src.database.database import get_db_path_safe
+            motor = MotorBackup(get_db_path_safe(), carpeta)
+            _motores[clave] = motor
+        return motor
@@ -1,21 +1,24 @@
 """
 Servicio de backups automáticos (FASE 4)
-- Backups versionados y comprimidos (.zip)
+- Backups en caliente con la API de backup de SQLite (ver backup_engine)
+- Incrementales: manifiesto por backup + bloques direccionados por contenido
 - Nombre con timestamp y razón
 - Retención configurable (últimos N)
 - Hooks: cierre aplicación, cierre mensual, error crítico
 """
 
 from __future__ import annotations
-import os
-import zipfile
-import time
-from datetime import datetime
 from pathlib import Path
 from typing import Optional
 import logging
 
-from src.database.database import get_db_path_safe
+from src.core.backup_engine import (
+    RETENCION_POR_DEFECTO,
+    ProgresoCallback,
+    TareaBackup,
+    directorio_backups,
+    get_backup_engine,
+)
 
 logger = logging.getLogger("backup_service")
 if not logger.handlers:
@@ -28,45 +31,62 @@ if not logger.handlers:
     fh.setFormatter(fmt)
     logger.addHandler(fh)
 
-DEFAULT_RETENTION = 10
-BACKUP_DIR = Path("backup")
+DEFAULT_RETENTION = RETENCION_POR_DEFECTO
 
 
-def backup_now(reason: str, user: Optional[str] = None, retention: int = DEFAULT_RETENTION) -> Path:
+def backup_now(
+    reason: str,
+    user: Optional[str] = None,
+    retention: int = DEFAULT_RETENTION,
+    progreso: Optional[ProgresoCallback] = None,
+) -> Path:
     """
-    Crea un backup comprimido de la base de datos con timestamp.
+    Crea un backup incremental de la base de datos con timestamp.
     Args:
         reason: Motivo del backup (cierre_mensual, cierre_app, error_critico)
         user: Usuario opcional
         retention: Cantidad de backups a retener (más antiguos se eliminan)
+        progreso: Callback opcional (páginas copiadas, total)
     Returns:
-        Ruta al archivo .zip creado
+        Ruta al manifiesto .json creado
     """
     try:
-        BACKUP_DIR.mkdir(parents=True, exist_ok=True)
-        db_path = get_db_path_safe()
-        ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-        user_part = f"_{user}" if user else ""
-        zip_name = f"backup_{ts}_{reason}{user_part}.zip"
-        zip_path = BACKUP_DIR / zip_name
-
-        logger.info(f"Creando backup: {zip_path}")
-        with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=9) as zf:
-            zf.write(db_path, arcname=db_path.name)
-        logger.info("Backup creado exitosamente")
+        motor = get_backup_engine()
+        logger.info(f"Creando backup: {reason}")
+        manifiesto = motor.crear_backup(reason, user, progreso)
+        logger.info(f"Backup creado exitosamente: {manifiesto}")
 
         # Retención
         _apply_retention(retention)
-        return zip_path
+        return manifiesto
     except Exception as e:
         logger.error(f"Error creando backup: {e}")
         raise
 
 
+def backup_async(
+    reason: str,
+    user: Optional[str] = None,
+    progreso: Optional[ProgresoCallback] = None,
+    retention: int = DEFAULT_RETENTION,
+) -> TareaBackup:
+    """
+    Igual que backup_now pero en un hilo aparte; retorna la tarea para
+    consultar progreso y resultado desde la UI (con after()).
+    La retención se aplica en el mismo hilo al terminar el backup.
+    """
+    logger.info(f"Creando backup en segundo plano: {reason}")
+    return get_backup_engine().crear_backup_async(reason, user, progreso, retencion=retention)
+
+
 def _apply_retention(retention: int) -> None:
     """Elimina backups antiguos, dejando los N más recientes."""
     try:
-        backups = sorted(BACKUP_DIR.glob("backup_*.zip"), key=lambda p: p.stat().st_mtime, reverse=True)
+        eliminados = get_backup_engine().aplicar_retencion(retention)
+        if eliminados:
+            logger.info(f"Bloques huérfanos eliminados: {eliminados}")
+        # Backups .zip del formato anterior
+        backups = sorted(directorio_backups().glob("backup_*.zip"), key=lambda p: p.stat().st_mtime, reverse=True)
         for old in backups[retention:]:
             try:
                 old.unlink()
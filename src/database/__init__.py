@@ -5,6 +5,7 @@ API pública:
 - get_connection: Context manager para conexiones
 - db: Instancia global de DatabaseManager
 - DatabaseManager: Manager para operaciones comunes
+- asegurar_esquema: Aplica las migraciones pendientes según PRAGMA user_version
 """
 
 from __future__ import annotations
@@ -25,7 +26,9 @@ from .database import (
     asegurar_esquema_minimo,
     asegurar_esquema_completo,
     get_db_path_safe,
+    cerrar_conexiones,
 )
+from .versiones_esquema import asegurar_esquema, esquema_actualizado, VERSION_ESQUEMA
 
 # Lazy DB_PATH for backwards compatibility
 DB_PATH: Path | None = None
@@ -58,6 +61,11 @@ __all__ = [
     "obtener_tablas",
     "asegurar_esquema_minimo",
     "asegurar_esquema_completo",
+    "cerrar_conexiones",
+    # Migraciones versionadas (PRAGMA user_version)
+    "asegurar_esquema",
+    "esquema_actualizado",
+    "VERSION_ESQUEMA",
     # Aliases para compatibilidad
     "check_database_exists",
     "init_database", 
@@ -289,22 +289,14 @@ class DatabaseManager:
         Yields:
             None (usa execute_update dentro del contexto)
         """
-        conn = None
-        try:
-            conn = sqlite3.connect(str(self.db_path))
-            conn.row_factory = sqlite3.Row
-            conn.execute("PRAGMA foreign_keys = ON")
-            conn.execute("PRAGMA journal_mode = WAL")
-            yield conn
-            conn.commit()
-        except Exception as e:
-            if conn:
+        with self.get_connection() as conn:
+            try:
+                yield conn
+                conn.commit()
+            except Exception as e:
                 conn.rollback()
-            self.logger.error(f"Error en transacción: {e}")
-            raise
-        finally:
-            if conn:
-                conn.close()
+                self.logger.error(f"Error en transacción: {e}")
+                raise
 
 
 # Instancia global
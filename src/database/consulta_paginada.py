@@ -0,0 +1,216 @@
+"""
+Consulta leída por páginas para grillas grandes.
+
+Las grillas (inventario general, registros de leche, historial de nómina,
+catálogo de insumos) traían todas las filas con fetchall() y las insertaban
+en el Treeview. FuentePaginada envuelve un SELECT y solo lee las páginas
+que se piden (LIMIT/OFFSET sobre el orden elegido), con una caché LRU de
+páginas; el total sale de un COUNT(*):
+
+    fuente = FuentePaginada(
+        get_db_connection,
+        "SELECT a.id, a.codigo, a.nombre FROM animal a WHERE a.id_finca = ?", (1,),
+        columnas_orden={"codigo": "codigo", "nombre": "nombre"},
+        orden="codigo",
+    )
+    fuente.total                 # 20431
+    fuente.filas(15000, 30)      # 30 dicts, lee solo esa página
+    fuente.ordenar("nombre", descendente=True)
+    fuente.posicion_de(812)      # índice de la fila con id 812 en el orden actual
+
+El SELECT no lleva ORDER BY: el orden se aplica por fuera con la columna
+elegida y la clave como desempate, así las posiciones son estables. La
+selección se sigue por clave (buscar_por_clave/posicion_de), sin cargar el
+conjunto. Tras modificar datos hay que llamar a invalidar().
+"""
+
+from __future__ import annotations
+
+import logging
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+TAM_PAGINA = 100
+MAX_PAGINAS = 20
+
+
+class FuentePaginada:
+    """Filas de un SELECT leídas por páginas, con orden y caché."""
+
+    def __init__(
+        self,
+        conexion: Callable[[], Any],
+        sql: str,
+        parametros: Sequence[Any] = (),
+        columnas_orden: Optional[Mapping[str, str]] = None,
+        orden: Optional[str] = None,
+        descendente: bool = False,
+        clave: str = "id",
+        tam_pagina: int = TAM_PAGINA,
+        max_paginas: int = MAX_PAGINAS,
+    ):
+        """
+        Args:
+            conexion: get_db_connection (context manager que entrega la conexión)
+            sql: SELECT sin ORDER BY; debe devolver la columna clave
+            columnas_orden: columna de la grilla -> columna (alias) del SELECT por la que ordenar
+            orden: columna de la grilla del orden inicial (None = por clave)
+        """
+        self._conexion = conexion
+        self._sql = sql
+        self._parametros = tuple(parametros)
+        self.columnas_orden = dict(columnas_orden or {})
+        self.clave = clave
+        self.tam_pagina = max(1, int(tam_pagina))
+        self.max_paginas = max(1, int(max_paginas))
+        self.orden: Optional[str] = None
+        self.descendente = False
+        self._paginas: "OrderedDict[int, List[Dict[str, Any]]]" = OrderedDict()
+        self._total: Optional[int] = None
+        self.ordenar(orden, descendente)
+
+    # ==================== ORDEN ====================
+
+    def ordenar(self, columna: Optional[str], descendente: bool = False) -> None:
+        """Cambia el orden (columna de la grilla o None = por clave) y vacía la caché."""
+        if columna is not None and columna not in self.columnas_orden:
+            raise ValueError(f"No se puede ordenar por {columna!r} (válidas: {sorted(self.columnas_orden)})")
+        self.orden = columna
+        self.descendente = bool(descendente)
+        self._paginas.clear()
+
+    def _columna_orden(self) -> str:
+        return self.columnas_orden[self.orden] if self.orden is not None else self.clave
+
+    def _order_by(self) -> str:
+        direccion = "DESC" if self.descendente else "ASC"
+        if self.orden is None:
+            return f"{self.clave} {direccion}"
+        return f"{self._columna_orden()} {direccion}, {self.clave} {direccion}"
+
+    # ==================== LECTURA ====================
+
+    @property
+    def total(self) -> int:
+        """Filas de la consulta (COUNT(*), se recuerda hasta invalidar())."""
+        if self._total is None:
+            with self._conexion() as conn:
+                self._total = int(
+                    conn.execute(f"SELECT COUNT(*) FROM ({self._sql})", self._parametros).fetchone()[0]
+                )
+        return self._total
+
+    def invalidar(self) -> None:
+        """Olvida total y páginas (llamar tras insertar/editar/borrar)."""
+        self._total = None
+        self._paginas.clear()
+
+    def _pagina(self, numero: int) -> List[Dict[str, Any]]:
+        pagina = self._paginas.get(numero)
+        if pagina is not None:
+            self._paginas.move_to_end(numero)
+            return pagina
+        with self._conexion() as conn:
+            cursor = conn.execute(
+                f"SELECT * FROM ({self._sql}) ORDER BY {self._order_by()} LIMIT ? OFFSET ?",
+                (*self._parametros, self.tam_pagina, numero * self.tam_pagina),
+            )
+            columnas = [d[0] for d in cursor.description]
+            pagina = [dict(zip(columnas, fila)) for fila in cursor.fetchall()]
+        self._paginas[numero] = pagina
+        while len(self._paginas) > self.max_paginas:
+            self._paginas.popitem(last=False)
+        return pagina
+
+    def filas(self, inicio: int, cantidad: int) -> List[Dict[str, Any]]:
+        """Filas [inicio, inicio + cantidad) en el orden actual (lee solo esas páginas)."""
+        inicio = max(0, int(inicio))
+        fin = inicio + max(0, int(cantidad))
+        resultado: List[Dict[str, Any]] = []
+        numero = inicio // self.tam_pagina
+        while numero * self.tam_pagina < fin:
+            pagina = self._pagina(numero)
+            base = numero * self.tam_pagina
+            resultado.extend(pagina[max(0, inicio - base):fin - base])
+            if len(pagina) < self.tam_pagina:
+                break  # última página
+            numero += 1
+        return resultado
+
+    def fila(self, indice: int) -> Optional[Dict[str, Any]]:
+        filas = self.filas(indice, 1)
+        return filas[0] if filas else None
+
+    def iterar(self, tam_lote: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Todas las filas en el orden actual, por lotes y sin usar la caché.
+
+        Abre su propia conexión: sirve desde un hilo de trabajo (exportar).
+        """
+        tam_lote = tam_lote or self.tam_pagina * 5
+        with self._conexion() as conn:
+            cursor = conn.execute(f"SELECT * FROM ({self._sql}) ORDER BY {self._order_by()}", self._parametros)
+            columnas = [d[0] for d in cursor.description]
+            while True:
+                lote = cursor.fetchmany(tam_lote)
+                if not lote:
+                    break
+                for fila in lote:
+                    yield dict(zip(columnas, fila))
+
+    # ==================== SELECCIÓN POR CLAVE ====================
+
+    def buscar_por_clave(self, valor: Any) -> Optional[Dict[str, Any]]:
+        """La fila con esa clave (primero en las páginas leídas, si no con una consulta)."""
+        for pagina in self._paginas.values():
+            for fila in pagina:
+                if fila.get(self.clave) == valor:
+                    return fila
+        with self._conexion() as conn:
+            cursor = conn.execute(
+                f"SELECT * FROM ({self._sql}) WHERE {self.clave} = ? LIMIT 1", (*self._parametros, valor)
+            )
+            fila = cursor.fetchone()
+            if fila is None:
+                return None
+            return dict(zip([d[0] for d in cursor.description], fila))
+
+    def posicion_de(self, valor: Any) -> Optional[int]:
+        """
+        Índice de la fila con esa clave en el orden actual (None si no está).
+
+        Cuenta las filas que van antes con la misma regla del ORDER BY
+        (en SQLite los NULL van primero en ASC y últimos en DESC).
+        """
+        fila = self.buscar_por_clave(valor)
+        if fila is None:
+            return None
+        if self.orden is None:
+            comparador = ">" if self.descendente else "<"
+            condicion, parametros = f"{self.clave} {comparador} ?", [valor]
+        else:
+            columna = self._columna_orden()
+            valor_orden = fila.get(columna)
+            comparador = ">" if self.descendente else "<"
+            desempate = f"{self.clave} {comparador} ?"
+            if valor_orden is None:
+                # NULL: antes van los demás NULL con clave menor (ASC) o todos los no NULL (DESC)
+                condicion = f"({columna} IS NULL AND {desempate})"
+                if self.descendente:
+                    condicion = f"({columna} IS NOT NULL OR {condicion})"
+                parametros = [valor]
+            else:
+                condicion = f"({columna} {comparador} ? OR ({columna} = ? AND {desempate}))"
+                if not self.descendente:
+                    condicion = f"({columna} IS NULL OR {condicion})"
+                parametros = [valor_orden, valor_orden, valor]
+        with self._conexion() as conn:
+            antes = conn.execute(
+                f"SELECT COUNT(*) FROM ({self._sql}) WHERE {condicion}", (*self._parametros, *parametros)
+            ).fetchone()[0]
+        return int(antes)
+
+
+__all__ = ["FuentePaginada", "TAM_PAGINA"]
@@ -16,14 +16,25 @@ logger = logging.getLogger(__name__)
 
 # Importar migraciones
 try:
-    from database.migraciones import ejecutar_migraciones
+    from .migraciones import ejecutar_migraciones
 except ImportError:
     # Fallback si está en src/
     try:
         from migraciones import ejecutar_migraciones
     except ImportError:
-        def ejecutar_migraciones(conn):
+        def ejecutar_migraciones(conn, estricto=False):
             logger.warning("Módulo de migraciones no disponible")
+try:
+    from .pool import pooled_connection, close_all_pools
+    from .profiler import instalar_si_habilitado as _instalar_profiler
+except ImportError:
+    # Fallback si se importa fuera del paquete
+    from pool import pooled_connection, close_all_pools
+    from profiler import instalar_si_habilitado as _instalar_profiler
+
+# Profiler de consultas opt-in (FINCAFACIL_SQL_PROFILE=1)
+_instalar_profiler()
+
 # Import app_paths lazily to avoid circular imports
 _DB_PATH = None
 _SEED_DB_PATH = None
@@ -92,6 +103,10 @@ ensure_local_db()
 def get_db_connection(db_path: Optional[Path | str] = None) -> Iterator[sqlite3.Connection]:
     """
     Obtiene una conexión SQLite configurada.
+
+    La conexión proviene del pool (ver database.pool): se reutiliza entre
+    llamadas del mismo hilo y al salir del bloque se hace rollback de lo no
+    confirmado, igual que al cerrar una conexión nueva.
     Args:
         db_path: Ruta opcional a la base de datos.
     Yields:
@@ -99,21 +114,19 @@ def get_db_connection(db_path: Optional[Path | str] = None) -> Iterator[sqlite3.
     """
     path = db_path or get_db_path_safe()
     try:
-        Path(path).parent.mkdir(exist_ok=True, parents=True)
-        conn = sqlite3.connect(str(path))
-        conn.row_factory = sqlite3.Row
-        conn.execute("PRAGMA foreign_keys = ON")
-        conn.execute("PRAGMA journal_mode = WAL")
-        yield conn
+        with pooled_connection(path) as conn:
+            yield conn
     except sqlite3.Error as e:
         logger.error(f"Error al conectar con la base de datos: {e}")
         raise
-    finally:
-        try:
-            if 'conn' in locals():
-                conn.close()
-        except Exception:
-            pass
+
+
+def cerrar_conexiones() -> None:
+    """
+    Cierra las conexiones agrupadas. Llamar antes de reemplazar el archivo
+    de base de datos (restauración de backups) o al finalizar la aplicación.
+    """
+    close_all_pools()
 
 def inicializar_base_datos() -> bool:
     """
@@ -180,178 +193,194 @@ def asegurar_esquema_minimo() -> None:
     """
     try:
         with get_db_connection() as conn:
-            cur = conn.cursor()
+            _asegurar_esquema_minimo(conn)
+    except Exception as e:
+        # No debe impedir el arranque, solo registrar advertencia
+        logger.warning(f"No se pudo asegurar esquema mínimo: {e}")
 
-            # Asegurar existencia de tabla app_settings
-            cur.execute(
-                """
-                CREATE TABLE IF NOT EXISTS app_settings (
-                    clave TEXT PRIMARY KEY,
-                    valor TEXT
-                )
-                """
-            )
 
-            # Insertar valores por defecto si no existen
-            cur.execute(
-                "INSERT OR IGNORE INTO app_settings (clave, valor) VALUES ('units_weight', 'kg')"
-            )
-            cur.execute(
-                "INSERT OR IGNORE INTO app_settings (clave, valor) VALUES ('units_volume', 'L')"
-            )
+def _asegurar_esquema_minimo(conn: sqlite3.Connection, estricto: bool = False) -> None:
+    """
+    Cuerpo de asegurar_esquema_minimo() sobre una conexión dada.
+
+    Con estricto=True los fallos se propagan (paso de migración versionado:
+    no debe darse por aplicado si algo falló).
+    """
+    cur = conn.cursor()
+
+    # Asegurar existencia de tabla app_settings
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS app_settings (
+            clave TEXT PRIMARY KEY,
+            valor TEXT
+        )
+        """
+    )
+
+    # Insertar valores por defecto si no existen
+    cur.execute(
+        "INSERT OR IGNORE INTO app_settings (clave, valor) VALUES ('units_weight', 'kg')"
+    )
+    cur.execute(
+        "INSERT OR IGNORE INTO app_settings (clave, valor) VALUES ('units_volume', 'L')"
+    )
+
+    conn.commit()
+    logger.info("Esquema mínimo verificado (app_settings y valores por defecto)")
+
+    # Ejecutar migraciones del sistema (usuarios, roles, auditoría, KPIs)
+    try:
+        ejecutar_migraciones(conn, estricto=estricto)
+    except Exception as e:
+        logger.warning(f"No se pudieron ejecutar migraciones adicionales: {e}")
+        if estricto:
+            raise
+
+    # Limpieza de tablas legacy residuales que causan errores FK
+    try:
+        # Verificar que tabla animal principal tiene datos
+        cur.execute("SELECT COUNT(*) FROM animal")
+        animal_count = cur.fetchone()
+        if animal_count and animal_count[0] > 0:
+            # Eliminar tablas legacy si existen
+            legacy_tables = ['animal_legacy', 'animal_legacy_temp']
+            for legacy_table in legacy_tables:
+                cur.execute(f"SELECT name FROM sqlite_master WHERE type='table' AND name=?", (legacy_table,))
+                if cur.fetchone():
+                    cur.execute(f"DROP TABLE IF EXISTS {legacy_table}")
+                    logger.info(f"Tabla legacy '{legacy_table}' eliminada durante inicialización")
+
+            # Eliminar triggers con referencias legacy
+            cur.execute("SELECT name FROM sqlite_master WHERE type='trigger' AND sql LIKE '%legacy%'")
+            legacy_triggers = cur.fetchall()
+            for (trigger_name,) in legacy_triggers:
+                cur.execute(f"DROP TRIGGER IF EXISTS {trigger_name}")
+                logger.info(f"Trigger legacy '{trigger_name}' eliminado")
 
             conn.commit()
-            logger.info("Esquema mínimo verificado (app_settings y valores por defecto)")
-
-            # Ejecutar migraciones del sistema (usuarios, roles, auditoría, KPIs)
-            try:
-                ejecutar_migraciones(conn)
-            except Exception as e:
-                logger.warning(f"No se pudieron ejecutar migraciones adicionales: {e}")
-
-            # Limpieza de tablas legacy residuales que causan errores FK
-            try:
-                # Verificar que tabla animal principal tiene datos
-                cur.execute("SELECT COUNT(*) FROM animal")
-                animal_count = cur.fetchone()
-                if animal_count and animal_count[0] > 0:
-                    # Eliminar tablas legacy si existen
-                    legacy_tables = ['animal_legacy', 'animal_legacy_temp']
-                    for legacy_table in legacy_tables:
-                        cur.execute(f"SELECT name FROM sqlite_master WHERE type='table' AND name=?", (legacy_table,))
-                        if cur.fetchone():
-                            cur.execute(f"DROP TABLE IF EXISTS {legacy_table}")
-                            logger.info(f"Tabla legacy '{legacy_table}' eliminada durante inicialización")
-                    
-                    # Eliminar triggers con referencias legacy
-                    cur.execute("SELECT name FROM sqlite_master WHERE type='trigger' AND sql LIKE '%legacy%'")
-                    legacy_triggers = cur.fetchall()
-                    for (trigger_name,) in legacy_triggers:
-                        cur.execute(f"DROP TRIGGER IF EXISTS {trigger_name}")
-                        logger.info(f"Trigger legacy '{trigger_name}' eliminado")
-                    
-                    conn.commit()
-                    logger.info("Limpieza de referencias legacy completada")
-                # Normalizar tabla comentario a esquema unificado
-                try:
-                    cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='comentario'")
-                    exists = cur.fetchone() is not None
-                    if not exists:
-                        cur.execute(
-                            """
-                            CREATE TABLE comentario (
-                                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                                animal_id INTEGER NOT NULL,
-                                fecha TEXT NOT NULL,
-                                comentario TEXT NOT NULL,
-                                FOREIGN KEY (animal_id) REFERENCES animal(id) ON DELETE CASCADE
-                            )
-                            """
-                        )
-                        logger.info("Tabla 'comentario' creada con esquema estándar")
-                    else:
-                        # Detectar columnas legacy (id_animal, autor, nota)
-                        cur.execute("PRAGMA table_info(comentario)")
-                        cols = [row[1] for row in cur.fetchall()]
-                        if 'animal_id' not in cols or 'comentario' not in cols:
-                            logger.info("Reconstruyendo 'comentario' para esquema estándar")
-                            cur.execute("ALTER TABLE comentario RENAME TO comentario_backup")
-                            cur.execute(
-                                """
-                                CREATE TABLE comentario (
-                                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                                    animal_id INTEGER NOT NULL,
-                                    fecha TEXT NOT NULL,
-                                    comentario TEXT NOT NULL,
-                                    FOREIGN KEY (animal_id) REFERENCES animal(id) ON DELETE CASCADE
-                                )
-                                """
-                            )
-                            # Migrar datos si existen columnas compatibles
-                            # Mapear: id_animal -> animal_id, nota -> comentario
-                            try:
-                                cur.execute(
-                                    """
-                                    INSERT INTO comentario (animal_id, fecha, comentario)
-                                    SELECT 
-                                        COALESCE(id_animal, animal_id),
-                                        fecha,
-                                        COALESCE(nota, comentario)
-                                    FROM comentario_backup
-                                    """
-                                )
-                            except Exception:
-                                # Si no coinciden, insertar nada
-                                pass
-                            cur.execute("DROP TABLE comentario_backup")
-                            logger.info("Tabla 'comentario' normalizada correctamente")
-                    conn.commit()
-                except Exception as ce:
-                    logger.warning(f"No se pudo normalizar tabla comentario: {ce}")
-
-                # Asegurar tabla reubicacion (nuevo modelo explícito)
-                cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='reubicacion'")
-                if cur.fetchone() is None:
+            logger.info("Limpieza de referencias legacy completada")
+        # Normalizar tabla comentario a esquema unificado
+        try:
+            cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='comentario'")
+            exists = cur.fetchone() is not None
+            if not exists:
+                cur.execute(
+                    """
+                    CREATE TABLE comentario (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        animal_id INTEGER NOT NULL,
+                        fecha TEXT NOT NULL,
+                        comentario TEXT NOT NULL,
+                        FOREIGN KEY (animal_id) REFERENCES animal(id) ON DELETE CASCADE
+                    )
+                    """
+                )
+                logger.info("Tabla 'comentario' creada con esquema estándar")
+            else:
+                # Detectar columnas legacy (id_animal, autor, nota)
+                cur.execute("PRAGMA table_info(comentario)")
+                cols = [row[1] for row in cur.fetchall()]
+                if 'animal_id' not in cols or 'comentario' not in cols:
+                    logger.info("Reconstruyendo 'comentario' para esquema estándar")
+                    cur.execute("ALTER TABLE comentario RENAME TO comentario_backup")
                     cur.execute(
                         """
-                        CREATE TABLE reubicacion (
+                        CREATE TABLE comentario (
                             id INTEGER PRIMARY KEY AUTOINCREMENT,
                             animal_id INTEGER NOT NULL,
                             fecha TEXT NOT NULL,
-                            from_potrero TEXT,
-                            to_potrero TEXT,
-                            motivo TEXT,
-                            autor TEXT,
+                            comentario TEXT NOT NULL,
                             FOREIGN KEY (animal_id) REFERENCES animal(id) ON DELETE CASCADE
                         )
                         """
                     )
-                    logger.info("Tabla 'reubicacion' creada")
-                # Índices útiles para reportes
-                cur.execute("CREATE INDEX IF NOT EXISTS idx_reub_animal_fecha ON reubicacion(animal_id, fecha)")
-                cur.execute("CREATE INDEX IF NOT EXISTS idx_reub_potreros ON reubicacion(from_potrero, to_potrero)")
-
-                # Historial de reubicaciones para reportes
-                cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='historial_reubicaciones'")
-                if cur.fetchone() is None:
-                    cur.execute(
-                        """
-                        CREATE TABLE historial_reubicaciones (
-                            id INTEGER PRIMARY KEY AUTOINCREMENT,
-                            animal_codigo TEXT NOT NULL,
-                            finca_origen TEXT,
-                            finca_destino TEXT,
-                            potrero_origen TEXT,
-                            potrero_destino TEXT,
-                            fecha TEXT NOT NULL,
-                            motivo TEXT,
-                            usuario TEXT,
-                            fecha_registro TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    # Migrar datos si existen columnas compatibles
+                    # Mapear: id_animal -> animal_id, nota -> comentario
+                    try:
+                        cur.execute(
+                            """
+                            INSERT INTO comentario (animal_id, fecha, comentario)
+                            SELECT 
+                                COALESCE(id_animal, animal_id),
+                                fecha,
+                                COALESCE(nota, comentario)
+                            FROM comentario_backup
+                            """
                         )
-                        """
-                    )
-                    cur.execute("CREATE INDEX IF NOT EXISTS idx_hist_reub_fecha ON historial_reubicaciones(fecha)")
+                    except Exception:
+                        # Si no coinciden, insertar nada
+                        pass
+                    cur.execute("DROP TABLE comentario_backup")
+                    logger.info("Tabla 'comentario' normalizada correctamente")
+            conn.commit()
+        except Exception as ce:
+            logger.warning(f"No se pudo normalizar tabla comentario: {ce}")
+            if estricto:
+                raise
+
+        # Asegurar tabla reubicacion (nuevo modelo explícito)
+        cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='reubicacion'")
+        if cur.fetchone() is None:
+            cur.execute(
+                """
+                CREATE TABLE reubicacion (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    animal_id INTEGER NOT NULL,
+                    fecha TEXT NOT NULL,
+                    from_potrero TEXT,
+                    to_potrero TEXT,
+                    motivo TEXT,
+                    autor TEXT,
+                    FOREIGN KEY (animal_id) REFERENCES animal(id) ON DELETE CASCADE
+                )
+                """
+            )
+            logger.info("Tabla 'reubicacion' creada")
+        # Índices útiles para reportes
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_reub_animal_fecha ON reubicacion(animal_id, fecha)")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_reub_potreros ON reubicacion(from_potrero, to_potrero)")
+
+        # Historial de reubicaciones para reportes
+        cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='historial_reubicaciones'")
+        if cur.fetchone() is None:
+            cur.execute(
+                """
+                CREATE TABLE historial_reubicaciones (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    animal_codigo TEXT NOT NULL,
+                    finca_origen TEXT,
+                    finca_destino TEXT,
+                    potrero_origen TEXT,
+                    potrero_destino TEXT,
+                    fecha TEXT NOT NULL,
+                    motivo TEXT,
+                    usuario TEXT,
+                    fecha_registro TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+                """
+            )
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_hist_reub_fecha ON historial_reubicaciones(fecha)")
 
-                # Inventario animales por finca (conteo rápido)
-                cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='inventario_animales'")
-                if cur.fetchone() is None:
-                    cur.execute(
-                        """
-                        CREATE TABLE inventario_animales (
-                            finca_id INTEGER PRIMARY KEY,
-                            cantidad INTEGER NOT NULL DEFAULT 0,
-                            fecha_actualizacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                            FOREIGN KEY (finca_id) REFERENCES finca(id)
-                        )
-                        """
-                    )
+        # Inventario animales por finca (conteo rápido)
+        cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='inventario_animales'")
+        if cur.fetchone() is None:
+            cur.execute(
+                """
+                CREATE TABLE inventario_animales (
+                    finca_id INTEGER PRIMARY KEY,
+                    cantidad INTEGER NOT NULL DEFAULT 0,
+                    fecha_actualizacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (finca_id) REFERENCES finca(id)
+                )
+                """
+            )
 
-                conn.commit()
-            except Exception as e:
-                logger.warning(f"No se pudo limpiar tablas legacy: {e}")
+        conn.commit()
     except Exception as e:
-        # No debe impedir el arranque, solo registrar advertencia
-        logger.warning(f"No se pudo asegurar esquema mínimo: {e}")
+        logger.warning(f"No se pudo limpiar tablas legacy: {e}")
+        if estricto:
+            raise
 
 def asegurar_esquema_completo() -> None:
     """
@@ -908,6 +937,7 @@ CREATE TABLE IF NOT EXISTS evento (
     descripcion TEXT,
     fecha_evento DATE NOT NULL,
     tipo_evento TEXT CHECK(tipo_evento IN ('Sanitario', 'Reproductivo', 'Movimiento', 'General')),
+    subtipo TEXT,  -- nacimiento, parto, servicio (ver eventos.SUBTIPOS_EVENTO)
     animal_id INTEGER,
     lote_id INTEGER,
     completado BOOLEAN DEFAULT 0,
@@ -1086,6 +1116,14 @@ CREATE INDEX IF NOT EXISTS idx_comentario_animal_fecha ON comentario (id_animal,
 CREATE INDEX IF NOT EXISTS idx_peso_animal_fecha ON peso (animal_id, fecha);
 CREATE INDEX IF NOT EXISTS idx_leche_animal_fecha ON produccion_leche (animal_id, fecha);
 CREATE INDEX IF NOT EXISTS idx_muerte_animal ON muerte (animal_id);
+-- Índices de fecha para filtros por rango (ver rango_fechas.py)
+CREATE INDEX IF NOT EXISTS idx_leche_fecha ON produccion_leche (fecha);
+CREATE INDEX IF NOT EXISTS idx_muerte_fecha ON muerte (fecha);
+CREATE INDEX IF NOT EXISTS idx_servicio_fecha ON servicio (fecha_servicio);
+CREATE INDEX IF NOT EXISTS idx_servicio_parto_real ON servicio (fecha_parto_real);
+CREATE INDEX IF NOT EXISTS idx_evento_fecha ON evento (fecha_evento);
+CREATE INDEX IF NOT EXISTS idx_movimiento_fecha ON movimiento (fecha_movimiento);
+CREATE INDEX IF NOT EXISTS idx_animal_fecha_nacimiento ON animal (fecha_nacimiento);
 CREATE INDEX IF NOT EXISTS idx_diag_evento_animal_fecha ON diagnostico_evento (animal_id, fecha);
 CREATE INDEX IF NOT EXISTS idx_sector_codigo ON sector (codigo);
 CREATE INDEX IF NOT EXISTS idx_sector_finca ON sector (finca_id);
@@ -1111,6 +1149,7 @@ CREATE INDEX IF NOT EXISTS idx_reproduccion_animal ON reproduccion (animal_id);
 CREATE INDEX IF NOT EXISTS idx_reproduccion_estado ON reproduccion (estado);
 -- Índice compuesto para mejorar consultas de nómina por empleado y período
 CREATE INDEX IF NOT EXISTS idx_pago_nomina_empleado_periodo ON pago_nomina (codigo_empleado, periodo_inicio, periodo_fin);
+CREATE INDEX IF NOT EXISTS idx_pago_nomina_fecha ON pago_nomina (fecha_pago);
 -- Índice de lote-finca si la migración ya agregó la columna
 CREATE INDEX IF NOT EXISTS idx_lote_finca ON lote (finca_id);
 -- Trigger para mantener fecha_actualizacion coherente al modificar animales
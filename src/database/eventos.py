@@ -0,0 +1,68 @@
+"""
+Escritura y clasificación de eventos (tabla evento)
+
+Los repositorios insertan con insertar_evento() y el subtipo ya resuelto;
+migraciones.instalar_subtipo_evento() clasifica los eventos existentes con
+expresion_sql_subtipo().
+"""
+
+# Subtipo normalizado de evento (evento.subtipo) para filtrar por igualdad
+# indexada en lugar de `descripcion LIKE '%...%'`. Solo se clasifican eventos
+# 'Reproductivo'; las palabras se buscan en título y descripción en minúsculas
+# y, si aparecen varias, gana el primer subtipo de esta lista.
+SUBTIPOS_EVENTO = {
+    "nacimiento": ("nacimiento",),
+    "parto": ("parto", "cesarea", "cesárea"),
+    "servicio": ("servicio", "inseminaci", "monta"),
+}
+
+
+def clasificar_subtipo_evento(tipo_evento, titulo=None, descripcion=None):
+    """Subtipo de un evento según SUBTIPOS_EVENTO (None si no aplica)."""
+    if tipo_evento != "Reproductivo":
+        return None
+    texto = f"{titulo or ''} {descripcion or ''}".lower()
+    for subtipo, palabras in SUBTIPOS_EVENTO.items():
+        if any(p in texto for p in palabras):
+            return subtipo
+    return None
+
+
+def insertar_evento(ejecutar, titulo, fecha_evento, subtipo, animal_id=None, descripcion=None,
+                    tipo_evento="Reproductivo"):
+    """
+    Inserta un evento con su subtipo ya clasificado (evento.subtipo).
+
+    Args:
+        ejecutar: ejecutar_consulta o el _execute de un repositorio
+    """
+    ejecutar(
+        """
+        INSERT INTO evento (titulo, descripcion, fecha_evento, tipo_evento, subtipo, animal_id, completado)
+        VALUES (?, ?, ?, ?, ?, ?, 1)
+        """,
+        (titulo, descripcion, fecha_evento, tipo_evento, subtipo, animal_id),
+        fetch=False,
+    )
+
+
+def expresion_sql_subtipo(fila=""):
+    """
+    Misma clasificación que clasificar_subtipo_evento como expresión SQL
+    (fila: prefijo de columnas, p. ej. 'NEW.' dentro de un trigger).
+    """
+    texto = f"lower(coalesce({fila}titulo, '') || ' ' || coalesce({fila}descripcion, ''))"
+    casos = []
+    for subtipo, palabras in SUBTIPOS_EVENTO.items():
+        condicion = " OR ".join(f"{texto} LIKE '%{p}%'" for p in palabras)
+        casos.append(f"        WHEN {condicion} THEN '{subtipo}'")
+    casos = "\n".join(casos)
+    return f"CASE WHEN {fila}tipo_evento IS NOT 'Reproductivo' THEN NULL\n{casos}\n    END"
+
+
+__all__ = [
+    "SUBTIPOS_EVENTO",
+    "clasificar_subtipo_evento",
+    "insertar_evento",
+    "expresion_sql_subtipo",
+]
@@ -0,0 +1,238 @@
+"""
+Resumen del hato mantenido por triggers (herd_summary).
+
+Las tarjetas del Dashboard, ReporteAnimales.obtener_inventario_actual y los
+reportes cuentan animales por estado, sexo, finca y categoría; con un
+GROUP BY sobre `animal` eso recorre todo el hato en cada refresco. Aquí
+herd_summary guarda una fila por combinación (finca × estado × sexo ×
+categoría) con su conteo, y triggers AFTER INSERT/UPDATE/DELETE sobre
+animal la mantienen exacta en la misma transacción del cambio:
+
+    with get_db_connection() as conn:
+        contar(conn, estados=("Activo", None))             # activos (NULL = Activo)
+        conteo_por(conn, "estado", "sexo")                 # {('Activo', 'Hembra'): 812, ...}
+
+Los NULL se guardan como '' (y la finca NULL como 0) para que la clave
+primaria sirva de destino del UPSERT; las funciones de lectura reciben y
+devuelven None. Si la tabla no está instalada (BD sin migrar) las lecturas
+caen al mismo GROUP BY sobre animal, con el mismo resultado.
+
+Una columna de dimensión que no exista en animal (categoria en bases muy
+antiguas) se trata como NULL. verificar() compara lo mantenido contra un
+conteo completo y reconstruir() lo rehace (ver tools/herd_summary.py).
+"""
+
+from __future__ import annotations
+
+import sqlite3
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+DIMENSIONES: Tuple[str, ...] = ("id_finca", "estado", "sexo", "categoria")
+
+# Valor guardado en lugar de NULL (la finca es entera)
+SIN_VALOR = {"id_finca": 0, "estado": "", "sexo": "", "categoria": ""}
+
+ESQUEMA_HERD_SUMMARY = """
+CREATE TABLE IF NOT EXISTS herd_summary (
+    id_finca INTEGER NOT NULL,
+    estado TEXT NOT NULL,
+    sexo TEXT NOT NULL,
+    categoria TEXT NOT NULL,
+    n INTEGER NOT NULL,
+    PRIMARY KEY (id_finca, estado, sexo, categoria)
+) WITHOUT ROWID;
+"""
+
+TRIGGERS = ("trg_herd_summary_insert", "trg_herd_summary_update", "trg_herd_summary_delete")
+
+
+def _sin_nulo(dimension: str, valor: Any) -> Any:
+    return SIN_VALOR[dimension] if valor is None else valor
+
+
+def _con_nulo(dimension: str, valor: Any) -> Any:
+    return None if valor == SIN_VALOR[dimension] else valor
+
+
+def _columnas_animal(conn: sqlite3.Connection) -> set:
+    return {fila[1] for fila in conn.execute("PRAGMA table_info(animal)").fetchall()}
+
+
+def _expresiones(conn: sqlite3.Connection, fila: str) -> List[str]:
+    """COALESCE de cada dimensión sobre {fila}; constante si la columna no existe."""
+    columnas = _columnas_animal(conn)
+    expresiones = []
+    for dimension in DIMENSIONES:
+        vacio = repr(SIN_VALOR[dimension])
+        expresiones.append(f"COALESCE({fila}.{dimension}, {vacio})" if dimension in columnas else vacio)
+    return expresiones
+
+
+def _sql_triggers(conn: sqlite3.Connection) -> str:
+    nuevo, viejo = _expresiones(conn, "NEW"), _expresiones(conn, "OLD")
+    columnas = ", ".join(DIMENSIONES)
+    presentes = [d for d in DIMENSIONES if d in _columnas_animal(conn)]
+    cambio = " OR ".join(f"OLD.{d} IS NOT NEW.{d}" for d in presentes) or "0"
+    donde_viejo = " AND ".join(f"{d} = {e}" for d, e in zip(DIMENSIONES, viejo))
+
+    sumar = f"""
+    INSERT INTO herd_summary ({columnas}, n) VALUES ({", ".join(nuevo)}, 1)
+    ON CONFLICT ({columnas}) DO UPDATE SET n = n + 1;"""
+    restar = f"""
+    UPDATE herd_summary SET n = n - 1 WHERE {donde_viejo};
+    DELETE FROM herd_summary WHERE {donde_viejo} AND n <= 0;"""
+    return f"""
+CREATE TRIGGER IF NOT EXISTS trg_herd_summary_insert AFTER INSERT ON animal
+BEGIN{sumar}
+END;
+CREATE TRIGGER IF NOT EXISTS trg_herd_summary_update AFTER UPDATE ON animal
+WHEN {cambio}
+BEGIN{restar}{sumar}
+END;
+CREATE TRIGGER IF NOT EXISTS trg_herd_summary_delete AFTER DELETE ON animal
+BEGIN{restar}
+END;"""
+
+
+def instalado(conn: sqlite3.Connection) -> bool:
+    """True si herd_summary y sus triggers existen."""
+    nombres = {
+        fila[0] for fila in conn.execute(
+            "SELECT name FROM sqlite_master WHERE name = 'herd_summary' OR name LIKE 'trg_herd_summary_%'"
+        )
+    }
+    return {"herd_summary", *TRIGGERS} <= nombres
+
+
+def instalar(conn: sqlite3.Connection) -> bool:
+    """Crea la tabla y los triggers si existe animal (idempotente, no hace commit)."""
+    if not _columnas_animal(conn):
+        return False
+    conn.executescript(ESQUEMA_HERD_SUMMARY)
+    conn.executescript(_sql_triggers(conn))
+    return True
+
+
+def _conteo_completo_sql(conn: sqlite3.Connection) -> str:
+    """El mismo resumen calculado con un GROUP BY sobre animal."""
+    expresiones = _expresiones(conn, "a")
+    alias = ", ".join(f"{e} AS {d}" for d, e in zip(DIMENSIONES, expresiones))
+    return f"SELECT {alias}, COUNT(*) AS n FROM animal AS a GROUP BY {', '.join(DIMENSIONES)}"
+
+
+def reconstruir(conn: sqlite3.Connection) -> int:
+    """
+    Reinstala los triggers y rehace herd_summary desde animal (no hace commit).
+
+    Returns:
+        Filas (combinaciones) del resumen
+    """
+    for trigger in TRIGGERS:
+        conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    if not instalar(conn):
+        return 0
+    conn.execute("DELETE FROM herd_summary")
+    conn.execute(f"INSERT INTO herd_summary ({', '.join(DIMENSIONES)}, n) {_conteo_completo_sql(conn)}")
+    return int(conn.execute("SELECT COUNT(*) FROM herd_summary").fetchone()[0])
+
+
+def verificar(conn: sqlite3.Connection) -> List[Dict[str, Any]]:
+    """
+    Compara herd_summary con un conteo completo de animal.
+
+    Returns:
+        Diferencias [{'id_finca', 'estado', 'sexo', 'categoria', 'resumen', 'completo'}];
+        vacía si coinciden
+    """
+    completo = {tuple(f[:-1]): f[-1] for f in conn.execute(_conteo_completo_sql(conn))}
+    mantenido = {
+        tuple(f[:-1]): f[-1] for f in conn.execute(f"SELECT {', '.join(DIMENSIONES)}, n FROM herd_summary")
+    }
+    diferencias = []
+    for clave in sorted(set(completo) | set(mantenido), key=lambda c: tuple(str(v) for v in c)):
+        esperado, actual = completo.get(clave, 0), mantenido.get(clave, 0)
+        if esperado != actual:
+            fila = {d: _con_nulo(d, v) for d, v in zip(DIMENSIONES, clave)}
+            fila.update(resumen=actual, completo=esperado)
+            diferencias.append(fila)
+    return diferencias
+
+
+# ==================== LECTURA ====================
+
+def _filtros(
+    estados: Optional[Iterable[Optional[str]]],
+    sexo: Optional[str],
+    id_finca: Optional[int],
+    categoria: Optional[str],
+) -> Tuple[str, List[Any]]:
+    condiciones, parametros = [], []
+    if estados is not None:
+        valores = [_sin_nulo("estado", e) for e in estados]
+        condiciones.append(f"estado IN ({', '.join('?' * len(valores))})" if valores else "0")
+        parametros.extend(valores)
+    for dimension, valor in (("sexo", sexo), ("id_finca", id_finca), ("categoria", categoria)):
+        if valor is not None:
+            condiciones.append(f"{dimension} = ?")
+            parametros.append(valor)
+    return (" WHERE " + " AND ".join(condiciones)) if condiciones else "", parametros
+
+
+def _origen(conn: sqlite3.Connection) -> str:
+    return "herd_summary" if instalado(conn) else f"({_conteo_completo_sql(conn)})"
+
+
+def contar(
+    conn: sqlite3.Connection,
+    estados: Optional[Iterable[Optional[str]]] = None,
+    sexo: Optional[str] = None,
+    id_finca: Optional[int] = None,
+    categoria: Optional[str] = None,
+) -> int:
+    """
+    Animales que cumplen los filtros (None en un filtro = sin filtrar).
+
+    estados admite None dentro de la lista para los animales sin estado.
+    """
+    donde, parametros = _filtros(estados, sexo, id_finca, categoria)
+    return int(conn.execute(f"SELECT COALESCE(SUM(n), 0) FROM {_origen(conn)}{donde}", parametros).fetchone()[0])
+
+
+def conteo_por(
+    conn: sqlite3.Connection,
+    *dimensiones: str,
+    estados: Optional[Iterable[Optional[str]]] = None,
+    sexo: Optional[str] = None,
+    id_finca: Optional[int] = None,
+    categoria: Optional[str] = None,
+) -> Dict[Any, int]:
+    """
+    Conteos agrupados por las dimensiones pedidas.
+
+    Con una dimensión las claves son el valor; con varias, tuplas en el orden
+    pedido. Los NULL vuelven como None.
+    """
+    desconocidas = set(dimensiones) - set(DIMENSIONES)
+    if not dimensiones or desconocidas:
+        raise ValueError(f"Dimensiones inválidas: {dimensiones} (válidas: {DIMENSIONES})")
+    donde, parametros = _filtros(estados, sexo, id_finca, categoria)
+    columnas = ", ".join(dimensiones)
+    resultado: Dict[Any, int] = {}
+    for fila in conn.execute(
+        f"SELECT {columnas}, SUM(n) FROM {_origen(conn)}{donde} GROUP BY {columnas}", parametros
+    ):
+        clave = tuple(_con_nulo(d, v) for d, v in zip(dimensiones, fila[:-1]))
+        resultado[clave[0] if len(clave) == 1 else clave] = int(fila[-1])
+    return resultado
+
+
+__all__ = [
+    "DIMENSIONES",
+    "ESQUEMA_HERD_SUMMARY",
+    "instalado",
+    "instalar",
+    "reconstruir",
+    "verificar",
+    "contar",
+    "conteo_por",
+]
@@ -0,0 +1,170 @@
+"""
+Tabla de hechos de KPIs en formato largo: kpi_fact(año, mes, finca_id, metrica, valor).
+
+Los servicios de analytics necesitan una o dos métricas por mes y antes las
+sacaban de bi_snapshots_mensual haciendo json.loads de cada data_json. Al
+generar un snapshot, BISnapshotService escribe también una fila por métrica
+numérica; los lectores piden solo las métricas y meses que usan:
+
+    with get_db_connection() as conn:
+        series = leer_kpis(conn, ["costo_total"], (2025, 1), (2025, 6))
+        series["costo_total"][(2025, 3)]  # -> valor
+
+finca_id = FINCA_TODAS (0) es el total de la empresa (los snapshots actuales
+son globales). Se usa 0 y no NULL para que la clave primaria detecte el
+conflicto al reescribir un mes.
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+try:
+    from .periodos import Periodo
+except ImportError:
+    from periodos import Periodo
+
+FINCA_TODAS = 0
+
+ESQUEMA_KPI_FACT = """
+CREATE TABLE IF NOT EXISTS kpi_fact (
+    año INTEGER NOT NULL,
+    mes INTEGER NOT NULL,
+    finca_id INTEGER NOT NULL DEFAULT 0,
+    metrica TEXT NOT NULL,
+    valor REAL NOT NULL,
+    PRIMARY KEY (metrica, finca_id, año, mes)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_kpi_fact_periodo ON kpi_fact(año, mes, finca_id);
+"""
+
+# Columnas de resumen_mensual que no son métricas
+_COLUMNAS_NO_METRICA = {"id", "año", "mes", "finca_id", "version"}
+
+
+def _numero(valor: Any) -> Optional[float]:
+    if isinstance(valor, dict):
+        valor = valor.get("valor")
+    if isinstance(valor, bool) or not isinstance(valor, (int, float)):
+        return None
+    return float(valor)
+
+
+def metricas_de_snapshot(data: Dict[str, Any]) -> Dict[str, float]:
+    """
+    Aplana un snapshot de bi_snapshots_mensual a {metrica: valor}.
+
+    Incluye las columnas numéricas de resumen_mensual y los KPIs del mes
+    (valor directo o {'valor': ..., 'categoria': ...}). Si una métrica aparece
+    en varios lugares se respeta la precedencia con la que la buscaban los
+    servicios: resumen_mensual.kpis, luego kpis.
+    """
+    metricas: Dict[str, float] = {}
+    resumen = data.get("resumen_mensual") or {}
+    for nombre, valor in resumen.items():
+        if nombre not in _COLUMNAS_NO_METRICA and (num := _numero(valor)) is not None:
+            metricas[nombre] = num
+    for fuente in (data.get("kpis") or {}, resumen.get("kpis") or {}):
+        if isinstance(fuente, dict):
+            for nombre, valor in fuente.items():
+                if (num := _numero(valor)) is not None:
+                    metricas[nombre] = num
+    return metricas
+
+
+def escribir_kpis(
+    conn: sqlite3.Connection,
+    año: int,
+    mes: int,
+    metricas: Dict[str, float],
+    finca_id: int = FINCA_TODAS,
+) -> int:
+    """Reemplaza las métricas del mes (no hace commit: va en la transacción del llamador)."""
+    conn.execute("DELETE FROM kpi_fact WHERE año = ? AND mes = ? AND finca_id = ?", (año, mes, finca_id))
+    conn.executemany(
+        "INSERT INTO kpi_fact (año, mes, finca_id, metrica, valor) VALUES (?, ?, ?, ?, ?)",
+        [(año, mes, finca_id, nombre, valor) for nombre, valor in metricas.items()],
+    )
+    return len(metricas)
+
+
+def leer_kpis(
+    conn: sqlite3.Connection,
+    metricas: Iterable[str],
+    desde: Periodo,
+    hasta: Periodo,
+    finca_id: int = FINCA_TODAS,
+) -> Dict[str, Dict[Periodo, float]]:
+    """
+    Valores de las métricas pedidas en [desde, hasta] (inclusive).
+
+    Returns:
+        {metrica: {(año, mes): valor}}; las métricas sin datos quedan vacías
+    """
+    metricas = list(dict.fromkeys(metricas))
+    series: Dict[str, Dict[Periodo, float]] = {m: {} for m in metricas}
+    if not metricas:
+        return series
+    marcas = ", ".join("?" * len(metricas))
+    filas = conn.execute(
+        f"""
+        SELECT metrica, año, mes, valor FROM kpi_fact
+        WHERE metrica IN ({marcas}) AND finca_id = ?
+          AND (año, mes) >= (?, ?) AND (año, mes) <= (?, ?)
+        ORDER BY metrica, año, mes
+        """,
+        (*metricas, finca_id, *desde, *hasta),
+    ).fetchall()
+    for metrica, año, mes, valor in filas:
+        series[metrica][(año, mes)] = valor
+    return series
+
+
+def periodos_entre(inicio: date, fin: date) -> Tuple[Periodo, Periodo]:
+    """Primer y último mes cuyo día 1 cae en [inicio, fin]."""
+    desde = (inicio.year, inicio.month)
+    if inicio.day > 1:
+        desde = (inicio.year + 1, 1) if inicio.month == 12 else (inicio.year, inicio.month + 1)
+    return desde, (fin.year, fin.month)
+
+
+def meses_con_snapshot(conn: sqlite3.Connection, desde: Periodo, hasta: Periodo) -> List[Periodo]:
+    """Meses de [desde, hasta] que tienen snapshot, en orden (solo lee el índice por período)."""
+    return [
+        (año, mes)
+        for año, mes in conn.execute(
+            """
+            SELECT año, mes FROM bi_snapshots_mensual
+            WHERE (año, mes) >= (?, ?) AND (año, mes) <= (?, ?)
+            ORDER BY año, mes
+            """,
+            (*desde, *hasta),
+        )
+    ]
+
+
+def poblar_desde_snapshots(conn: sqlite3.Connection) -> int:
+    """Carga kpi_fact desde los data_json existentes (migración única)."""
+    total = 0
+    for año, mes, data_json in conn.execute("SELECT año, mes, data_json FROM bi_snapshots_mensual").fetchall():
+        try:
+            data = json.loads(data_json)
+        except (TypeError, ValueError):
+            continue
+        total += escribir_kpis(conn, año, mes, metricas_de_snapshot(data))
+    return total
+
+
+__all__ = [
+    "FINCA_TODAS",
+    "ESQUEMA_KPI_FACT",
+    "metricas_de_snapshot",
+    "escribir_kpis",
+    "leer_kpis",
+    "periodos_entre",
+    "meses_con_snapshot",
+    "poblar_desde_snapshots",
+]
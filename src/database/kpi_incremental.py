@@ -0,0 +1,367 @@
+"""
+Agregados mensuales incrementales para KPICalculatorService.
+
+Los KPIs aditivos (sumas, conteos y conteos de distintos) se mantienen por
+mes en kpi_agregado / kpi_agregado_distinto. Triggers en las tablas fuente
+escriben cada cambio como delta firmado en kpi_delta (+ al insertar, - al
+borrar, ambos al actualizar) y aplicar_deltas() los consolida con un solo
+GROUP BY sobre las filas nuevas:
+
+    with get_db_connection() as conn:
+        aplicar_deltas(conn)
+        leer_agregados(conn, 2025, 6)   # {'gastos': 1200.0, 'vacas_leche': 14, ...}
+
+Los distintos (días con pesaje, vacas en ordeño) guardan un contador de
+referencias por clave, así un borrado solo quita la clave cuando ya no
+quedan filas que la usen.
+
+FUENTES_KPI usa las columnas del esquema real y también la usa el cálculo
+completo de KPICalculatorService (totales_periodo). Una fuente cuya tabla o
+columnas no existen en la BD no instala triggers y aporta 0; se informa en
+fuentes_omitidas(), en el resultado de reconstruir() y en el log de
+verificar(), que compara lo mantenido contra un cálculo completo.
+"""
+
+from __future__ import annotations
+
+import logging
+import sqlite3
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple, Union
+
+try:
+    from .rango_fechas import filtro_fechas
+except ImportError:
+    from rango_fechas import filtro_fechas
+
+logger = logging.getLogger(__name__)
+
+ESQUEMA_KPI_INCREMENTAL = """
+CREATE TABLE IF NOT EXISTS kpi_delta (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    año INTEGER NOT NULL,
+    mes INTEGER NOT NULL,
+    medida TEXT NOT NULL,
+    valor REAL NOT NULL,
+    clave TEXT
+);
+CREATE TABLE IF NOT EXISTS kpi_agregado (
+    año INTEGER NOT NULL,
+    mes INTEGER NOT NULL,
+    medida TEXT NOT NULL,
+    valor REAL NOT NULL,
+    PRIMARY KEY (año, mes, medida)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS kpi_agregado_distinto (
+    año INTEGER NOT NULL,
+    mes INTEGER NOT NULL,
+    medida TEXT NOT NULL,
+    clave TEXT NOT NULL,
+    n INTEGER NOT NULL,
+    PRIMARY KEY (año, mes, medida, clave)
+) WITHOUT ROWID;
+"""
+
+TOLERANCIA = 1e-6
+
+CATEGORIAS_GASTO_PRODUCCION = ("Alimentación", "Insumos", "Veterinario")
+
+ESTADOS_SERVICIO_EXITOSO = ("Gestante", "Parida")
+
+
+@dataclass(frozen=True)
+class FuenteKPI:
+    """
+    Tabla fuente: columna de fecha, sumas y distintos (expresiones sobre {f}).
+    alias distingue los triggers de dos fuentes sobre la misma tabla.
+    """
+    tabla: str
+    fecha: str
+    columnas: Tuple[str, ...]
+    sumas: Dict[str, str] = field(default_factory=dict)
+    distintos: Dict[str, str] = field(default_factory=dict)
+    alias: str = ""
+
+    @property
+    def nombre(self) -> str:
+        return self.alias or self.tabla
+
+
+_EN_CATEGORIAS = ", ".join(f"'{c}'" for c in CATEGORIAS_GASTO_PRODUCCION)
+_EN_EXITOSOS = ", ".join(f"'{e}'" for e in ESTADOS_SERVICIO_EXITOSO)
+
+FUENTES_KPI: List[FuenteKPI] = [
+    FuenteKPI("venta", "fecha", ("fecha", "precio_total"), {"ventas_animales": "{f}.precio_total"}),
+    FuenteKPI("venta_leche", "fecha", ("fecha", "precio_total"), {"ventas_leche": "{f}.precio_total"}),
+    FuenteKPI(
+        "gasto", "fecha", ("fecha", "monto", "categoria"),
+        {
+            "gastos": "{f}.monto",
+            "gastos_produccion": f"CASE WHEN {{f}}.categoria IN ({_EN_CATEGORIAS}) THEN {{f}}.monto ELSE 0 END",
+        },
+    ),
+    FuenteKPI("pago_nomina", "fecha_pago", ("fecha_pago", "total_pagado"), {"nomina": "{f}.total_pagado"}),
+    # tratamiento no guarda costo en el esquema actual: queda omitida hasta que exista la columna
+    FuenteKPI("tratamiento", "fecha_inicio", ("fecha_inicio", "costo"), {"tratamientos": "{f}.costo"}),
+    FuenteKPI(
+        "produccion_leche", "fecha", ("fecha", "litros_manana", "litros_tarde", "litros_noche", "animal_id"),
+        {"litros": "COALESCE({f}.litros_manana, 0) + COALESCE({f}.litros_tarde, 0) + COALESCE({f}.litros_noche, 0)"},
+        {"dias_leche": "{f}.fecha", "vacas_leche": "{f}.animal_id"},
+    ),
+    FuenteKPI(
+        "servicio", "fecha_servicio", ("fecha_servicio", "estado"),
+        {
+            "servicios": "1",
+            "servicios_exitosos": f"CASE WHEN {{f}}.estado IN ({_EN_EXITOSOS}) THEN 1 ELSE 0 END",
+        },
+    ),
+    # Los partos se registran en el servicio (estado 'Parida' + fecha_parto_real)
+    FuenteKPI("servicio", "fecha_parto_real", ("fecha_parto_real",), {"partos": "1"}, alias="servicio_parto"),
+]
+
+
+def _año_mes(fuente: FuenteKPI, f: str) -> Tuple[str, str]:
+    columna = f"{f}.{fuente.fecha}"
+    return f"CAST(strftime('%Y', {columna}) AS INTEGER)", f"CAST(strftime('%m', {columna}) AS INTEGER)"
+
+
+def _select_deltas(fuente: FuenteKPI, f: str, signo: int) -> str:
+    """Filas (año, mes, medida, valor, clave) que aporta la fila {f} con el signo dado."""
+    año, mes = _año_mes(fuente, f)
+    partes = [
+        f"SELECT {año} AS año, {mes} AS mes, '{m}' AS medida, {signo} * COALESCE({e.format(f=f)}, 0) AS valor, NULL AS clave"
+        for m, e in fuente.sumas.items()
+    ]
+    partes += [
+        f"SELECT {año} AS año, {mes} AS mes, '{m}' AS medida, {signo} AS valor, CAST({e.format(f=f)} AS TEXT) AS clave"
+        f" WHERE {e.format(f=f)} IS NOT NULL"
+        for m, e in fuente.distintos.items()
+    ]
+    return " UNION ALL ".join(partes)
+
+
+def _sql_triggers(fuente: FuenteKPI) -> str:
+    """Triggers AFTER INSERT/UPDATE/DELETE que registran deltas firmados."""
+    cambio = " OR ".join(f"OLD.{c} IS NOT NEW.{c}" for c in fuente.columnas)
+    eventos = (
+        ("INSERT", "", [("NEW", 1)]),
+        ("UPDATE", f" WHEN {cambio}", [("OLD", -1), ("NEW", 1)]),
+        ("DELETE", "", [("OLD", -1)]),
+    )
+    sentencias = []
+    for evento, condicion, filas in eventos:
+        deltas = " UNION ALL ".join(_select_deltas(fuente, f, s) for f, s in filas)
+        sentencias.append(f"""
+CREATE TRIGGER IF NOT EXISTS trg_kpi_{fuente.nombre}_{evento.lower()} AFTER {evento} ON {fuente.tabla}{condicion}
+BEGIN
+    INSERT INTO kpi_delta (año, mes, medida, valor, clave)
+    SELECT año, mes, medida, valor, clave FROM ({deltas}) WHERE año IS NOT NULL AND mes IS NOT NULL;
+END;""")
+    return "\n".join(sentencias)
+
+
+def _columnas_faltantes(conn: sqlite3.Connection, fuente: FuenteKPI) -> List[str]:
+    """Columnas requeridas que no tiene la tabla (todas si la tabla no existe)."""
+    columnas = {fila[1] for fila in conn.execute(f"PRAGMA table_info({fuente.tabla})").fetchall()}
+    return [c for c in fuente.columnas if c not in columnas]
+
+
+def fuentes_disponibles(conn: sqlite3.Connection) -> List[FuenteKPI]:
+    """Fuentes cuya tabla existe con todas las columnas requeridas."""
+    return [f for f in FUENTES_KPI if not _columnas_faltantes(conn, f)]
+
+
+def fuentes_omitidas(conn: sqlite3.Connection) -> Dict[str, List[str]]:
+    """Fuentes sin tabla o columnas en esta BD ({nombre: columnas faltantes}); sus medidas valen 0."""
+    omitidas = {}
+    for fuente in FUENTES_KPI:
+        faltantes = _columnas_faltantes(conn, fuente)
+        if faltantes:
+            omitidas[fuente.nombre] = faltantes
+    return omitidas
+
+
+def fuentes_instaladas(conn: sqlite3.Connection) -> List[FuenteKPI]:
+    """Fuentes con triggers de deltas instalados."""
+    triggers = {
+        fila[0] for fila in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'trg_kpi_%'")
+    }
+    return [f for f in FUENTES_KPI if f"trg_kpi_{f.nombre}_insert" in triggers]
+
+
+def instalar_triggers(conn: sqlite3.Connection) -> List[str]:
+    """Crea el esquema y los triggers de las fuentes disponibles (idempotente); retorna sus nombres."""
+    conn.executescript(ESQUEMA_KPI_INCREMENTAL)
+    instaladas = []
+    for fuente in fuentes_disponibles(conn):
+        conn.executescript(_sql_triggers(fuente))
+        instaladas.append(fuente.nombre)
+    return instaladas
+
+
+def aplicar_deltas(conn: sqlite3.Connection) -> int:
+    """
+    Consolida los deltas pendientes en los agregados (no hace commit).
+
+    Returns:
+        Número de deltas aplicados
+    """
+    maximo, pendientes = conn.execute("SELECT MAX(id), COUNT(*) FROM kpi_delta").fetchone()
+    if not pendientes:
+        return 0
+    conn.execute(
+        """
+        INSERT INTO kpi_agregado (año, mes, medida, valor)
+        SELECT año, mes, medida, SUM(valor) FROM kpi_delta
+        WHERE id <= ? AND clave IS NULL
+        GROUP BY año, mes, medida
+        ON CONFLICT(año, mes, medida) DO UPDATE SET valor = valor + excluded.valor
+        """,
+        (maximo,),
+    )
+    conn.execute(
+        """
+        INSERT INTO kpi_agregado_distinto (año, mes, medida, clave, n)
+        SELECT año, mes, medida, clave, SUM(valor) FROM kpi_delta
+        WHERE id <= ? AND clave IS NOT NULL
+        GROUP BY año, mes, medida, clave
+        ON CONFLICT(año, mes, medida, clave) DO UPDATE SET n = n + excluded.n
+        """,
+        (maximo,),
+    )
+    conn.execute(
+        """
+        DELETE FROM kpi_agregado_distinto
+        WHERE n <= 0 AND (año, mes, medida, clave) IN (
+            SELECT año, mes, medida, clave FROM kpi_delta WHERE id <= ? AND clave IS NOT NULL
+        )
+        """,
+        (maximo,),
+    )
+    conn.execute("DELETE FROM kpi_delta WHERE id <= ?", (maximo,))
+    return int(pendientes)
+
+
+def leer_agregados(conn: sqlite3.Connection, año: int, mes: int) -> Dict[str, float]:
+    """Sumas y conteos de distintos del mes ({medida: valor}); las medidas sin filas no aparecen."""
+    valores = {m: v for m, v in conn.execute(
+        "SELECT medida, valor FROM kpi_agregado WHERE año = ? AND mes = ?", (año, mes)
+    )}
+    valores.update({m: n for m, n in conn.execute(
+        "SELECT medida, COUNT(*) FROM kpi_agregado_distinto WHERE año = ? AND mes = ? GROUP BY medida", (año, mes)
+    )})
+    return valores
+
+
+def _agregados_completos(conn: sqlite3.Connection, fuentes: List[FuenteKPI]):
+    """Sumas y contadores de distintos calculados desde cero sobre las tablas fuente."""
+    sumas: Dict[Tuple[int, int, str], float] = {}
+    distintos: Dict[Tuple[int, int, str, str], int] = {}
+    for fuente in fuentes:
+        año, mes = _año_mes(fuente, "f")
+        for medida, expr in fuente.sumas.items():
+            for a, m, v in conn.execute(
+                f"SELECT {año} AS a, {mes} AS m, SUM(COALESCE({expr.format(f='f')}, 0)) FROM {fuente.tabla} AS f "
+                f"WHERE a IS NOT NULL AND m IS NOT NULL GROUP BY a, m"
+            ):
+                sumas[(a, m, medida)] = v
+        for medida, expr in fuente.distintos.items():
+            for a, m, c, n in conn.execute(
+                f"SELECT {año} AS a, {mes} AS m, CAST({expr.format(f='f')} AS TEXT) AS c, COUNT(*) "
+                f"FROM {fuente.tabla} AS f WHERE a IS NOT NULL AND m IS NOT NULL AND c IS NOT NULL GROUP BY a, m, c"
+            ):
+                distintos[(a, m, medida, c)] = n
+    return sumas, distintos
+
+
+def totales_periodo(conn: sqlite3.Connection, fecha_inicio: str, fecha_fin: str) -> Dict[str, float]:
+    """
+    Sumas y conteos de distintos entre dos fechas (inclusive) calculados sobre
+    las tablas fuente disponibles; las medidas sin filas no aparecen.
+    """
+    totales: Dict[str, float] = {}
+    for fuente in fuentes_disponibles(conn):
+        filtro, params = filtro_fechas(f"f.{fuente.fecha}", fecha_inicio, fecha_fin)
+        columnas = [f"SUM(COALESCE({e.format(f='f')}, 0))" for e in fuente.sumas.values()]
+        columnas += [f"COUNT(DISTINCT {e.format(f='f')})" for e in fuente.distintos.values()]
+        fila = conn.execute(
+            f"SELECT COUNT(*), {', '.join(columnas)} FROM {fuente.tabla} AS f WHERE {filtro}",
+            params,
+        ).fetchone()
+        if fila[0]:
+            totales.update(zip([*fuente.sumas, *fuente.distintos], fila[1:]))
+    return totales
+
+
+def reconstruir(conn: sqlite3.Connection) -> Dict[str, Union[int, Dict[str, List[str]]]]:
+    """
+    Reinstala triggers y rehace los agregados desde las tablas fuente (no hace commit).
+
+    Returns:
+        {'sumas': n, 'distintos': n, 'omitidas': {fuente: columnas faltantes}}
+    """
+    instalar_triggers(conn)
+    sumas, distintos = _agregados_completos(conn, fuentes_instaladas(conn))
+    conn.execute("DELETE FROM kpi_delta")
+    conn.execute("DELETE FROM kpi_agregado")
+    conn.execute("DELETE FROM kpi_agregado_distinto")
+    conn.executemany(
+        "INSERT INTO kpi_agregado (año, mes, medida, valor) VALUES (?, ?, ?, ?)",
+        [(*k, v) for k, v in sumas.items()],
+    )
+    conn.executemany(
+        "INSERT INTO kpi_agregado_distinto (año, mes, medida, clave, n) VALUES (?, ?, ?, ?, ?)",
+        [(*k, n) for k, n in distintos.items()],
+    )
+    return {"sumas": len(sumas), "distintos": len(distintos), "omitidas": fuentes_omitidas(conn)}
+
+
+def verificar(conn: sqlite3.Connection) -> List[Dict[str, object]]:
+    """
+    Compara los agregados mantenidos con un cálculo completo (aplica antes
+    los deltas pendientes). El cálculo completo cubre todas las fuentes
+    disponibles, así una fuente sin triggers aparece como diferencia; las
+    fuentes omitidas (sin tabla o columnas) se avisan en el log.
+
+    Returns:
+        Diferencias [{'año', 'mes', 'medida', 'incremental', 'completo'}]; vacía si coinciden
+    """
+    for nombre, faltantes in fuentes_omitidas(conn).items():
+        logger.warning(f"Fuente KPI '{nombre}' omitida (faltan {', '.join(faltantes)}): sus medidas valen 0")
+    aplicar_deltas(conn)
+    sumas, distintos = _agregados_completos(conn, fuentes_disponibles(conn))
+    completo: Dict[Tuple[int, int, str], float] = dict(sumas)
+    for a, m, medida, _ in distintos:
+        completo[(a, m, medida)] = completo.get((a, m, medida), 0) + 1
+
+    incremental: Dict[Tuple[int, int, str], float] = {
+        (a, m, medida): v for a, m, medida, v in conn.execute("SELECT año, mes, medida, valor FROM kpi_agregado")
+    }
+    for a, m, medida, n in conn.execute(
+        "SELECT año, mes, medida, COUNT(*) FROM kpi_agregado_distinto GROUP BY año, mes, medida"
+    ):
+        incremental[(a, m, medida)] = n
+
+    diferencias = []
+    for clave in sorted(set(completo) | set(incremental)):
+        esperado, actual = completo.get(clave, 0), incremental.get(clave, 0)
+        if abs(esperado - actual) > TOLERANCIA * max(1.0, abs(esperado)):
+            a, m, medida = clave
+            diferencias.append({"año": a, "mes": m, "medida": medida, "incremental": actual, "completo": esperado})
+    return diferencias
+
+
+__all__ = [
+    "ESQUEMA_KPI_INCREMENTAL",
+    "FUENTES_KPI",
+    "FuenteKPI",
+    "fuentes_disponibles",
+    "fuentes_omitidas",
+    "fuentes_instaladas",
+    "instalar_triggers",
+    "aplicar_deltas",
+    "leer_agregados",
+    "totales_periodo",
+    "reconstruir",
+    "verificar",
+]
@@ -8,7 +8,8 @@ Agregaciones de tablas para:
 - Tracking de cierres mensuales
 - Tracking de KPIs
 
-Se ejecutan automáticamente en asegurar_esquema_minimo()
+Se ejecutan como parte del paso 1 de versiones_esquema.PASOS_MIGRACION
+(solo cuando PRAGMA user_version indica que faltan pasos)
 """
 
 # Migraciones por orden de ejecución
@@ -172,13 +173,327 @@ MIGRACIONES_SISTEMA = [
 ]
 
 
-def ejecutar_migraciones(conn):
+# Tabla de auditoría operativa (src/core/audit_service.py)
+ESQUEMA_AUDIT_LOG = """
+CREATE TABLE IF NOT EXISTS audit_log (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    usuario TEXT,
+    fecha TEXT NOT NULL,
+    modulo TEXT NOT NULL,
+    accion TEXT NOT NULL,
+    entidad TEXT,
+    resultado TEXT NOT NULL,
+    mensaje TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_audit_fecha ON audit_log(fecha);
+"""
+
+# Dependencias del cache analítico (src/services/analytics_cache_service.py):
+# cada entrada declara tablas y rangos [desde, hasta) de los que depende y los
+# triggers de las tablas rastreadas borran solo las entradas afectadas
+ESQUEMA_DEPENDENCIAS_CACHE = """
+CREATE TABLE IF NOT EXISTS cache_dependencia (
+    cache_key TEXT NOT NULL,
+    tabla TEXT NOT NULL,
+    desde TEXT,
+    hasta TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_cache_dep_tabla ON cache_dependencia(tabla, desde);
+CREATE INDEX IF NOT EXISTS idx_cache_dep_key ON cache_dependencia(cache_key);
+CREATE TABLE IF NOT EXISTS cache_invalidacion (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    cache_key TEXT NOT NULL,
+    fecha TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+# Tabla rastreada -> columnas candidatas de fecha (se usa la primera que exista)
+# o expresión SQL sobre {fila} para tablas por período (año, mes)
+TABLAS_RASTREADAS_CACHE = {
+    "produccion_leche": ("fecha",),
+    "venta": ("fecha",),
+    "pago_nomina": ("fecha_pago",),
+    "movimiento_insumo": ("fecha_movimiento", "fecha"),
+    "bi_snapshots_mensual": "printf('%04d-%02d-01', {fila}.año, {fila}.mes)",
+    "cierre_mensual": "printf('%04d-%02d-01', {fila}.año, {fila}.mes)",
+}
+
+
+def _sql_triggers_cache(tabla, expresion):
+    """Triggers AFTER INSERT/UPDATE/DELETE que invalidan las entradas afectadas."""
+
+    def afectadas(filas):
+        conds = []
+        for fila in filas:
+            fecha = expresion.format(fila=fila)
+            conds.append(
+                f"({fecha} IS NULL OR ((desde IS NULL OR {fecha} >= desde) AND (hasta IS NULL OR {fecha} < hasta)))"
+            )
+        return f"SELECT cache_key FROM cache_dependencia WHERE tabla = '{tabla}' AND ({' OR '.join(conds)})"
+
+    sentencias = []
+    for evento, filas in (("INSERT", ("NEW",)), ("UPDATE", ("OLD", "NEW")), ("DELETE", ("OLD",))):
+        claves = afectadas(filas)
+        sentencias.append(f"""
+CREATE TRIGGER IF NOT EXISTS trg_cache_{tabla}_{evento.lower()} AFTER {evento} ON {tabla}
+BEGIN
+    INSERT INTO cache_invalidacion (cache_key) SELECT DISTINCT cache_key FROM ({claves});
+    DELETE FROM analytics_cache WHERE cache_key IN ({claves});
+    DELETE FROM cache_dependencia WHERE cache_key IN ({claves});
+END;""")
+    return "\n".join(sentencias)
+
+
+def instalar_triggers_cache(conn):
+    """
+    Crea las tablas de dependencias del cache y los triggers de invalidación
+    en las tablas rastreadas que existan. Idempotente.
+    """
+    conn.executescript(ESQUEMA_DEPENDENCIAS_CACHE)
+    cursor = conn.cursor()
+    for tabla, fecha in TABLAS_RASTREADAS_CACHE.items():
+        columnas = [fila[1] for fila in cursor.execute(f"PRAGMA table_info({tabla})").fetchall()]
+        if not columnas:
+            continue
+        if isinstance(fecha, tuple):
+            existentes = [c for c in fecha if c in columnas]
+            if not existentes:
+                continue
+            fecha = "{fila}." + existentes[0]
+        conn.executescript(_sql_triggers_cache(tabla, fecha))
+    conn.commit()
+
+
+# Planificador de jobs de analytics (src/jobs/scheduler.py): marca de agua por
+# job y empresa (último día procesado completo) y registro de ejecuciones
+ESQUEMA_JOBS_ANALYTICS = """
+CREATE TABLE IF NOT EXISTS analytics_job_watermark (
+    job TEXT NOT NULL,
+    empresa_id INTEGER NOT NULL,
+    ultima_fecha DATE NOT NULL,
+    actualizado TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (job, empresa_id)
+);
+CREATE TABLE IF NOT EXISTS analytics_job_run (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job TEXT NOT NULL,
+    empresa_id INTEGER NOT NULL,
+    modo TEXT NOT NULL CHECK(modo IN ('incremental', 'backfill')),
+    desde DATE NOT NULL,
+    hasta DATE NOT NULL,
+    estado TEXT NOT NULL CHECK(estado IN ('ok', 'error')),
+    dias INTEGER DEFAULT 0,
+    filas INTEGER DEFAULT 0,
+    duracion_ms REAL,
+    error TEXT,
+    inicio TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_job_run_job ON analytics_job_run(job, empresa_id, inicio);
+"""
+
+
+
+# Cola de exportaciones en segundo plano (src/jobs/export_queue.py): registro
+# de trabajos y artefactos cacheados de períodos cerrados. desde/hasta son
+# 'YYYY-MM' para invalidar por mes al revertir un cierre.
+ESQUEMA_EXPORT_JOBS = """
+CREATE TABLE IF NOT EXISTS export_job (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    tipo TEXT NOT NULL,
+    parametros TEXT,
+    ruta_salida TEXT,
+    estado TEXT NOT NULL CHECK(estado IN ('pendiente', 'ejecutando', 'completado', 'error', 'cancelado')),
+    desde_cache INTEGER DEFAULT 0,
+    filas INTEGER DEFAULT 0,
+    duracion_ms REAL,
+    error TEXT,
+    creado TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    terminado TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_export_job_estado ON export_job(estado, creado);
+CREATE TABLE IF NOT EXISTS export_artefacto (
+    clave TEXT PRIMARY KEY,
+    tipo TEXT NOT NULL,
+    desde TEXT NOT NULL,
+    hasta TEXT NOT NULL,
+    archivos TEXT NOT NULL,
+    bytes INTEGER DEFAULT 0,
+    usos INTEGER DEFAULT 0,
+    creado TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_export_artefacto_periodo ON export_artefacto(desde, hasta);
+"""
+
+
+# Resultados de períodos cerrados (src/services/closed_period_store.py):
+# reportes, KPIs y comparativos de meses con cierre 'Completado', sin
+# vencimiento. desde/hasta son 'YYYY-MM'; firma identifica los cierres que
+# cubre el resultado. Solo DataLockService.unblock_period los borra.
+ESQUEMA_RESULTADOS_CERRADOS = """
+CREATE TABLE IF NOT EXISTS resultado_periodo_cerrado (
+    tipo TEXT NOT NULL,
+    desde TEXT NOT NULL,
+    hasta TEXT NOT NULL,
+    filtros_hash TEXT NOT NULL,
+    firma TEXT NOT NULL,
+    valor TEXT NOT NULL,
+    creado TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (tipo, desde, hasta, filtros_hash)
+);
+CREATE INDEX IF NOT EXISTS idx_resultado_cerrado_periodo ON resultado_periodo_cerrado(desde, hasta);
+"""
+
+def instalar_subtipo_evento(conn):
+    """
+    Agrega evento.subtipo con su índice, clasifica los eventos existentes y
+    crea el trigger que lo completa en inserciones que no lo traen (cargas
+    masivas, código legado). Idempotente.
+    """
+    try:
+        from .eventos import expresion_sql_subtipo
+    except ImportError:
+        from eventos import expresion_sql_subtipo
+
+    cursor = conn.cursor()
+    columnas = [fila[1] for fila in cursor.execute("PRAGMA table_info(evento)").fetchall()]
+    if not columnas:
+        return
+    if "subtipo" not in columnas:
+        cursor.execute("ALTER TABLE evento ADD COLUMN subtipo TEXT")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_evento_subtipo_fecha ON evento (subtipo, fecha_evento)")
+    cursor.execute(f"UPDATE evento SET subtipo = {expresion_sql_subtipo('')} WHERE subtipo IS NULL")
+    clasificados = cursor.rowcount
+    cursor.executescript(f"""
+CREATE TRIGGER IF NOT EXISTS trg_evento_subtipo AFTER INSERT ON evento
+WHEN NEW.subtipo IS NULL
+BEGIN
+    UPDATE evento SET subtipo = {expresion_sql_subtipo('NEW.')} WHERE id = NEW.id;
+END;""")
+    conn.commit()
+    print(f"[OK] evento.subtipo instalado ({clasificados} eventos revisados)")
+
+
+def instalar_kpi_fact(conn):
+    """
+    Crea kpi_fact y la llena desde los snapshots ya guardados. Las entradas
+    de cache calculadas con los snapshots se invalidan porque ahora se leen
+    de la tabla de hechos.
+    """
+    try:
+        from .kpi_fact import ESQUEMA_KPI_FACT, poblar_desde_snapshots
+    except ImportError:
+        from kpi_fact import ESQUEMA_KPI_FACT, poblar_desde_snapshots
+
+    conn.executescript(ESQUEMA_KPI_FACT)
+    cursor = conn.cursor()
+    tablas = {fila[0] for fila in cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    filas = 0
+    if "bi_snapshots_mensual" in tablas:
+        # Índice cubriente para filtrar snapshots por fecha sin leer data_json
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_bi_snapshot_fecha_periodo ON bi_snapshots_mensual(fecha_snapshot, año, mes)"
+        )
+        filas = poblar_desde_snapshots(conn)
+    if {"cache_dependencia", "analytics_cache"} <= tablas:
+        claves = "SELECT cache_key FROM cache_dependencia WHERE tabla = 'bi_snapshots_mensual'"
+        cursor.execute(f"INSERT INTO cache_invalidacion (cache_key) SELECT DISTINCT cache_key FROM ({claves})")
+        cursor.execute(f"DELETE FROM analytics_cache WHERE cache_key IN ({claves})")
+        cursor.execute(f"DELETE FROM cache_dependencia WHERE cache_key IN ({claves})")
+    conn.commit()
+    print(f"[OK] kpi_fact instalada ({filas} valores desde snapshots)")
+
+
+def instalar_kpi_incremental(conn):
+    """
+    Crea los agregados mensuales incrementales de KPIs, los triggers de
+    deltas en las tablas fuente disponibles y la carga inicial completa.
+    """
+    try:
+        from .kpi_incremental import instalar_triggers, reconstruir
+    except ImportError:
+        from kpi_incremental import instalar_triggers, reconstruir
+
+    fuentes = instalar_triggers(conn)
+    totales = reconstruir(conn)
+    conn.commit()
+    omitidas = ", ".join(totales["omitidas"]) or "ninguna"
+    print(
+        f"[OK] Agregados KPI incrementales ({', '.join(fuentes) or 'sin fuentes'}; {totales['sumas']} sumas;"
+        f" fuentes omitidas: {omitidas})"
+    )
+
+
+def instalar_herd_summary(conn):
+    """
+    Crea herd_summary (conteo de animales por finca, estado, sexo y
+    categoría), sus triggers sobre animal y la carga inicial completa.
+    """
+    try:
+        from .herd_summary import reconstruir
+    except ImportError:
+        from herd_summary import reconstruir
+
+    filas = reconstruir(conn)
+    conn.commit()
+    print(f"[OK] Resumen del hato herd_summary ({filas} combinaciones)")
+
+
+# Índices de fecha que necesitan los filtros por rango semiabierto
+INDICES_FECHA = [
+    ("idx_leche_fecha", "produccion_leche", "fecha"),
+    ("idx_venta_fecha", "venta", "fecha"),
+    ("idx_muerte_fecha", "muerte", "fecha"),
+    ("idx_servicio_fecha", "servicio", "fecha_servicio"),
+    ("idx_servicio_parto_real", "servicio", "fecha_parto_real"),
+    ("idx_pago_nomina_fecha", "pago_nomina", "fecha_pago"),
+    ("idx_mov_insumo_fecha", "movimiento_insumo", "fecha_movimiento"),
+    ("idx_movimiento_fecha", "movimiento", "fecha_movimiento"),
+    ("idx_evento_fecha", "evento", "fecha_evento"),
+    ("idx_animal_fecha_nacimiento", "animal", "fecha_nacimiento"),
+]
+
+# Marca en app_settings: la canonicalización recorre tablas completas y
+# solo se necesita una vez por BD
+_CLAVE_FECHAS_CANONICAS = "migracion_fechas_canonicas"
+
+
+def migrar_fechas_canonicas(conn):
+    """
+    Canonicaliza las fechas almacenadas (YYYY-MM-DD[ HH:MM:SS]) y crea los
+    índices de fecha, requisito de los filtros `col >= ? AND col < ?`.
+    """
+    try:
+        from .rango_fechas import canonicalizar_fechas
+    except ImportError:
+        from rango_fechas import canonicalizar_fechas
+
+    cursor = conn.cursor()
+    for nombre, tabla, columna in INDICES_FECHA:
+        columnas = [fila[1] for fila in cursor.execute(f"PRAGMA table_info({tabla})").fetchall()]
+        if columna in columnas:
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS {nombre} ON {tabla} ({columna})")
+
+    cursor.execute("SELECT valor FROM app_settings WHERE clave = ?", (_CLAVE_FECHAS_CANONICAS,))
+    if cursor.fetchone():
+        conn.commit()
+        return
+    actualizadas = canonicalizar_fechas(conn)
+    cursor.execute(
+        "INSERT OR REPLACE INTO app_settings (clave, valor) VALUES (?, '1')",
+        (_CLAVE_FECHAS_CANONICAS,),
+    )
+    conn.commit()
+    print(f"[OK] Fechas canonicalizadas: {sum(actualizadas.values())} valores")
+
+
+def ejecutar_migraciones(conn, estricto=False):
     """
     Ejecuta todas las migraciones necesarias.
     Idempotente y seguro para ejecutar en cada arranque.
     
     Args:
         conn: Conexión SQLite
+        estricto: Si es True, un fallo se propaga en lugar de solo avisarse
     """
     cursor = conn.cursor()
     
@@ -190,7 +505,17 @@ def ejecutar_migraciones(conn):
         except Exception as e:
             print(f"[WARN] Migracion {i}: {e}")
             conn.rollback()
+            if estricto:
+                raise
     
+    try:
+        migrar_fechas_canonicas(conn)
+    except Exception as e:
+        print(f"[WARN] Migracion fechas: {e}")
+        conn.rollback()
+        if estricto:
+            raise
+
     # Crear usuario por defecto si no existe
     try:
         cursor.execute("SELECT COUNT(*) FROM usuario")
@@ -204,3 +529,5 @@ def ejecutar_migraciones(conn):
     except Exception as e:
         print(f"[WARN] Usuario admin: {e}")
         conn.rollback()
+        if estricto:
+            raise
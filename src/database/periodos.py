@@ -0,0 +1,44 @@
+"""
+Períodos mensuales (año, mes) compartidos por cierres, exportaciones y series de KPIs.
+
+    texto_mes((2025, 3))            # -> '2025-03'
+    meses_entre((2024, 11), (2025, 2))  # -> [(2024, 11), (2024, 12), (2025, 1), (2025, 2)]
+    codigo_mes((2025, 3))           # -> 24302, consecutivo entre meses
+
+El código de mes (año * 12 + mes - 1) ordena y resta meses como enteros;
+periodo_de_codigo() es su inversa.
+"""
+
+from __future__ import annotations
+
+from typing import List, Tuple
+
+Periodo = Tuple[int, int]  # (año, mes)
+
+
+def codigo_mes(periodo: Periodo) -> int:
+    """Mes como entero consecutivo (año * 12 + mes - 1)."""
+    return int(periodo[0]) * 12 + int(periodo[1]) - 1
+
+
+def periodo_de_codigo(codigo: int) -> Periodo:
+    return int(codigo) // 12, int(codigo) % 12 + 1
+
+
+def texto_mes(periodo: Periodo) -> str:
+    """'YYYY-MM' (orden de texto = orden cronológico)."""
+    return f"{int(periodo[0]):04d}-{int(periodo[1]):02d}"
+
+
+def meses_entre(desde: Periodo, hasta: Periodo) -> List[Periodo]:
+    """Meses de [desde, hasta] en orden; vacía si desde > hasta."""
+    return [periodo_de_codigo(c) for c in range(codigo_mes(desde), codigo_mes(hasta) + 1)]
+
+
+__all__ = [
+    "Periodo",
+    "codigo_mes",
+    "periodo_de_codigo",
+    "texto_mes",
+    "meses_entre",
+]
@@ -0,0 +1,469 @@
+"""
+Pool de conexiones SQLite para FincaFácil
+
+Evita abrir una conexión nueva (y reemitir los PRAGMA de configuración) en
+cada llamada a get_db_connection(). Características:
+
+- Reutilización afín al hilo: cada hilo solo recibe conexiones que él creó,
+  respetando el modelo de hilos de sqlite3
+- Anidamiento seguro: un bloque `with` interno nunca comparte la conexión
+  del bloque externo
+- Health check al entregar conexiones inactivas y detección de archivo de BD
+  reemplazado (ej: restauración de backup)
+- Tamaño máximo global; por encima se entregan conexiones temporales que se
+  cierran al liberarse
+- Al liberar: rollback de transacciones abiertas y cierre de cursores, de modo
+  que el comportamiento observable es el mismo que cerrar la conexión
+
+Uso:
+    from database.pool import get_pool
+
+    with get_pool(ruta).connection() as conn:
+        conn.execute("SELECT 1")
+"""
+
+from __future__ import annotations
+import atexit
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Valores por defecto (sobrescribibles con configurar_pool)
+DEFAULT_MAX_SIZE = 8
+DEFAULT_MAX_IDLE_PER_THREAD = 2
+DEFAULT_HEALTH_CHECK_INTERVAL = 30.0  # segundos de inactividad antes de validar
+
+# Permite desactivar el pool (FINCAFACIL_DB_POOL=0) para diagnóstico
+POOL_ENABLED = os.getenv("FINCAFACIL_DB_POOL", "1") not in ("0", "false", "False")
+
+
+class PooledConnection(sqlite3.Connection):
+    """
+    Conexión SQLite que registra sus cursores.
+
+    Permite cerrar los cursores pendientes al devolver la conexión al pool, de
+    forma que ninguna sentencia a medio leer mantenga abierta una transacción
+    de lectura (snapshot WAL) entre usos.
+    """
+
+    cursor_factory: type = sqlite3.Cursor
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._cursores: "weakref.WeakSet[sqlite3.Cursor]" = weakref.WeakSet()
+
+    def cursor(self, factory=None):  # type: ignore[override]
+        cur = super().cursor(factory or self.cursor_factory)
+        self._cursores.add(cur)
+        return cur
+
+    def execute(self, sql, parameters=(), /):  # type: ignore[override]
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, parameters, /):  # type: ignore[override]
+        return self.cursor().executemany(sql, parameters)
+
+    def executescript(self, sql_script, /):  # type: ignore[override]
+        return self.cursor().executescript(sql_script)
+
+    def _cerrar_cursores(self) -> None:
+        for cur in list(self._cursores):
+            try:
+                cur.close()
+            except Exception:
+                pass
+        self._cursores = weakref.WeakSet()
+
+
+@dataclass
+class _Entrada:
+    """Conexión administrada por el pool junto a su metadata."""
+    conn: PooledConnection
+    hilo: "weakref.ref[threading.Thread]"
+    identidad_archivo: Optional[Tuple[int, int]]
+    ultimo_uso: float = field(default_factory=time.monotonic)
+
+
+def _identidad_archivo(path: str) -> Optional[Tuple[int, int]]:
+    """(st_dev, st_ino) del archivo de BD o None si no existe."""
+    try:
+        st = os.stat(path)
+        return (st.st_dev, st.st_ino)
+    except OSError:
+        return None
+
+
+def configurar_conexion(conn: sqlite3.Connection) -> None:
+    """Aplica la configuración estándar de FincaFácil a una conexión nueva."""
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.execute("PRAGMA journal_mode = WAL")
+
+
+class ConnectionPool:
+    """
+    Pool de conexiones para un archivo de base de datos.
+
+    Las conexiones inactivas se guardan por hilo. Un hilo que pide conexión
+    reutiliza una de las suyas si existe; si no, se crea una nueva mientras el
+    total no supere max_size. Por encima del límite se entrega una conexión
+    temporal (overflow) que se cierra al liberarse.
+    """
+
+    def __init__(
+        self,
+        db_path: Path | str,
+        max_size: int = DEFAULT_MAX_SIZE,
+        max_idle_per_thread: int = DEFAULT_MAX_IDLE_PER_THREAD,
+        health_check_interval: float = DEFAULT_HEALTH_CHECK_INTERVAL,
+    ):
+        self.db_path = str(db_path)
+        self.max_size = max_size
+        self.max_idle_per_thread = max_idle_per_thread
+        self.health_check_interval = health_check_interval
+
+        self._lock = threading.Lock()
+        self._inactivas: Dict[int, List[_Entrada]] = {}
+        self._en_uso: Dict[int, _Entrada] = {}
+        self._overflow: Dict[int, PooledConnection] = {}
+        self._reservadas = 0
+        self._stats = {
+            "creadas": 0,
+            "reutilizadas": 0,
+            "overflow": 0,
+            "descartadas": 0,
+            "health_checks": 0,
+        }
+
+    # ------------------------------------------------------------------
+    # API pública
+    # ------------------------------------------------------------------
+    def acquire(self) -> PooledConnection:
+        """Entrega una conexión configurada, reutilizando una del hilo si existe."""
+        hilo = threading.current_thread()
+        descartar: List[_Entrada] = []
+        entrada: Optional[_Entrada] = None
+
+        with self._lock:
+            descartar.extend(self._purgar_hilos_muertos())
+            libres = self._inactivas.get(hilo.ident or 0, [])
+            while libres:
+                candidata = libres.pop()
+                if candidata.hilo() is not hilo:
+                    descartar.append(candidata)
+                    continue
+                entrada = candidata
+                break
+            if entrada is not None:
+                self._en_uso[id(entrada.conn)] = entrada
+
+        for vieja in descartar:
+            self._cerrar(vieja.conn)
+
+        if entrada is not None:
+            if self._es_saludable(entrada):
+                self._contar("reutilizadas")
+                return entrada.conn
+            with self._lock:
+                self._en_uso.pop(id(entrada.conn), None)
+            self._descartar(entrada.conn)
+
+        # Reservar cupo antes de conectar para no exceder max_size entre hilos
+        with self._lock:
+            agrupada = self._total() < self.max_size
+            if agrupada:
+                self._reservadas += 1
+
+        try:
+            conn = self._conectar()
+        except Exception:
+            if agrupada:
+                with self._lock:
+                    self._reservadas -= 1
+            raise
+
+        with self._lock:
+            if agrupada:
+                self._reservadas -= 1
+                self._en_uso[id(conn)] = _Entrada(
+                    conn=conn,
+                    hilo=weakref.ref(hilo),
+                    identidad_archivo=_identidad_archivo(self.db_path),
+                )
+            else:
+                self._overflow[id(conn)] = conn
+                self._stats["overflow"] += 1
+        return conn
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        """Devuelve la conexión al pool, descartando cualquier estado pendiente."""
+        with self._lock:
+            entrada = self._en_uso.pop(id(conn), None)
+            temporal = self._overflow.pop(id(conn), None)
+
+        if entrada is None:
+            # Overflow, conexión retirada por close_all() o ajena al pool
+            self._cerrar(temporal or conn)
+            return
+
+        if not self._limpiar(entrada.conn) or entrada.hilo() is not threading.current_thread():
+            self._descartar(entrada.conn)
+            return
+
+        entrada.ultimo_uso = time.monotonic()
+        ident = threading.get_ident()
+        with self._lock:
+            libres = self._inactivas.setdefault(ident, [])
+            if len(libres) < self.max_idle_per_thread:
+                libres.append(entrada)
+                return
+        self._cerrar(entrada.conn)
+
+    @contextmanager
+    def connection(self) -> Iterator[PooledConnection]:
+        """Context manager: acquire() al entrar y release() al salir."""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close_all(self) -> None:
+        """
+        Cierra todas las conexiones inactivas y marca las activas para descarte.
+
+        Debe llamarse antes de reemplazar el archivo de BD (restauración) o al
+        cerrar la aplicación.
+        """
+        with self._lock:
+            inactivas = [e for libres in self._inactivas.values() for e in libres]
+            self._inactivas.clear()
+            # Las activas se cerrarán al liberarse (ya no figuran en el pool)
+            activas = list(self._en_uso.values())
+            self._en_uso.clear()
+            for entrada in activas:
+                self._overflow[id(entrada.conn)] = entrada.conn
+        for entrada in inactivas:
+            self._cerrar(entrada.conn)
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores de uso del pool."""
+        with self._lock:
+            return {
+                **self._stats,
+                "inactivas": sum(len(v) for v in self._inactivas.values()),
+                "en_uso": len(self._en_uso),
+                "max_size": self.max_size,
+            }
+
+    # ------------------------------------------------------------------
+    # Internos
+    # ------------------------------------------------------------------
+    def _total(self) -> int:
+        inactivas = sum(len(v) for v in self._inactivas.values())
+        return len(self._en_uso) + inactivas + self._reservadas
+
+    def _contar(self, clave: str) -> None:
+        with self._lock:
+            self._stats[clave] += 1
+
+    def _conectar(self) -> PooledConnection:
+        Path(self.db_path).parent.mkdir(exist_ok=True, parents=True)
+        conn = sqlite3.connect(self.db_path, factory=PooledConnection, check_same_thread=False)
+        try:
+            configurar_conexion(conn)
+        except Exception:
+            conn.close()
+            raise
+        self._contar("creadas")
+        return conn
+
+    def _es_saludable(self, entrada: _Entrada) -> bool:
+        """Valida que la conexión siga apuntando al mismo archivo y responda."""
+        if _identidad_archivo(self.db_path) != entrada.identidad_archivo:
+            return False
+        if time.monotonic() - entrada.ultimo_uso < self.health_check_interval:
+            return True
+        self._contar("health_checks")
+        try:
+            entrada.conn.execute("SELECT 1").fetchall()
+            return True
+        except sqlite3.Error:
+            return False
+
+    @staticmethod
+    def _limpiar(conn: PooledConnection) -> bool:
+        """Deja la conexión como recién abierta. False si quedó inutilizable."""
+        try:
+            conn._cerrar_cursores()
+            if conn.in_transaction:
+                conn.rollback()
+            conn.row_factory = sqlite3.Row
+            return True
+        except Exception:
+            return False
+
+    def _purgar_hilos_muertos(self) -> List[_Entrada]:
+        """Retira (bajo lock) las conexiones inactivas de hilos terminados."""
+        muertas: List[_Entrada] = []
+        for ident in list(self._inactivas):
+            libres = self._inactivas[ident]
+            vivas = []
+            for entrada in libres:
+                hilo = entrada.hilo()
+                if hilo is None or not hilo.is_alive():
+                    muertas.append(entrada)
+                else:
+                    vivas.append(entrada)
+            if vivas:
+                self._inactivas[ident] = vivas
+            else:
+                del self._inactivas[ident]
+        return muertas
+
+    def _descartar(self, conn: sqlite3.Connection) -> None:
+        self._contar("descartadas")
+        self._cerrar(conn)
+
+    @staticmethod
+    def _cerrar(conn: sqlite3.Connection) -> None:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+# ----------------------------------------------------------------------
+# Registro de pools por archivo
+# ----------------------------------------------------------------------
+_pools: Dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+_config: Dict[str, Any] = {
+    "max_size": DEFAULT_MAX_SIZE,
+    "max_idle_per_thread": DEFAULT_MAX_IDLE_PER_THREAD,
+    "health_check_interval": DEFAULT_HEALTH_CHECK_INTERVAL,
+}
+
+
+def _es_agrupable(db_path: str) -> bool:
+    """Las BD en memoria o URIs no se agrupan: cada conexión es una BD distinta."""
+    return db_path != ":memory:" and not db_path.startswith("file:")
+
+
+def get_pool(db_path: Path | str) -> ConnectionPool:
+    """Obtiene (o crea) el pool asociado a un archivo de BD."""
+    clave = os.path.abspath(str(db_path))
+    pool = _pools.get(clave)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(clave)
+            if pool is None:
+                pool = ConnectionPool(clave, **_config)
+                _pools[clave] = pool
+    return pool
+
+
+@contextmanager
+def pooled_connection(db_path: Path | str) -> Iterator[sqlite3.Connection]:
+    """
+    Conexión configurada para db_path, agrupada si el pool está habilitado.
+
+    Con el pool deshabilitado (o BD en memoria) se comporta como antes:
+    conexión nueva que se cierra al salir.
+    """
+    ruta = str(db_path)
+    if not POOL_ENABLED or not _es_agrupable(ruta):
+        if _es_agrupable(ruta):
+            Path(ruta).parent.mkdir(exist_ok=True, parents=True)
+        conn = sqlite3.connect(ruta, factory=PooledConnection)
+        try:
+            configurar_conexion(conn)
+            yield conn
+        finally:
+            conn._cerrar_cursores()
+            conn.close()
+        return
+
+    with get_pool(ruta).connection() as conn:
+        yield conn
+
+
+def configurar_pool(
+    enabled: Optional[bool] = None,
+    max_size: Optional[int] = None,
+    max_idle_per_thread: Optional[int] = None,
+    health_check_interval: Optional[float] = None,
+) -> None:
+    """
+    Ajusta parámetros del pool. Aplica a pools existentes y futuros.
+
+    Args:
+        enabled: Habilitar/deshabilitar el pool
+        max_size: Conexiones máximas agrupadas por archivo
+        max_idle_per_thread: Conexiones inactivas retenidas por hilo
+        health_check_interval: Segundos de inactividad antes de validar con SELECT 1
+    """
+    global POOL_ENABLED
+    if enabled is not None:
+        POOL_ENABLED = enabled
+        if not enabled:
+            close_all_pools()
+    cambios = {
+        k: v for k, v in {
+            "max_size": max_size,
+            "max_idle_per_thread": max_idle_per_thread,
+            "health_check_interval": health_check_interval,
+        }.items() if v is not None
+    }
+    _config.update(cambios)
+    with _pools_lock:
+        for pool in _pools.values():
+            for k, v in cambios.items():
+                setattr(pool, k, v)
+
+
+def close_all_pools() -> None:
+    """
+    Cierra las conexiones de todos los pools (restauración de BD, salida).
+
+    El paquete puede estar cargado dos veces (como `database` y como
+    `src.database`); se cierran los pools de ambas copias.
+    """
+    for nombre in ("database.pool", "src.database.pool", __name__):
+        modulo = sys.modules.get(nombre)
+        registro = getattr(modulo, "_pools", None)
+        if registro is None:
+            continue
+        for pool in list(registro.values()):
+            pool.close_all()
+
+
+def obtener_estadisticas_pool() -> Dict[str, Dict[str, Any]]:
+    """Estadísticas por archivo de BD."""
+    with _pools_lock:
+        return {ruta: pool.stats() for ruta, pool in _pools.items()}
+
+
+atexit.register(close_all_pools)
+
+
+__all__ = [
+    "ConnectionPool",
+    "PooledConnection",
+    "configurar_conexion",
+    "get_pool",
+    "pooled_connection",
+    "configurar_pool",
+    "close_all_pools",
+    "obtener_estadisticas_pool",
+]
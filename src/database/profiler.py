@@ -0,0 +1,564 @@
+"""
+Profiler de consultas SQLite (opt-in)
+
+Instrumenta los cursores entregados por get_db_connection() / ejecutar_consulta()
+para registrar, por sentencia normalizada:
+
+- Número de ejecuciones, tiempo total/máximo y filas
+- Histograma de latencia en memoria (p50 / p95 / p99)
+- Puntos de llamada (archivo:línea función) fuera de la capa de BD
+- Muestra periódica de EXPLAIN QUERY PLAN
+
+Las sentencias que superan el umbral se escriben en logs/slow_queries.log
+(una línea JSON por consulta). Las estadísticas se vuelcan periódicamente y al
+salir a logs/query_profile.json, que lee tools/query_report.py.
+
+Activación:
+    - Variable de entorno FINCAFACIL_SQL_PROFILE=1 (umbral opcional en
+      FINCAFACIL_SQL_SLOW_MS), o
+    - from database.profiler import activar_profiler; activar_profiler()
+
+Desactivado no tiene costo: los cursores son sqlite3.Cursor estándar.
+"""
+
+from __future__ import annotations
+import atexit
+import bisect
+import json
+import logging
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_UMBRAL_LENTO_MS = 100.0
+DEFAULT_MUESTREO_PLAN = 100        # EXPLAIN en la 1ª ejecución y cada N
+DEFAULT_INTERVALO_SNAPSHOT = 60.0  # segundos entre volcados a disco
+MAX_PUNTOS_LLAMADA = 10
+
+ARCHIVO_LENTAS = "slow_queries.log"
+ARCHIVO_SNAPSHOT = "query_profile.json"
+
+# Módulos cuyo stack se ignora al identificar el punto de llamada
+_PREFIJOS_INTERNOS = (
+    "database.", "src.database.", "contextlib", "sqlite3",
+)
+
+
+def directorio_logs() -> Path:
+    """Directorio de logs de la aplicación (mismo criterio que db_logging)."""
+    try:
+        from config import config as app_config
+        ruta = Path(getattr(app_config, "LOG_DIR", Path.cwd() / "logs"))
+    except Exception:
+        base = os.getenv("LOCALAPPDATA") or os.getenv("APPDATA") or str(Path.cwd())
+        ruta = Path(base) / "FincaFacil" / "logs"
+    ruta.mkdir(parents=True, exist_ok=True)
+    return ruta
+
+
+# ----------------------------------------------------------------------
+# Normalización
+# ----------------------------------------------------------------------
+_RE_COMENTARIOS = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_RE_CADENAS = re.compile(r"'(?:[^']|'')*'")
+_RE_NUMEROS = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_RE_LISTAS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_RE_ESPACIOS = re.compile(r"\s+")
+
+
+def normalizar_sql(sql: str) -> str:
+    """
+    Reduce una sentencia a su forma canónica para agrupar ejecuciones:
+    sin comentarios, literales reemplazados por ?, listas IN colapsadas y
+    espacios compactados.
+    """
+    texto = _RE_COMENTARIOS.sub(" ", sql)
+    texto = _RE_CADENAS.sub("?", texto)
+    texto = _RE_NUMEROS.sub("?", texto)
+    texto = _RE_LISTAS.sub("(?+)", texto)
+    return _RE_ESPACIOS.sub(" ", texto).strip()
+
+
+def _punto_de_llamada() -> str:
+    """Primer frame fuera de la capa de BD: 'archivo:línea función'."""
+    frame = sys._getframe(2)
+    while frame is not None:
+        modulo = frame.f_globals.get("__name__", "")
+        if not modulo.startswith(_PREFIJOS_INTERNOS):
+            codigo = frame.f_code
+            return f"{Path(codigo.co_filename).name}:{frame.f_lineno} {codigo.co_name}"
+        frame = frame.f_back
+    return "?"
+
+
+# ----------------------------------------------------------------------
+# Histograma de latencias
+# ----------------------------------------------------------------------
+def _limites_buckets() -> List[float]:
+    """Límites geométricos (ms) de 0.01 ms a ~60 s, factor 1.25."""
+    limites = []
+    valor = 0.01
+    while valor < 60_000:
+        limites.append(round(valor, 4))
+        valor *= 1.25
+    return limites
+
+
+LIMITES_MS = _limites_buckets()
+
+
+class LatencyHistogram:
+    """Histograma de buckets fijos; percentiles con error acotado (<25%)."""
+
+    __slots__ = ("conteos", "total")
+
+    def __init__(self):
+        self.conteos = [0] * (len(LIMITES_MS) + 1)
+        self.total = 0
+
+    def registrar(self, ms: float) -> None:
+        self.conteos[bisect.bisect_left(LIMITES_MS, ms)] += 1
+        self.total += 1
+
+    def percentil(self, p: float) -> float:
+        if not self.total:
+            return 0.0
+        objetivo = p / 100.0 * self.total
+        acumulado = 0
+        for i, n in enumerate(self.conteos):
+            acumulado += n
+            if acumulado >= objetivo and n:
+                return LIMITES_MS[i] if i < len(LIMITES_MS) else LIMITES_MS[-1]
+        return LIMITES_MS[-1]
+
+
+class _EstadisticaSentencia:
+    """Acumulado por sentencia normalizada."""
+
+    __slots__ = ("sql", "ejecuciones", "total_ms", "max_ms", "filas",
+                 "histograma", "puntos", "plan", "plan_fecha")
+
+    def __init__(self, sql: str):
+        self.sql = sql
+        self.ejecuciones = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.filas = 0
+        self.histograma = LatencyHistogram()
+        self.puntos: Counter = Counter()
+        self.plan: Optional[List[str]] = None
+        self.plan_fecha: Optional[str] = None
+
+    def como_dict(self) -> Dict[str, Any]:
+        return {
+            "sql": self.sql,
+            "ejecuciones": self.ejecuciones,
+            "total_ms": round(self.total_ms, 3),
+            "media_ms": round(self.total_ms / self.ejecuciones, 3) if self.ejecuciones else 0.0,
+            "max_ms": round(self.max_ms, 3),
+            "p50_ms": round(min(self.histograma.percentil(50), self.max_ms), 3),
+            "p95_ms": round(min(self.histograma.percentil(95), self.max_ms), 3),
+            "p99_ms": round(min(self.histograma.percentil(99), self.max_ms), 3),
+            "filas": self.filas,
+            "puntos_llamada": dict(self.puntos.most_common(MAX_PUNTOS_LLAMADA)),
+            "plan": self.plan,
+            "plan_fecha": self.plan_fecha,
+        }
+
+
+# ----------------------------------------------------------------------
+# Profiler
+# ----------------------------------------------------------------------
+class QueryProfiler:
+    """Acumula estadísticas de consultas en memoria (thread-safe)."""
+
+    def __init__(
+        self,
+        umbral_lento_ms: float = DEFAULT_UMBRAL_LENTO_MS,
+        muestreo_plan: int = DEFAULT_MUESTREO_PLAN,
+        intervalo_snapshot: float = DEFAULT_INTERVALO_SNAPSHOT,
+        directorio: Optional[Path] = None,
+    ):
+        self.umbral_lento_ms = umbral_lento_ms
+        self.muestreo_plan = max(1, muestreo_plan)
+        self.intervalo_snapshot = intervalo_snapshot
+        self.directorio = directorio
+        self.activo = False
+        self._lock = threading.Lock()
+        self._sentencias: Dict[str, _EstadisticaSentencia] = {}
+        # Mediciones de cursores liberados por el GC (ver diferir)
+        self._pendientes: deque = deque()
+        self._ultimo_snapshot = time.monotonic()
+        self._log_lentas: Optional[logging.Logger] = None
+
+    # -- registro --------------------------------------------------------
+    def debe_muestrear_plan(self, sql_normalizado: str) -> bool:
+        est = self._sentencias.get(sql_normalizado)
+        ejecuciones = est.ejecuciones if est else 0
+        return ejecuciones % self.muestreo_plan == 0
+
+    def registrar(
+        self,
+        sql: str,
+        ms: float,
+        filas: int,
+        punto: str,
+        plan: Optional[List[str]] = None,
+        sql_normalizado: Optional[str] = None,
+    ) -> None:
+        clave = sql_normalizado or normalizar_sql(sql)
+        with self._lock:
+            self._acumular(clave, ms, filas, punto, plan)
+            diferidas = self._drenar_pendientes()
+            volcar = time.monotonic() - self._ultimo_snapshot >= self.intervalo_snapshot
+            if volcar:
+                self._ultimo_snapshot = time.monotonic()
+
+        for medicion in [(clave, ms, filas, punto)] + diferidas:
+            if medicion[1] >= self.umbral_lento_ms:
+                self._registrar_lenta(*medicion)
+        if volcar:
+            self.guardar_snapshot()
+
+    def diferir(
+        self,
+        sql: str,
+        ms: float,
+        filas: int,
+        punto: str,
+        plan: Optional[List[str]] = None,
+        sql_normalizado: Optional[str] = None,
+    ) -> None:
+        """
+        Encola una medición sin tomar el lock (para __del__ de los cursores).
+
+        El GC puede correr __del__ en un hilo que ya tiene self._lock tomado;
+        deque.append es atómico y la medición se acumula en el próximo
+        registrar() o estadisticas().
+        """
+        self._pendientes.append((sql_normalizado or normalizar_sql(sql), ms, filas, punto, plan))
+
+    def _acumular(self, clave: str, ms: float, filas: int, punto: str, plan: Optional[List[str]]) -> None:
+        est = self._sentencias.get(clave)
+        if est is None:
+            est = self._sentencias[clave] = _EstadisticaSentencia(clave)
+        est.ejecuciones += 1
+        est.total_ms += ms
+        est.max_ms = max(est.max_ms, ms)
+        est.filas += max(filas, 0)
+        est.histograma.registrar(ms)
+        est.puntos[punto] += 1
+        if plan is not None:
+            est.plan = plan
+            est.plan_fecha = datetime.now().isoformat(timespec="seconds")
+
+    def _drenar_pendientes(self) -> List[tuple]:
+        """Acumula las mediciones diferidas (con self._lock tomado)."""
+        drenadas = []
+        while self._pendientes:
+            try:
+                clave, ms, filas, punto, plan = self._pendientes.popleft()
+            except IndexError:
+                break
+            self._acumular(clave, ms, filas, punto, plan)
+            drenadas.append((clave, ms, filas, punto))
+        return drenadas
+
+    def _registrar_lenta(self, sql: str, ms: float, filas: int, punto: str) -> None:
+        try:
+            if self._log_lentas is None:
+                log = logging.getLogger("db.slow")
+                if not log.handlers:
+                    handler = RotatingFileHandler(
+                        self._directorio() / ARCHIVO_LENTAS,
+                        maxBytes=5 * 1024 * 1024,
+                        backupCount=3,
+                        encoding="utf-8",
+                    )
+                    handler.setFormatter(logging.Formatter("%(message)s"))
+                    log.addHandler(handler)
+                    log.setLevel(logging.INFO)
+                    log.propagate = False
+                self._log_lentas = log
+            self._log_lentas.info(json.dumps({
+                "fecha": datetime.now().isoformat(timespec="milliseconds"),
+                "ms": round(ms, 3),
+                "filas": filas,
+                "sql": sql,
+                "punto_llamada": punto,
+            }, ensure_ascii=False))
+        except Exception as e:
+            logger.debug(f"No se pudo registrar consulta lenta: {e}")
+
+    # -- consulta ---------------------------------------------------------
+    def estadisticas(self, orden: str = "total_ms", limite: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Sentencias ordenadas de mayor a menor según `orden`."""
+        with self._lock:
+            diferidas = self._drenar_pendientes()
+            filas = [est.como_dict() for est in self._sentencias.values()]
+        for medicion in diferidas:
+            if medicion[1] >= self.umbral_lento_ms:
+                self._registrar_lenta(*medicion)
+        filas.sort(key=lambda f: f.get(orden, 0), reverse=True)
+        return filas[:limite] if limite else filas
+
+    def reiniciar(self) -> None:
+        with self._lock:
+            self._sentencias.clear()
+            self._pendientes.clear()
+
+    def guardar_snapshot(self, ruta: Optional[Path] = None) -> Optional[Path]:
+        """Vuelca las estadísticas a JSON para tools/query_report.py."""
+        try:
+            destino = Path(ruta) if ruta else self._directorio() / ARCHIVO_SNAPSHOT
+            datos = {
+                "generado": datetime.now().isoformat(timespec="seconds"),
+                "pid": os.getpid(),
+                "umbral_lento_ms": self.umbral_lento_ms,
+                "sentencias": self.estadisticas(),
+            }
+            temporal = destino.with_suffix(".tmp")
+            temporal.write_text(json.dumps(datos, ensure_ascii=False, indent=1), encoding="utf-8")
+            temporal.replace(destino)
+            return destino
+        except Exception as e:
+            logger.debug(f"No se pudo guardar snapshot de consultas: {e}")
+            return None
+
+    def _directorio(self) -> Path:
+        if self.directorio is None:
+            self.directorio = directorio_logs()
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        return self.directorio
+
+
+class ProfiledCursor(sqlite3.Cursor):
+    """
+    Cursor que mide el tiempo pasado dentro de SQLite (execute + fetch*) y
+    las filas leídas. La medición se cierra al ejecutar otra sentencia con el
+    mismo cursor o al cerrarlo (el pool cierra los cursores al liberar).
+    """
+
+    profiler: Optional[QueryProfiler] = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._sql: Optional[str] = None
+        self._ms = 0.0
+        self._filas = 0
+        self._punto = "?"
+        self._plan: Optional[List[str]] = None
+        self._normalizado: Optional[str] = None
+
+    # -- ciclo de medición -------------------------------------------------
+    def _iniciar(self, sql: str) -> None:
+        self._finalizar()
+        self._sql = sql
+        self._ms = 0.0
+        self._filas = 0
+        self._plan = None
+        self._punto = _punto_de_llamada()
+        self._normalizado = normalizar_sql(sql)
+
+    def _finalizar(self, diferido: bool = False) -> None:
+        if self._sql is None:
+            return
+        profiler = type(self).profiler
+        sql, self._sql = self._sql, None
+        if profiler is None or not profiler.activo:
+            return
+        filas = self._filas
+        if not filas:
+            try:
+                filas = max(self.rowcount, 0)
+            except Exception:
+                filas = 0
+        registrar = profiler.diferir if diferido else profiler.registrar
+        registrar(sql, self._ms, filas, self._punto, self._plan, self._normalizado)
+
+    def _muestrear_plan(self, sql: str, parametros) -> None:
+        profiler = type(self).profiler
+        if profiler is None or not self._normalizado:
+            return
+        if not self._normalizado.lstrip("( ").upper().startswith(("SELECT", "WITH")):
+            return
+        if not profiler.debe_muestrear_plan(self._normalizado):
+            return
+        try:
+            # Cursor base: evita instrumentar el propio EXPLAIN
+            cur = sqlite3.Cursor(self.connection)
+            filas = cur.execute(f"EXPLAIN QUERY PLAN {sql}", parametros).fetchall()
+            cur.close()
+            self._plan = [str(f[-1]) for f in filas]
+        except Exception:
+            self._plan = None
+
+    def _medir(self, metodo, *args):
+        t0 = time.perf_counter()
+        try:
+            return metodo(*args)
+        finally:
+            self._ms += (time.perf_counter() - t0) * 1000
+
+    # -- API sqlite3.Cursor ------------------------------------------------
+    def execute(self, sql, parameters=(), /):  # type: ignore[override]
+        self._iniciar(sql)
+        resultado = self._medir(super().execute, sql, parameters)
+        self._muestrear_plan(sql, parameters)
+        return resultado
+
+    def executemany(self, sql, seq_of_parameters, /):  # type: ignore[override]
+        self._iniciar(sql)
+        return self._medir(super().executemany, sql, seq_of_parameters)
+
+    def executescript(self, sql_script, /):  # type: ignore[override]
+        self._iniciar(sql_script)
+        return self._medir(super().executescript, sql_script)
+
+    def fetchone(self):  # type: ignore[override]
+        fila = self._medir(super().fetchone)
+        if fila is not None:
+            self._filas += 1
+        return fila
+
+    def fetchmany(self, size=None):  # type: ignore[override]
+        filas = self._medir(super().fetchmany, size if size is not None else self.arraysize)
+        self._filas += len(filas)
+        return filas
+
+    def fetchall(self):  # type: ignore[override]
+        filas = self._medir(super().fetchall)
+        self._filas += len(filas)
+        return filas
+
+    def __next__(self):
+        fila = self._medir(super().__next__)
+        self._filas += 1
+        return fila
+
+    def __iter__(self):
+        return self
+
+    def close(self):  # type: ignore[override]
+        self._finalizar()
+        super().close()
+
+    def __del__(self):
+        # Cursores temporales (conn.execute(...).fetchone()) se liberan sin close().
+        # Sin lock: el GC puede correr aquí con el lock del profiler tomado
+        try:
+            self._finalizar(diferido=True)
+        except Exception:
+            pass
+
+
+# ----------------------------------------------------------------------
+# Activación
+# ----------------------------------------------------------------------
+_instancia: Optional[QueryProfiler] = None
+
+# El paquete puede estar cargado como `database` y como `src.database`
+_MODULOS_GEMELOS = ("database", "src.database")
+
+
+def get_query_profiler() -> QueryProfiler:
+    """Instancia única del profiler (compartida entre copias del paquete)."""
+    global _instancia
+    if _instancia is None:
+        for paquete in _MODULOS_GEMELOS:
+            otro = sys.modules.get(f"{paquete}.profiler")
+            if otro is not None and getattr(otro, "_instancia", None) is not None:
+                _instancia = otro._instancia
+                break
+        else:
+            _instancia = QueryProfiler()
+    return _instancia
+
+
+def _instalar_cursor(factory) -> None:
+    for paquete in _MODULOS_GEMELOS:
+        pool = sys.modules.get(f"{paquete}.pool")
+        if pool is not None:
+            pool.PooledConnection.cursor_factory = factory
+
+
+def activar_profiler(
+    umbral_lento_ms: Optional[float] = None,
+    muestreo_plan: Optional[int] = None,
+) -> QueryProfiler:
+    """
+    Activa la instrumentación de consultas.
+
+    Args:
+        umbral_lento_ms: Tiempo a partir del cual la consulta va a slow_queries.log
+        muestreo_plan: Frecuencia de muestreo de EXPLAIN QUERY PLAN por sentencia
+    """
+    profiler = get_query_profiler()
+    if umbral_lento_ms is not None:
+        profiler.umbral_lento_ms = umbral_lento_ms
+    if muestreo_plan is not None:
+        profiler.muestreo_plan = max(1, muestreo_plan)
+    ProfiledCursor.profiler = profiler
+    profiler.activo = True
+    _instalar_cursor(ProfiledCursor)
+    logger.info(f"Profiler SQL activo (umbral lento: {profiler.umbral_lento_ms} ms)")
+    return profiler
+
+
+def desactivar_profiler() -> None:
+    """Desactiva la instrumentación y vuelca las estadísticas acumuladas."""
+    profiler = get_query_profiler()
+    if profiler.activo:
+        profiler.guardar_snapshot()
+    profiler.activo = False
+    _instalar_cursor(sqlite3.Cursor)
+
+
+def instalar_si_habilitado() -> None:
+    """Activa el profiler si lo pide el entorno o si otra copia ya lo activó."""
+    activo_por_entorno = os.getenv("FINCAFACIL_SQL_PROFILE", "0") not in ("0", "", "false", "False")
+    compartido = get_query_profiler()
+    if activo_por_entorno or compartido.activo:
+        activar_profiler(umbral_lento_ms=_umbral_de_entorno())
+
+
+def _umbral_de_entorno() -> Optional[float]:
+    """FINCAFACIL_SQL_SLOW_MS como float; None (umbral por defecto) si falta o es inválido."""
+    valor = os.getenv("FINCAFACIL_SQL_SLOW_MS")
+    if not valor:
+        return None
+    try:
+        return float(valor)
+    except ValueError:
+        logger.warning(f"FINCAFACIL_SQL_SLOW_MS inválido ({valor!r}); se usa {DEFAULT_UMBRAL_LENTO_MS} ms")
+        return None
+
+
+def _volcar_al_salir() -> None:
+    if _instancia is not None and _instancia.activo:
+        _instancia.guardar_snapshot()
+
+
+atexit.register(_volcar_al_salir)
+
+
+__all__ = [
+    "QueryProfiler",
+    "ProfiledCursor",
+    "LatencyHistogram",
+    "normalizar_sql",
+    "get_query_profiler",
+    "activar_profiler",
+    "desactivar_profiler",
+    "instalar_si_habilitado",
+]
@@ -0,0 +1,246 @@
+"""
+Rangos de fechas indexables (sargables) para consultas SQLite.
+
+Predicados como `DATE(fecha) BETWEEN ? AND ?` o `DATE(fecha_evento) = ?`
+aplican una función a la columna y obligan a recorrer la tabla completa,
+aunque exista un índice sobre la fecha. Con las fechas almacenadas en
+formato canónico ISO ('YYYY-MM-DD' o 'YYYY-MM-DD HH:MM:SS') la comparación
+de texto equivale a la cronológica, así que el mismo filtro se expresa como
+un rango semiabierto que sí usa el índice:
+
+    fecha >= '2025-01-01' AND fecha < '2025-02-01'
+
+Uso:
+    sql, params = filtro_fechas("fecha", fecha_inicio, fecha_fin)
+    cur.execute(f"SELECT ... FROM venta WHERE {sql}", params)
+
+La migración `canonicalizar_fechas()` reescribe los valores existentes
+('15/01/2025', '2025-1-5', '2025-01-15T08:00:00', ...) al formato canónico
+para que la reescritura de las consultas sea segura.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+import sqlite3
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+FechaLike = Union[str, date, datetime]
+
+# Valores ya canónicos: fecha ISO con hora opcional separada por espacio
+_RE_CANONICA = re.compile(r"^\d{4}-\d{2}-\d{2}(?: \d{2}:\d{2}:\d{2}(?:\.\d{1,6})?)?$")
+
+# Formatos heredados aceptados (día primero, como se capturan en la UI)
+_FORMATOS_HEREDADOS = (
+    "%d/%m/%Y",
+    "%d/%m/%Y %H:%M:%S",
+    "%d/%m/%Y %H:%M",
+    "%d-%m-%Y",
+    "%Y/%m/%d",
+    "%Y/%m/%d %H:%M:%S",
+    "%Y-%m-%d %H:%M",
+)
+
+# Columnas de fecha filtradas por rango en analytics, reportes y servicios
+COLUMNAS_FECHA: Dict[str, Tuple[str, ...]] = {
+    "produccion_leche": ("fecha",),
+    "venta": ("fecha",),
+    "muerte": ("fecha",),
+    "peso": ("fecha",),
+    "tratamiento": ("fecha", "fecha_inicio", "fecha_fin"),
+    "servicio": ("fecha_servicio", "fecha_parto_estimada", "fecha_parto_real"),
+    "pago_nomina": ("fecha_pago",),
+    "movimiento_insumo": ("fecha", "fecha_movimiento"),
+    "movimiento": ("fecha_movimiento",),
+    "evento": ("fecha_evento",),
+    "animal": ("fecha_nacimiento", "fecha_destete", "fecha_muerte"),
+    "alerta": ("fecha_resolucion",),
+    "sugerencia_ia": ("fecha_creacion", "fecha_aceptacion"),
+    "orquestacion": ("fecha_ejecucion",),
+    "killswitch_log": ("fecha_activacion",),
+}
+
+
+def _texto_fecha(dt: datetime, con_hora: bool) -> str:
+    if not con_hora:
+        return dt.strftime("%Y-%m-%d")
+    if dt.microsecond:
+        return dt.strftime("%Y-%m-%d %H:%M:%S.%f").rstrip("0")
+    return dt.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def normalizar_fecha(valor: Optional[FechaLike]) -> Optional[str]:
+    """
+    Convierte una fecha al formato canónico de almacenamiento.
+
+    Returns:
+        'YYYY-MM-DD' o 'YYYY-MM-DD HH:MM:SS[.ffffff]'; None si el valor es
+        vacío o no se reconoce.
+    """
+    if valor is None:
+        return None
+    if isinstance(valor, datetime):
+        if valor.tzinfo is not None:
+            valor = valor.astimezone(timezone.utc).replace(tzinfo=None)
+        return _texto_fecha(valor, True)
+    if isinstance(valor, date):
+        return valor.isoformat()
+
+    texto = str(valor).strip()
+    if not texto:
+        return None
+    if _RE_CANONICA.match(texto):
+        return texto
+
+    # ISO con 'T', zona horaria o componentes sin relleno ('2025-1-5')
+    iso = texto.replace("Z", "+00:00")
+    m = re.match(r"^(\d{4})-(\d{1,2})-(\d{1,2})(.*)$", iso)
+    if m:
+        iso = f"{m.group(1)}-{int(m.group(2)):02d}-{int(m.group(3)):02d}{m.group(4)}"
+    try:
+        dt = datetime.fromisoformat(iso)
+        con_hora = len(iso) > 10
+        if dt.tzinfo is not None:
+            # Igual que DATE()/datetime() de SQLite: se lleva a UTC
+            dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+        return _texto_fecha(dt, con_hora)
+    except ValueError:
+        pass
+
+    for formato in _FORMATOS_HEREDADOS:
+        try:
+            dt = datetime.strptime(texto, formato)
+            return _texto_fecha(dt, "%H" in formato)
+        except ValueError:
+            continue
+    return None
+
+
+def _dia(valor: FechaLike) -> date:
+    texto = normalizar_fecha(valor)
+    if texto is None:
+        raise ValueError(f"Fecha no reconocida: {valor!r}")
+    return date.fromisoformat(texto[:10])
+
+
+def rango_semiabierto(fecha_inicio: FechaLike, fecha_fin: Optional[FechaLike] = None) -> Tuple[str, str]:
+    """
+    Rango inclusivo de días [fecha_inicio, fecha_fin] como límites [desde, hasta).
+
+    Equivale a `DATE(col) BETWEEN fecha_inicio AND fecha_fin`: `hasta` es el
+    día siguiente a `fecha_fin`, así se incluyen los valores con hora de ese
+    día. Sin `fecha_fin` se toma un solo día.
+    """
+    desde = _dia(fecha_inicio)
+    hasta = _dia(fecha_fin) if fecha_fin is not None else desde
+    return desde.isoformat(), (hasta + timedelta(days=1)).isoformat()
+
+
+def rango_mes(año: int, mes: int) -> Tuple[str, str]:
+    """Límites [primer día del mes, primer día del mes siguiente)."""
+    desde = date(año, mes, 1)
+    hasta = date(año + 1, 1, 1) if mes == 12 else date(año, mes + 1, 1)
+    return desde.isoformat(), hasta.isoformat()
+
+
+def condicion_rango(columna: str) -> str:
+    """Predicado indexable para un rango semiabierto sobre `columna`."""
+    return f"{columna} >= ? AND {columna} < ?"
+
+
+def filtro_fechas(
+    columna: str,
+    fecha_inicio: FechaLike,
+    fecha_fin: Optional[FechaLike] = None,
+) -> Tuple[str, Tuple[str, str]]:
+    """
+    Predicado y parámetros para filtrar `columna` entre dos días (inclusive).
+
+    Returns:
+        (sql, params) listos para interpolar en WHERE y pasar a execute()
+    """
+    return condicion_rango(columna), rango_semiabierto(fecha_inicio, fecha_fin)
+
+
+# ----------------------------------------------------------------------
+# Migración
+# ----------------------------------------------------------------------
+def _columnas_existentes(conn: sqlite3.Connection, tabla: str) -> List[str]:
+    try:
+        return [fila[1] for fila in conn.execute(f"PRAGMA table_info({tabla})").fetchall()]
+    except sqlite3.Error:
+        return []
+
+
+def canonicalizar_fechas(
+    conn: sqlite3.Connection,
+    columnas: Optional[Dict[str, Iterable[str]]] = None,
+) -> Dict[str, int]:
+    """
+    Reescribe al formato canónico las fechas almacenadas en otro formato.
+
+    Solo se leen las filas cuyo valor no es ya canónico. Los valores que no
+    se pueden interpretar se dejan intactos y se reportan en el log.
+
+    Returns:
+        {'tabla.columna': filas_actualizadas} para las columnas modificadas
+    """
+    columnas = columnas if columnas is not None else COLUMNAS_FECHA
+    resultado: Dict[str, int] = {}
+
+    for tabla, cols in columnas.items():
+        existentes = set(_columnas_existentes(conn, tabla))
+        for columna in cols:
+            if columna not in existentes:
+                continue
+            filas = conn.execute(
+                f"""
+                SELECT rowid, {columna} FROM {tabla}
+                WHERE {columna} IS NOT NULL
+                  AND (typeof({columna}) != 'text'
+                       OR {columna} NOT GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]'
+                       AND {columna} NOT GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9] [0-9][0-9]:[0-9][0-9]:[0-9][0-9]*')
+                """
+            ).fetchall()
+
+            cambios = []
+            invalidas = 0
+            for rowid, valor in filas:
+                canonica = normalizar_fecha(valor) if isinstance(valor, str) else None
+                if canonica is None:
+                    invalidas += 1
+                elif canonica != valor:
+                    cambios.append((canonica, rowid))
+
+            if cambios:
+                # OR IGNORE: un valor canónico que choque con una restricción
+                # UNIQUE (p. ej. produccion_leche(animal_id, fecha)) se deja igual
+                antes = conn.total_changes
+                conn.executemany(f"UPDATE OR IGNORE {tabla} SET {columna} = ? WHERE rowid = ?", cambios)
+                actualizadas = conn.total_changes - antes
+                resultado[f"{tabla}.{columna}"] = actualizadas
+                if actualizadas < len(cambios):
+                    logger.warning(
+                        f"{tabla}.{columna}: {len(cambios) - actualizadas} fechas duplicarían una fila existente"
+                    )
+            if invalidas:
+                logger.warning(f"{tabla}.{columna}: {invalidas} fechas no reconocidas se dejaron sin cambios")
+
+    if resultado:
+        logger.info(f"Fechas canonicalizadas: {resultado}")
+    return resultado
+
+
+__all__ = [
+    "COLUMNAS_FECHA",
+    "normalizar_fecha",
+    "rango_semiabierto",
+    "rango_mes",
+    "condicion_rango",
+    "filtro_fechas",
+    "canonicalizar_fechas",
+]
@@ -0,0 +1,196 @@
+"""
+Versionado del esquema con PRAGMA user_version.
+
+Cada paso de migración tiene un número de versión. La versión aplicada se
+guarda en el encabezado del archivo SQLite (PRAGMA user_version), así que un
+arranque en caliente hace una sola lectura entera y no ejecuta DDL:
+
+    asegurar_esquema()   # BD al día -> solo "PRAGMA user_version"
+
+Los pasos se aplican en orden y la versión se actualiza después de cada uno;
+si un paso falla se detiene la secuencia y se reintenta en el próximo
+arranque. Para agregar una migración, añadir un PasoMigracion al final de
+PASOS_MIGRACION con la versión siguiente (nunca reordenar ni renumerar).
+"""
+
+from __future__ import annotations
+
+import logging
+import sqlite3
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, List, Optional
+
+try:
+    from .database import (
+        _asegurar_esquema_minimo,
+        _migrar_esquema_basico,
+        get_db_connection,
+        get_db_path_safe,
+    )
+    from .migraciones import (
+        ESQUEMA_AUDIT_LOG,
+        ESQUEMA_EXPORT_JOBS,
+        ESQUEMA_JOBS_ANALYTICS,
+        ESQUEMA_RESULTADOS_CERRADOS,
+        instalar_herd_summary,
+        instalar_kpi_fact,
+        instalar_kpi_incremental,
+        instalar_subtipo_evento,
+        instalar_triggers_cache,
+    )
+except ImportError:
+    # Fallback si se importa fuera del paquete
+    from database import _asegurar_esquema_minimo, _migrar_esquema_basico, get_db_connection, get_db_path_safe
+    from migraciones import (
+        ESQUEMA_AUDIT_LOG,
+        ESQUEMA_EXPORT_JOBS,
+        ESQUEMA_JOBS_ANALYTICS,
+        ESQUEMA_RESULTADOS_CERRADOS,
+        instalar_herd_summary,
+        instalar_kpi_fact,
+        instalar_kpi_incremental,
+        instalar_subtipo_evento,
+        instalar_triggers_cache,
+    )
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class PasoMigracion:
+    version: int
+    descripcion: str
+    aplicar: Callable[[sqlite3.Connection], None]
+
+
+def _esquema_minimo(conn: sqlite3.Connection) -> None:
+    # _asegurar_esquema_minimo solo avisa de sus errores: aquí deben detener
+    # la secuencia para que user_version no avance y se reintente
+    _asegurar_esquema_minimo(conn, estricto=True)
+
+
+def _esquema_audit_log(conn: sqlite3.Connection) -> None:
+    conn.executescript(ESQUEMA_AUDIT_LOG)
+
+
+def _esquema_jobs_analytics(conn: sqlite3.Connection) -> None:
+    conn.executescript(ESQUEMA_JOBS_ANALYTICS)
+
+
+def _esquema_export_jobs(conn: sqlite3.Connection) -> None:
+    conn.executescript(ESQUEMA_EXPORT_JOBS)
+
+
+def _esquema_resultados_cerrados(conn: sqlite3.Connection) -> None:
+    conn.executescript(ESQUEMA_RESULTADOS_CERRADOS)
+
+
+def _descartar_reportes_guardados(conn: sqlite3.Connection) -> None:
+    # Los reportes completos guardados congelaban el inventario actual; ahora
+    # solo se guardan las secciones del período (tipo 'seccion_*')
+    conn.execute(r"DELETE FROM resultado_periodo_cerrado WHERE tipo LIKE 'reporte\_%' ESCAPE '\'")
+
+
+# Los pasos 1-3 agrupan las verificaciones idempotentes que antes corrían en
+# cada arranque (asegurar_esquema_minimo, asegurar_esquema_completo y
+# audit_service.ensure_audit_schema al importar)
+PASOS_MIGRACION: List[PasoMigracion] = [
+    PasoMigracion(1, "Esquema mínimo y migraciones del sistema", _esquema_minimo),
+    PasoMigracion(2, "Columnas del esquema completo", _migrar_esquema_basico),
+    PasoMigracion(3, "Auditoría operativa (audit_log)", _esquema_audit_log),
+    PasoMigracion(4, "Dependencias e invalidación del cache analítico", instalar_triggers_cache),
+    PasoMigracion(5, "Marcas de agua y registro de jobs de analytics", _esquema_jobs_analytics),
+    PasoMigracion(6, "Subtipo indexado de evento y clasificación inicial", instalar_subtipo_evento),
+    PasoMigracion(7, "Tabla de hechos kpi_fact desde snapshots BI", instalar_kpi_fact),
+    PasoMigracion(8, "Agregados mensuales incrementales de KPIs", instalar_kpi_incremental),
+    PasoMigracion(9, "Cola de exportaciones y artefactos de períodos cerrados", _esquema_export_jobs),
+    PasoMigracion(10, "Resultados permanentes de períodos cerrados", _esquema_resultados_cerrados),
+    PasoMigracion(11, "Resumen del hato mantenido por triggers (herd_summary)", instalar_herd_summary),
+    PasoMigracion(12, "Fuentes de KPIs incrementales sobre las columnas reales", instalar_kpi_incremental),
+    PasoMigracion(13, "Descartar reportes guardados con el estado actual del hato", _descartar_reportes_guardados),
+]
+
+VERSION_ESQUEMA = PASOS_MIGRACION[-1].version
+
+
+def version_actual(conn: sqlite3.Connection) -> int:
+    """Versión de esquema registrada en la BD (0 = nunca migrada)."""
+    return int(conn.execute("PRAGMA user_version").fetchone()[0])
+
+
+def aplicar_migraciones(conn: sqlite3.Connection) -> List[int]:
+    """
+    Aplica los pasos con versión mayor a la registrada.
+
+    Returns:
+        Versiones aplicadas (vacía si la BD ya estaba al día)
+    """
+    version = version_actual(conn)
+    if version >= VERSION_ESQUEMA:
+        if version > VERSION_ESQUEMA:
+            logger.warning(
+                f"La BD tiene versión de esquema {version}, más nueva que la de la aplicación ({VERSION_ESQUEMA})"
+            )
+        return []
+
+    aplicadas: List[int] = []
+    for paso in PASOS_MIGRACION:
+        if paso.version <= version:
+            continue
+        logger.info(f"Aplicando migración v{paso.version}: {paso.descripcion}")
+        try:
+            paso.aplicar(conn)
+            conn.execute(f"PRAGMA user_version = {int(paso.version)}")
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Migración v{paso.version} falló, se reintentará en el próximo arranque: {e}")
+            break
+        aplicadas.append(paso.version)
+
+    if aplicadas:
+        logger.info(f"Esquema actualizado a versión {aplicadas[-1]}")
+    return aplicadas
+
+
+def esquema_actualizado(db_path: Optional[Path | str] = None) -> bool:
+    """True si la BD existe y su user_version ya incluye todos los pasos."""
+    path = Path(db_path or get_db_path_safe())
+    if not path.exists():
+        return False
+    try:
+        with get_db_connection(path) as conn:
+            return version_actual(conn) >= VERSION_ESQUEMA
+    except sqlite3.Error as e:
+        logger.warning(f"No se pudo leer la versión del esquema: {e}")
+        return False
+
+
+def asegurar_esquema(db_path: Optional[Path | str] = None) -> bool:
+    """
+    Lleva el esquema a VERSION_ESQUEMA aplicando solo los pasos pendientes.
+
+    Returns:
+        True si la BD quedó en la versión actual
+    """
+    try:
+        with get_db_connection(db_path) as conn:
+            if version_actual(conn) >= VERSION_ESQUEMA:
+                return True
+            aplicar_migraciones(conn)
+            return version_actual(conn) >= VERSION_ESQUEMA
+    except Exception as e:
+        logger.warning(f"No se pudo asegurar el esquema: {e}")
+        return False
+
+
+__all__ = [
+    "PasoMigracion",
+    "PASOS_MIGRACION",
+    "VERSION_ESQUEMA",
+    "version_actual",
+    "aplicar_migraciones",
+    "esquema_actualizado",
+    "asegurar_esquema",
+]
@@ -3,7 +3,7 @@ Analytics Repository - Acceso a datos de read models
 Encapsula todas las operaciones con tablas de analytics
 """
 from typing import Dict, Any, List, Optional
-from database.database import ejecutar_consulta
+from database.database import ejecutar_consulta, get_db_connection
 import sqlite3
 
 
@@ -157,6 +157,41 @@ class AnalyticsRepository:
             data.get('peso_promedio'),
         ))
 
+    def insertar_productividad_lote(self, filas: List[Dict[str, Any]]) -> int:
+        """
+        Reemplaza en una sola transacción la productividad a nivel empresa
+        (lote_id y sector_id nulos) de varios días.
+
+        UNIQUE(empresa_id, fecha, lote_id, sector_id) no detecta conflictos
+        cuando lote_id/sector_id son NULL, por eso INSERT OR REPLACE duplicaba
+        filas; aquí se borran las existentes con IS antes de insertar.
+        """
+        if not filas:
+            return 0
+        columnas = ('nacimientos', 'destetes', 'muertes', 'traslados', 'servicios', 'partos')
+        with get_db_connection() as conn:
+            conn.executemany(
+                """DELETE FROM analytics_productividad
+                   WHERE empresa_id = ? AND fecha = ? AND lote_id IS ? AND sector_id IS ?""",
+                [(f.get('empresa_id', 1), f['fecha'], f.get('lote_id'), f.get('sector_id')) for f in filas],
+            )
+            conn.executemany(
+                """INSERT INTO analytics_productividad
+                   (empresa_id, fecha, lote_id, sector_id, animales_totales, nacimientos, destetes, muertes,
+                    traslados, servicios, partos, mortalidad_pct, natalidad_pct, peso_promedio, refresh_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)""",
+                [
+                    (
+                        f.get('empresa_id', 1), f['fecha'], f.get('lote_id'), f.get('sector_id'),
+                        f.get('animales_totales', 0), *(f.get(c, 0) for c in columnas),
+                        f.get('mortalidad_pct', 0.0), f.get('natalidad_pct', 0.0), f.get('peso_promedio'),
+                    )
+                    for f in filas
+                ],
+            )
+            conn.commit()
+        return len(filas)
+
     def obtener_productividad(self, empresa_id: int, fecha: str, lote_id: Optional[int] = None) -> List[Dict[str, Any]]:
         """Obtiene datos de productividad por fecha."""
         if lote_id:
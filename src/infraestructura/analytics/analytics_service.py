@@ -194,6 +194,11 @@ class AnalyticsService:
         data['fecha'] = fecha
         self._repo.insertar_productividad(data)
 
+    def registrar_productividad_lote(self, empresa_id: int, dias: Dict[str, Dict[str, Any]]) -> int:
+        """Registra (o reemplaza) la productividad de varios días {fecha: data} en una transacción."""
+        filas = [dict(data, empresa_id=empresa_id, fecha=fecha) for fecha, data in dias.items()]
+        return self._repo.insertar_productividad_lote(filas)
+
     def registrar_alerta(self, empresa_id: int, fecha: str, data: Dict[str, Any]) -> None:
         """Registra (o actualiza) datos de alertas."""
         data['empresa_id'] = empresa_id
@@ -6,6 +6,7 @@ mantener compatibilidad y formato de resultados existente.
 from typing import Any, Dict, List, Optional
 
 from database.database import ejecutar_consulta
+from database.eventos import insertar_evento as _insertar_evento
 
 
 class AnimalRepository:
@@ -33,6 +34,18 @@ class AnimalRepository:
     def eliminar(self, animal_id: int) -> None:
         self._execute("DELETE FROM animal WHERE id = ?", (animal_id,), fetch=False)
 
+    def insertar_evento(
+        self,
+        titulo: str,
+        fecha_evento: str,
+        subtipo: str,
+        animal_id: Optional[int] = None,
+        descripcion: Optional[str] = None,
+        tipo_evento: str = "Reproductivo",
+    ) -> None:
+        """Insertar evento con su subtipo ya clasificado (evento.subtipo)."""
+        _insertar_evento(self._execute, titulo, fecha_evento, subtipo, animal_id, descripcion, tipo_evento)
+
     def obtener_por_codigo(self, codigo: str) -> Optional[Dict[str, Any]]:
         res = self._execute("SELECT * FROM animal WHERE codigo = ?", (codigo,), fetch=True)
         return res[0] if res else None
@@ -29,6 +29,17 @@ class AnimalService:
 
         self._repo.crear(data)
 
+        # Un ingreso por nacimiento queda como evento tipado para analytics
+        if str(data.get("tipo_ingreso") or "").upper() == "NACIMIENTO" and data.get("fecha_nacimiento"):
+            animal = self._repo.obtener_por_codigo(codigo)
+            self._repo.insertar_evento(
+                titulo="Nacimiento",
+                descripcion=f"Nacimiento de {codigo}",
+                fecha_evento=data["fecha_nacimiento"],
+                subtipo="nacimiento",
+                animal_id=animal["id"] if animal else None,
+            )
+
     def actualizar_animal(self, animal_id: int, cambios: Dict[str, Any]) -> None:
         if not cambios:
             return
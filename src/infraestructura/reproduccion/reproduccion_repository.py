@@ -5,6 +5,7 @@ No contiene lógica de negocio, solo acceso a datos.
 """
 from typing import Any, Dict, List, Optional
 from database.database import ejecutar_consulta
+from database.eventos import insertar_evento as _insertar_evento
 
 
 class ReproduccionRepository:
@@ -275,6 +276,18 @@ class ReproduccionRepository:
         """
         self._execute(sql, (animal_id, fecha, tipo, nota, autor), fetch=False)
 
+    def insertar_evento(
+        self,
+        titulo: str,
+        fecha_evento: str,
+        subtipo: str,
+        animal_id: Optional[int] = None,
+        descripcion: Optional[str] = None,
+        tipo_evento: str = "Reproductivo",
+    ) -> None:
+        """Insertar evento con su subtipo ya clasificado (evento.subtipo)."""
+        _insertar_evento(self._execute, titulo, fecha_evento, subtipo, animal_id, descripcion, tipo_evento)
+
     def actualizar_servicio_parto(
         self,
         servicio_id: int,
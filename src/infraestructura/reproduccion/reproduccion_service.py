@@ -151,6 +151,15 @@ class ReproduccionService:
             nota=f"Servicio: {tipo_servicio}. Parto estimado: {fecha_parto_estimada}",
         )
 
+        # Evento tipado para analytics (evento.subtipo)
+        self._repo.insertar_evento(
+            titulo="Servicio",
+            descripcion=f"Servicio: {tipo_servicio}",
+            fecha_evento=fecha_servicio,
+            subtipo="servicio",
+            animal_id=hembra_id,
+        )
+
     def registrar_parto(
         self,
         servicio_id: int,
@@ -167,7 +176,8 @@ class ReproduccionService:
 
         Flujo:
         1. Actualizar servicio a estado "Parida"
-        2. Insertar comentario en bitácora de hembra
+        2. Insertar comentario en bitácora de hembra y eventos tipados
+           (parto y, si la cría nace viva, nacimiento)
         3. Si registrar_cria=True:
            - Generar código automático
            - Obtener finca de la madre
@@ -202,6 +212,21 @@ class ReproduccionService:
             tipo="Parto",
             nota=nota_parto,
         )
+        self._repo.insertar_evento(
+            titulo="Parto",
+            descripcion=nota_parto,
+            fecha_evento=fecha_parto,
+            subtipo="parto",
+            animal_id=hembra_id,
+        )
+        if estado_cria == "Vivo":
+            self._repo.insertar_evento(
+                titulo="Nacimiento",
+                descripcion=f"Cría {sexo_cria}",
+                fecha_evento=fecha_parto,
+                subtipo="nacimiento",
+                animal_id=hembra_id,
+            )
 
         # 3. Registrar cría si corresponde
         if registrar_cria and estado_cria == "Vivo":
@@ -7,10 +7,18 @@ from .analytics_jobs import (
     BuildIAAnalyticsJob,
     BuildAutonomyAnalyticsJob,
 )
+from .scheduler import AnalyticsJobScheduler, get_analytics_scheduler
+from .export_queue import ColaExportaciones, TrabajoExportacion, get_export_queue, seguir_en_ui
 
 __all__ = [
     'BuildProductivityAnalyticsJob',
     'BuildAlertAnalyticsJob',
     'BuildIAAnalyticsJob',
     'BuildAutonomyAnalyticsJob',
+    'AnalyticsJobScheduler',
+    'get_analytics_scheduler',
+    'ColaExportaciones',
+    'TrabajoExportacion',
+    'get_export_queue',
+    'seguir_en_ui',
 ]
@@ -1,11 +1,12 @@
 """Trabajos (Jobs) para agregación de analytics - VERSION 2.
 
 Ejecutan consultas reales sobre datos operacionales y escriben en read models.
-Diseñados para ejecutarse con APScheduler (hourly).
+Se ejecutan con el planificador de src/jobs/scheduler.py (marcas de agua
+por job y empresa, backfill por rango) en un hilo o desde tools/analytics_jobs.py.
 Cada job es idempotente: puede ejecutarse múltiples veces sin efectos secundarios.
 
 QUERIES REALES conectadas a:
-- animal (nacimiento, destete, muerte)
+- muerte (muertes por fecha)
 - evento (Reproductivo, Sanitario)
 - movimiento (traslados)
 - alerta (activas, resueltas, críticas)
@@ -15,11 +16,12 @@ QUERIES REALES conectadas a:
 """
 
 import logging
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from typing import Dict, Optional
 
 from src.infraestructura.analytics.analytics_service import AnalyticsService
 from src.database.database import ejecutar_consulta
+from src.database.rango_fechas import rango_semiabierto
 
 
 logger = logging.getLogger(__name__)
@@ -31,6 +33,8 @@ class BuildProductivityAnalyticsJob:
     def __init__(self, service: AnalyticsService):
         self.service = service
 
+    CAMPOS = ("nacimientos", "destetes", "muertes", "traslados", "servicios", "partos")
+
     def ejecutar(self, empresa_id: int, fecha: Optional[str] = None) -> Dict:
         """
         Construir analítica de productividad.
@@ -43,123 +47,102 @@ class BuildProductivityAnalyticsJob:
             Diccionario con resultados de agregación
         """
         fecha = fecha or datetime.now().strftime("%Y-%m-%d")
-        
+        resultado = self.ejecutar_rango(empresa_id, fecha, fecha)
+        if resultado["status"] != "success":
+            return resultado
+        conteos = resultado["dias"][fecha]
+        return {
+            "status": "success",
+            "fecha": fecha,
+            "nacimientos": conteos["nacimientos"],
+            "destetes": conteos["destetes"],
+            "muertes": conteos["muertes"],
+        }
+
+    def ejecutar_rango(self, empresa_id: int, desde: str, hasta: str) -> Dict:
+        """
+        Construir analítica de productividad para todos los días de [desde, hasta].
+
+        Una sola pasada agrupada por tabla de origen (evento, muerte,
+        movimiento) en lugar de seis COUNT(*) por día, y un upsert en lote
+        sobre analytics_productividad. Los días sin actividad se escriben en 0
+        para que un reproceso limpie valores anteriores.
+        """
         try:
-            # ==================== QUERIES REALES ====================
-            
-            # Nacimientos (eventos de tipo nacimiento registrados en la fecha)
-            nacimientos_result = ejecutar_consulta(
-                """
-                SELECT COUNT(*) as total
-                FROM evento
-                WHERE empresa_id = ? 
-                  AND tipo_evento = 'Reproductivo'
-                  AND descripcion LIKE '%nacimiento%'
-                  AND DATE(fecha_evento) = ?
-                """,
-                (empresa_id, fecha),
-            )
-            nacimientos = nacimientos_result[0]['total'] if nacimientos_result else 0
-            
-            # Destetes (animales con fecha_destete = fecha)
-            destetes_result = ejecutar_consulta(
-                """
-                SELECT COUNT(*) as total
-                FROM animal
-                WHERE empresa_id = ? 
-                  AND DATE(fecha_destete) = ?
-                """,
-                (empresa_id, fecha),
-            )
-            destetes = destetes_result[0]['total'] if destetes_result else 0
-            
-            # Muertes (animales con fecha_muerte = fecha)
-            muertes_result = ejecutar_consulta(
-                """
-                SELECT COUNT(*) as total
-                FROM animal
-                WHERE empresa_id = ? 
-                  AND DATE(fecha_muerte) = ?
-                """,
-                (empresa_id, fecha),
-            )
-            muertes = muertes_result[0]['total'] if muertes_result else 0
-            
-            # Traslados (movimientos de tipo 'Traslado' en la fecha)
-            traslados_result = ejecutar_consulta(
-                """
-                SELECT COUNT(*) as total
-                FROM movimiento m
-                JOIN animal a ON m.animal_id = a.id
-                WHERE a.empresa_id = ? 
-                  AND m.tipo_movimiento = 'Traslado'
-                  AND DATE(m.fecha_movimiento) = ?
-                """,
-                (empresa_id, fecha),
-            )
-            traslados = traslados_result[0]['total'] if traslados_result else 0
-            
-            # Servicios (evento de tipo Reproductivo con 'servicio')
-            servicios_result = ejecutar_consulta(
-                """
-                SELECT COUNT(*) as total
-                FROM evento
-                WHERE empresa_id = ? 
-                  AND tipo_evento = 'Reproductivo'
-                  AND descripcion LIKE '%servicio%'
-                  AND DATE(fecha_evento) = ?
-                """,
-                (empresa_id, fecha),
-            )
-            servicios = servicios_result[0]['total'] if servicios_result else 0
-            
-            # Partos (eventos con tipo 'parto')
-            partos_result = ejecutar_consulta(
-                """
-                SELECT COUNT(*) as total
-                FROM evento
-                WHERE empresa_id = ? 
-                  AND tipo_evento = 'Reproductivo'
-                  AND descripcion LIKE '%parto%'
-                  AND DATE(fecha_evento) = ?
-                """,
-                (empresa_id, fecha),
-            )
-            partos = partos_result[0]['total'] if partos_result else 0
-            
-            # Registrar en read model
-            self.service.registrar_productividad(
-                empresa_id=empresa_id,
-                fecha=fecha,
-                data={
-                    'nacimientos': nacimientos,
-                    'destetes': destetes,
-                    'muertes': muertes,
-                    'traslados': traslados,
-                    'servicios': servicios,
-                    'partos': partos,
-                    'animales_totales': 0,  # Será calculado por repo
-                    'lote_id': None,
-                    'sector_id': None,
-                }
-            )
-            
+            conteos = self.contar_rango(empresa_id, desde, hasta)
+            self.service.registrar_productividad_lote(empresa_id, conteos)
+
+            totales = {c: sum(d[c] for d in conteos.values()) for c in self.CAMPOS}
             logger.info(
-                f"✓ Productividad agregada: {fecha} empresa={empresa_id} "
-                f"nacimientos={nacimientos} destetes={destetes} muertes={muertes}"
+                f"✓ Productividad agregada: {desde}..{hasta} empresa={empresa_id} "
+                f"dias={len(conteos)} nacimientos={totales['nacimientos']} "
+                f"destetes={totales['destetes']} muertes={totales['muertes']}"
             )
-            
-            return {
-                "status": "success",
-                "fecha": fecha,
-                "nacimientos": nacimientos,
-                "destetes": destetes,
-                "muertes": muertes,
-            }
+            return {"status": "success", "filas": len(conteos), "totales": totales, "dias": conteos}
         except Exception as e:
             logger.error(f"✗ Error en BuildProductivityAnalyticsJob: {e}", exc_info=True)
             return {"status": "error", "mensaje": str(e)}
 
+    def contar_rango(self, empresa_id: int, desde: str, hasta: str) -> Dict[str, Dict[str, int]]:
+        """Conteos por día {fecha: {campo: n}} para el rango inclusivo [desde, hasta]."""
+        rango = rango_semiabierto(desde, hasta)
+        dias: Dict[str, Dict[str, int]] = {}
+        dia, fin = date.fromisoformat(rango[0]), date.fromisoformat(rango[1])
+        while dia < fin:
+            dias[dia.isoformat()] = dict.fromkeys(self.CAMPOS, 0)
+            dia += timedelta(days=1)
+
+        # La BD es de una sola empresa: evento, muerte y movimiento no llevan
+        # empresa_id; empresa_id solo identifica las filas del read model.
+
+        # evento: nacimientos, servicios y partos por igualdad sobre idx_evento_subtipo_fecha
+        for fila in ejecutar_consulta(
+            """
+            SELECT subtipo, substr(fecha_evento, 1, 10) AS dia, COUNT(*) AS total
+            FROM evento
+            WHERE subtipo IN ('nacimiento', 'servicio', 'parto')
+              AND fecha_evento >= ? AND fecha_evento < ?
+            GROUP BY subtipo, dia
+            """,
+            rango,
+            fetch=True,
+        ) or []:
+            if fila["dia"] in dias:
+                campo = {"nacimiento": "nacimientos", "servicio": "servicios", "parto": "partos"}[fila["subtipo"]]
+                dias[fila["dia"]][campo] = fila["total"]
+
+        # muerte: un registro por animal muerto (idx_muerte_fecha). Los destetes
+        # no tienen fecha propia en el esquema y quedan en 0.
+        for fila in ejecutar_consulta(
+            """
+            SELECT substr(fecha, 1, 10) AS dia, COUNT(*) AS total
+            FROM muerte
+            WHERE fecha >= ? AND fecha < ?
+            GROUP BY dia
+            """,
+            rango,
+            fetch=True,
+        ) or []:
+            if fila["dia"] in dias:
+                dias[fila["dia"]]["muertes"] = fila["total"]
+
+        # movimiento: traslados por día
+        for fila in ejecutar_consulta(
+            """
+            SELECT substr(fecha_movimiento, 1, 10) AS dia, COUNT(*) AS total
+            FROM movimiento
+            WHERE tipo_movimiento = 'Traslado'
+              AND fecha_movimiento >= ? AND fecha_movimiento < ?
+            GROUP BY dia
+            """,
+            rango,
+            fetch=True,
+        ) or []:
+            if fila["dia"] in dias:
+                dias[fila["dia"]]["traslados"] = fila["total"]
+
+        return dias
+
 
 class BuildAlertAnalyticsJob:
     """Agrega datos de alertas (activas, resueltas, por tipo)"""
@@ -170,6 +153,7 @@ class BuildAlertAnalyticsJob:
     def ejecutar(self, empresa_id: int, fecha: Optional[str] = None) -> Dict:
         """Construir analítica de alertas."""
         fecha = fecha or datetime.now().strftime("%Y-%m-%d")
+        dia = rango_semiabierto(fecha)
         
         try:
             # ==================== QUERIES REALES ====================
@@ -183,6 +167,7 @@ class BuildAlertAnalyticsJob:
                   AND estado = 'Activa'
                 """,
                 (empresa_id,),
+                fetch=True,
             )
             alertas_activas = activas_result[0]['total'] if activas_result else 0
             
@@ -193,9 +178,10 @@ class BuildAlertAnalyticsJob:
                 FROM alerta
                 WHERE empresa_id = ? 
                   AND estado = 'Resuelta'
-                  AND DATE(fecha_resolucion) = ?
+                  AND fecha_resolucion >= ? AND fecha_resolucion < ?
                 """,
-                (empresa_id, fecha),
+                (empresa_id, *dia),
+                fetch=True,
             )
             alertas_resueltas = resueltas_result[0]['total'] if resueltas_result else 0
             
@@ -209,6 +195,7 @@ class BuildAlertAnalyticsJob:
                   AND prioridad = 'Crítica'
                 """,
                 (empresa_id,),
+                fetch=True,
             )
             alertas_criticas = criticas_result[0]['total'] if criticas_result else 0
             
@@ -251,6 +238,7 @@ class BuildIAAnalyticsJob:
     def ejecutar(self, empresa_id: int, fecha: Optional[str] = None) -> Dict:
         """Construir analítica de IA."""
         fecha = fecha or datetime.now().strftime("%Y-%m-%d")
+        dia = rango_semiabierto(fecha)
         
         try:
             # ==================== QUERIES REALES ====================
@@ -261,9 +249,10 @@ class BuildIAAnalyticsJob:
                 SELECT COUNT(*) as total
                 FROM sugerencia_ia
                 WHERE empresa_id = ? 
-                  AND DATE(fecha_creacion) = ?
+                  AND fecha_creacion >= ? AND fecha_creacion < ?
                 """,
-                (empresa_id, fecha),
+                (empresa_id, *dia),
+                fetch=True,
             )
             sugerencias_generadas = generadas_result[0]['total'] if generadas_result else 0
             
@@ -274,9 +263,10 @@ class BuildIAAnalyticsJob:
                 FROM sugerencia_ia
                 WHERE empresa_id = ? 
                   AND estado_aceptacion = 'Aceptada'
-                  AND DATE(fecha_aceptacion) = ?
+                  AND fecha_aceptacion >= ? AND fecha_aceptacion < ?
                 """,
-                (empresa_id, fecha),
+                (empresa_id, *dia),
+                fetch=True,
             )
             sugerencias_aceptadas = aceptadas_result[0]['total'] if aceptadas_result else 0
             
@@ -294,9 +284,10 @@ class BuildIAAnalyticsJob:
                 FROM sugerencia_ia
                 WHERE empresa_id = ? 
                   AND estado_aceptacion = 'Aceptada'
-                  AND DATE(fecha_aceptacion) = ?
+                  AND fecha_aceptacion >= ? AND fecha_aceptacion < ?
                 """,
-                (empresa_id, fecha),
+                (empresa_id, *dia),
+                fetch=True,
             )
             impacto_estimado = (
                 float(impacto_result[0]['total']) if impacto_result and impacto_result[0]['total'] else 0.0
@@ -311,6 +302,7 @@ class BuildIAAnalyticsJob:
                   AND estado_aceptacion = 'Aceptada'
                 """,
                 (empresa_id,),
+                fetch=True,
             )
             precision = (
                 float(precision_result[0]['promedio']) if precision_result and precision_result[0]['promedio'] else 0.0
@@ -357,6 +349,7 @@ class BuildAutonomyAnalyticsJob:
     def ejecutar(self, empresa_id: int, fecha: Optional[str] = None) -> Dict:
         """Construir analítica de autonomía."""
         fecha = fecha or datetime.now().strftime("%Y-%m-%d")
+        dia = rango_semiabierto(fecha)
         
         try:
             # ==================== QUERIES REALES ====================
@@ -367,9 +360,10 @@ class BuildAutonomyAnalyticsJob:
                 SELECT COUNT(*) as total
                 FROM orquestacion
                 WHERE empresa_id = ? 
-                  AND DATE(fecha_ejecucion) = ?
+                  AND fecha_ejecucion >= ? AND fecha_ejecucion < ?
                 """,
-                (empresa_id, fecha),
+                (empresa_id, *dia),
+                fetch=True,
             )
             orquestaciones_ejecutadas = ejecutadas_result[0]['total'] if ejecutadas_result else 0
             
@@ -380,9 +374,10 @@ class BuildAutonomyAnalyticsJob:
                 FROM orquestacion
                 WHERE empresa_id = ? 
                   AND estado_ejecucion = 'Exitosa'
-                  AND DATE(fecha_ejecucion) = ?
+                  AND fecha_ejecucion >= ? AND fecha_ejecucion < ?
                 """,
-                (empresa_id, fecha),
+                (empresa_id, *dia),
+                fetch=True,
             )
             orquestaciones_exitosas = exitosas_result[0]['total'] if exitosas_result else 0
             
@@ -402,9 +397,10 @@ class BuildAutonomyAnalyticsJob:
                 SELECT COUNT(*) as total
                 FROM killswitch_log
                 WHERE empresa_id = ? 
-                  AND DATE(fecha_activacion) = ?
+                  AND fecha_activacion >= ? AND fecha_activacion < ?
                 """,
-                (empresa_id, fecha),
+                (empresa_id, *dia),
+                fetch=True,
             )
             kill_switch_activaciones = killswitch_result[0]['total'] if killswitch_result else 0
             
@@ -444,6 +440,7 @@ class BuildAutonomyAnalyticsJob:
 JOBS_CONFIG = {
     "BuildProductivityAnalyticsJob": {
         "class": BuildProductivityAnalyticsJob,
+        "tablas": ("evento", "muerte", "movimiento"),
         "trigger": "cron",
         "hour": "*",
         "minute": "0",  # Cada hora en :00
@@ -451,6 +448,7 @@ JOBS_CONFIG = {
     },
     "BuildAlertAnalyticsJob": {
         "class": BuildAlertAnalyticsJob,
+        "tablas": ("alerta",),
         "trigger": "cron",
         "hour": "*",
         "minute": "15",  # Cada hora en :15
@@ -458,6 +456,7 @@ JOBS_CONFIG = {
     },
     "BuildIAAnalyticsJob": {
         "class": BuildIAAnalyticsJob,
+        "tablas": ("sugerencia_ia",),
         "trigger": "cron",
         "hour": "*",
         "minute": "30",  # Cada hora en :30
@@ -465,6 +464,7 @@ JOBS_CONFIG = {
     },
     "BuildAutonomyAnalyticsJob": {
         "class": BuildAutonomyAnalyticsJob,
+        "tablas": ("orquestacion", "killswitch_log"),
         "trigger": "cron",
         "hour": "*",
         "minute": "45",  # Cada hora en :45
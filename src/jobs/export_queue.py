@@ -0,0 +1,458 @@
+"""Cola de exportaciones en segundo plano con progreso, cancelación y cache.
+
+Las exportaciones grandes (reportes, inventario, ficha PDF, todos los
+formatos de un mes) corrían en el hilo de Tk y congelaban la ventana. Aquí
+se encolan en un pool de hilos:
+
+    cola = get_export_queue()
+    trabajo = cola.enviar("inventario", generar, ruta_salida="inv.xlsx")
+    seguir_en_ui(self, trabajo, al_progreso=actualizar_barra, al_terminar=avisar)
+    ...
+    trabajo.cancelar()
+
+`generar(trabajo)` hace la exportación y devuelve la ruta generada (o un
+dict nombre -> ruta si genera varios archivos). Informa avance con
+`trabajo.avanzar(hechas, total)`, que tiene la firma del callback de
+export_stream y devuelve False si se pidió cancelar; el trabajo puede además
+llamar a `trabajo.verificar()` entre pasos. La cancelación es cooperativa.
+
+La UI nunca se toca desde los hilos: seguir_en_ui sondea el estado del
+trabajo con widget.after() en el hilo de Tk.
+
+Cache: un trabajo con `periodo=((año, mes), (año, mes))` cuyos meses estén
+todos cerrados (cierre_mensual 'Completado') guarda sus archivos en
+directorio_cache() (config.DATA_DIR/exports/cache) y queda en export_artefacto; repetir la misma exportación copia
+el artefacto sin regenerarlo. DataLockService.unblock_period descarta los
+artefactos del mes revertido (invalidar_artefactos_periodo).
+
+Cada trabajo queda registrado en export_job (estado, filas, duración, error).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import itertools
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from src.database.database import get_db_connection
+from src.database.periodos import Periodo, meses_entre, texto_mes
+
+logger = logging.getLogger(__name__)
+
+Resultado = Union[str, Path, Dict[str, Any], None]
+
+MAX_HILOS = 2
+INTERVALO_UI_MS = 150
+
+PENDIENTE = "pendiente"
+EJECUTANDO = "ejecutando"
+COMPLETADO = "completado"
+ERROR = "error"
+CANCELADO = "cancelado"
+TERMINALES = (COMPLETADO, ERROR, CANCELADO)
+
+
+class TrabajoCancelado(Exception):
+    """Se pidió cancelar el trabajo."""
+
+
+def directorio_cache() -> Path:
+    """Carpeta de artefactos cacheados (config.DATA_DIR/exports/cache), independiente del cwd."""
+    try:
+        from config import config as app_config
+        return Path(app_config.DATA_DIR) / "exports" / "cache"
+    except Exception:
+        base = os.getenv("LOCALAPPDATA") or os.getenv("APPDATA") or str(Path.home())
+        return Path(base) / "FincaFacil" / "exports" / "cache"
+
+
+@dataclass
+class TrabajoExportacion:
+    """Estado de una exportación; se lee desde la UI y se escribe desde el hilo de trabajo."""
+    id: int
+    tipo: str
+    ruta_salida: Optional[str] = None
+    parametros: Dict[str, Any] = field(default_factory=dict)
+    periodo: Optional[Tuple[Periodo, Periodo]] = None
+    estado: str = PENDIENTE
+    hechas: int = 0
+    total: Optional[int] = None
+    resultado: Resultado = None
+    error: Optional[str] = None
+    desde_cache: bool = False
+    duracion_ms: float = 0.0
+    _cancelar: threading.Event = field(default_factory=threading.Event, repr=False)
+    _fin: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    # ---- desde el hilo de trabajo ----
+
+    def avanzar(self, hechas: int, total: Optional[int] = None) -> bool:
+        """Registra el avance; devuelve False si se pidió cancelar."""
+        self.hechas = hechas
+        if total is not None:
+            self.total = total
+        return not self._cancelar.is_set()
+
+    def verificar(self) -> None:
+        """Lanza TrabajoCancelado si se pidió cancelar."""
+        if self._cancelar.is_set():
+            raise TrabajoCancelado(f"Exportación {self.id} cancelada")
+
+    # ---- desde la UI ----
+
+    def cancelar(self) -> None:
+        self._cancelar.set()
+
+    @property
+    def cancelado_solicitado(self) -> bool:
+        return self._cancelar.is_set()
+
+    @property
+    def terminado(self) -> bool:
+        return self.estado in TERMINALES
+
+    @property
+    def fraccion(self) -> Optional[float]:
+        """Avance entre 0 y 1, o None si el total no se conoce."""
+        if self.estado == COMPLETADO:
+            return 1.0
+        if not self.total:
+            return None
+        return min(1.0, self.hechas / self.total)
+
+    def esperar(self, timeout: Optional[float] = None) -> bool:
+        return self._fin.wait(timeout)
+
+
+class ColaExportaciones:
+    """Pool de hilos para exportaciones con registro, cancelación y cache de períodos cerrados."""
+
+    def __init__(self, max_hilos: int = MAX_HILOS, dir_cache: Optional[Path] = None):
+        self.max_hilos = max_hilos
+        self.dir_cache = Path(dir_cache) if dir_cache else directorio_cache()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._trabajos: Dict[int, TrabajoExportacion] = {}
+        self._ids_locales = itertools.count(1)
+        self._stats = {"enviados": 0, "completados": 0, "errores": 0, "cancelados": 0, "cache": 0}
+
+    # ==================== ENVÍO ====================
+
+    def enviar(
+        self,
+        tipo: str,
+        generar: Callable[[TrabajoExportacion], Resultado],
+        ruta_salida: Optional[Union[str, Path]] = None,
+        parametros: Optional[Dict[str, Any]] = None,
+        periodo: Optional[Tuple[Periodo, Periodo]] = None,
+    ) -> TrabajoExportacion:
+        """
+        Encola una exportación.
+
+        Args:
+            tipo: Nombre de la exportación (parte de la clave de cache)
+            generar: Función que recibe el trabajo y devuelve la ruta o {nombre: ruta}
+            ruta_salida: Archivo destino, si la exportación tiene uno solo
+            parametros: Filtros que determinan el contenido (JSON-serializables)
+            periodo: ((año, mes), (año, mes)) cubierto; habilita la cache si está cerrado
+        """
+        parametros = dict(parametros or {})
+        ruta = str(ruta_salida) if ruta_salida is not None else None
+        trabajo = TrabajoExportacion(
+            id=self._registrar_inicio(tipo, parametros, ruta),
+            tipo=tipo,
+            ruta_salida=ruta,
+            parametros=parametros,
+            periodo=periodo,
+        )
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_hilos, thread_name_prefix="exportacion")
+            self._trabajos[trabajo.id] = trabajo
+            self._stats["enviados"] += 1
+            self._executor.submit(self._ejecutar, trabajo, generar)
+        logger.info(f"Exportación {trabajo.id} encolada: {tipo}")
+        return trabajo
+
+    def _ejecutar(self, trabajo: TrabajoExportacion, generar: Callable[[TrabajoExportacion], Resultado]) -> None:
+        inicio = time.perf_counter()
+        try:
+            trabajo.verificar()
+            trabajo.estado = EJECUTANDO
+            clave = self._clave_cache(trabajo)
+            resultado = self._desde_cache(trabajo, clave) if clave else None
+            if resultado is not None:
+                trabajo.desde_cache = True
+            else:
+                resultado = generar(trabajo)
+                trabajo.verificar()
+                if clave:
+                    self._guardar_cache(trabajo, clave, resultado)
+            trabajo.resultado = resultado
+            trabajo.estado = COMPLETADO
+        except Exception as e:
+            # ExportacionCancelada (export_stream) también llega aquí
+            if trabajo.cancelado_solicitado:
+                trabajo.estado = CANCELADO
+            else:
+                trabajo.estado, trabajo.error = ERROR, str(e)
+                logger.error(f"Exportación {trabajo.id} ({trabajo.tipo}) falló: {e}", exc_info=True)
+        finally:
+            trabajo.duracion_ms = round((time.perf_counter() - inicio) * 1000, 3)
+            clave_stat = {COMPLETADO: "completados", ERROR: "errores", CANCELADO: "cancelados"}.get(trabajo.estado)
+            with self._lock:
+                if clave_stat:
+                    self._stats[clave_stat] += 1
+                if trabajo.desde_cache:
+                    self._stats["cache"] += 1
+            self._registrar_fin(trabajo)
+            trabajo._fin.set()
+            logger.info(
+                f"Exportación {trabajo.id} ({trabajo.tipo}): {trabajo.estado}"
+                f"{' (cache)' if trabajo.desde_cache else ''} en {trabajo.duracion_ms:.0f} ms"
+            )
+
+    # ==================== CONSULTA Y CONTROL ====================
+
+    def obtener(self, trabajo_id: int) -> Optional[TrabajoExportacion]:
+        with self._lock:
+            return self._trabajos.get(trabajo_id)
+
+    def activos(self) -> List[TrabajoExportacion]:
+        with self._lock:
+            return [t for t in self._trabajos.values() if not t.terminado]
+
+    def cancelar(self, trabajo_id: int) -> bool:
+        trabajo = self.obtener(trabajo_id)
+        if trabajo is None or trabajo.terminado:
+            return False
+        trabajo.cancelar()
+        return True
+
+    def limpiar_terminados(self) -> int:
+        """Olvida en memoria los trabajos terminados (siguen en export_job)."""
+        with self._lock:
+            terminados = [i for i, t in self._trabajos.items() if t.terminado]
+            for i in terminados:
+                del self._trabajos[i]
+        return len(terminados)
+
+    def historial(self, limite: int = 50) -> List[Dict[str, Any]]:
+        """Últimos trabajos registrados (más reciente primero)."""
+        with get_db_connection() as conn:
+            cursor = conn.execute("SELECT * FROM export_job ORDER BY id DESC LIMIT ?", (limite,))
+            columnas = [c[0] for c in cursor.description]
+            return [dict(zip(columnas, fila)) for fila in cursor.fetchall()]
+
+    def estadisticas(self) -> Dict[str, int]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["activos"] = sum(1 for t in self._trabajos.values() if not t.terminado)
+        return stats
+
+    def cerrar(self, esperar: bool = True) -> None:
+        """Detiene el pool; sin esperar, cancela lo pendiente."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+            trabajos = list(self._trabajos.values())
+        if not esperar:
+            for trabajo in trabajos:
+                trabajo.cancelar()
+        if executor is not None:
+            executor.shutdown(wait=esperar, cancel_futures=not esperar)
+
+    # ==================== REGISTRO (export_job) ====================
+
+    def _registrar_inicio(self, tipo: str, parametros: Dict[str, Any], ruta: Optional[str]) -> int:
+        try:
+            with get_db_connection() as conn:
+                cursor = conn.execute(
+                    "INSERT INTO export_job (tipo, parametros, ruta_salida, estado) VALUES (?, ?, ?, ?)",
+                    (tipo, json.dumps(parametros, sort_keys=True, default=str), ruta, PENDIENTE),
+                )
+                conn.commit()
+                return int(cursor.lastrowid)
+        except Exception as e:
+            logger.debug(f"No se pudo registrar exportación: {e}")
+            # Sin tabla: ids negativos solo en memoria
+            return -next(self._ids_locales)
+
+    def _registrar_fin(self, trabajo: TrabajoExportacion) -> None:
+        if trabajo.id < 0:
+            return
+        try:
+            with get_db_connection() as conn:
+                conn.execute(
+                    """
+                    UPDATE export_job
+                    SET estado = ?, desde_cache = ?, filas = ?, duracion_ms = ?, error = ?,
+                        terminado = CURRENT_TIMESTAMP
+                    WHERE id = ?
+                    """,
+                    (
+                        trabajo.estado, int(trabajo.desde_cache), trabajo.hechas,
+                        trabajo.duracion_ms, trabajo.error, trabajo.id,
+                    ),
+                )
+                conn.commit()
+        except Exception as e:
+            logger.debug(f"No se pudo registrar fin de exportación {trabajo.id}: {e}")
+
+    # ==================== CACHE DE PERÍODOS CERRADOS ====================
+
+    def _clave_cache(self, trabajo: TrabajoExportacion) -> Optional[str]:
+        """Clave del artefacto si el período del trabajo está completamente cerrado."""
+        if trabajo.periodo is None:
+            return None
+        desde, hasta = trabajo.periodo
+        meses = meses_entre(desde, hasta)
+        try:
+            with get_db_connection() as conn:
+                cerrados = {
+                    (int(a), int(m)) for a, m in conn.execute(
+                        "SELECT año, mes FROM cierre_mensual WHERE estado = 'Completado'"
+                    ).fetchall()
+                }
+        except Exception as e:
+            logger.debug(f"No se pudo verificar cierres para cache de exportación: {e}")
+            return None
+        if not meses or any(m not in cerrados for m in meses):
+            return None
+        formato = Path(trabajo.ruta_salida).suffix.lower() if trabajo.ruta_salida else ""
+        firma = json.dumps(
+            [trabajo.tipo, texto_mes(desde), texto_mes(hasta), formato, trabajo.parametros],
+            sort_keys=True, default=str,
+        )
+        return hashlib.sha1(firma.encode("utf-8")).hexdigest()
+
+    def _desde_cache(self, trabajo: TrabajoExportacion, clave: str) -> Resultado:
+        """Copia el artefacto cacheado al destino; None si no hay o está incompleto."""
+        try:
+            with get_db_connection() as conn:
+                fila = conn.execute("SELECT archivos FROM export_artefacto WHERE clave = ?", (clave,)).fetchone()
+        except Exception as e:
+            logger.debug(f"No se pudo leer cache de exportación: {e}")
+            return None
+        if fila is None:
+            return None
+        archivos: Dict[str, Dict[str, str]] = json.loads(fila[0])
+        if not all(Path(a["cache"]).is_file() for a in archivos.values()):
+            return None
+
+        salida: Dict[str, str] = {}
+        for nombre, archivo in archivos.items():
+            destino = trabajo.ruta_salida if nombre == "" and trabajo.ruta_salida else archivo["destino"]
+            Path(destino).parent.mkdir(parents=True, exist_ok=True)
+            if Path(destino).resolve() != Path(archivo["cache"]).resolve():
+                shutil.copyfile(archivo["cache"], destino)
+            salida[nombre] = destino
+        try:
+            with get_db_connection() as conn:
+                conn.execute("UPDATE export_artefacto SET usos = usos + 1 WHERE clave = ?", (clave,))
+                conn.commit()
+        except Exception:
+            pass
+        return salida[""] if list(salida) == [""] else salida
+
+    def _guardar_cache(self, trabajo: TrabajoExportacion, clave: str, resultado: Resultado) -> None:
+        if resultado is None:
+            return
+        rutas = resultado if isinstance(resultado, dict) else {"": resultado}
+        archivos: Dict[str, Dict[str, str]] = {}
+        total = 0
+        try:
+            carpeta = self.dir_cache / clave
+            carpeta.mkdir(parents=True, exist_ok=True)
+            for nombre, ruta in rutas.items():
+                origen = Path(ruta)
+                copia = carpeta / origen.name
+                shutil.copyfile(origen, copia)
+                total += copia.stat().st_size
+                archivos[str(nombre)] = {"cache": str(copia), "destino": str(origen)}
+            desde, hasta = trabajo.periodo  # type: ignore[misc]
+            with get_db_connection() as conn:
+                conn.execute(
+                    """
+                    INSERT OR REPLACE INTO export_artefacto (clave, tipo, desde, hasta, archivos, bytes)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    """,
+                    (clave, trabajo.tipo, texto_mes(desde), texto_mes(hasta), json.dumps(archivos), total),
+                )
+                conn.commit()
+        except Exception as e:
+            logger.warning(f"No se pudo cachear exportación {trabajo.id}: {e}")
+
+
+def invalidar_artefactos_periodo(año: int, mes: int, dir_cache: Optional[Path] = None) -> int:
+    """
+    Borra los artefactos cacheados que cubren el mes (al revertir su cierre).
+
+    Returns:
+        Número de artefactos eliminados
+    """
+    mes_txt = texto_mes((año, mes))
+    with get_db_connection() as conn:
+        filas = conn.execute(
+            "SELECT clave FROM export_artefacto WHERE desde <= ? AND hasta >= ?",
+            (mes_txt, mes_txt),
+        ).fetchall()
+        conn.executemany("DELETE FROM export_artefacto WHERE clave = ?", [(f[0],) for f in filas])
+        conn.commit()
+    for (clave,) in filas:
+        shutil.rmtree(Path(dir_cache or directorio_cache()) / clave, ignore_errors=True)
+    if filas:
+        logger.info(f"Artefactos de exportación invalidados para {mes_txt}: {len(filas)}")
+    return len(filas)
+
+
+def seguir_en_ui(
+    widget: Any,
+    trabajo: TrabajoExportacion,
+    al_progreso: Optional[Callable[[TrabajoExportacion], None]] = None,
+    al_terminar: Optional[Callable[[TrabajoExportacion], None]] = None,
+    intervalo_ms: int = INTERVALO_UI_MS,
+) -> None:
+    """
+    Sondea el trabajo con widget.after() y llama a los callbacks en el hilo de Tk.
+
+    al_progreso se llama cuando cambia el avance; al_terminar una vez al final
+    (completado, error o cancelado). Si el widget se destruye, se deja de sondear.
+    """
+    ultimo: List[Any] = [None]
+
+    def _tick():
+        try:
+            if al_progreso is not None and (trabajo.hechas, trabajo.total, trabajo.estado) != ultimo[0]:
+                ultimo[0] = (trabajo.hechas, trabajo.total, trabajo.estado)
+                al_progreso(trabajo)
+            if trabajo.terminado:
+                if al_terminar is not None:
+                    al_terminar(trabajo)
+                return
+            widget.after(intervalo_ms, _tick)
+        except Exception as e:
+            # TclError si la ventana ya no existe
+            logger.debug(f"Seguimiento de exportación {trabajo.id} detenido: {e}")
+
+    widget.after(0, _tick)
+
+
+# Singleton
+_export_queue_instance: Optional[ColaExportaciones] = None
+
+
+def get_export_queue() -> ColaExportaciones:
+    """Obtiene la instancia singleton de la cola de exportaciones"""
+    global _export_queue_instance
+    if _export_queue_instance is None:
+        _export_queue_instance = ColaExportaciones()
+    return _export_queue_instance
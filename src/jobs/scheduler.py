@@ -0,0 +1,332 @@
+"""Planificador de jobs de analytics con marcas de agua.
+
+Ejecuta los jobs de analytics_jobs_v2 (o cualquier objeto con
+`ejecutar(empresa_id, fecha)`) procesando solo los días pendientes:
+
+- Marca de agua por (job, empresa) en analytics_job_watermark: último día
+  procesado completo. Una corrida incremental va del día siguiente a la
+  marca hasta hoy; hoy se reprocesa siempre porque el día sigue abierto.
+- Backfill de un rango [desde, hasta] (inclusive) sin tocar días fuera de él.
+- Si el job define `ejecutar_rango(empresa_id, desde, hasta)` se llama una
+  sola vez para el rango; si no, se itera día a día.
+- Cada corrida queda en analytics_job_run (modo, rango, días, filas,
+  duración, estado, error).
+- Solo se registran los jobs de JOBS_CONFIG cuyas tablas fuente ("tablas")
+  existen en la BD; los demás se omiten con el motivo en el log.
+
+Uso en proceso (hilo en segundo plano; la app lo inicia al arrancar):
+    planificador = get_analytics_scheduler()
+    planificador.iniciar(intervalo_s=3600)
+
+Uso por línea de comandos: tools/analytics_jobs.py
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from src.database.database import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+DIAS_INICIALES = 7
+INTERVALO_DEFAULT_S = 3600
+
+
+@dataclass
+class ResultadoCorrida:
+    """Resultado de ejecutar un job para una empresa y un rango de días."""
+    job: str
+    empresa_id: int
+    modo: str
+    desde: str
+    hasta: str
+    estado: str = "ok"
+    dias: int = 0
+    filas: int = 0
+    duracion_ms: float = 0.0
+    error: Optional[str] = None
+    detalle: List[Dict[str, Any]] = field(default_factory=list)
+
+
+def _fecha(valor: Any) -> date:
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    return date.fromisoformat(str(valor)[:10])
+
+
+def _dias(desde: date, hasta: date) -> Iterable[date]:
+    dia = desde
+    while dia <= hasta:
+        yield dia
+        dia += timedelta(days=1)
+
+
+def _invocar(metodo, *args) -> Dict[str, Any]:
+    """Llama al job; una excepción se trata como salida con status 'error'."""
+    try:
+        return metodo(*args) or {}
+    except Exception as e:
+        logger.error(f"Job falló con excepción: {e}", exc_info=True)
+        return {"status": "error", "mensaje": str(e)}
+
+
+def crear_jobs_default() -> Dict[str, Any]:
+    """
+    Instancia los jobs de JOBS_CONFIG con un AnalyticsService compartido.
+
+    Un job cuyas tablas fuente no existen fallaría en cada corrida (y dejaría
+    una fila de error en analytics_job_run por ciclo): se omite y se registra
+    el motivo en el log.
+    """
+    from src.infraestructura.analytics.analytics_service import AnalyticsService
+    from src.jobs.analytics_jobs_v2 import JOBS_CONFIG
+
+    with get_db_connection() as conn:
+        existentes = {fila[0] for fila in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+    servicio = AnalyticsService()
+    jobs = {}
+    for nombre, cfg in JOBS_CONFIG.items():
+        faltantes = [t for t in cfg.get("tablas", ()) if t not in existentes]
+        if faltantes:
+            logger.info(f"Job {nombre} omitido: no existen las tablas {', '.join(faltantes)}")
+            continue
+        jobs[nombre] = cfg["class"](servicio)
+    return jobs
+
+
+class AnalyticsJobScheduler:
+    """Runner de jobs de analytics con marcas de agua y registro de corridas."""
+
+    def __init__(
+        self,
+        jobs: Optional[Dict[str, Any]] = None,
+        empresas: Optional[List[int]] = None,
+        dias_iniciales: int = DIAS_INICIALES,
+    ):
+        self._jobs = jobs
+        self.empresas = empresas or [1]
+        self.dias_iniciales = dias_iniciales
+        self._lock = threading.Lock()
+        self._hilo: Optional[threading.Thread] = None
+        self._detener = threading.Event()
+
+    @property
+    def jobs(self) -> Dict[str, Any]:
+        if self._jobs is None:
+            self._jobs = crear_jobs_default()
+        return self._jobs
+
+    # ==================== MARCAS DE AGUA ====================
+
+    def obtener_marca(self, job: str, empresa_id: int) -> Optional[date]:
+        with get_db_connection() as conn:
+            row = conn.execute(
+                "SELECT ultima_fecha FROM analytics_job_watermark WHERE job = ? AND empresa_id = ?",
+                (job, empresa_id),
+            ).fetchone()
+        return _fecha(row[0]) if row else None
+
+    def _guardar_marca(self, conn, job: str, empresa_id: int, dia: date) -> None:
+        conn.execute(
+            """
+            INSERT INTO analytics_job_watermark (job, empresa_id, ultima_fecha, actualizado)
+            VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(job, empresa_id) DO UPDATE SET
+                ultima_fecha = MAX(ultima_fecha, excluded.ultima_fecha),
+                actualizado = CURRENT_TIMESTAMP
+            """,
+            (job, empresa_id, dia.isoformat()),
+        )
+
+    # ==================== EJECUCIÓN ====================
+
+    def ejecutar_pendientes(
+        self,
+        jobs: Optional[Iterable[str]] = None,
+        empresas: Optional[Iterable[int]] = None,
+        hoy: Optional[date] = None,
+    ) -> List[ResultadoCorrida]:
+        """
+        Corrida incremental: para cada job y empresa procesa los días desde
+        la marca de agua (exclusive) hasta hoy (inclusive).
+        """
+        hoy = _fecha(hoy or date.today())
+        resultados = []
+        with self._lock:
+            for nombre in self._registrados(jobs):
+                for empresa_id in empresas or self.empresas:
+                    marca = self.obtener_marca(nombre, empresa_id)
+                    if marca is None:
+                        desde = hoy - timedelta(days=self.dias_iniciales - 1)
+                    else:
+                        desde = min(marca + timedelta(days=1), hoy)
+                    resultados.append(self._correr(nombre, empresa_id, desde, hoy, "incremental", hoy))
+        return resultados
+
+    def backfill(
+        self,
+        desde: Any,
+        hasta: Any,
+        jobs: Optional[Iterable[str]] = None,
+        empresas: Optional[Iterable[int]] = None,
+        hoy: Optional[date] = None,
+    ) -> List[ResultadoCorrida]:
+        """
+        Reprocesa el rango [desde, hasta] aunque ya esté bajo la marca de
+        agua. La marca solo avanza si el rango la alcanza sin dejar huecos.
+        """
+        desde, hasta = _fecha(desde), _fecha(hasta)
+        if hasta < desde:
+            raise ValueError(f"Rango inválido: {desde} > {hasta}")
+        hoy = _fecha(hoy or date.today())
+        resultados = []
+        with self._lock:
+            for nombre in self._registrados(jobs):
+                for empresa_id in empresas or self.empresas:
+                    resultados.append(self._correr(nombre, empresa_id, desde, hasta, "backfill", hoy))
+        return resultados
+
+    def _registrados(self, jobs: Optional[Iterable[str]]) -> List[str]:
+        """Nombres pedidos que tienen job registrado (todos si no se pide ninguno)."""
+        if not jobs:
+            return list(self.jobs)
+        nombres = []
+        for nombre in jobs:
+            if nombre in self.jobs:
+                nombres.append(nombre)
+            else:
+                logger.warning(f"Job {nombre} no registrado (desconocido o sin tablas fuente), se omite")
+        return nombres
+
+    def _correr(self, nombre: str, empresa_id: int, desde: date, hasta: date, modo: str, hoy: date) -> ResultadoCorrida:
+        job = self.jobs[nombre]
+        resultado = ResultadoCorrida(nombre, empresa_id, modo, desde.isoformat(), hasta.isoformat())
+        inicio = time.perf_counter()
+        ultimo_ok: Optional[date] = None
+
+        if hasattr(job, "ejecutar_rango"):
+            salida = _invocar(job.ejecutar_rango, empresa_id, desde.isoformat(), hasta.isoformat())
+            resultado.detalle.append(salida)
+            if salida.get("status") == "error":
+                resultado.estado, resultado.error = "error", salida.get("mensaje")
+            else:
+                resultado.dias = (hasta - desde).days + 1
+                resultado.filas = int(salida.get("filas", resultado.dias))
+                ultimo_ok = hasta
+        else:
+            for dia in _dias(desde, hasta):
+                salida = _invocar(job.ejecutar, empresa_id, dia.isoformat())
+                resultado.detalle.append(salida)
+                if salida.get("status") == "error":
+                    # Se detiene en el primer día fallido: la marca queda en el último día bueno
+                    resultado.estado, resultado.error = "error", f"{dia}: {salida.get('mensaje')}"
+                    break
+                resultado.dias += 1
+                resultado.filas += int(salida.get("filas", 1))
+                ultimo_ok = dia
+
+        resultado.duracion_ms = round((time.perf_counter() - inicio) * 1000, 3)
+        self._registrar(resultado, ultimo_ok, hoy)
+
+        nivel = logging.INFO if resultado.estado == "ok" else logging.WARNING
+        logger.log(
+            nivel,
+            f"Job {nombre} empresa={empresa_id} {modo} {resultado.desde}..{resultado.hasta}: "
+            f"{resultado.estado} dias={resultado.dias} filas={resultado.filas} "
+            f"({resultado.duracion_ms:.0f} ms)",
+        )
+        return resultado
+
+    def _registrar(self, resultado: ResultadoCorrida, ultimo_ok: Optional[date], hoy: date) -> None:
+        """Guarda la corrida en el registro y avanza la marca de agua."""
+        try:
+            with get_db_connection() as conn:
+                conn.execute(
+                    """
+                    INSERT INTO analytics_job_run
+                    (job, empresa_id, modo, desde, hasta, estado, dias, filas, duracion_ms, error)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    (
+                        resultado.job, resultado.empresa_id, resultado.modo, resultado.desde,
+                        resultado.hasta, resultado.estado, resultado.dias, resultado.filas,
+                        resultado.duracion_ms, resultado.error,
+                    ),
+                )
+                if ultimo_ok is not None:
+                    # El día de hoy sigue abierto: la marca nunca pasa de ayer
+                    nueva = min(ultimo_ok, hoy - timedelta(days=1))
+                    marca = conn.execute(
+                        "SELECT ultima_fecha FROM analytics_job_watermark WHERE job = ? AND empresa_id = ?",
+                        (resultado.job, resultado.empresa_id),
+                    ).fetchone()
+                    contiguo = (
+                        resultado.modo == "incremental"
+                        or marca is None
+                        or _fecha(resultado.desde) <= _fecha(marca[0]) + timedelta(days=1)
+                    )
+                    if contiguo and nueva >= _fecha(resultado.desde):
+                        self._guardar_marca(conn, resultado.job, resultado.empresa_id, nueva)
+                conn.commit()
+        except Exception as e:
+            logger.error(f"Error registrando corrida de {resultado.job}: {e}")
+
+    def historial(self, job: Optional[str] = None, limite: int = 50) -> List[Dict[str, Any]]:
+        """Últimas corridas registradas (más reciente primero)."""
+        sql = "SELECT * FROM analytics_job_run"
+        params: tuple = ()
+        if job:
+            sql += " WHERE job = ?"
+            params = (job,)
+        sql += " ORDER BY id DESC LIMIT ?"
+        with get_db_connection() as conn:
+            cursor = conn.execute(sql, params + (limite,))
+            columnas = [c[0] for c in cursor.description]
+            return [dict(zip(columnas, fila)) for fila in cursor.fetchall()]
+
+    # ==================== HILO EN SEGUNDO PLANO ====================
+
+    def iniciar(self, intervalo_s: float = INTERVALO_DEFAULT_S) -> None:
+        """Lanza un hilo daemon que ejecuta las corridas incrementales cada intervalo_s."""
+        if self._hilo is not None and self._hilo.is_alive():
+            return
+        self._detener.clear()
+
+        def _bucle():
+            while not self._detener.is_set():
+                try:
+                    self.ejecutar_pendientes()
+                except Exception as e:
+                    logger.error(f"Error en corrida programada de analytics: {e}", exc_info=True)
+                self._detener.wait(intervalo_s)
+
+        self._hilo = threading.Thread(target=_bucle, name="analytics-scheduler", daemon=True)
+        self._hilo.start()
+        logger.info(f"Planificador de analytics iniciado (cada {intervalo_s:.0f}s)")
+
+    def detener(self, timeout: Optional[float] = 5.0) -> None:
+        self._detener.set()
+        if self._hilo is not None:
+            self._hilo.join(timeout)
+            self._hilo = None
+
+
+# Singleton
+_scheduler_instance: Optional[AnalyticsJobScheduler] = None
+
+
+def get_analytics_scheduler() -> AnalyticsJobScheduler:
+    """Obtiene la instancia singleton del planificador de analytics"""
+    global _scheduler_instance
+    if _scheduler_instance is None:
+        _scheduler_instance = AnalyticsJobScheduler()
+    return _scheduler_instance
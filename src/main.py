@@ -69,24 +69,17 @@ try:
     config = config_module.config
     print("DEBUG: OK - Config (pre)")
     
-    print("DEBUG: Importando DashboardModule...")
-    from modules.dashboard.dashboard_main import DashboardModule
-    print("DEBUG: OK - DashboardModule")
-    
-    print("DEBUG: Importando AjustesFrame...")
-    from modules.ajustes.ajustes_main import AjustesFrame
-    print("DEBUG: OK - AjustesFrame")
-    
-    print("DEBUG: Importando VentasModule...")
-    from modules.ventas.ventas_main import VentasModule
-    print("DEBUG: OK - VentasModule")
+    # Los módulos de pantalla (dashboard, ajustes, ventas, ...) y sus
+    # dependencias pesadas (matplotlib, openpyxl, reportlab) se importan en
+    # show_screen() al abrirlos por primera vez, no antes del login.
+    # Presupuesto de arranque: test_presupuesto_arranque.py
     
     print("DEBUG: Importando logger...")
     from modules.utils.logger import setup_logger, get_logger
     print("DEBUG: OK - Logger")
     
     print("DEBUG: Importando database...")
-    from database import inicializar_base_datos, verificar_base_datos, asegurar_esquema_minimo, asegurar_esquema_completo
+    from database import inicializar_base_datos, verificar_base_datos, asegurar_esquema, esquema_actualizado
     print("DEBUG: OK - Database")
     
 except ImportError as e:
@@ -107,6 +100,7 @@ class FincaFacilApp(ctk.CTk):
         super().__init__()
 
         self.title("FincaFácil 🐄 - Gestión Ganadera Profesional")
+        self._cerrando = False  # on_closing ignora clics repetidos mientras termina el backup
         
         # Configurar tema ANTES de geometry/state
         ctk.set_appearance_mode("light")
@@ -196,6 +190,9 @@ class FincaFacilApp(ctk.CTk):
         # Verificar si es el primer uso y mostrar tour
         self.after(1000, self.verificar_primer_uso)
 
+        # Jobs de analytics con marcas de agua (hilo en segundo plano)
+        self.after(5000, self.iniciar_jobs_analytics)
+
         # Crear menú principal
         self.crear_menu_principal()
 
@@ -222,6 +219,15 @@ class FincaFacilApp(ctk.CTk):
             if self.logger:
                 self.logger.warning(f"Error verificando manual PDF: {e}")
     
+    def iniciar_jobs_analytics(self):
+        """Inicia el planificador de jobs de analytics (corrida incremental cada hora en un hilo)."""
+        try:
+            from src.jobs.scheduler import get_analytics_scheduler
+            get_analytics_scheduler().iniciar()
+        except Exception as e:
+            if self.logger:
+                self.logger.warning(f"No se pudo iniciar el planificador de analytics: {e}")
+
     def verificar_primer_uso(self):
         """Verifica si es la primera vez usando el sistema e inicia el tour global"""
         try:
@@ -483,12 +489,15 @@ class FincaFacilApp(ctk.CTk):
         try:
             # Crea el nuevo módulo según la opción elegida
             if name == "dashboard":
+                from modules.dashboard.dashboard_main import DashboardModule
                 self.current_module = DashboardModule(self.main_frame)
 
             elif name == "ajustes":
+                from modules.ajustes.ajustes_main import AjustesFrame
                 self.current_module = AjustesFrame(self.main_frame)
 
             elif name == "ventas":
+                from modules.ventas.ventas_main import VentasModule
                 self.current_module = VentasModule(self.main_frame)
 
             # --- Módulos modernizados ---
@@ -603,6 +612,9 @@ class FincaFacilApp(ctk.CTk):
 
     def on_closing(self):
         """Maneja el cierre de la aplicación con backup automático"""
+        if self._cerrando:
+            return  # Cierre ya en curso (p. ej. esperando el backup)
+        self._cerrando = True
         try:
             # Verificar si es necesario hacer backup automático
             if self._necesita_backup_automatico():
@@ -613,9 +625,16 @@ class FincaFacilApp(ctk.CTk):
                     icon='question'
                 )
                 
-                if respuesta:
-                    self._hacer_backup_automatico()
-            
+                if respuesta and self._hacer_backup_automatico(al_terminar=self._finalizar_cierre):
+                    return  # El cierre continúa cuando termine el backup
+        except Exception as e:
+            if self.logger:
+                self.logger.error(f"Error en cierre de aplicación: {e}")
+        self._finalizar_cierre()
+
+    def _finalizar_cierre(self):
+        """Cancela callbacks pendientes y destruye la ventana"""
+        try:
             if self.logger:
                 self.logger.info("Aplicación cerrada por el usuario")
             
@@ -646,69 +665,82 @@ class FincaFacilApp(ctk.CTk):
     def _necesita_backup_automatico(self):
         """Verifica si han pasado más de 24 horas desde el último backup"""
         try:
-            from pathlib import Path
             from datetime import datetime, timedelta
+            from src.core.backup_engine import get_backup_engine
             
             backup_dir = config.BACKUP_DIR
             if not backup_dir.exists():
                 return True  # Si no hay carpeta de backup, crear uno
             
-            # Buscar el backup más reciente
-            backups = list(backup_dir.glob("*.db"))
-            if not backups:
+            # Último backup: manifiestos incrementales o copias .db antiguas
+            fechas = [datetime.fromtimestamp(p.stat().st_mtime) for p in backup_dir.glob("*.db")]
+            ultimo_incremental = get_backup_engine(backup_dir).ultimo_backup()
+            if ultimo_incremental:
+                fechas.append(ultimo_incremental)
+            if not fechas:
                 return True  # No hay backups
             
-            ultimo_backup = max(backups, key=lambda p: p.stat().st_mtime)
-            tiempo_ultimo = datetime.fromtimestamp(ultimo_backup.stat().st_mtime)
-            tiempo_actual = datetime.now()
-            
             # Retornar True si han pasado más de 24 horas
-            return (tiempo_actual - tiempo_ultimo) > timedelta(hours=24)
+            return (datetime.now() - max(fechas)) > timedelta(hours=24)
             
         except Exception as e:
             if self.logger:
                 self.logger.warning(f"Error verificando backup automático: {e}")
             return False  # En caso de error, no forzar backup
     
-    def _hacer_backup_automatico(self):
-        """Crea un backup automático de la base de datos"""
+    def _hacer_backup_automatico(self, al_terminar=None):
+        """Lanza un backup incremental en segundo plano con ventana de progreso.
+
+        Retorna True si el backup quedó en curso; al_terminar() se llama
+        desde el hilo de la UI cuando finaliza (con éxito o error).
+        """
         try:
-            import shutil
-            from pathlib import Path
-            from datetime import datetime
-            
-            # Rutas
-            from database.database import get_db_path_safe
-            db_path = get_db_path_safe()
-            if not db_path.exists():
-                return
-            
-            backup_dir = config.BACKUP_DIR
-            backup_dir.mkdir(exist_ok=True, parents=True)
-            
-            # Nombre del backup
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            backup_name = f"fincafacil_auto_{timestamp}.db"
-            backup_path = backup_dir / backup_name
-            
-            # Copiar base de datos
-            shutil.copy2(db_path, backup_path)
-            
-            if self.logger:
-                self.logger.info(f"Backup automático creado: {backup_name}")
-            
-            messagebox.showinfo(
-                "Backup Creado",
-                f"✅ Backup automático creado exitosamente:\n{backup_name}"
-            )
+            from src.core.backup_engine import RETENCION_POR_DEFECTO, get_backup_engine
             
+            motor = get_backup_engine(config.BACKUP_DIR)
+            if not motor.db_path.exists():
+                return False
+            tarea = motor.crear_backup_async("auto", retencion=RETENCION_POR_DEFECTO)
         except Exception as e:
             if self.logger:
                 self.logger.error(f"Error creando backup automático: {e}")
-            messagebox.showwarning(
-                "Advertencia",
-                f"No se pudo crear el backup automático:\n{e}"
-            )
+            messagebox.showwarning("Advertencia", f"No se pudo crear el backup automático:\n{e}")
+            return False
+        
+        ventana = ctk.CTkToplevel(self)
+        ventana.title("Backup")
+        ventana.geometry("360x110")
+        ventana.transient(self)
+        ctk.CTkLabel(ventana, text="💾 Creando backup de seguridad...").pack(pady=(15, 8))
+        barra = ctk.CTkProgressBar(ventana, width=300)
+        barra.pack(pady=5)
+        barra.set(0)
+        
+        def _consultar():
+            if not tarea.terminado.is_set():
+                barra.set(tarea.fraccion)
+                self.after(100, _consultar)
+                return
+            ventana.destroy()
+            if tarea.error is None:
+                if self.logger:
+                    self.logger.info(f"Backup automático creado: {tarea.resultado.name}")
+                messagebox.showinfo(
+                    "Backup Creado",
+                    f"✅ Backup automático creado exitosamente:\n{tarea.resultado.name}"
+                )
+            else:
+                if self.logger:
+                    self.logger.error(f"Error creando backup automático: {tarea.error}")
+                messagebox.showwarning(
+                    "Advertencia",
+                    f"No se pudo crear el backup automático:\n{tarea.error}"
+                )
+            if al_terminar:
+                al_terminar()
+        
+        self.after(100, _consultar)
+        return True
 
     def crear_menu_principal(self):
         """Crea el menú principal de la aplicación"""
@@ -750,7 +782,13 @@ def inicializar_sistema():
     logger = get_logger("Inicializacion")
     
     try:
-        # 1. Verificar base de datos
+        # 1. Arranque en caliente: una sola lectura de PRAGMA user_version
+        if esquema_actualizado():
+            logger.info("Base de datos verificada (esquema al día)")
+            logger.info("✅ Sistema inicializado correctamente")
+            return True
+
+        # 1.1. Verificar base de datos
         logger.info("Verificando estado de la base de datos...")
         if not verificar_base_datos():
             logger.info("Inicializando base de datos...")
@@ -761,16 +799,9 @@ def inicializar_sistema():
         else:
             logger.info("Base de datos verificada correctamente")
 
-        # 1.1. Asegurar esquema mínimo para compatibilidad con BD antiguas
-        try:
-            asegurar_esquema_minimo()
-        except Exception as mig_e:
-            logger.warning(f"No se pudo asegurar esquema mínimo: {mig_e}")
-        # 1.2. Asegurar esquema completo (migración ligera: columnas claves como id_sector)
-        try:
-            asegurar_esquema_completo()
-        except Exception as mig_e2:
-            logger.warning(f"No se pudo asegurar esquema completo: {mig_e2}")
+        # 1.2. Aplicar migraciones pendientes (esquema mínimo, columnas, auditoría)
+        if not asegurar_esquema():
+            logger.warning("Quedaron migraciones de esquema pendientes; se reintentarán en el próximo arranque")
         
         logger.info("✅ Sistema inicializado correctamente")
         return True
@@ -607,43 +607,69 @@ class AjustesFrame(ctk.CTkFrame):
     # Métodos duplicados eliminados: _load_preferences / _save_preferences
 
     def hacer_backup_manual(self):
-        """Crea una copia de seguridad de la base de datos"""
-        import shutil
+        """Crea una copia de seguridad incremental en segundo plano"""
         try:
-            # Ruta de la BD actual
-            from database.database import get_db_path_safe
-            db_path = get_db_path_safe()
-            if not db_path.exists():
+            from src.core.backup_engine import get_backup_engine
+            motor = get_backup_engine(Path(app_config.BACKUP_DIR))
+            if not motor.db_path.exists():
                 messagebox.showerror("Error", "No se encontró la base de datos")
                 return
-            
-            # Carpeta de backup
-            backup_dir = Path("backup")
-            backup_dir.mkdir(exist_ok=True)
-            
-            # Nombre con timestamp
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            backup_name = f"fincafacil_backup_{timestamp}.db"
-            backup_path = backup_dir / backup_name
-            
-            # Copiar BD
-            shutil.copy2(db_path, backup_path)
-            
-            messagebox.showinfo("Éxito", f"✅ Backup creado:\n{backup_name}")
-            self.logger.info(f"Backup creado: {backup_path}")
+            tarea = motor.crear_backup_async("manual")
         except Exception as e:
             messagebox.showerror("Error", f"No se pudo crear backup:\n{e}")
             self.logger.error(f"Error en backup: {e}")
+            return
+        
+        # Progreso consultado desde el hilo de la UI
+        ventana = ctk.CTkToplevel(self)
+        ventana.title("Backup")
+        ventana.geometry("360x110")
+        ctk.CTkLabel(ventana, text="💾 Creando backup...").pack(pady=(15, 8))
+        barra = ctk.CTkProgressBar(ventana, width=300)
+        barra.pack(pady=5)
+        barra.set(0)
+        
+        def _consultar():
+            if not tarea.terminado.is_set():
+                barra.set(tarea.fraccion)
+                self.after(100, _consultar)
+                return
+            ventana.destroy()
+            if tarea.error is None:
+                messagebox.showinfo("Éxito", f"✅ Backup creado:\n{tarea.resultado.name}")
+                self.logger.info(f"Backup creado: {tarea.resultado}")
+            else:
+                messagebox.showerror("Error", f"No se pudo crear backup:\n{tarea.error}")
+                self.logger.error(f"Error en backup: {tarea.error}")
+        
+        self.after(100, _consultar)
+
+    def _listar_backups(self, backup_dir: Path):
+        """Backups disponibles (manifiestos incrementales y copias .db antiguas)
+        como tuplas (ruta, fecha, tamaño en bytes), del más reciente al más antiguo"""
+        from src.core.backup_engine import get_backup_engine
+        motor = get_backup_engine(backup_dir)
+        filas = []
+        for manifiesto in motor.listar_backups():
+            try:
+                tamano = motor.leer_manifiesto(manifiesto).get("tamano", 0)
+            except Exception:
+                continue
+            filas.append((manifiesto, manifiesto.stat().st_mtime, tamano))
+        for copia in backup_dir.glob("*.db"):
+            stat = copia.stat()
+            filas.append((copia, stat.st_mtime, stat.st_size))
+        return sorted(filas, key=lambda f: f[1], reverse=True)
 
     def ver_backups(self):
         """Muestra lista de backups disponibles"""
         try:
-            backup_dir = Path("backup")
+            backup_dir = Path(app_config.BACKUP_DIR)
             if not backup_dir.exists():
                 messagebox.showinfo("Info", "No hay backups disponibles")
                 return
             
-            backups = sorted(backup_dir.glob("*.db"), key=lambda p: p.stat().st_mtime, reverse=True)
+            backups = self._listar_backups(backup_dir)
             
             if not backups:
                 messagebox.showinfo("Info", "No hay backups disponibles")
@@ -667,10 +693,9 @@ class AjustesFrame(ctk.CTkFrame):
             # Compactar ancho (padx 20→4)
             tabla.pack(fill="both", expand=True, padx=4, pady=10)
             
-            for backup in backups:
-                stat = backup.stat()
-                fecha = datetime.fromtimestamp(stat.st_mtime).strftime("%Y-%m-%d %H:%M:%S")
-                tamaño = f"{stat.st_size / 1024:.1f} KB"
+            for backup, mtime, tamano in backups:
+                fecha = datetime.fromtimestamp(mtime).strftime("%Y-%m-%d %H:%M:%S")
+                tamaño = f"{tamano / 1024:.1f} KB"
                 tabla.insert("", "end", values=(backup.name, fecha, tamaño))
             
             ctk.CTkButton(ventana, text="Cerrar", command=ventana.destroy).pack(pady=10)
@@ -681,7 +706,7 @@ class AjustesFrame(ctk.CTkFrame):
         """Restaura la BD desde un backup seleccionado"""
         import shutil
         try:
-            backup_dir = Path("backup")
+            backup_dir = Path(app_config.BACKUP_DIR)
             if not backup_dir.exists():
                 messagebox.showwarning("Atención", "No hay backups disponibles")
                 return
@@ -690,7 +715,8 @@ class AjustesFrame(ctk.CTkFrame):
             archivo = filedialog.askopenfilename(
                 title="Seleccionar Backup",
                 initialdir=backup_dir,
-                filetypes=[("Base de datos", "*.db"), ("Todos", "*.*")]
+                filetypes=[("Backups", "*.json *.db"), ("Manifiesto incremental", "*.json"),
+                           ("Base de datos", "*.db"), ("Todos", "*.*")]
             )
             
             if not archivo:
@@ -704,15 +730,21 @@ class AjustesFrame(ctk.CTkFrame):
                                       "¿Desea continuar?"):
                 return
             
-            # Backup de seguridad de la BD actual
-            from database.database import get_db_path_safe
-            db_path = get_db_path_safe()
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            safety_backup = backup_dir / f"fincafacil_pre_restauracion_{timestamp}.db"
-            shutil.copy2(db_path, safety_backup)
+            # Backup de seguridad de la BD actual (en caliente, incremental)
+            from src.core.backup_engine import get_backup_engine
+            motor = get_backup_engine(backup_dir)
+            db_path = motor.db_path
+            safety_backup = motor.crear_backup("pre_restauracion")
             
-            # Restaurar
-            shutil.copy2(archivo, db_path)
+            # Restaurar (liberar conexiones agrupadas antes de reemplazar el archivo)
+            from database.database import cerrar_conexiones
+            cerrar_conexiones()
+            if archivo.lower().endswith(".json"):
+                motor.restaurar(archivo)
+            else:
+                for sufijo in ("-wal", "-shm"):
+                    Path(f"{db_path}{sufijo}").unlink(missing_ok=True)
+                shutil.copy2(archivo, db_path)
             
             messagebox.showinfo("Éxito", 
                               "✅ Base de datos restaurada\n\n"
@@ -1,6 +1,7 @@
 import customtkinter as ctk
 from tkinter import ttk, messagebox
 from datetime import datetime
+import logging
 import sys
 import os
 import sqlite3
@@ -11,6 +12,8 @@ from modules.utils.units_helper import units_helper
 from modules.utils.animal_format import build_animal_info_text
 from modules.utils.db_logging import safe_execute
 
+logger = logging.getLogger(__name__)
+
 def build_meta_note(event_type, resumen, metadata=None):
     """Construye una nota con metadatos (interfaz unificada)."""
     try:
@@ -444,6 +447,13 @@ class ActualizacionInventarioFrame(ctk.CTkFrame):
 
             total = l_m + l_t + l_n
             messagebox.showinfo("Éxito", f"Producción registrada ({fecha}): {units_helper.format_volume(total, decimal_places=1)}")
+            try:
+                from src.services.milk_stream_detector import get_milk_stream_detector
+                alerta = get_milk_stream_detector().registrar(self.animal_actual['id'], fecha, total)
+                if alerta:
+                    messagebox.showwarning("Alerta de producción", alerta["descripcion"])
+            except Exception as e:
+                logger.warning(f"Detector de leche no disponible: {e}")
         except Exception as e:
             messagebox.showerror("Error", f"No se pudo registrar la leche:\n{e}")
 
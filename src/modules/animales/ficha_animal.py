@@ -1,5 +1,6 @@
 import customtkinter as ctk
 from tkinter import ttk, messagebox
+import logging
 import sqlite3
 from datetime import datetime
 from pathlib import Path
@@ -12,6 +13,8 @@ try:
 except Exception:
     Image = None
 
+logger = logging.getLogger(__name__)
+
 
 class FichaAnimalFrame(ctk.CTkFrame):
     def __init__(self, master, on_animal_selected=None):
@@ -840,41 +843,58 @@ class FichaAnimalFrame(ctk.CTkFrame):
             messagebox.showinfo("Exportar", "Busque un animal primero")
             return
         try:
-            try:
-                from reportlab.lib.pagesizes import A4
-                from reportlab.pdfgen import canvas
-                from reportlab.lib.units import cm
-                import tempfile
-                import os
-                tmp = Path(tempfile.gettempdir()) / f"ficha_{self.animal_actual['codigo']}.pdf"
+            import tempfile
+            from modules.utils.progreso_exportacion import exportar_en_segundo_plano
+
+            # Los widgets solo se leen en el hilo de Tk; el archivo se genera en la cola
+            codigo = self.animal_actual.get('codigo', '')
+            info_text = self.info_general_label.cget('text')
+
+            def generar(trabajo):
+                try:
+                    from reportlab.lib.pagesizes import A4
+                    from reportlab.pdfgen import canvas
+                    from reportlab.lib.units import cm
+                except ImportError:
+                    # Fallback a HTML simple
+                    tmp = Path(tempfile.gettempdir()) / f"ficha_{codigo}.html"
+                    html = "<html><head><meta charset='utf-8'><title>Ficha</title></head><body>" + \
+                           f"<h2>Ficha del Animal - {codigo}</h2>" + \
+                           "<pre>" + info_text + "</pre>" + \
+                           "</body></html>"
+                    tmp.write_text(html, encoding='utf-8')
+                    return str(tmp)
+                tmp = Path(tempfile.gettempdir()) / f"ficha_{codigo}.pdf"
                 c = canvas.Canvas(str(tmp), pagesize=A4)
                 w, h = A4
                 y = h - 2*cm
                 c.setFont("Helvetica-Bold", 14)
-                c.drawString(2*cm, y, f"Ficha del Animal - {self.animal_actual.get('codigo','')} ")
+                c.drawString(2*cm, y, f"Ficha del Animal - {codigo} ")
                 y -= 1*cm
                 c.setFont("Helvetica", 10)
-                info_text = self.info_general_label.cget('text').split('\n')
-                for line in info_text:
+                lineas = info_text.split('\n')
+                for n, line in enumerate(lineas, start=1):
+                    trabajo.verificar()
                     if y < 2*cm:
                         c.showPage(); y = h - 2*cm
                     c.drawString(2*cm, y, line)
                     y -= 0.6*cm
+                    trabajo.avanzar(n, len(lineas))
                 c.showPage()
                 c.save()
-                messagebox.showinfo("Exportar", f"PDF generado: {tmp}")
-                os.startfile(str(tmp))
-            except Exception:
-                # Fallback a HTML simple
-                import tempfile, os
-                tmp = Path(tempfile.gettempdir()) / f"ficha_{self.animal_actual['codigo']}.html"
-                html = "<html><head><meta charset='utf-8'><title>Ficha</title></head><body>" + \
-                       f"<h2>Ficha del Animal - {self.animal_actual.get('codigo','')}</h2>" + \
-                       "<pre>" + self.info_general_label.cget('text') + "</pre>" + \
-                       "</body></html>"
-                tmp.write_text(html, encoding='utf-8')
-                messagebox.showinfo("Exportar", f"HTML generado: {tmp}")
-                os.startfile(str(tmp))
+                return str(tmp)
+
+            def al_completar(trabajo):
+                import os
+                tipo = "PDF" if trabajo.resultado.endswith('.pdf') else "HTML"
+                messagebox.showinfo("Exportar", f"{tipo} generado: {trabajo.resultado}")
+                try:
+                    os.startfile(trabajo.resultado)
+                except Exception as e:
+                    logger.warning(f"No se pudo abrir {trabajo.resultado}: {e}")
+
+            exportar_en_segundo_plano(self, "ficha_animal", generar, titulo="Exportando ficha",
+                                      al_completar=al_completar)
         except Exception as e:
             messagebox.showerror("Exportar", f"No se pudo exportar: {e}")
 
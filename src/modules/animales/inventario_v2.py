@@ -13,6 +13,8 @@ try:
     from database import get_db_connection
 except Exception:
     from database.database import get_db_connection
+from database.consulta_paginada import FuentePaginada
+from modules.utils.tabla_virtual import TablaVirtual
 
 # ==================== HELPERS SQL ====================
 
@@ -63,100 +65,123 @@ def get_lotes_por_finca(finca_id: int) -> List[Tuple[int, str]]:
         print(f"Error get_lotes_por_finca: {e}")
         return []
 
-def buscar_animales(filters: Dict[str, Any], search_query: str = "") -> List[Dict[str, Any]]:
-    """Busca animales con filtros y texto de búsqueda"""
-    try:
+# Columna de la grilla -> columna de consulta_animales() por la que se puede ordenar
+COLUMNAS_ORDEN_INVENTARIO = {
+    "codigo": "codigo",
+    "nombre": "nombre",
+    "categoria": "categoria",
+    "finca": "finca",
+    "sector": "sector",
+    "lote": "lote",
+    "potrero": "potrero",
+    "peso": "ultimo_peso",
+    "inventariado": "inventariado",
+    "estado": "estado",
+    "fecha_peso": "fecha_ultimo_peso",
+}
+
+def consulta_animales(filters: Dict[str, Any], search_query: str = "", cur=None) -> Tuple[str, List[Any]]:
+    """Arma el SELECT (sin ORDER BY) y los parámetros del inventario con filtros y búsqueda"""
+    if cur is None:
         with get_db_connection() as conn:
-            cur = conn.cursor()
-
-            # Detectar columnas
-            cur.execute("PRAGMA table_info(animal)")
-            cols = [r[1] for r in cur.fetchall()]
-            has_hierro = 'hierro' in cols
-            finca_col = 'finca_id' if 'finca_id' in cols else 'id_finca'
-            sector_col = 'sector_id' if 'sector_id' in cols else 'id_sector'
-            potrero_col = 'potrero_id' if 'potrero_id' in cols else 'id_potrero'
-
-            # Diagnóstico: columnas detectadas
-            try:
-                print(f"[InventarioV2] Columnas detectadas -> finca:{finca_col}, sector:{sector_col}, potrero:{potrero_col}, hierro:{has_hierro}")
-            except Exception:
-                pass
-
-            where = []
-            params = []
-
-            if filters.get('finca_id'):
-                where.append(f"a.{finca_col} = ?")
-                params.append(filters['finca_id'])
+            return consulta_animales(filters, search_query, conn.cursor())
 
-            if filters.get('sector_id'):
-                where.append(f"a.{sector_col} = ?")
-                params.append(filters['sector_id'])
+    # Detectar columnas
+    cur.execute("PRAGMA table_info(animal)")
+    cols = [r[1] for r in cur.fetchall()]
+    has_hierro = 'hierro' in cols
+    finca_col = 'finca_id' if 'finca_id' in cols else 'id_finca'
+    sector_col = 'sector_id' if 'sector_id' in cols else 'id_sector'
+    potrero_col = 'potrero_id' if 'potrero_id' in cols else 'id_potrero'
 
-            if filters.get('lote_id'):
-                where.append("a.lote_id = ?")
-                params.append(filters['lote_id'])
+    # Diagnóstico: columnas detectadas
+    try:
+        print(f"[InventarioV2] Columnas detectadas -> finca:{finca_col}, sector:{sector_col}, potrero:{potrero_col}, hierro:{has_hierro}")
+    except Exception:
+        pass
+
+    where = []
+    params = []
+
+    if filters.get('finca_id'):
+        where.append(f"a.{finca_col} = ?")
+        params.append(filters['finca_id'])
+
+    if filters.get('sector_id'):
+        where.append(f"a.{sector_col} = ?")
+        params.append(filters['sector_id'])
+
+    if filters.get('lote_id'):
+        where.append("a.lote_id = ?")
+        params.append(filters['lote_id'])
+
+    if filters.get('potrero_id'):
+        where.append(f"a.{potrero_col} = ?")
+        params.append(filters['potrero_id'])
+
+    if filters.get('categoria'):
+        where.append("COALESCE(a.categoria, 'Sin categoría') = ?")
+        params.append(filters['categoria'])
+
+    if search_query:
+        like_val = f"%{search_query}%"
+        if has_hierro:
+            where.append("(a.nombre LIKE ? OR a.codigo LIKE ? OR a.hierro LIKE ?)")
+            params.extend([like_val, like_val, like_val])
+        else:
+            where.append("(a.nombre LIKE ? OR a.codigo LIKE ?)")
+            params.extend([like_val, like_val])
+
+    # Detectar columnas opcionales de peso y fechas
+    has_peso_nac = 'peso_nacimiento' in cols
+    has_peso_comp = 'peso_compra' in cols
+    has_fecha_up = 'fecha_ultimo_peso' in cols
+
+    sql = f"""
+        SELECT 
+            a.id,
+            a.codigo,
+            a.nombre,
+            a.sexo,
+            a.fecha_nacimiento,
+            COALESCE(a.categoria, 'Sin categoría') AS categoria,
+            f.nombre AS finca,
+            s.nombre AS sector,
+            l.nombre AS lote,
+            p.nombre AS potrero,
+            COALESCE(a.ultimo_peso, 0) AS ultimo_peso,
+            { 'a.peso_nacimiento,' if has_peso_nac else 'NULL AS peso_nacimiento,' }
+            { 'a.peso_compra,' if has_peso_comp else 'NULL AS peso_compra,' }
+            { 'a.fecha_ultimo_peso,' if has_fecha_up else 'NULL AS fecha_ultimo_peso,' }
+            a.inventariado,
+            a.foto_path,
+            CASE WHEN a.inventariado = 1 THEN 'Inventariado' ELSE 'No inventariado' END AS estado
+        FROM animal a
+        LEFT JOIN finca f ON a.{finca_col} = f.id
+        LEFT JOIN sector s ON a.{sector_col} = s.id
+        LEFT JOIN lote l ON a.lote_id = l.id
+        LEFT JOIN potrero p ON a.{potrero_col} = p.id
+    """
 
-            if filters.get('potrero_id'):
-                where.append(f"a.{potrero_col} = ?")
-                params.append(filters['potrero_id'])
+    if where:
+        sql += " WHERE " + " AND ".join(where)
 
-            if filters.get('categoria'):
-                where.append("COALESCE(a.categoria, 'Sin categoría') = ?")
-                params.append(filters['categoria'])
+    # Diagnóstico: preview del WHERE y parámetros
+    try:
+        print(f"[InventarioV2] WHERE parts: {len(where)} | Params: {params}")
+    except Exception:
+        pass
 
-            if search_query:
-                like_val = f"%{search_query}%"
-                if has_hierro:
-                    where.append("(a.nombre LIKE ? OR a.codigo LIKE ? OR a.hierro LIKE ?)")
-                    params.extend([like_val, like_val, like_val])
-                else:
-                    where.append("(a.nombre LIKE ? OR a.codigo LIKE ?)")
-                    params.extend([like_val, like_val])
-
-            # Detectar columnas opcionales de peso y fechas
-            has_peso_nac = 'peso_nacimiento' in cols
-            has_peso_comp = 'peso_compra' in cols
-            has_fecha_up = 'fecha_ultimo_peso' in cols
-
-            sql = f"""
-                SELECT 
-                    a.id,
-                    a.codigo,
-                    a.nombre,
-                    a.sexo,
-                    a.fecha_nacimiento,
-                    COALESCE(a.categoria, 'Sin categoría') AS categoria,
-                    f.nombre AS finca,
-                    s.nombre AS sector,
-                    l.nombre AS lote,
-                    p.nombre AS potrero,
-                    COALESCE(a.ultimo_peso, 0) AS ultimo_peso,
-                    { 'a.peso_nacimiento,' if has_peso_nac else 'NULL AS peso_nacimiento,' }
-                    { 'a.peso_compra,' if has_peso_comp else 'NULL AS peso_compra,' }
-                    { 'a.fecha_ultimo_peso,' if has_fecha_up else 'NULL AS fecha_ultimo_peso,' }
-                    a.inventariado,
-                    a.foto_path,
-                    CASE WHEN a.inventariado = 1 THEN 'Inventariado' ELSE 'No inventariado' END AS estado
-                FROM animal a
-                LEFT JOIN finca f ON a.{finca_col} = f.id
-                LEFT JOIN sector s ON a.{sector_col} = s.id
-                LEFT JOIN lote l ON a.lote_id = l.id
-                LEFT JOIN potrero p ON a.{potrero_col} = p.id
-            """
-
-            if where:
-                sql += " WHERE " + " AND ".join(where)
+    return sql, params
 
+def buscar_animales(filters: Dict[str, Any], search_query: str = "") -> List[Dict[str, Any]]:
+    """Busca animales con filtros y texto de búsqueda (lista completa, ordenada por código)"""
+    try:
+        with get_db_connection() as conn:
+            cur = conn.cursor()
+            sql, params = consulta_animales(filters, search_query, cur)
             sql += " ORDER BY a.codigo"
 
-            # Diagnóstico: preview del WHERE y parámetros
-            try:
-                print(f"[InventarioV2] WHERE parts: {len(where)} | Params: {params}")
-            except Exception:
-                pass
-
             cur.execute(sql, tuple(params))
             columns = [desc[0] for desc in cur.description]
 
@@ -244,7 +269,8 @@ class InventarioGeneralFrame(ctk.CTkFrame):
         
         self.current_filters = {}
         self.search_timer = None
-        self.current_data = []
+        # Filas del filtro actual: se leen por páginas según lo visible en la tabla
+        self.fuente: Optional[FuentePaginada] = None
         
         # Scroll container
         self.scroll_container = ctk.CTkScrollableFrame(self)
@@ -419,15 +445,17 @@ class InventarioGeneralFrame(ctk.CTkFrame):
             # For uniform centered appearance, center all columns
             self.tree.column(col, width=width, anchor='center', stretch=True)
         
-        vsb = ttk.Scrollbar(table_frame, orient="vertical", command=self.tree.yview)
+        vsb = ttk.Scrollbar(table_frame, orient="vertical")
         hsb = ttk.Scrollbar(table_frame, orient="horizontal", command=self.tree.xview)
-        self.tree.configure(yscrollcommand=vsb.set, xscrollcommand=hsb.set)
+        self.tree.configure(xscrollcommand=hsb.set)
         
         self.tree.pack(side="left", fill="both", expand=True)
         vsb.pack(side="right", fill="y")
         hsb.pack(side="bottom", fill="x")
         
-        self.tree.bind("<<TreeviewSelect>>", self._on_tree_select)
+        # Solo las filas visibles existen en el Treeview; la barra vertical la maneja TablaVirtual
+        self.tabla = TablaVirtual(self.tree, vsb, formatear=self._valores_fila,
+                                  al_seleccionar=self._on_tree_select)
         
         self.tree.tag_configure('inventariado', background='#e6f4ea')
         self.tree.tag_configure('evenrow', background='#f8f9fa')
@@ -560,17 +588,16 @@ class InventarioGeneralFrame(ctk.CTkFrame):
             
             search_query = self.search_entry.get().strip()
             
-            self.current_data = buscar_animales(filters, search_query)
             self.current_filters = filters
+            self._update_table(filters, search_query)
+            total = self.tabla.total
             
-            self._update_table()
-            
-            self.lbl_count.configure(text=f"{len(self.current_data)} animales")
+            self.lbl_count.configure(text=f"{total} animales")
             self.lbl_status.configure(text=f"Última actualización: {datetime.now().strftime('%H:%M:%S')}")
 
             # Diagnóstico: resumen de carga
             try:
-                print(f"[InventarioV2] _aplicar_filtros -> {len(self.current_data)} animales | filtros={filters} | search='{search_query}'")
+                print(f"[InventarioV2] _aplicar_filtros -> {total} animales | filtros={filters} | search='{search_query}'")
             except Exception:
                 pass
             
@@ -585,52 +612,46 @@ class InventarioGeneralFrame(ctk.CTkFrame):
             self.after_cancel(self.search_timer)
         self.search_timer = self.after(250, self._aplicar_filtros)
     
-    def _update_table(self):
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        
-        for i, animal in enumerate(self.current_data):
-            peso_inicial = animal.get('peso_nacimiento') or animal.get('peso_compra') or ''
-            values = (
-                animal.get('codigo', ''),
-                animal.get('nombre', '') or '',
-                animal.get('categoria', 'Sin categoría') or 'Sin categoría',
-                animal.get('finca', '') or '',
-                animal.get('sector', '') or '',
-                animal.get('lote', '') or '',
-                animal.get('potrero', '') or '',
-                f"{(animal.get('ultimo_peso') or 0):.1f}",
-                ("✓" if (animal.get('inventariado') or 0) == 1 else ""),
-                animal.get('estado', ''),
-                (animal.get('fecha_ultimo_peso') or '')[:10],
-                f"{peso_inicial:.1f}" if isinstance(peso_inicial, (int, float)) else ''
-            )
-            
-            estado = animal.get('estado', '')
-            if estado == 'Inventariado':
-                tags = ('inventariado',)
-            else:
-                tags = ('evenrow',) if i % 2 == 0 else ('oddrow',)
-            
-            iid = str(animal.get('id', f"row-{i}"))
-            self.tree.insert('', 'end', iid=iid, values=values, tags=tags)
+    def _update_table(self, filters: Dict[str, Any], search_query: str):
+        """Carga el filtro en la tabla virtual conservando el orden elegido por el usuario"""
+        orden, descendente = ("codigo", False) if self.fuente is None else (self.fuente.orden, self.fuente.descendente)
+        sql, params = consulta_animales(filters, search_query)
+        self.fuente = FuentePaginada(get_db_connection, sql, params, columnas_orden=COLUMNAS_ORDEN_INVENTARIO,
+                                     orden=orden, descendente=descendente)
+        self.tabla.cargar(self.fuente)
+
+    def _valores_fila(self, animal: Dict[str, Any], i: int):
+        """Valores y tags de una fila de la tabla (también se usan al exportar)"""
+        peso_inicial = animal.get('peso_nacimiento') or animal.get('peso_compra') or ''
+        values = (
+            animal.get('codigo', ''),
+            animal.get('nombre', '') or '',
+            animal.get('categoria', 'Sin categoría') or 'Sin categoría',
+            animal.get('finca', '') or '',
+            animal.get('sector', '') or '',
+            animal.get('lote', '') or '',
+            animal.get('potrero', '') or '',
+            f"{(animal.get('ultimo_peso') or 0):.1f}",
+            ("✓" if (animal.get('inventariado') or 0) == 1 else ""),
+            animal.get('estado', ''),
+            (animal.get('fecha_ultimo_peso') or '')[:10],
+            f"{peso_inicial:.1f}" if isinstance(peso_inicial, (int, float)) else ''
+        )
+        
+        estado = animal.get('estado', '')
+        if estado == 'Inventariado':
+            tags = ('inventariado',)
+        else:
+            tags = ('evenrow',) if i % 2 == 0 else ('oddrow',)
+        return values, tags
     
-    def _on_tree_select(self, event):
-        selection = self.tree.selection()
-        state = "normal" if selection else "disabled"
+    def _on_tree_select(self, animal: Optional[Dict[str, Any]] = None):
+        state = "normal" if animal else "disabled"
         for btn in self.action_buttons:
             btn.configure(state=state)
     
     def _get_selected_animal(self) -> Optional[Dict[str, Any]]:
-        selection = self.tree.selection()
-        if not selection:
-            return None
-        
-        iid = selection[0]
-        for animal in self.current_data:
-            if str(animal['id']) == iid:
-                return animal
-        return None
+        return self.tabla.seleccion()
     
     def _ver_animal(self):
         animal = self._get_selected_animal()
@@ -700,7 +721,7 @@ class InventarioGeneralFrame(ctk.CTkFrame):
 
     # ==================== NUEVAS ACCIONES ====================
     def _exportar_actual(self):
-        if not self.current_data:
+        if self.fuente is None or not self.tabla.total:
             messagebox.showinfo("Exportar", "No hay datos para exportar")
             return
         try:
@@ -709,35 +730,36 @@ class InventarioGeneralFrame(ctk.CTkFrame):
             if not ruta:
                 return
             headers = ["Código", "Nombre", "Categoría", "Finca", "Sector", "Lote", "Potrero", "Peso", "Inventariado", "Estado", "Fecha Últ. Peso", "Peso Inicial"]
-            rows = []
-            for a in self.current_data:
-                peso_inicial = a.get('peso_nacimiento') or a.get('peso_compra') or ''
-                rows.append([
-                    a.get('codigo',''), a.get('nombre',''), a.get('categoria','Sin categoría'),
-                    a.get('finca',''), a.get('sector',''), a.get('lote',''), a.get('potrero',''),
-                    f"{(a.get('ultimo_peso') or 0):.1f}", ("✓" if (a.get('inventariado') or 0) == 1 else ""), a.get('estado',''), (a.get('fecha_ultimo_peso') or '')[:10],
-                    f"{peso_inicial:.1f}" if isinstance(peso_inicial,(int,float)) else ''
-                ])
-            # Intentar Excel
-            try:
-                from openpyxl import Workbook
-                wb = Workbook()
-                ws = wb.active
-                if ws is None:
-                    ws = wb.create_sheet()
-                ws.append(headers)
-                for r in rows:
-                    ws.append(r)
-                wb.save(ruta)
-                messagebox.showinfo("Exportar", f"Archivo Excel guardado:\n{ruta}")
-            except Exception:
-                import csv
-                ruta_csv = ruta.replace('.xlsx', '.csv')
-                with open(ruta_csv, 'w', newline='', encoding='utf-8') as f:
-                    w = csv.writer(f)
-                    w.writerow(headers)
-                    w.writerows(rows)
-                messagebox.showinfo("Exportar", f"openpyxl no disponible. Exportado CSV:\n{ruta_csv}")
+            # Se recorre el filtro en el orden de la tabla, por lotes, dentro del hilo de exportación
+            fuente, total = self.fuente, self.tabla.total
+            def filas_exportacion():
+                for i, a in enumerate(fuente.iterar()):
+                    yield list(self._valores_fila(a, i)[0])
+            from modules.utils.progreso_exportacion import exportar_en_segundo_plano
+            from src.utils.export.export_stream import exportar_csv_stream, exportar_excel_stream
+
+            def generar(trabajo):
+                # Corre en un hilo de la cola de exportaciones; intenta Excel y cae a CSV
+                try:
+                    import openpyxl  # noqa: F401
+                    excel = not ruta.lower().endswith('.csv')
+                except ImportError:
+                    excel = False
+                if not excel:
+                    ruta_csv = ruta.replace('.xlsx', '.csv')
+                    exportar_csv_stream(ruta_csv, headers, filas_exportacion(), progreso=trabajo.avanzar, total=total)
+                    return ruta_csv
+                exportar_excel_stream(ruta, headers, filas_exportacion(), "Inventario", progreso=trabajo.avanzar, total=total)
+                return ruta
+
+            def al_completar(trabajo):
+                if str(trabajo.resultado).endswith('.csv') and ruta.endswith('.xlsx'):
+                    messagebox.showinfo("Exportar", f"openpyxl no disponible. Exportado CSV:\n{trabajo.resultado}")
+                else:
+                    messagebox.showinfo("Exportar", f"Archivo guardado:\n{trabajo.resultado}")
+
+            exportar_en_segundo_plano(self, "inventario", generar, ruta, titulo="Exportando inventario",
+                                      al_completar=al_completar)
         except Exception as e:
             messagebox.showerror("Exportar", f"Error exportando:\n{e}")
 
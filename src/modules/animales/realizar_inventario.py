@@ -3,7 +3,6 @@ from tkinter import ttk, messagebox, filedialog
 from datetime import datetime
 from typing import List, Any, Optional
 import sqlite3
-from matplotlib.figure import Figure
 
 try:
     from database import get_db_connection
@@ -265,6 +264,7 @@ class RealizarInventarioFrame(ctk.CTkFrame):
         try:
             import matplotlib.pyplot as plt
             from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+            from matplotlib.figure import Figure
             finca_id = None
             val = self.cmb_finca.get()
             if val and '-' in val:
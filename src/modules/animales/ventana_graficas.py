@@ -9,10 +9,10 @@ from datetime import datetime, timedelta
 import matplotlib
 matplotlib.use('TkAgg')
 import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from matplotlib.figure import Figure
 import numpy as np
 
+from src.utils.charts import GraficoAgg
+
 try:
     from database import get_db_connection
 except Exception:
@@ -26,6 +26,13 @@ class VentanaGraficas(ctk.CTkToplevel):
         super().__init__(master)
         
         self.filters = filters_iniciales or {}
+
+        # Tarjetas reutilizadas entre actualizaciones: título -> (card, GraficoAgg)
+        self._tarjetas = {}
+        self._mensaje_error = None
+        # Filtros leídos en el hilo de Tk; las gráficas se dibujan en segundo plano
+        self._filtros_sql = ("", [])
+        self._rango_fechas = ("2000-01-01", datetime.now().strftime('%Y-%m-%d'))
         
         # Configuración ventana
         self.title("📊 Análisis Gráfico del Inventario")
@@ -235,9 +242,12 @@ class VentanaGraficas(ctk.CTkToplevel):
     
     def _renderizar_graficos(self):
         """Renderizar todas las gráficas"""
-        # Limpiar contenedor
-        for widget in self.cards_scroll.winfo_children():
-            widget.destroy()
+        # Ocultar tarjetas (se conservan sus figuras) y mensajes anteriores
+        if self._mensaje_error is not None:
+            self._mensaje_error.destroy()
+            self._mensaje_error = None
+        for card, _grafico in self._tarjetas.values():
+            card.pack_forget()
         
         try:
             # Obtener finca seleccionada
@@ -253,29 +263,37 @@ class VentanaGraficas(ctk.CTkToplevel):
             finca2_val = self.cmb_finca2.get()
             if finca2_val and finca2_val != "Ninguna" and '-' in finca2_val:
                 finca2_id = int(finca2_val.split(' - ')[0])
-            
-            # Helper para crear una card con un gráfico
-            def add_chart_card(title, render_fn):
-                card = ctk.CTkFrame(self.cards_scroll, corner_radius=10, border_width=1, border_color="#e5e7eb")
+
+            self._filtros_sql = self._get_filters_sql()
+            self._rango_fechas = self._get_fecha_rango()
+            
+            # Helper para mostrar una card con un gráfico (la figura se crea una sola vez)
+            def add_chart_card(title, render_fn, clave=None):
+                if title not in self._tarjetas:
+                    card = ctk.CTkFrame(self.cards_scroll, corner_radius=10, border_width=1, border_color="#e5e7eb")
+                    ctk.CTkLabel(card, text=title, font=("Segoe UI", 14, "bold"), text_color="#1f2937").pack(anchor="w", padx=15, pady=(10, 0))
+                    grafico = GraficoAgg(card, ancho_px=1000, alto_px=360, dpi=100, fondo='white')
+                    grafico.widget.pack(fill="x", expand=True, padx=12, pady=10)
+                    self._tarjetas[title] = (card, grafico)
+                card, grafico = self._tarjetas[title]
                 card.pack(fill="x", padx=10, pady=8)
-                ctk.CTkLabel(card, text=title, font=("Segoe UI", 14, "bold"), text_color="#1f2937").pack(anchor="w", padx=15, pady=(10, 0))
-                fig_local = Figure(figsize=(10, 3.6), dpi=100, facecolor='white')
-                ax = fig_local.add_subplot(111)
-                render_fn(ax)
-                fig_local.tight_layout()
-                canvas = FigureCanvasTkAgg(fig_local, master=card)
-                canvas.draw()
-                canvas.get_tk_widget().pack(fill="x", expand=True, padx=12, pady=10)
 
-            add_chart_card("Distribución por Categorías", lambda ax: self._grafico_categorias(ax, finca1_id))
-            add_chart_card("Distribución por Sexo", lambda ax: self._grafico_sexo(ax, finca1_id))
-            add_chart_card("Ganancia/Pérdida de Peso (Acumulado)", lambda ax: self._grafico_peso_ganancia(ax, finca1_id))
-            add_chart_card("Nacidos vs Comprados", lambda ax: self._grafico_nacidos_comprados(ax, finca1_id))
-            add_chart_card("Muertes por Período", lambda ax: self._grafico_muertes(ax, finca1_id))
+                def dibujar(g):
+                    render_fn(g)
+                    g.figura.tight_layout()
+
+                grafico.solicitar(dibujar, clave)
+
+            add_chart_card("Distribución por Categorías", lambda g: self._grafico_categorias(g.ejes, finca1_id))
+            add_chart_card("Distribución por Sexo", lambda g: self._grafico_sexo(g.ejes, finca1_id))
+            add_chart_card("Ganancia/Pérdida de Peso (Acumulado)", lambda g: self._grafico_peso_ganancia(g, finca1_id),
+                           clave=("peso", finca1_id))
+            add_chart_card("Nacidos vs Comprados", lambda g: self._grafico_nacidos_comprados(g.ejes, finca1_id))
+            add_chart_card("Muertes por Período", lambda g: self._grafico_muertes(g.ejes, finca1_id))
             if finca2_id:
-                add_chart_card("Comparación entre Fincas", lambda ax: self._grafico_comparacion_fincas(ax, finca1_id, finca2_id))
+                add_chart_card("Comparación entre Fincas", lambda g: self._grafico_comparacion_fincas(g.ejes, finca1_id, finca2_id))
             else:
-                add_chart_card("Estado de Inventario", lambda ax: self._grafico_inventariado(ax, finca1_id))
+                add_chart_card("Estado de Inventario", lambda g: self._grafico_inventariado(g.ejes, finca1_id))
             
         except Exception as e:
             self._show_error_message(f"Error renderizando gráficos:\n{e}")
@@ -286,7 +304,7 @@ class VentanaGraficas(ctk.CTkToplevel):
         try:
             with get_db_connection() as conn:
                 cur = conn.cursor()
-                clause, pars = self._get_filters_sql()
+                clause, pars = self._filtros_sql
                 sql = f"""
                     SELECT categoria, COUNT(*) 
                     FROM animal a
@@ -319,7 +337,7 @@ class VentanaGraficas(ctk.CTkToplevel):
         try:
             with get_db_connection() as conn:
                 cur = conn.cursor()
-                clause, pars = self._get_filters_sql()
+                clause, pars = self._filtros_sql
                 sql = f"""
                     SELECT a.sexo, COUNT(*) 
                     FROM animal a
@@ -356,14 +374,15 @@ class VentanaGraficas(ctk.CTkToplevel):
                    fontsize=10, transform=ax.transAxes)
             ax.set_title('Distribución por Sexo')
     
-    def _grafico_peso_ganancia(self, ax, finca_id):
-        """Gráfico line: ganancia/pérdida de peso"""
+    def _grafico_peso_ganancia(self, g, finca_id):
+        """Gráfico line: ganancia/pérdida de peso (la serie se reutiliza y se reduce al ancho)"""
+        ax = g.ejes
         try:
-            fecha_inicio, fecha_fin = self._get_fecha_rango()
+            fecha_inicio, fecha_fin = self._rango_fechas
             
             with get_db_connection() as conn:
                 cur = conn.cursor()
-                clause, pars = self._get_filters_sql()
+                clause, pars = self._filtros_sql
                 sql = f"""
                     SELECT 
                         r.fecha,
@@ -378,26 +397,29 @@ class VentanaGraficas(ctk.CTkToplevel):
                 data = cur.fetchall()
             
             if not data:
+                g.limpiar()
                 ax.text(0.5, 0.5, 'Sin registros de peso', ha='center', va='center', 
                        fontsize=12, transform=ax.transAxes)
                 ax.set_title('Ganancia/Pérdida de Peso')
                 return
             
             fechas = [datetime.strptime(row[0], '%Y-%m-%d') for row in data]
-            deltas = [row[1] for row in data]
+            deltas = [row[1] or 0 for row in data]
             
             # Acumulado
             deltas_acum = np.cumsum(deltas)
             
-            ax.plot(fechas, deltas_acum, marker='o', linewidth=2, color='#10b981')
-            ax.axhline(y=0, color='red', linestyle='--', linewidth=1)
+            g.linea("acumulado", fechas, deltas_acum, marker='o', linewidth=2, color='#10b981')
+            g.linea_horizontal("cero", 0, color='red', linestyle='--', linewidth=1)
+            g.ajustar()
             ax.set_title('Ganancia/Pérdida de Peso (Acumulado)', fontweight='bold')
             ax.set_xlabel('Fecha')
             ax.set_ylabel('Kg acumulados')
             ax.grid(True, alpha=0.3)
-            plt.setp(ax.xaxis.get_majorticklabels(), rotation=45, ha='right')
+            g.figura.autofmt_xdate(rotation=45)
             
         except Exception as e:
+            g.limpiar()
             ax.text(0.5, 0.5, f'Error: {str(e)[:30]}', ha='center', va='center', 
                    fontsize=10, transform=ax.transAxes)
             ax.set_title('Ganancia/Pérdida de Peso')
@@ -405,11 +427,11 @@ class VentanaGraficas(ctk.CTkToplevel):
     def _grafico_nacidos_comprados(self, ax, finca_id):
         """Gráfico bar: nacidos vs comprados"""
         try:
-            fecha_inicio, fecha_fin = self._get_fecha_rango()
+            fecha_inicio, fecha_fin = self._rango_fechas
             
             with get_db_connection() as conn:
                 cur = conn.cursor()
-                clause, pars = self._get_filters_sql()
+                clause, pars = self._filtros_sql
                 # Nacidos
                 sql_nac = f"""
                     SELECT COUNT(*) 
@@ -452,11 +474,11 @@ class VentanaGraficas(ctk.CTkToplevel):
     def _grafico_muertes(self, ax, finca_id):
         """Gráfico bar: muertes por período"""
         try:
-            fecha_inicio, fecha_fin = self._get_fecha_rango()
+            fecha_inicio, fecha_fin = self._rango_fechas
             
             with get_db_connection() as conn:
                 cur = conn.cursor()
-                clause, pars = self._get_filters_sql()
+                clause, pars = self._filtros_sql
                 sql = f"""
                     SELECT strftime('%Y-%m', a.fecha_muerte) as mes, COUNT(*)
                     FROM animal a
@@ -495,7 +517,7 @@ class VentanaGraficas(ctk.CTkToplevel):
         try:
             with get_db_connection() as conn:
                 cur = conn.cursor()
-                clause, pars = self._get_filters_sql()
+                clause, pars = self._filtros_sql
                 sql = f"""
                     SELECT a.inventariado, COUNT(*) 
                     FROM animal a
@@ -526,7 +548,7 @@ class VentanaGraficas(ctk.CTkToplevel):
         try:
             with get_db_connection() as conn:
                 cur = conn.cursor()
-                clause, pars = self._get_filters_sql()
+                clause, pars = self._filtros_sql
                 sql = f"SELECT COUNT(*) FROM animal a WHERE a.id_finca = ?{clause}"
                 cur.execute(sql, (finca1_id, *pars))
                 total1 = cur.fetchone()[0]
@@ -561,10 +583,10 @@ class VentanaGraficas(ctk.CTkToplevel):
     
     def _show_error_message(self, message):
         """Mostrar mensaje de error en el canvas"""
-        error_label = ctk.CTkLabel(
+        self._mensaje_error = ctk.CTkLabel(
             self.cards_scroll,
             text=f"⚠️  {message}",
             font=("Segoe UI", 16),
             text_color="red"
         )
-        error_label.pack(expand=True)
+        self._mensaje_error.pack(expand=True)
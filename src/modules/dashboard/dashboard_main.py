@@ -1,8 +1,5 @@
 import customtkinter as ctk
 from tkinter import ttk
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from matplotlib.dates import DateFormatter, MonthLocator
 from datetime import datetime, timedelta
 
 # Importaciones corregidas
@@ -46,6 +43,9 @@ class DashboardModule(ctk.CTkFrame):
         # Estado del filtro de periodo
         self.periodo_actual = "Últimos 30 días"
         self.rango_dias_produccion = 30
+
+        # Carga en segundo plano en curso (ver actualizar_estadisticas)
+        self._carga = None
         
         # Inicializar interfaz y datos
         self.crear_widgets()
@@ -268,7 +268,10 @@ class DashboardModule(ctk.CTkFrame):
             text_color="white"
         ).pack(pady=8)
 
-        # Gráfico
+        # Gráfico (matplotlib se importa al abrir el dashboard, no al arrancar)
+        import matplotlib.pyplot as plt
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
         self.fig_estados, self.ax_estados = plt.subplots(figsize=(6.5, 4))
         self._estilizar_matplotlib()
         
@@ -300,12 +303,12 @@ class DashboardModule(ctk.CTkFrame):
             text_color="white"
         ).pack(pady=8)
 
-        # Gráfico
-        self.fig_produccion, self.ax_produccion = plt.subplots(figsize=(6.5, 4))
+        # Gráfico: se dibuja en segundo plano reutilizando la serie (ver src/utils/charts)
+        from src.utils.charts import GraficoAgg
+
         self._estilizar_matplotlib()
-        
-        self.canvas_produccion = FigureCanvasTkAgg(self.fig_produccion, prod_frame)
-        self.canvas_produccion.get_tk_widget().pack(fill="both", expand=True, padx=8, pady=(0, 8))
+        self.grafico_produccion = GraficoAgg(prod_frame, ancho_px=650, alto_px=400)
+        self.grafico_produccion.widget.pack(fill="both", expand=True, padx=8, pady=(0, 8))
 
     def _crear_panel_eventos(self, parent):
         """Crea el panel de eventos recientes en el lado derecho"""
@@ -456,6 +459,8 @@ class DashboardModule(ctk.CTkFrame):
 
     def _estilizar_matplotlib(self):
         """Aplica estilos profesionales a las figuras matplotlib"""
+        import matplotlib.pyplot as plt
+
         plt.style.use('default')
         
         # Modo oscuro si es necesario
@@ -553,99 +558,86 @@ class DashboardModule(ctk.CTkFrame):
     #                 ACTUALIZACIÓN DE ESTADÍSTICAS - MEJORADA
     # =========================================================
     def actualizar_estadisticas(self):
-        """Actualiza todas las métricas, gráficos, eventos y alertas"""
-        try:
-            with get_db_connection() as conn:
-                cursor = conn.cursor()
-
-                # -------- MÉTRICAS PRINCIPALES (8 KPIs) --------
-                # Total animales
-                cursor.execute("SELECT COUNT(*) FROM animal")
-                total_animales = cursor.fetchone()[0]
-
-                # Animales activos
-                cursor.execute("SELECT COUNT(*) FROM animal WHERE estado = 'Activo' OR estado IS NULL")
-                activos = cursor.fetchone()[0]
-
-                # Animales muertos
-                cursor.execute("SELECT COUNT(*) FROM animal WHERE estado = 'Muerto'")
-                muertos = cursor.fetchone()[0]
-
-                # Animales vendidos
-                cursor.execute("SELECT COUNT(*) FROM animal WHERE estado = 'Vendido'")
-                vendidos = cursor.fetchone()[0]
-
-                # En tratamiento (últimos 30 días)
-                cursor.execute("""
-                    SELECT COUNT(DISTINCT id_animal) FROM tratamiento 
-                    WHERE fecha_inicio >= date('now', '-30 days') 
-                    AND (estado = 'En curso' OR estado = 'Activo' OR estado IS NULL)
-                """)
-                result_tratamiento = cursor.fetchone()
-                en_tratamiento = result_tratamiento[0] if result_tratamiento else 0
-
-                # Gestantes
-                cursor.execute("""
-                    SELECT COUNT(DISTINCT animal_id) FROM reproduccion 
-                    WHERE estado = 'Gestante'
-                """)
-                result_gestantes = cursor.fetchone()
-                gestantes = result_gestantes[0] if result_gestantes else 0
-
-                # Producción de leche HOY
-                cursor.execute("""
-                    SELECT COALESCE(SUM(COALESCE(litros_manana, 0) + COALESCE(litros_tarde, 0) + COALESCE(litros_noche, 0)), 0)
-                    FROM produccion_leche
-                    WHERE fecha = date('now')
-                """)
-                produccion_hoy = cursor.fetchone()[0]
-
-                # Nacimientos del mes
-                cursor.execute("""
-                    SELECT COUNT(*) FROM animal 
-                    WHERE fecha_nacimiento >= date('now', 'start of month')
-                """)
-                result_nacimientos = cursor.fetchone()
-                nacimientos_mes = result_nacimientos[0] if result_nacimientos else 0
-
-                # Actualizar las métricas KPI
-                self.metricas["total_animales"].configure(text=str(total_animales))
-                self.metricas["activos"].configure(text=str(activos))
-                self.metricas["muertos"].configure(text=str(muertos))
-                self.metricas["vendidos"].configure(text=str(vendidos))
-                self.metricas["en_tratamiento"].configure(text=str(en_tratamiento))
-                self.metricas["gestantes"].configure(text=str(gestantes))
-                self.metricas["produccion_hoy"].configure(text=f"{produccion_hoy:.0f}L")
-                self.metricas["nacimientos_mes"].configure(text=str(nacimientos_mes))
-        
-            # Obtener calidad de datos para mostrar badges
-            self._actualizar_badges_calidad()
-            self.logger.info(f"Dashboard actualizado: {total_animales} animales, {activos} activos")
+        """
+        Actualiza métricas, gráficos, eventos y alertas sin bloquear la ventana.
+
+        Las consultas corren en un hilo de trabajo (dashboard_data_service) y
+        cada sección se pinta en cuanto llega, vía after(). Una actualización
+        nueva descarta la que estuviera en curso.
+        """
+        from src.services.dashboard_data_service import (
+            CargaDashboard,
+            secciones_dashboard,
+            seguir_carga_en_ui,
+        )
 
-        except Exception as e:
-            self.logger.error(f"Error actualizando dashboard: {e}")
+        if self._carga is not None:
+            self._carga.cancelar()
+        self._carga = CargaDashboard(secciones_dashboard(self.rango_dias_produccion)).iniciar()
+        seguir_carga_en_ui(self, self._carga, self._pintar_seccion, self._carga_terminada)
+
+    def _pintar_seccion(self, nombre, datos, error):
+        """Pinta una sección del dashboard (hilo de Tk)."""
+        if error is not None:
+            self.logger.error(f"Error actualizando dashboard ({nombre}): {error}")
+            if nombre == "eventos":
+                self._mostrar_eventos(None)
+            elif nombre == "alertas":
+                self._mostrar_alertas(None, error=error)
+            return
+        if nombre == "animales":
+            self._mostrar_kpis_animales(datos)
+        elif nombre == "actividad":
+            self._mostrar_kpis_actividad(datos)
+        elif nombre == "produccion":
+            self._actualizar_grafico_produccion(datos)
+        elif nombre == "eventos":
+            self._mostrar_eventos(datos)
+        elif nombre == "alertas":
+            self._mostrar_alertas(datos)
+
+    def _carga_terminada(self):
+        self._carga = None
+        # Obtener calidad de datos para mostrar badges
+        self._actualizar_badges_calidad()
+
+    def _mostrar_kpis_animales(self, animales):
+        """Tarjetas de conteo de animales y gráfico de estados."""
+        from src.services.dashboard_data_service import estados_animales
+
+        self.metricas["total_animales"].configure(text=str(animales["total"]))
+        self.metricas["activos"].configure(text=str(animales["activos"]))
+        self.metricas["muertos"].configure(text=str(animales["muertos"]))
+        self.metricas["vendidos"].configure(text=str(animales["vendidos"]))
+        self.metricas["nacimientos_mes"].configure(text=str(animales["nacimientos_mes"]))
+        self._actualizar_grafico_estados(estados_animales(animales))
+        self.logger.info(f"Dashboard actualizado: {animales['total']} animales, {animales['activos']} activos")
+
+    def _mostrar_kpis_actividad(self, actividad):
+        """Tarjetas de tratamientos, gestantes y leche, y estado de AI Lite."""
+        self.metricas["en_tratamiento"].configure(text=str(actividad["en_tratamiento"]))
+        self.metricas["gestantes"].configure(text=str(actividad["gestantes"]))
+        self.metricas["produccion_hoy"].configure(text=f"{actividad['produccion_hoy']:.0f}L")
+        try:
+            self.ai_status_label.configure(
+                text=f"AI Lite: {actividad['ai_activas']} activas · Última: {actividad['ai_ultima']}"
+            )
+            self.alert_count_label.configure(
+                text=f"Alertas totales: {actividad['alertas_totales']}"
+            )
+        except Exception:
+            pass
 
     # =========================================================
     #                     FUNCIONES DE GRÁFICOS - MEJORADAS
     # =========================================================
-    def _actualizar_grafico_estados(self, cursor):
+    def _actualizar_grafico_estados(self, datos):
         """Actualiza el gráfico de estado de animales mostrando SOLO: Activos, Muertos, Vendidos, Perdidos"""
         try:
-            # Consultar solo estados relevantes
-            cursor.execute("""
-                SELECT COALESCE(estado, 'Activo') as estado, COUNT(*) as cantidad
-                FROM animal
-                WHERE estado IN ('Activo', 'Muerto', 'Vendido', 'Perdido') OR estado IS NULL
-                GROUP BY estado
-                ORDER BY cantidad DESC
-            """)
-
-            datos = cursor.fetchall()
-            
             self.ax_estados.clear()
 
             if datos:
-                estados = [d[0] if d[0] else "Activo" for d in datos]
+                estados = [d[0] for d in datos]
                 cantidades = [d[1] for d in datos]
 
                 # Colores corporativos
@@ -681,333 +673,139 @@ class DashboardModule(ctk.CTkFrame):
                                     fontsize=11, style='italic', color='gray')
 
             self.fig_estados.tight_layout()
-            self.canvas_estados.draw()
+            self.canvas_estados.draw_idle()
 
         except Exception as e:
             self.logger.error(f"Error en gráfico estados: {e}")
 
-    def _actualizar_grafico_produccion(self, cursor):
+    def _actualizar_grafico_produccion(self, datos):
         """Actualiza el gráfico de producción de leche con línea curva, promedio, máx y mín"""
         try:
-            self.ax_produccion.clear()
-
-            # Consultar producción según rango seleccionado
-            cursor.execute(f"""
-                SELECT fecha, 
-                       SUM(COALESCE(litros_manana, 0) + COALESCE(litros_tarde, 0) + COALESCE(litros_noche, 0)) as total
-                FROM produccion_leche
-                WHERE fecha >= date('now', '-{self.rango_dias_produccion} days')
-                GROUP BY fecha
-                ORDER BY fecha
-            """)
-            datos = cursor.fetchall()
-
-            if datos:
-                fechas = [row[0] for row in datos]
-                totales = [row[1] for row in datos]
+            if not datos:
+                self.grafico_produccion.solicitar(self._dibujar_sin_produccion, clave="vacio")
+                return
+
+            fechas = [row[0] for row in datos]
+            totales = [row[1] or 0 for row in datos]
+            colores = self.COLORS_CORP
+
+            def dibujar(g):
+                ax = g.ejes
+                promedio = sum(totales) / len(totales)
+                maximo, minimo = max(totales), min(totales)
+
+                # Línea con relleno (reducida al ancho del gráfico si el rango es largo)
+                g.relleno("relleno", fechas, totales, alpha=0.25, color=colores["primary"])
+                g.linea("produccion", fechas, totales, marker='o', markersize=4, linewidth=2.5,
+                        color=colores["primary"], label='Producción Diaria', zorder=3)
+                g.linea_horizontal("promedio", promedio, color=colores["warning"], linestyle='--',
+                                   linewidth=2, label=f'Promedio: {promedio:.1f}L', alpha=0.8)
+                g.linea_horizontal("maximo", maximo, color=colores["success"], linestyle=':',
+                                   linewidth=1.5, label=f'Máximo: {maximo:.1f}L', alpha=0.6)
+                g.linea_horizontal("minimo", minimo, color=colores["danger"], linestyle=':',
+                                   linewidth=1.5, label=f'Mínimo: {minimo:.1f}L', alpha=0.6)
+                g.ajustar()
+
+                # Configuración general (máximo 6 etiquetas de fecha)
+                import matplotlib.dates as mdates
+                ax.xaxis.set_major_locator(mdates.AutoDateLocator(maxticks=6))
+                ax.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
+                ax.tick_params(axis='x', labelrotation=45)
+                ax.set_ylabel("Litros", fontsize=10, fontweight='bold')
+                ax.set_xlabel("Fecha", fontsize=10, fontweight='bold')
+                ax.tick_params(axis='both', labelsize=9)
+                ax.legend(loc='upper left', fontsize=9, framealpha=0.95)
+                ax.grid(True, alpha=0.3, linestyle=':', linewidth=0.7)
 
-                x = range(len(fechas))
-
-                # Gráfico de línea suave con relleno
-                self.ax_produccion.fill_between(x, totales, alpha=0.25, color=self.COLORS_CORP["primary"])
-                self.ax_produccion.plot(x, totales, marker='o', markersize=4, 
-                                       linewidth=2.5, color=self.COLORS_CORP["primary"], 
-                                       label='Producción Diaria', zorder=3)
-                
-                # Línea de promedio
-                promedio = sum(totales) / len(totales) if totales else 0
-                self.ax_produccion.axhline(y=promedio, color=self.COLORS_CORP["warning"], 
-                                          linestyle='--', linewidth=2, 
-                                          label=f'Promedio: {promedio:.1f}L', alpha=0.8)
-                
-                # Línea de máximo
-                maximo = max(totales) if totales else 0
-                self.ax_produccion.axhline(y=maximo, color=self.COLORS_CORP["success"], 
-                                          linestyle=':', linewidth=1.5, 
-                                          label=f'Máximo: {maximo:.1f}L', alpha=0.6)
-                
-                # Línea de mínimo
-                minimo = min(totales) if totales else 0
-                self.ax_produccion.axhline(y=minimo, color=self.COLORS_CORP["danger"], 
-                                          linestyle=':', linewidth=1.5, 
-                                          label=f'Mínimo: {minimo:.1f}L', alpha=0.6)
-                
-                # Configuración del eje X
-                step = max(1, len(fechas) // 6)  # Mostrar máximo 6 etiquetas
-                self.ax_produccion.set_xticks(range(0, len(fechas), step))
-                self.ax_produccion.set_xticklabels([fechas[i] for i in range(0, len(fechas), step)], 
-                                                   rotation=45, ha='right', fontsize=9)
-                
-                # Configuración general
-                self.ax_produccion.set_ylabel("Litros", fontsize=10, fontweight='bold')
-                self.ax_produccion.set_xlabel("Fecha", fontsize=10, fontweight='bold')
-                self.ax_produccion.tick_params(axis='both', labelsize=9)
-                self.ax_produccion.legend(loc='upper left', fontsize=9, framealpha=0.95)
-                self.ax_produccion.grid(True, alpha=0.3, linestyle=':', linewidth=0.7)
-                
                 # Estadísticas en el gráfico
-                total_periodo = sum(totales)
-                promedio_dias = self.rango_dias_produccion
-                stats_text = f"Total: {total_periodo:.0f}L | Días: {len(fechas)} | Promedio: {promedio:.1f}L"
-                self.ax_produccion.text(0.98, 0.05, stats_text, transform=self.ax_produccion.transAxes,
-                                       fontsize=8, ha='right', va='bottom',
-                                       bbox=dict(boxstyle='round', facecolor='white', alpha=0.8, edgecolor='gray'))
-            else:
-                self.ax_produccion.text(0.5, 0.5, "No hay datos de producción", 
-                                       ha="center", va="center", transform=self.ax_produccion.transAxes,
-                                       fontsize=11, style='italic', color='gray')
+                stats_text = f"Total: {sum(totales):.0f}L | Días: {len(fechas)} | Promedio: {promedio:.1f}L"
+                g.texto("resumen", 0.98, 0.05, stats_text, transform=ax.transAxes,
+                        fontsize=8, ha='right', va='bottom',
+                        bbox=dict(boxstyle='round', facecolor='white', alpha=0.8, edgecolor='gray'))
+                g.figura.tight_layout()
 
-            self.fig_produccion.tight_layout()
-            self.canvas_produccion.draw()
+            self.grafico_produccion.solicitar(dibujar, clave="produccion")
 
         except Exception as e:
             self.logger.error(f"Error en gráfico producción: {e}")
 
+    @staticmethod
+    def _dibujar_sin_produccion(g):
+        g.limpiar()
+        g.ejes.text(0.5, 0.5, "No hay datos de producción",
+                    ha="center", va="center", transform=g.ejes.transAxes,
+                    fontsize=11, style='italic', color='gray')
+
     # =========================================================
     #                     EVENTOS Y ALERTAS - MEJORADOS
     # =========================================================
-    def _actualizar_eventos_recientes(self, cursor):
-        """Actualiza el panel de eventos recientes (últimos 10 eventos reales)"""
-        try:
-            # Limpiar eventos existentes
-            for item in self.eventos_tree.get_children():
-                self.eventos_tree.delete(item)
-
-            eventos_lista = []
-
-            # Nuevos animales registrados
-            cursor.execute("""
-                SELECT date(fecha_creacion), 'Animal', 'Nuevo animal: ' || codigo || ' - ' || COALESCE(nombre, 'Sin nombre')
-                FROM animal
-                WHERE fecha_creacion IS NOT NULL
-                ORDER BY fecha_creacion DESC
-                LIMIT 3
-            """)
-            eventos_lista.extend(cursor.fetchall())
-
-            # Tratamientos aplicados
-            cursor.execute("""
-                SELECT date(t.fecha_inicio), 'Tratamiento', 'Tratamiento: ' || t.producto || ' - ' || a.codigo
-                FROM tratamiento t
-                JOIN animal a ON t.id_animal = a.id
-                WHERE t.fecha_inicio IS NOT NULL
-                ORDER BY t.fecha_inicio DESC
-                LIMIT 2
-            """)
-            eventos_lista.extend(cursor.fetchall())
-
-            # Producción registrada (últimos 2 registros)
-            cursor.execute("""
-                SELECT date(fecha), 'Producción', 'Producción: ' || animal_id || ' L'
-                FROM produccion_leche
-                WHERE fecha IS NOT NULL
-                ORDER BY fecha DESC
-                LIMIT 2
-            """)
-            eventos_lista.extend(cursor.fetchall())
-
-            # Ventas registradas
-            cursor.execute("""
-                SELECT date(v.fecha), 'Venta', 'Venta: ' || a.codigo || ' - $' || CAST(v.precio_total AS INT)
-                FROM venta v
-                JOIN animal a ON v.animal_id = a.id
-                WHERE v.fecha IS NOT NULL
-                ORDER BY v.fecha DESC
-                LIMIT 2
-            """)
-            eventos_lista.extend(cursor.fetchall())
-
-            # Nacimientos
-            cursor.execute("""
-                SELECT date(fecha_nacimiento), 'Nacimiento', 'Nacimiento: ' || codigo
-                FROM animal
-                WHERE fecha_nacimiento >= date('now', 'start of month')
-                ORDER BY fecha_nacimiento DESC
-                LIMIT 2
-            """)
-            eventos_lista.extend(cursor.fetchall())
-
-            # Ordenar por fecha descendente y tomar máximo 10
-            eventos_lista.sort(key=lambda x: x[0] if x[0] else "1900-01-01", reverse=True)
-            eventos_lista = eventos_lista[:10]
-
-            # Insertar en tabla
-            for fecha, tipo, desc in eventos_lista:
-                fecha_str = fecha if fecha else "--"
-                self.eventos_tree.insert("", "end", values=(fecha_str, tipo, desc))
-
-            # Si no hay eventos
-            if not eventos_lista:
-                self.eventos_tree.insert("", "end", values=("--", "--", "No hay eventos recientes"))
-
-            self.logger.info(f"Cargados {len(eventos_lista)} eventos recientes")
+    def _mostrar_eventos(self, eventos_lista):
+        """Pinta el panel de eventos recientes (últimos 10 eventos reales); None si falló la carga"""
+        for item in self.eventos_tree.get_children():
+            self.eventos_tree.delete(item)
 
-        except Exception as e:
-            self.logger.error(f"Error cargando eventos: {e}")
-            for item in self.eventos_tree.get_children():
-                self.eventos_tree.delete(item)
+        if eventos_lista is None:
             self.eventos_tree.insert("", "end", values=("Error", "Error", "No se pudieron cargar eventos"))
+            return
 
-    def _actualizar_alertas(self, cursor):
-        """Actualiza alertas reales generadas automáticamente desde la base de datos"""
-        try:
-            self.alertas_text.configure(state="normal")
-            self.alertas_text.delete("1.0", "end")
+        for fecha, tipo, desc in eventos_lista:
+            fecha_str = fecha if fecha else "--"
+            self.eventos_tree.insert("", "end", values=(fecha_str, tipo, desc))
 
-            # Estado AI Lite desde tabla alertas
-            ai_conteo = 0
-            ai_ultima = "--"
-            total_alertas = 0
-            try:
-                cursor.execute(
-                    """
-                    SELECT COUNT(*), COALESCE(MAX(fecha_deteccion), '--')
-                    FROM alertas
-                    WHERE estado = 'activa' AND (tipo LIKE 'anomalia_%' OR tipo LIKE 'patron_%')
-                    """
-                )
-                row = cursor.fetchone()
-                if row:
-                    ai_conteo = row[0] or 0
-                    ai_ultima = row[1] or "--"
-                cursor.execute(
-                    """
-                    SELECT COUNT(*)
-                    FROM alertas
-                    WHERE estado = 'activa'
-                    """
-                )
-                total_row = cursor.fetchone()
-                if total_row:
-                    total_alertas = total_row[0] or 0
-            except Exception:
-                pass
-            try:
-                self.ai_status_label.configure(
-                    text=f"AI Lite: {ai_conteo} activas · Última: {ai_ultima}"
-                )
-                self.alert_count_label.configure(
-                    text=f"Alertas totales: {total_alertas}"
-                )
-            except Exception:
-                pass
+        # Si no hay eventos
+        if not eventos_lista:
+            self.eventos_tree.insert("", "end", values=("--", "--", "No hay eventos recientes"))
 
-            alertas = []
-
-            # 1. Animales sin raza
-            cursor.execute("""
-                SELECT COUNT(*), GROUP_CONCAT(codigo, ', ')
-                FROM animal 
-                WHERE raza_id IS NULL AND (estado = 'Activo' OR estado IS NULL)
-            """)
-            result = cursor.fetchone()
-            sin_raza_count = result[0] if result else 0
-            if sin_raza_count > 0:
-                alertas.append(("alta", "🔴 CRIANZA", f"{sin_raza_count} animal(es) sin raza asignada"))
-
-            # 2. Animales sin lote asignado
-            cursor.execute("""
-                SELECT COUNT(*), GROUP_CONCAT(codigo, ', ')
-                FROM animal 
-                WHERE lote_id IS NULL AND (estado = 'Activo' OR estado IS NULL)
-            """)
-            result = cursor.fetchone()
-            sin_lote_count = result[0] if result else 0
-            if sin_lote_count > 0:
-                alertas.append(("media", "🟡 ORGANIZACIÓN", f"{sin_lote_count} animal(es) sin lote asignado"))
-
-            # 3. Animales sin última vacunación registrada
-            cursor.execute("""
-                SELECT COUNT(*)
-                FROM animal a
-                WHERE (estado = 'Activo' OR estado IS NULL)
-                AND NOT EXISTS (
-                    SELECT 1 FROM tratamiento 
-                    WHERE id_animal = a.id AND tipo_tratamiento = 'Vacunación'
-                )
-            """)
-            sin_vacuna = cursor.fetchone()[0]
-            if sin_vacuna > 0:
-                alertas.append(("alta", "⚕️ SALUD", f"{sin_vacuna} animal(es) sin vacunación registrada"))
-
-            # 4. Gestantes actuales
-            cursor.execute("""
-                SELECT COUNT(DISTINCT animal_id)
-                FROM reproduccion
-                WHERE estado = 'Gestante'
-            """)
-            result = cursor.fetchone()
-            gestantes_count = result[0] if result else 0
-            if gestantes_count > 0:
-                alertas.append(("media", "🤰 REPRODUCCIÓN", f"{gestantes_count} animal(es) gestante(s) registrado(s)"))
-
-            # 5. Tratamientos por vencer (últimos 3 días)
-            cursor.execute("""
-                SELECT COUNT(*)
-                FROM tratamiento
-                WHERE fecha_fin BETWEEN date('now') AND date('now', '+3 days')
-                AND (estado = 'En curso' OR estado = 'Activo' OR estado IS NULL)
-            """)
-            tratamientos_vencer = cursor.fetchone()[0]
-            if tratamientos_vencer > 0:
-                alertas.append(("alta", "💊 MEDICINAS", f"{tratamientos_vencer} tratamiento(s) por vencer en 3 días"))
-
-            # 6. Animales con problemas de salud
-            cursor.execute("""
-                SELECT COUNT(*)
-                FROM animal
-                WHERE (estado = 'Activo' OR estado IS NULL)
-                AND (salud = 'Enfermo' OR salud = 'En cuarentena')
-            """)
-            enfermos = cursor.fetchone()[0]
-            if enfermos > 0:
-                alertas.append(("alta", "🏥 SALUD CRÍTICA", f"{enfermos} animal(es) con problemas de salud"))
-
-            # Mostrar alertas ordenadas por prioridad
-            if alertas:
-                # Separar por prioridad
-                alertas_alta = [a for a in alertas if a[0] == "alta"]
-                alertas_media = [a for a in alertas if a[0] == "media"]
-
-                # Mostrar alertas de alta prioridad
-                if alertas_alta:
-                    self.alertas_text.insert("end", "⚠️ ALERTAS URGENTES\n", "titulo_alta")
-                    self.alertas_text.insert("end", "─" * 40 + "\n", "separador")
-                    for _, titulo, desc in alertas_alta:
-                        self.alertas_text.insert("end", f"{titulo}\n", "titulo_alerta")
-                        self.alertas_text.insert("end", f"{desc}\n\n", "alerta_alta")
-
-                # Mostrar alertas de prioridad media
-                if alertas_media:
-                    self.alertas_text.insert("end", "📌 RECORDATORIOS\n", "titulo_media")
-                    self.alertas_text.insert("end", "─" * 40 + "\n", "separador")
-                    for _, titulo, desc in alertas_media:
-                        self.alertas_text.insert("end", f"{titulo}\n", "titulo_alerta")
-                        self.alertas_text.insert("end", f"{desc}\n\n", "alerta_media")
-            else:
-                self.alertas_text.insert("end", "✅ TODO EN ORDEN\n\n", "exito")
-                self.alertas_text.insert("end", "No hay alertas activas en el sistema.", "info")
-
-            # Configurar tags de colores (sin font en CTkTextbox)
-            self.alertas_text.tag_config("titulo_alta", foreground="#E53935")
-            self.alertas_text.tag_config("alerta_alta", foreground="#D32F2F")
-            self.alertas_text.tag_config("titulo_media", foreground="#FB8C00")
-            self.alertas_text.tag_config("alerta_media", foreground="#F57C00")
-            self.alertas_text.tag_config("titulo_alerta", foreground="#333333")
-            self.alertas_text.tag_config("exito", foreground="#43A047")
-            self.alertas_text.tag_config("info", foreground="#757575")
-            self.alertas_text.tag_config("separador", foreground="#BDBDBD")
+        self.logger.info(f"Cargados {len(eventos_lista)} eventos recientes")
 
-            self.alertas_text.configure(state="disabled")
-            self.logger.info(f"Generadas {len(alertas)} alertas en dashboard")
+    def _mostrar_alertas(self, alertas, error=None):
+        """Pinta las alertas generadas a partir de los resúmenes; None si falló la carga"""
+        self.alertas_text.configure(state="normal")
+        self.alertas_text.delete("1.0", "end")
 
-        except Exception as e:
-            self.logger.error(f"Error actualizando alertas: {e}")
-            self.alertas_text.configure(state="normal")
-            self.alertas_text.delete("1.0", "end")
+        if alertas is None:
             self.alertas_text.insert("end", "❌ Error cargando alertas\n")
-            self.alertas_text.insert("end", f"Detalle: {str(e)}")
+            self.alertas_text.insert("end", f"Detalle: {error}")
             self.alertas_text.configure(state="disabled")
+            return
+
+        # Mostrar alertas ordenadas por prioridad
+        if alertas:
+            # Separar por prioridad
+            alertas_alta = [a for a in alertas if a[0] == "alta"]
+            alertas_media = [a for a in alertas if a[0] == "media"]
+
+            # Mostrar alertas de alta prioridad
+            if alertas_alta:
+                self.alertas_text.insert("end", "⚠️ ALERTAS URGENTES\n", "titulo_alta")
+                self.alertas_text.insert("end", "─" * 40 + "\n", "separador")
+                for _, titulo, desc in alertas_alta:
+                    self.alertas_text.insert("end", f"{titulo}\n", "titulo_alerta")
+                    self.alertas_text.insert("end", f"{desc}\n\n", "alerta_alta")
+
+            # Mostrar alertas de prioridad media
+            if alertas_media:
+                self.alertas_text.insert("end", "📌 RECORDATORIOS\n", "titulo_media")
+                self.alertas_text.insert("end", "─" * 40 + "\n", "separador")
+                for _, titulo, desc in alertas_media:
+                    self.alertas_text.insert("end", f"{titulo}\n", "titulo_alerta")
+                    self.alertas_text.insert("end", f"{desc}\n\n", "alerta_media")
+        else:
+            self.alertas_text.insert("end", "✅ TODO EN ORDEN\n\n", "exito")
+            self.alertas_text.insert("end", "No hay alertas activas en el sistema.", "info")
+
+        # Configurar tags de colores (sin font en CTkTextbox)
+        self.alertas_text.tag_config("titulo_alta", foreground="#E53935")
+        self.alertas_text.tag_config("alerta_alta", foreground="#D32F2F")
+        self.alertas_text.tag_config("titulo_media", foreground="#FB8C00")
+        self.alertas_text.tag_config("alerta_media", foreground="#F57C00")
+        self.alertas_text.tag_config("titulo_alerta", foreground="#333333")
+        self.alertas_text.tag_config("exito", foreground="#43A047")
+        self.alertas_text.tag_config("info", foreground="#757575")
+        self.alertas_text.tag_config("separador", foreground="#BDBDBD")
+
+        self.alertas_text.configure(state="disabled")
+        self.logger.info(f"Generadas {len(alertas)} alertas en dashboard")
 
     def _mostrar_todas_alertas(self):
         """Abre una ventana con todas las alertas del sistema (implementación futura)"""
@@ -1054,9 +852,13 @@ class DashboardModule(ctk.CTkFrame):
 
     def limpiar_recursos(self):
         """Limpia recursos de matplotlib al cerrar"""
+        if self._carga is not None:
+            self._carga.cancelar()
         try:
+            import matplotlib.pyplot as plt
+
             plt.close(self.fig_estados)
-            plt.close(self.fig_produccion)
+            self.grafico_produccion.cancelar()
             self.logger.info("Recursos de matplotlib liberados")
         except Exception as e:
             self.logger.error(f"Error liberando recursos: {e}")
@@ -12,7 +12,6 @@ import sys
 import os
 from PIL import Image
 import shutil
-import openpyxl
 import unicodedata
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
@@ -1708,6 +1707,7 @@ class HerramientasModule(ctk.CTkFrame):
             return
         
         try:
+            import openpyxl
             wb = openpyxl.load_workbook(archivo)
             ws = wb.active
             if ws is None:
@@ -1862,6 +1862,7 @@ class HerramientasModule(ctk.CTkFrame):
             archivo_plantilla = os.path.join(plantillas_dir, 'plantilla_herramientas.xlsx')
             
             # Crear workbook
+            import openpyxl
             wb = openpyxl.Workbook()
             ws = wb.active
             if ws is None:
@@ -12,7 +12,6 @@ import sys
 import os
 from PIL import Image
 import shutil
-import openpyxl
 import unicodedata
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
@@ -1849,6 +1848,7 @@ class InsumosModule(ctk.CTkFrame):
             return
         
         try:
+            import openpyxl
             wb = openpyxl.load_workbook(archivo)
             ws = wb.active
             if ws is None:
@@ -2000,6 +2000,7 @@ class InsumosModule(ctk.CTkFrame):
             archivo_plantilla = os.path.join(plantillas_dir, 'plantilla_insumos.xlsx')
             
             # Crear workbook
+            import openpyxl
             wb = openpyxl.Workbook()
             ws = wb.active
             if ws is None:
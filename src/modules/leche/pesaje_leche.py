@@ -1,6 +1,7 @@
 import customtkinter as ctk
 from tkinter import ttk, messagebox
 from datetime import datetime, timedelta
+import logging
 import sqlite3
 import os, sys
 from calendar import monthrange
@@ -8,9 +9,7 @@ from calendar import monthrange
 # Importar matplotlib para gráficas
 try:
     import matplotlib.pyplot as plt
-    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-    from matplotlib.figure import Figure
-    import matplotlib.dates as mdates
+    from src.utils.charts import GraficoAgg
     MATPLOTLIB_AVAILABLE = True
 except ImportError:
     MATPLOTLIB_AVAILABLE = False
@@ -20,6 +19,10 @@ from database import get_db_connection
 from modules.utils.date_picker import attach_date_picker
 from modules.utils.ui import add_tooltip
 from modules.utils.colores import obtener_colores
+from modules.utils.tabla_virtual import TablaVirtual
+from database.consulta_paginada import FuentePaginada
+
+logger = logging.getLogger(__name__)
 
 class PesajeLecheFrame(ctk.CTkFrame):
     """
@@ -49,6 +52,10 @@ class PesajeLecheFrame(ctk.CTkFrame):
         # Variables de estado para análisis
         self.datos_mes_actual = {}
         self.datos_mes_anterior = {}
+
+        # Gráfica reutilizada entre refrescos (se crea al primer uso)
+        self._grafico = None
+        self._mensaje_grafica = None
         
         # UI
         self.crear_widgets()
@@ -179,7 +186,7 @@ class PesajeLecheFrame(ctk.CTkFrame):
         cols = ("id", "fecha", "animal", "total", "mañana", "tarde", "noche", "obs")
         self.tabla_registros = ttk.Treeview(list_frame, columns=cols, show="headings", 
                                            displaycolumns=("fecha", "animal", "total", "mañana", "tarde", "noche", "obs"),
-                                           height=12)
+                                           selectmode="browse", height=12)
         headings = {
             "id": "ID", "fecha": "Fecha", "animal": "Vaca", "total": "Total (L)",
             "mañana": "Mañana", "tarde": "Tarde", "noche": "Noche", "obs": "Observaciones"
@@ -193,9 +200,10 @@ class PesajeLecheFrame(ctk.CTkFrame):
             self.tabla_registros.column(c, width=widths[c], anchor="center")
         
         self.tabla_registros.pack(side="left", fill="both", expand=True)
-        scrollbar = ttk.Scrollbar(list_frame, orient="vertical", command=self.tabla_registros.yview)
-        self.tabla_registros.configure(yscrollcommand=scrollbar.set)
+        scrollbar = ttk.Scrollbar(list_frame, orient="vertical")
         scrollbar.pack(side="right", fill="y")
+        # Solo las filas visibles se materializan; las páginas se leen al desplazarse
+        self._registros_virtual = TablaVirtual(self.tabla_registros, scrollbar, formatear=self._valores_registro)
 
         # Botones de acción
         action_row = ctk.CTkFrame(list_frame, fg_color="transparent")
@@ -517,6 +525,7 @@ class PesajeLecheFrame(ctk.CTkFrame):
                 conn.commit()
             
             messagebox.showinfo("Éxito", "Registro guardado correctamente.")
+            self._notificar_detector_leche(animal_id, fecha, l_man + l_tar + l_noc)
             self.limpiar_formulario(reset_date=False)
             self.actualizar_analisis()
         except sqlite3.IntegrityError:
@@ -524,14 +533,25 @@ class PesajeLecheFrame(ctk.CTkFrame):
         except Exception as e:
             messagebox.showerror("Error", f"No se pudo guardar:\n{e}")
 
+    def _notificar_detector_leche(self, animal_id, fecha, litros):
+        """Pasa el pesaje al detector de caídas por vaca; nunca bloquea el guardado."""
+        try:
+            from src.services.milk_stream_detector import get_milk_stream_detector
+            alerta = get_milk_stream_detector().registrar(animal_id, fecha, litros)
+        except Exception as e:
+            logger.warning(f"Detector de leche no disponible: {e}")
+            return
+        if alerta:
+            messagebox.showwarning("Alerta de producción", alerta["descripcion"])
+
     def eliminar_registro(self):
         """Elimina un registro seleccionado"""
-        sel = self.tabla_registros.selection()
-        if not sel:
+        registro = self._registros_virtual.seleccion()
+        if not registro:
             messagebox.showwarning("Atención", "Seleccione un registro para eliminar.")
             return
         
-        reg_id = self.tabla_registros.item(sel[0])['values'][0]
+        reg_id = registro['id']
         
         if not messagebox.askyesno("Confirmar", "¿Eliminar este registro?"):
             return
@@ -571,41 +591,47 @@ class PesajeLecheFrame(ctk.CTkFrame):
 
     def _cargar_registros(self):
         """Carga los últimos 30 días de registros en la tabla"""
-        for item in self.tabla_registros.get_children():
-            self.tabla_registros.delete(item)
-        
         if not self._finca_id_actual:
+            self._registros_virtual.cargar(None)
             return
 
         desde = (datetime.now() - timedelta(days=30)).strftime("%Y-%m-%d")
         try:
-            with get_db_connection() as conn:
-                cur = conn.cursor()
-                cur.execute("""
+            fuente = FuentePaginada(
+                get_db_connection,
+                """
                     SELECT pl.id, pl.fecha, a.codigo, COALESCE(a.nombre,'') AS nombre,
-                           pl.litros_manana, pl.litros_tarde, pl.litros_noche, pl.observaciones
+                           pl.litros_manana, pl.litros_tarde, pl.litros_noche, pl.observaciones,
+                           COALESCE(pl.litros_manana, 0) + COALESCE(pl.litros_tarde, 0)
+                               + COALESCE(pl.litros_noche, 0) AS total
                     FROM produccion_leche pl
                     JOIN animal a ON a.id = pl.animal_id
                     WHERE pl.fecha >= ? AND a.id_finca = ?
-                    ORDER BY pl.fecha DESC, a.codigo
-                """, (desde, self._finca_id_actual))
-                
-                for r in cur.fetchall():
-                    total = (r[4] or 0) + (r[5] or 0) + (r[6] or 0)
-                    valores = (
-                        str(r[0]),
-                        str(r[1]),
-                        f"{r[2]} - {r[3]}",
-                        f"{total:.2f}",
-                        f"{(r[4] or 0):.2f}",
-                        f"{(r[5] or 0):.2f}",
-                        f"{(r[6] or 0):.2f}",
-                        (r[7] or '')
-                    )
-                    self.tabla_registros.insert('', 'end', values=valores)
+                """,
+                (desde, self._finca_id_actual),
+                columnas_orden={"fecha": "fecha", "animal": "codigo", "total": "total",
+                                "mañana": "litros_manana", "tarde": "litros_tarde", "noche": "litros_noche"},
+                orden="fecha", descendente=True,
+            )
+            self._registros_virtual.cargar(fuente)
         except Exception as e:
             messagebox.showerror("Error", f"No se pudieron cargar registros:\n{e}")
 
+    @staticmethod
+    def _valores_registro(r, _indice):
+        """Fila de la tabla de registros: (values, tags)"""
+        valores = (
+            str(r['id']),
+            str(r['fecha']),
+            f"{r['codigo']} - {r['nombre']}",
+            f"{r['total']:.2f}",
+            f"{(r['litros_manana'] or 0):.2f}",
+            f"{(r['litros_tarde'] or 0):.2f}",
+            f"{(r['litros_noche'] or 0):.2f}",
+            (r['observaciones'] or '')
+        )
+        return valores, ()
+
     def _actualizar_estadisticas(self):
         """Actualiza estadísticas del mes actual y hoy"""
         if not self._finca_id_actual:
@@ -815,9 +841,12 @@ class PesajeLecheFrame(ctk.CTkFrame):
         if not MATPLOTLIB_AVAILABLE or not self._finca_id_actual:
             return
 
-        # Limpiar frame anterior
-        for widget in self.frame_grafica.winfo_children():
-            widget.destroy()
+        # Ocultar lo anterior (la figura se conserva para reutilizar sus series)
+        if self._mensaje_grafica is not None:
+            self._mensaje_grafica.destroy()
+            self._mensaje_grafica = None
+        if self._grafico is not None:
+            self._grafico.widget.pack_forget()
 
         tipo_dato = self.combo_tipo_dato.get()
         tipo_visual = self.combo_tipo_visualizacion.get()
@@ -838,12 +867,39 @@ class PesajeLecheFrame(ctk.CTkFrame):
         except Exception as e:
             messagebox.showerror("Error", f"Error al generar gráfica:\n{e}")
 
+    def _mostrar_grafica(self, dibujar, clave=None):
+        """
+        Muestra la gráfica compartida y la dibuja en segundo plano.
+
+        dibujar(g) recibe el GraficoAgg (g.ejes es el Axes) y no debe tocar
+        widgets; con la misma clave que el render anterior se reutilizan las
+        series (g.linea), con clave None se limpian los ejes.
+        """
+        if self._grafico is None:
+            self._grafico = GraficoAgg(self.frame_grafica, ancho_px=960, alto_px=480, dpi=80,
+                                       fondo='#2a2a2a', fondo_ejes='#3a3a3a')
+        self._grafico.widget.pack(fill="both", expand=True)
+        self._grafico.solicitar(dibujar, clave)
+
+    def _mostrar_mensaje_grafica(self, texto, **estilo):
+        """Mensaje en lugar de la gráfica (sin datos / todo en orden)"""
+        self._mensaje_grafica = ctk.CTkLabel(self.frame_grafica, text=texto,
+                                             font=("Segoe UI", 12), **estilo)
+        self._mensaje_grafica.pack(pady=50)
+
     # ============================================================================
     # MÉTODOS RENDERIZADORES DE GRÁFICAS
     # ============================================================================
     
     def _render_produccion_diaria(self, tipo_visual, vaca_filtro):
         """Renderiza producción diaria según tipo de visualización"""
+        if tipo_visual == "Pastel":
+            messagebox.showwarning("Atención", "El gráfico de pastel no es aplicable a datos diarios.\nUse 'Producción por Vaca'")
+            return
+        if tipo_visual == "Columnas Apiladas":
+            messagebox.showwarning("Atención", "Use 'Producción por Turno' para visualizar columnas apiladas")
+            return
+
         ahora = datetime.now()
         primer_dia = ahora.replace(day=1)
         
@@ -879,45 +935,40 @@ class PesajeLecheFrame(ctk.CTkFrame):
             return
 
         if not datos:
-            label = ctk.CTkLabel(self.frame_grafica, text="No hay datos para mostrar",
-                                font=("Segoe UI", 12))
-            label.pack(pady=50)
+            self._mostrar_mensaje_grafica("No hay datos para mostrar")
             return
 
         fechas = [datetime.strptime(str(d[0]), "%Y-%m-%d") for d in datos]
         totales = [d[1] or 0 for d in datos]
 
-        fig = Figure(figsize=(12, 6), dpi=80, facecolor='#2a2a2a')
-        ax = fig.add_subplot(111, facecolor='#3a3a3a')
-        
-        if tipo_visual == "Línea":
-            ax.plot(fechas, totales, marker='o', linewidth=2, color='#FBC02D', markersize=6)  # type: ignore[arg-type]
-            ax.fill_between(fechas, totales, alpha=0.3, color='#FBC02D')  # type: ignore[arg-type]
-        elif tipo_visual == "Barras":
-            ax.bar(fechas, totales, color='#4CAF50', alpha=0.8, edgecolor='white', width=0.8)  # type: ignore[arg-type]
-        elif tipo_visual == "Combinada (Columnas+Línea)":
-            ax.bar(fechas, totales, color='#4CAF50', alpha=0.6)  # type: ignore[arg-type]
-            ax.plot(fechas, totales, marker='o', linewidth=2.5, color='#FFC107', markersize=7)  # type: ignore[arg-type]
-        elif tipo_visual == "Pastel":
-            messagebox.showwarning("Atención", "El gráfico de pastel no es aplicable a datos diarios.\nUse 'Producción por Vaca'")
-            return
-        elif tipo_visual == "Columnas Apiladas":
-            messagebox.showwarning("Atención", "Use 'Producción por Turno' para visualizar columnas apiladas")
-            return
-        
-        ax.set_xlabel('Fecha', color='white', fontsize=10)
-        ax.set_ylabel('Litros', color='white', fontsize=10)
-        ax.set_title(f'Producción Total Diaria - {titulo_extra}', color='white', fontsize=14, fontweight='bold')
-        ax.grid(True, alpha=0.3, color='white')
-        ax.tick_params(colors='white')
-        fig.autofmt_xdate(rotation=45)
-        
-        canvas = FigureCanvasTkAgg(fig, master=self.frame_grafica)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill="both", expand=True)
+        def dibujar(g):
+            ax = g.ejes
+            if tipo_visual == "Línea":
+                g.linea("total", fechas, totales, marker='o', linewidth=2, color='#FBC02D', markersize=6)
+                g.relleno("relleno", fechas, totales, alpha=0.3, color='#FBC02D')
+                g.ajustar()
+            elif tipo_visual == "Barras":
+                ax.bar(fechas, totales, color='#4CAF50', alpha=0.8, edgecolor='white', width=0.8)  # type: ignore[arg-type]
+            elif tipo_visual == "Combinada (Columnas+Línea)":
+                ax.bar(fechas, totales, color='#4CAF50', alpha=0.6)  # type: ignore[arg-type]
+                g.linea("total", fechas, totales, marker='o', linewidth=2.5, color='#FFC107', markersize=7)
+
+            ax.set_xlabel('Fecha', color='white', fontsize=10)
+            ax.set_ylabel('Litros', color='white', fontsize=10)
+            ax.set_title(f'Producción Total Diaria - {titulo_extra}', color='white', fontsize=14, fontweight='bold')
+            ax.grid(True, alpha=0.3, color='white')
+            ax.tick_params(colors='white')
+            g.figura.autofmt_xdate(rotation=45)
+
+        # Solo la línea reutiliza la serie entre refrescos; las barras se rehacen
+        self._mostrar_grafica(dibujar, clave=("diaria", tipo_visual) if tipo_visual == "Línea" else None)
 
     def _render_produccion_por_vaca(self, tipo_visual, vaca_filtro):
         """Renderiza producción acumulada por vaca"""
+        if tipo_visual not in ("Barras", "Pastel", "Línea", "Combinada (Columnas+Línea)"):
+            messagebox.showwarning("Atención", "Use 'Producción por Turno' para columnas apiladas")
+            return
+
         ahora = datetime.now()
         primer_dia = ahora.replace(day=1)
         
@@ -940,58 +991,53 @@ class PesajeLecheFrame(ctk.CTkFrame):
             return
 
         if not datos:
-            label = ctk.CTkLabel(self.frame_grafica, text="No hay datos para mostrar",
-                                font=("Segoe UI", 12))
-            label.pack(pady=50)
+            self._mostrar_mensaje_grafica("No hay datos para mostrar")
             return
 
         etiquetas = [f"{d[0]} - {d[1]}".strip().rstrip('- ') for d in datos]
         valores = [d[2] or 0 for d in datos]
-
-        fig = Figure(figsize=(12, 6), dpi=80, facecolor='#2a2a2a')
-        ax = fig.add_subplot(111, facecolor='#3a3a3a')
-        
         colores = ['#4CAF50' if v >= self.LIMITE_PRODUCCION_BAJA else '#FF6B6B' for v in valores]
 
-        if tipo_visual == "Barras":
-            bars = ax.barh(etiquetas, valores, color=colores, alpha=0.8, edgecolor='white')
-            for i, (bar, val) in enumerate(zip(bars, valores)):
-                ax.text(val + 0.2, i, f'{val:.1f}L', va='center', color='white', fontsize=10)
-        elif tipo_visual == "Pastel":
-            valores_pos = [v for v in valores if v > 0]
-            etiquetas_pos = [e for e, v in zip(etiquetas, valores) if v > 0]
-            if valores_pos:
-                colores_pastel = plt.get_cmap('Set3')(range(len(valores_pos)))
-                pie_result = ax.pie(valores_pos, labels=etiquetas_pos, autopct='%1.1f%%',
-                                                   colors=colores_pastel, startangle=90, textprops={'color': 'white', 'fontsize': 9})  # type: ignore[arg-type]
-                # pie() puede retornar 2 o 3 valores; tomar primer intento
-                autotexts = pie_result[2] if len(pie_result) > 2 else []
-                for autotext in autotexts:
-                    autotext.set_color('black')
-                    autotext.set_fontweight('bold')
-        elif tipo_visual == "Línea":
-            ax.plot(range(len(etiquetas)), valores, marker='o', linewidth=2, color='#00BCD4', markersize=8)
-            ax.set_xticks(range(len(etiquetas)))
-            ax.set_xticklabels(etiquetas, rotation=45, ha='right')
-        elif tipo_visual == "Combinada (Columnas+Línea)":
-            ax.bar(range(len(etiquetas)), valores, color=colores, alpha=0.6, edgecolor='white')
-            ax.plot(range(len(etiquetas)), valores, marker='o', linewidth=2.5, color='#FFC107', markersize=8)
-            ax.set_xticks(range(len(etiquetas)))
-            ax.set_xticklabels(etiquetas, rotation=45, ha='right')
-        else:  # Columnas Apiladas (no aplica aquí)
-            messagebox.showwarning("Atención", "Use 'Producción por Turno' para columnas apiladas")
-            return
-        
-        ax.set_title('Producción Total por Vaca (Mes Actual)', color='white', fontsize=14, fontweight='bold')
-        ax.grid(True, alpha=0.3, color='white', axis='y' if tipo_visual == "Barras" else 'both')
-        ax.tick_params(colors='white')
-        
-        canvas = FigureCanvasTkAgg(fig, master=self.frame_grafica)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill="both", expand=True)
+        def dibujar(g):
+            ax = g.ejes
+            if tipo_visual == "Barras":
+                bars = ax.barh(etiquetas, valores, color=colores, alpha=0.8, edgecolor='white')
+                for i, (bar, val) in enumerate(zip(bars, valores)):
+                    ax.text(val + 0.2, i, f'{val:.1f}L', va='center', color='white', fontsize=10)
+            elif tipo_visual == "Pastel":
+                valores_pos = [v for v in valores if v > 0]
+                etiquetas_pos = [e for e, v in zip(etiquetas, valores) if v > 0]
+                if valores_pos:
+                    colores_pastel = plt.get_cmap('Set3')(range(len(valores_pos)))
+                    pie_result = ax.pie(valores_pos, labels=etiquetas_pos, autopct='%1.1f%%',
+                                                       colors=colores_pastel, startangle=90, textprops={'color': 'white', 'fontsize': 9})  # type: ignore[arg-type]
+                    # pie() puede retornar 2 o 3 valores; tomar primer intento
+                    autotexts = pie_result[2] if len(pie_result) > 2 else []
+                    for autotext in autotexts:
+                        autotext.set_color('black')
+                        autotext.set_fontweight('bold')
+            elif tipo_visual == "Línea":
+                ax.plot(range(len(etiquetas)), valores, marker='o', linewidth=2, color='#00BCD4', markersize=8)
+                ax.set_xticks(range(len(etiquetas)))
+                ax.set_xticklabels(etiquetas, rotation=45, ha='right')
+            elif tipo_visual == "Combinada (Columnas+Línea)":
+                ax.bar(range(len(etiquetas)), valores, color=colores, alpha=0.6, edgecolor='white')
+                ax.plot(range(len(etiquetas)), valores, marker='o', linewidth=2.5, color='#FFC107', markersize=8)
+                ax.set_xticks(range(len(etiquetas)))
+                ax.set_xticklabels(etiquetas, rotation=45, ha='right')
+            
+            ax.set_title('Producción Total por Vaca (Mes Actual)', color='white', fontsize=14, fontweight='bold')
+            ax.grid(True, alpha=0.3, color='white', axis='y' if tipo_visual == "Barras" else 'both')
+            ax.tick_params(colors='white')
+
+        self._mostrar_grafica(dibujar)
 
     def _render_baja_produccion(self, tipo_visual, vaca_filtro):
         """Renderiza vacas con baja producción"""
+        if tipo_visual not in ("Barras", "Pastel", "Línea", "Combinada (Columnas+Línea)"):
+            messagebox.showwarning("Atención", "Tipo de visualización no compatible")
+            return
+
         primer_dia_mes = datetime.now().replace(day=1).strftime("%Y-%m-%d")
         
         try:
@@ -1014,56 +1060,50 @@ class PesajeLecheFrame(ctk.CTkFrame):
             return
 
         if not datos:
-            label = ctk.CTkLabel(self.frame_grafica, 
-                               text=f"✅ ¡Excelente! Todas las vacas tienen producción ≥ {self.LIMITE_PRODUCCION_BAJA}L",
-                               font=("Segoe UI", 12), text_color="lightgreen")
-            label.pack(pady=50)
+            self._mostrar_mensaje_grafica(
+                f"✅ ¡Excelente! Todas las vacas tienen producción ≥ {self.LIMITE_PRODUCCION_BAJA}L",
+                text_color="lightgreen")
             return
 
         etiquetas = [f"{d[0]} - {d[1]}".strip().rstrip('- ') for d in datos]
         valores = [d[2] for d in datos]
-
-        fig = Figure(figsize=(12, 6), dpi=80, facecolor='#2a2a2a')
-        ax = fig.add_subplot(111, facecolor='#3a3a3a')
-
-        if tipo_visual == "Barras":
-            bars = ax.barh(etiquetas, valores, color='#FF6B6B', alpha=0.8, edgecolor='white')
-            ax.axvline(x=self.LIMITE_PRODUCCION_BAJA, color='#FBC02D', linestyle='--', linewidth=2, label=f'Límite ({self.LIMITE_PRODUCCION_BAJA}L)')
-            for i, (bar, val) in enumerate(zip(bars, valores)):
-                ax.text(val + 0.1, i, f'{val:.1f}L', va='center', color='white', fontsize=10)
-        elif tipo_visual == "Pastel":
-            colores_pastel = plt.get_cmap('Set3')(range(len(valores)))
-            pie_result = ax.pie(valores, labels=etiquetas, autopct='%1.1f%%',
-                                               colors=colores_pastel, startangle=90, textprops={'color': 'white', 'fontsize': 9})  # type: ignore[arg-type]
-            autotexts = pie_result[2] if len(pie_result) > 2 else []
-            for autotext in autotexts:
-                autotext.set_color('black')
-                autotext.set_fontweight('bold')
-        elif tipo_visual == "Línea":
-            ax.plot(range(len(etiquetas)), valores, marker='o', linewidth=2, color='#FF6B6B', markersize=8)
-            ax.axhline(y=self.LIMITE_PRODUCCION_BAJA, color='#FBC02D', linestyle='--', linewidth=2, label=f'Límite ({self.LIMITE_PRODUCCION_BAJA}L)')
-            ax.set_xticks(range(len(etiquetas)))
-            ax.set_xticklabels(etiquetas, rotation=45, ha='right')
-        elif tipo_visual == "Combinada (Columnas+Línea)":
-            ax.bar(range(len(etiquetas)), valores, color='#FF6B6B', alpha=0.6, edgecolor='white')
-            ax.plot(range(len(etiquetas)), valores, marker='o', linewidth=2, color='#FFC107', markersize=8)
-            ax.set_xticks(range(len(etiquetas)))
-            ax.set_xticklabels(etiquetas, rotation=45, ha='right')
-        else:
-            messagebox.showwarning("Atención", "Tipo de visualización no compatible")
-            return
-
-        ax.set_xlabel('Promedio de Producción (L)', color='white', fontsize=10)
-        ax.set_title(f'Vacas con Baja Producción (< {self.LIMITE_PRODUCCION_BAJA}L)', 
-                    color='white', fontsize=14, fontweight='bold')
-        if tipo_visual == "Barras":
-            ax.legend(loc='lower right', labelcolor='white')
-        ax.grid(True, alpha=0.3, color='white', axis='x' if tipo_visual == "Barras" else 'both')
-        ax.tick_params(colors='white')
-        
-        canvas = FigureCanvasTkAgg(fig, master=self.frame_grafica)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill="both", expand=True)
+        limite = self.LIMITE_PRODUCCION_BAJA
+
+        def dibujar(g):
+            ax = g.ejes
+            if tipo_visual == "Barras":
+                bars = ax.barh(etiquetas, valores, color='#FF6B6B', alpha=0.8, edgecolor='white')
+                ax.axvline(x=limite, color='#FBC02D', linestyle='--', linewidth=2, label=f'Límite ({limite}L)')
+                for i, (bar, val) in enumerate(zip(bars, valores)):
+                    ax.text(val + 0.1, i, f'{val:.1f}L', va='center', color='white', fontsize=10)
+            elif tipo_visual == "Pastel":
+                colores_pastel = plt.get_cmap('Set3')(range(len(valores)))
+                pie_result = ax.pie(valores, labels=etiquetas, autopct='%1.1f%%',
+                                                   colors=colores_pastel, startangle=90, textprops={'color': 'white', 'fontsize': 9})  # type: ignore[arg-type]
+                autotexts = pie_result[2] if len(pie_result) > 2 else []
+                for autotext in autotexts:
+                    autotext.set_color('black')
+                    autotext.set_fontweight('bold')
+            elif tipo_visual == "Línea":
+                ax.plot(range(len(etiquetas)), valores, marker='o', linewidth=2, color='#FF6B6B', markersize=8)
+                ax.axhline(y=limite, color='#FBC02D', linestyle='--', linewidth=2, label=f'Límite ({limite}L)')
+                ax.set_xticks(range(len(etiquetas)))
+                ax.set_xticklabels(etiquetas, rotation=45, ha='right')
+            elif tipo_visual == "Combinada (Columnas+Línea)":
+                ax.bar(range(len(etiquetas)), valores, color='#FF6B6B', alpha=0.6, edgecolor='white')
+                ax.plot(range(len(etiquetas)), valores, marker='o', linewidth=2, color='#FFC107', markersize=8)
+                ax.set_xticks(range(len(etiquetas)))
+                ax.set_xticklabels(etiquetas, rotation=45, ha='right')
+
+            ax.set_xlabel('Promedio de Producción (L)', color='white', fontsize=10)
+            ax.set_title(f'Vacas con Baja Producción (< {limite}L)', 
+                        color='white', fontsize=14, fontweight='bold')
+            if tipo_visual == "Barras":
+                ax.legend(loc='lower right', labelcolor='white')
+            ax.grid(True, alpha=0.3, color='white', axis='x' if tipo_visual == "Barras" else 'both')
+            ax.tick_params(colors='white')
+
+        self._mostrar_grafica(dibujar)
 
     def _render_comparativa_meses(self, tipo_visual, vaca_filtro):
         """Renderiza comparativa de meses anterior vs actual"""
@@ -1102,45 +1142,45 @@ class PesajeLecheFrame(ctk.CTkFrame):
         meses = [f"Mes Anterior\n({primer_dia_anterior.strftime('%b')})", 
                 f"Mes Actual\n({primer_dia_actual.strftime('%b')})"]
         valores = [total_ant, total_act]
-
-        fig = Figure(figsize=(10, 6), dpi=80, facecolor='#2a2a2a')
-        ax = fig.add_subplot(111, facecolor='#3a3a3a')
-        
         colores = ['#2196F3', '#4CAF50']
 
-        if tipo_visual == "Barras":
-            bars = ax.barh(meses, valores, color=colores, alpha=0.8, edgecolor='white', height=0.5)
-            for bar, val in zip(bars, valores):
-                ax.text(val + 20, bar.get_y() + bar.get_height()/2, f'{val:.0f}L',
-                       va='center', color='white', fontsize=12, fontweight='bold')
-        elif tipo_visual == "Línea":
-            ax.plot(meses, valores, marker='o', linewidth=2.5, color='#00BCD4', markersize=10)
-            for i, (mes, val) in enumerate(zip(meses, valores)):
-                ax.text(i, val + 100, f'{val:.0f}L', ha='center', color='white', fontsize=11, fontweight='bold')
-        else:  # Columnas, Pastel, Combinada
-            bars = ax.bar(meses, valores, color=colores, alpha=0.8, edgecolor='white', width=0.6)
-            for bar, val in zip(bars, valores):
-                height = bar.get_height()
-                ax.text(bar.get_x() + bar.get_width()/2., height,
-                       f'{val:.0f}L', ha='center', va='bottom', color='white', fontsize=12, fontweight='bold')
-        
-        if total_ant > 0:
-            cambio = ((total_act - total_ant) / total_ant) * 100
-            ax.text(0.5, max(valores) * 0.9, f'Cambio: {cambio:+.1f}%',
-                   transform=ax.transAxes, fontsize=14, fontweight='bold',
-                   ha='center', bbox=dict(boxstyle='round', facecolor='#FBC02D', alpha=0.8))
-        
-        ax.set_ylabel('Litros Totales', color='white', fontsize=11)
-        ax.set_title('Comparativa de Producción Total: Mes Anterior vs Actual', 
-                    color='white', fontsize=14, fontweight='bold')
-        ax.tick_params(colors='white')
-        
-        canvas = FigureCanvasTkAgg(fig, master=self.frame_grafica)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill="both", expand=True)
+        def dibujar(g):
+            ax = g.ejes
+            if tipo_visual == "Barras":
+                bars = ax.barh(meses, valores, color=colores, alpha=0.8, edgecolor='white', height=0.5)
+                for bar, val in zip(bars, valores):
+                    ax.text(val + 20, bar.get_y() + bar.get_height()/2, f'{val:.0f}L',
+                           va='center', color='white', fontsize=12, fontweight='bold')
+            elif tipo_visual == "Línea":
+                ax.plot(meses, valores, marker='o', linewidth=2.5, color='#00BCD4', markersize=10)
+                for i, (mes, val) in enumerate(zip(meses, valores)):
+                    ax.text(i, val + 100, f'{val:.0f}L', ha='center', color='white', fontsize=11, fontweight='bold')
+            else:  # Columnas, Pastel, Combinada
+                bars = ax.bar(meses, valores, color=colores, alpha=0.8, edgecolor='white', width=0.6)
+                for bar, val in zip(bars, valores):
+                    height = bar.get_height()
+                    ax.text(bar.get_x() + bar.get_width()/2., height,
+                           f'{val:.0f}L', ha='center', va='bottom', color='white', fontsize=12, fontweight='bold')
+            
+            if total_ant > 0:
+                cambio = ((total_act - total_ant) / total_ant) * 100
+                ax.text(0.5, max(valores) * 0.9, f'Cambio: {cambio:+.1f}%',
+                       transform=ax.transAxes, fontsize=14, fontweight='bold',
+                       ha='center', bbox=dict(boxstyle='round', facecolor='#FBC02D', alpha=0.8))
+            
+            ax.set_ylabel('Litros Totales', color='white', fontsize=11)
+            ax.set_title('Comparativa de Producción Total: Mes Anterior vs Actual', 
+                        color='white', fontsize=14, fontweight='bold')
+            ax.tick_params(colors='white')
+
+        self._mostrar_grafica(dibujar)
 
     def _render_produccion_por_turno(self, tipo_visual, vaca_filtro):
         """Renderiza producción por turno (Mañana, Tarde, Noche)"""
+        if tipo_visual not in ("Columnas Apiladas", "Línea", "Barras"):
+            messagebox.showwarning("Atención", "Tipo de visualización no compatible con datos por turno")
+            return
+
         ahora = datetime.now()
         primer_dia = ahora.replace(day=1)
         
@@ -1163,9 +1203,7 @@ class PesajeLecheFrame(ctk.CTkFrame):
             return
 
         if not datos:
-            label = ctk.CTkLabel(self.frame_grafica, text="No hay datos para mostrar",
-                                font=("Segoe UI", 12))
-            label.pack(pady=50)
+            self._mostrar_mensaje_grafica("No hay datos para mostrar")
             return
 
         fechas = [datetime.strptime(str(d[0]), "%Y-%m-%d") for d in datos]
@@ -1173,43 +1211,38 @@ class PesajeLecheFrame(ctk.CTkFrame):
         tarde = [d[2] or 0 for d in datos]
         noche = [d[3] or 0 for d in datos]
 
-        fig = Figure(figsize=(12, 6), dpi=80, facecolor='#2a2a2a')
-        ax = fig.add_subplot(111, facecolor='#3a3a3a')
-
-        if tipo_visual == "Columnas Apiladas":
-            x = range(len(fechas))
-            ax.bar(x, manana, label='Mañana', color='#FF9800', alpha=0.8)
-            ax.bar(x, tarde, bottom=manana, label='Tarde', color='#2196F3', alpha=0.8)
-            ax.bar(x, noche, bottom=[m+t for m,t in zip(manana, tarde)], label='Noche', color='#9C27B0', alpha=0.8)
-            ax.set_xticks(x[::max(1, len(x)//10)])
-            ax.set_xticklabels([f.strftime('%d/%m') for f in fechas[::max(1, len(fechas)//10)]], rotation=45)
-        elif tipo_visual == "Línea":
-            ax.plot(fechas, manana, marker='o', linewidth=2, color='#FF9800', label='Mañana', markersize=5)  # type: ignore[arg-type]
-            ax.plot(fechas, tarde, marker='s', linewidth=2, color='#2196F3', label='Tarde', markersize=5)  # type: ignore[arg-type]
-            ax.plot(fechas, noche, marker='^', linewidth=2, color='#9C27B0', label='Noche', markersize=5)  # type: ignore[arg-type]
-            fig.autofmt_xdate(rotation=45)
-        elif tipo_visual == "Barras":
-            x = range(len(fechas))
-            width = 0.25
-            ax.bar([i - width for i in x], manana, width, label='Mañana', color='#FF9800', alpha=0.8)
-            ax.bar(x, tarde, width, label='Tarde', color='#2196F3', alpha=0.8)
-            ax.bar([i + width for i in x], noche, width, label='Noche', color='#9C27B0', alpha=0.8)
-            ax.set_xticks(x[::max(1, len(x)//10)])
-            ax.set_xticklabels([f.strftime('%d/%m') for f in fechas[::max(1, len(fechas)//10)]], rotation=45)
-        else:
-            messagebox.showwarning("Atención", "Tipo de visualización no compatible con datos por turno")
-            return
-        
-        ax.set_xlabel('Fecha', color='white', fontsize=10)
-        ax.set_ylabel('Litros', color='white', fontsize=10)
-        ax.set_title('Producción por Turno Horario', color='white', fontsize=14, fontweight='bold')
-        ax.legend(loc='upper left', labelcolor='white')
-        ax.grid(True, alpha=0.3, color='white', axis='y')
-        ax.tick_params(colors='white')
-        
-        canvas = FigureCanvasTkAgg(fig, master=self.frame_grafica)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill="both", expand=True)
+        def dibujar(g):
+            ax = g.ejes
+            if tipo_visual == "Columnas Apiladas":
+                x = range(len(fechas))
+                ax.bar(x, manana, label='Mañana', color='#FF9800', alpha=0.8)
+                ax.bar(x, tarde, bottom=manana, label='Tarde', color='#2196F3', alpha=0.8)
+                ax.bar(x, noche, bottom=[m+t for m,t in zip(manana, tarde)], label='Noche', color='#9C27B0', alpha=0.8)
+                ax.set_xticks(x[::max(1, len(x)//10)])
+                ax.set_xticklabels([f.strftime('%d/%m') for f in fechas[::max(1, len(fechas)//10)]], rotation=45)
+            elif tipo_visual == "Línea":
+                g.linea("manana", fechas, manana, marker='o', linewidth=2, color='#FF9800', label='Mañana', markersize=5)
+                g.linea("tarde", fechas, tarde, marker='s', linewidth=2, color='#2196F3', label='Tarde', markersize=5)
+                g.linea("noche", fechas, noche, marker='^', linewidth=2, color='#9C27B0', label='Noche', markersize=5)
+                g.ajustar()
+                g.figura.autofmt_xdate(rotation=45)
+            elif tipo_visual == "Barras":
+                x = range(len(fechas))
+                width = 0.25
+                ax.bar([i - width for i in x], manana, width, label='Mañana', color='#FF9800', alpha=0.8)
+                ax.bar(x, tarde, width, label='Tarde', color='#2196F3', alpha=0.8)
+                ax.bar([i + width for i in x], noche, width, label='Noche', color='#9C27B0', alpha=0.8)
+                ax.set_xticks(x[::max(1, len(x)//10)])
+                ax.set_xticklabels([f.strftime('%d/%m') for f in fechas[::max(1, len(fechas)//10)]], rotation=45)
+            
+            ax.set_xlabel('Fecha', color='white', fontsize=10)
+            ax.set_ylabel('Litros', color='white', fontsize=10)
+            ax.set_title('Producción por Turno Horario', color='white', fontsize=14, fontweight='bold')
+            ax.legend(loc='upper left', labelcolor='white')
+            ax.grid(True, alpha=0.3, color='white', axis='y')
+            ax.tick_params(colors='white')
+
+        self._mostrar_grafica(dibujar, clave=("turno", tipo_visual) if tipo_visual == "Línea" else None)
 
 
 # Helper para probar
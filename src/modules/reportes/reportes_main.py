@@ -16,6 +16,7 @@ except Exception:
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
 from database import db
+from database.herd_summary import contar as contar_animales
 
 
 class ReportesModule(ctk.CTkFrame):
@@ -339,23 +340,16 @@ class ReportesModule(ctk.CTkFrame):
                 stats_frame.pack(fill="both", expand=True, padx=4, pady=10)
 
                 # Estadísticas principales
-                cursor.execute("SELECT COUNT(*) FROM animal WHERE estado = 'Activo'")
-                total_animales = cursor.fetchone()[0]
-
-                cursor.execute("SELECT COUNT(*) FROM animal WHERE estado = 'Vendido'")
-                animales_vendidos = cursor.fetchone()[0]
-
-                cursor.execute("SELECT COUNT(*) FROM animal WHERE estado = 'Muerto'")
-                animales_muertos = cursor.fetchone()[0]
+                # Conteos de animales desde herd_summary (sin recorrer animal)
+                total_animales = contar_animales(conn, estados=("Activo",))
+                animales_vendidos = contar_animales(conn, estados=("Vendido",))
+                animales_muertos = contar_animales(conn, estados=("Muerto",))
 
                 cursor.execute("SELECT COUNT(*) FROM potrero WHERE estado = 'Activo'")
                 total_potreros = cursor.fetchone()[0]
 
-                cursor.execute("SELECT COUNT(*) FROM animal WHERE sexo = 'Macho' AND estado = 'Activo'")
-                machos = cursor.fetchone()[0]
-
-                cursor.execute("SELECT COUNT(*) FROM animal WHERE sexo = 'Hembra' AND estado = 'Activo'")
-                hembras = cursor.fetchone()[0]
+                machos = contar_animales(conn, estados=("Activo",), sexo="Macho")
+                hembras = contar_animales(conn, estados=("Activo",), sexo="Hembra")
 
                 cursor.execute("SELECT COUNT(*) FROM empleado WHERE estado = 'Activo'")
                 total_empleados = cursor.fetchone()[0]
@@ -931,17 +925,35 @@ Características próximas:
             )
             if not filename:
                 return
-            # Preparar datos según reporte
-            headers, rows = self._generar_dataset(tipo_reporte)
-            if not rows:
-                messagebox.showinfo("Exportación", "No hay datos para exportar con los filtros actuales.")
-                return
-            # Escritura con BOM para Excel
-            with open(filename, "w", encoding="utf-8-sig", newline="") as f:
-                writer = csv.writer(f)
-                writer.writerow(headers)
-                writer.writerows(rows)
-            messagebox.showinfo("Éxito", f"Reporte exportado correctamente ({len(rows)} filas).")
+            from modules.utils.progreso_exportacion import exportar_en_segundo_plano
+            from src.utils.export.export_stream import exportar_csv_stream
+
+            def generar(trabajo):
+                # Corre en un hilo de la cola de exportaciones
+                headers, rows = self._generar_dataset(tipo_reporte)
+                if not rows:
+                    return None
+                # Escritura con BOM para Excel
+                exportar_csv_stream(filename, headers, rows, progreso=trabajo.avanzar,
+                                    total=len(rows), encoding="utf-8-sig")
+                return filename
+
+            def al_completar(trabajo):
+                if trabajo.resultado is None:
+                    messagebox.showinfo("Exportación", "No hay datos para exportar con los filtros actuales.")
+                elif trabajo.desde_cache:
+                    messagebox.showinfo("Éxito", "Reporte exportado correctamente (período cerrado, desde cache).")
+                else:
+                    messagebox.showinfo("Éxito", f"Reporte exportado correctamente ({trabajo.hechas} filas).")
+
+            # Ventas y tratamientos de meses cerrados no cambian: se cachean
+            periodo = None
+            if self._f_inicio and self._f_fin and ("Ventas" in tipo_reporte or "Tratamientos" in tipo_reporte):
+                periodo = ((int(self._f_inicio[:4]), int(self._f_inicio[5:7])),
+                           (int(self._f_fin[:4]), int(self._f_fin[5:7])))
+            parametros = {"reporte": tipo_reporte, "desde": self._f_inicio, "hasta": self._f_fin}
+            exportar_en_segundo_plano(self, "reporte_csv", generar, filename, parametros, periodo,
+                                      titulo=f"Exportando {tipo_reporte}", al_completar=al_completar)
         except Exception as e:
             messagebox.showerror("Error", f"No se pudo exportar el reporte:\n{e}")
 
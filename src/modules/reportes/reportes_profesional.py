@@ -18,6 +18,7 @@ from modules.utils.logger import get_logger
 from modules.utils.date_picker import attach_date_picker
 from modules.utils.colores import obtener_colores
 from database import db
+from database.herd_summary import contar as contar_animales, conteo_por as conteo_animales_por
 
 try:
     import matplotlib.pyplot as plt
@@ -609,9 +610,8 @@ class ReportesModule(ctk.CTkFrame):
             with db.get_connection() as conn:
                 cursor = conn.cursor()
                 
-                # Queries principales
-                cursor.execute("SELECT COUNT(*) FROM animal WHERE estado = 'Activo'")
-                total_animales = cursor.fetchone()[0]
+                # Queries principales (conteo de animales desde herd_summary)
+                total_animales = contar_animales(conn, estados=("Activo",))
 
                 cursor.execute("SELECT SUM(precio_compra) FROM animal WHERE estado = 'Activo'")
                 valor_inv = cursor.fetchone()[0] or 0
@@ -661,15 +661,10 @@ class ReportesModule(ctk.CTkFrame):
             with db.get_connection() as conn:
                 cursor = conn.cursor()
                 
-                # Obtener estadísticas generales
-                cursor.execute("SELECT COUNT(*) FROM animal WHERE estado = 'Activo'")
-                total_activos = cursor.fetchone()[0]
-                
-                cursor.execute("SELECT COUNT(*) FROM animal WHERE estado = 'Vendido'")
-                total_vendidos = cursor.fetchone()[0]
-                
-                cursor.execute("SELECT COUNT(*) FROM animal WHERE estado = 'Muerto'")
-                total_muertos = cursor.fetchone()[0]
+                # Obtener estadísticas generales (herd_summary)
+                total_activos = contar_animales(conn, estados=("Activo",))
+                total_vendidos = contar_animales(conn, estados=("Vendido",))
+                total_muertos = contar_animales(conn, estados=("Muerto",))
                 
                 # Construir query con filtros
                 query = """
@@ -1539,14 +1534,10 @@ class ReportesModule(ctk.CTkFrame):
 
     def _mostrar_resumen_inventario(self, parent, cursor):
         """Muestra resumen del inventario"""
-        cursor.execute("SELECT COUNT(*) FROM animal WHERE estado = 'Activo'")
-        total = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM animal WHERE sexo = 'Macho' AND estado = 'Activo'")
-        machos = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM animal WHERE sexo = 'Hembra' AND estado = 'Activo'")
-        hembras = cursor.fetchone()[0]
+        por_sexo = conteo_animales_por(cursor.connection, "sexo", estados=("Activo",))
+        total = sum(por_sexo.values())
+        machos = por_sexo.get("Macho", 0)
+        hembras = por_sexo.get("Hembra", 0)
         resumen = self._section(parent, "Resumen rápido", "Indicadores clave del inventario activo")
         cards = ctk.CTkFrame(resumen, fg_color="transparent")
         cards.pack(fill="x", padx=8, pady=8)
@@ -1567,8 +1558,7 @@ class ReportesModule(ctk.CTkFrame):
                 cursor = conn.cursor()
                 
                 # Gráfico 1: Animales por estado
-                cursor.execute("SELECT estado, COUNT(*) FROM animal GROUP BY estado")
-                datos_estados = cursor.fetchall()
+                datos_estados = list(conteo_animales_por(conn, "estado").items())
                 estados = [r[0] for r in datos_estados]
                 cantidades = [r[1] for r in datos_estados]
 
@@ -1576,8 +1566,7 @@ class ReportesModule(ctk.CTkFrame):
                 axes[0, 0].set_title('Animales por Estado')
 
                 # Gráfico 2: Distribuión por sexo
-                cursor.execute("SELECT sexo, COUNT(*) FROM animal WHERE estado = 'Activo' GROUP BY sexo")
-                datos = cursor.fetchall()
+                datos = list(conteo_animales_por(conn, "sexo", estados=("Activo",)).items())
                 if datos:
                     sexos = [r[0] for r in datos]
                     cant_sexo = [r[1] for r in datos]
@@ -1665,8 +1654,7 @@ class ReportesModule(ctk.CTkFrame):
                 cursor = conn.cursor()
                 
                 # Por sexo
-                cursor.execute("SELECT sexo, COUNT(*) FROM animal WHERE estado = 'Activo' GROUP BY sexo")
-                datos = cursor.fetchall()
+                datos = list(conteo_animales_por(conn, "sexo", estados=("Activo",)).items())
                 sexos = [r[0] or 'Desconocido' for r in datos]
                 cant = [r[1] for r in datos]
                 
@@ -1,12 +1,12 @@
 """Módulo de utilidades para FincaFácil."""
 
 # API pública estable (Categoría A)
-from modules.utils.logger import Logger
+from .logger import Logger
 
 # API Legacy / Compatibilidad (Categoría B)
 # Mantenida para backward compatibility; consumidores usan import directo
 try:
-    from modules.utils.validaciones import (  # type: ignore[attr-defined]
+    from .validaciones import (  # type: ignore[attr-defined]
         validar_texto, validar_numero  # type: ignore[attr-defined]
     )
 except ImportError:
@@ -17,14 +17,14 @@ except ImportError:
 
 # API pública estable (Categoría A)
 try:
-    from modules.utils.tour_manager import TourManager, TourStep, ModuleTourHelper
+    from .tour_manager import TourManager, TourStep, ModuleTourHelper
 except ImportError:
     TourManager = None
     TourStep = None
     ModuleTourHelper = None
 
 try:
-    from modules.utils.metadata import GestorMetadatos, obtener_gestor_metadatos
+    from .metadata import GestorMetadatos, obtener_gestor_metadatos
 except ImportError:
     GestorMetadatos = None
     obtener_gestor_metadatos = None
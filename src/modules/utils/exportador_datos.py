@@ -2,7 +2,7 @@
 Utilidad para exportar datos a diferentes formatos (PDF, Excel, CSV)
 Centraliza la funcionalidad de exportación para todos los módulos
 """
-from typing import List, Dict, Any, Optional
+from typing import Any, Callable, Dict, Iterable, List, Optional
 from pathlib import Path
 import logging
 
@@ -13,68 +13,31 @@ class ExportadorDatos:
     """Clase para exportar datos a diferentes formatos"""
     
     @staticmethod
-    def exportar_a_excel(datos: List[Dict[str, Any]], columnas: List[str], 
-                         ruta_archivo: Path, nombre_hoja: str = "Datos") -> bool:
+    def exportar_a_excel(datos: Iterable[Dict[str, Any]], columnas: List[str], 
+                         ruta_archivo: Path, nombre_hoja: str = "Datos",
+                         progreso: Optional[Callable[[int, Optional[int]], Any]] = None) -> bool:
         """
         Exporta datos a formato Excel
         
+        Escribe en modo write-only a medida que recorre `datos`, así que acepta
+        generadores (p. ej. filas_consulta) sin cargarlos en memoria.
+        
         Args:
-            datos: Lista de diccionarios con los datos
+            datos: Diccionarios (o tuplas alineadas a columnas) con los datos
             columnas: Lista de nombres de columnas
             ruta_archivo: Ruta donde guardar el archivo
             nombre_hoja: Nombre de la hoja de Excel
+            progreso: Callback opcional (filas_escritas, total)
             
         Returns:
             True si se exportó exitosamente
         """
         try:
-            import openpyxl
-            from openpyxl.styles import Font, PatternFill, Alignment
-            from openpyxl.worksheet.worksheet import Worksheet
-            
-            # Crear workbook
-            wb = openpyxl.Workbook()
-            ws = wb.active
-            if ws is None:
-                ws = wb.create_sheet()
-            
-            assert isinstance(ws, Worksheet), "ws debe ser una hoja de trabajo válida"
-            
-            ws.title = nombre_hoja
-            
-            # Estilo de encabezados
-            header_fill = PatternFill(start_color="1976D2", end_color="1976D2", fill_type="solid")
-            header_font = Font(bold=True, color="FFFFFF", size=12)
-            header_alignment = Alignment(horizontal="center", vertical="center")
-            
-            # Escribir encabezados
-            for col_idx, columna in enumerate(columnas, start=1):
-                celda = ws.cell(row=1, column=col_idx, value=columna)
-                celda.fill = header_fill
-                celda.font = header_font
-                celda.alignment = header_alignment
+            import openpyxl  # noqa: F401
+            from src.utils.export.export_stream import exportar_excel_stream
             
-            # Escribir datos
-            for row_idx, fila in enumerate(datos, start=2):
-                for col_idx, columna in enumerate(columnas, start=1):
-                    valor = fila.get(columna, "")
-                    ws.cell(row=row_idx, column=col_idx, value=valor)
-            
-            # Ajustar ancho de columnas
-            for column in ws.columns:
-                max_length = 0
-                column_letter = column[0].column_letter  # type: ignore[attr-defined]
-                for cell in column:
-                    try:
-                        if len(str(cell.value)) > max_length:
-                            max_length = len(str(cell.value))
-                    except:
-                        pass
-                adjusted_width = min(max_length + 2, 50)
-                ws.column_dimensions[column_letter].width = adjusted_width
-            
-            # Guardar archivo
-            wb.save(ruta_archivo)
+            total = len(datos) if isinstance(datos, list) else None
+            exportar_excel_stream(ruta_archivo, columnas, datos, nombre_hoja, progreso, total)
             logger.info(f"Datos exportados a Excel: {ruta_archivo}")
             return True
             
@@ -86,27 +49,26 @@ class ExportadorDatos:
             return False
     
     @staticmethod
-    def exportar_a_csv(datos: List[Dict[str, Any]], columnas: List[str], 
-                       ruta_archivo: Path) -> bool:
+    def exportar_a_csv(datos: Iterable[Dict[str, Any]], columnas: List[str], 
+                       ruta_archivo: Path,
+                       progreso: Optional[Callable[[int, Optional[int]], Any]] = None) -> bool:
         """
         Exporta datos a formato CSV
         
         Args:
-            datos: Lista de diccionarios con los datos
+            datos: Diccionarios (o tuplas alineadas a columnas) con los datos
             columnas: Lista de nombres de columnas
             ruta_archivo: Ruta donde guardar el archivo
+            progreso: Callback opcional (filas_escritas, total)
             
         Returns:
             True si se exportó exitosamente
         """
         try:
-            import csv
-            
-            with open(ruta_archivo, 'w', newline='', encoding='utf-8') as csvfile:
-                writer = csv.DictWriter(csvfile, fieldnames=columnas)
-                writer.writeheader()
-                writer.writerows(datos)
+            from src.utils.export.export_stream import exportar_csv_stream
             
+            total = len(datos) if isinstance(datos, list) else None
+            exportar_csv_stream(ruta_archivo, columnas, datos, progreso, total)
             logger.info(f"Datos exportados a CSV: {ruta_archivo}")
             return True
             
@@ -114,6 +76,31 @@ class ExportadorDatos:
             logger.error(f"Error exportando a CSV: {e}")
             return False
     
+    @staticmethod
+    def exportar_consulta(consulta: str, ruta_archivo: Path,
+                          progreso: Optional[Callable[[int, Optional[int]], Any]] = None) -> bool:
+        """
+        Exporta una consulta predefinida ('historial_leche', 'inventario_animales')
+        en streaming; el formato sale de la extensión (.xlsx o .csv).
+        
+        Returns:
+            True si se exportó exitosamente
+        """
+        try:
+            from src.utils.export.export_stream import CONSULTAS, exportar_consulta
+            
+            columnas, sql = CONSULTAS[consulta]
+            exportar_consulta(ruta_archivo, sql, columnas=columnas, progreso=progreso)
+            logger.info(f"Consulta '{consulta}' exportada: {ruta_archivo}")
+            return True
+            
+        except ImportError:
+            logger.error("Módulo openpyxl no está instalado. Instale con: pip install openpyxl")
+            return False
+        except Exception as e:
+            logger.error(f"Error exportando consulta '{consulta}': {e}")
+            return False
+    
     @staticmethod
     def exportar_a_pdf(datos: List[Dict[str, Any]], columnas: List[str], 
                        ruta_archivo: Path, titulo: str = "Reporte") -> bool:
@@ -2,8 +2,6 @@
 Módulo utilitario para importar datos desde archivos Excel
 NOTA: Usa helpers case-insensitive de database_helpers para búsquedas de fincas, razas, etc.
 """
-import openpyxl
-from openpyxl.utils.exceptions import InvalidFileException
 import logging
 import unicodedata
 from typing import List, Dict, Tuple
@@ -101,6 +99,10 @@ def parse_excel_to_dicts(file_path: str) -> Tuple[List[Dict], List[str]]:
     Returns:
         Tuple[List[Dict], List[str]]: (lista de registros, lista de errores)
     """
+    # openpyxl se carga al importar el primer archivo, no al abrir la pantalla
+    import openpyxl
+    from openpyxl.utils.exceptions import InvalidFileException
+
     registros = []
     errores = []
     
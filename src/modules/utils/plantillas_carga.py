@@ -3,10 +3,12 @@
 Se generan en memoria usando openpyxl y se guardan en la ruta elegida por el usuario.
 """
 from __future__ import annotations
-from typing import Dict, List, Tuple
-from openpyxl import Workbook
+from typing import TYPE_CHECKING, Dict, List, Tuple
 import os
 
+if TYPE_CHECKING:
+    from openpyxl import Workbook
+
 # Definición de columnas por módulo (clave -> lista de encabezados)
 # Aseguradas según los importadores existentes en el proyecto
 TEMPLATE_SPECS: Dict[str, List[str]] = {
@@ -139,6 +141,8 @@ def create_workbook_for_module(module_key: str) -> Workbook:
     if not headers:
         raise ValueError(f"No hay especificación de plantilla para el módulo: {module_key}")
 
+    from openpyxl import Workbook
+
     wb = Workbook()
     ws = wb.active
     if ws is None:
@@ -0,0 +1,115 @@
+"""
+Diálogo de progreso para exportaciones en segundo plano.
+
+Encola la exportación en la cola compartida (src/jobs/export_queue.py) y
+muestra una ventana no modal con barra de avance y botón Cancelar; el avance
+se lee con after() en el hilo de Tk, así que la ventana principal sigue
+respondiendo mientras se genera el archivo.
+"""
+import logging
+from typing import Any, Callable, Dict, Optional
+
+import customtkinter as ctk
+from tkinter import messagebox
+
+from src.jobs.export_queue import (
+    CANCELADO,
+    COMPLETADO,
+    TrabajoExportacion,
+    get_export_queue,
+    seguir_en_ui,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class DialogoProgresoExportacion(ctk.CTkToplevel):
+    """Ventana con el avance de un trabajo de exportación y opción de cancelarlo."""
+
+    def __init__(self, master, trabajo: TrabajoExportacion, titulo: str = "Exportando"):
+        super().__init__(master)
+        self.trabajo = trabajo
+        self.title(titulo)
+        self.geometry("380x150")
+        self.resizable(False, False)
+        self.transient(master)
+
+        self.lbl_estado = ctk.CTkLabel(self, text="En cola...", font=("Segoe UI", 12))
+        self.lbl_estado.pack(pady=(18, 8), padx=16)
+        self.barra = ctk.CTkProgressBar(self, width=320)
+        self.barra.pack(pady=4, padx=16)
+        self.barra.set(0)
+        self.btn_cancelar = ctk.CTkButton(self, text="Cancelar", width=110, command=self._cancelar)
+        self.btn_cancelar.pack(pady=12)
+        self.protocol("WM_DELETE_WINDOW", self._cancelar)
+
+    def actualizar(self, trabajo: TrabajoExportacion):
+        fraccion = trabajo.fraccion
+        if fraccion is None:
+            # Total desconocido: barra indeterminada
+            if self.barra.cget("mode") != "indeterminate":
+                self.barra.configure(mode="indeterminate")
+                self.barra.start()
+            texto = f"{trabajo.hechas} filas" if trabajo.hechas else "Generando..."
+        else:
+            if self.barra.cget("mode") != "determinate":
+                self.barra.stop()
+                self.barra.configure(mode="determinate")
+            self.barra.set(fraccion)
+            texto = f"{trabajo.hechas} de {trabajo.total}" if trabajo.total else "Generando..."
+        if trabajo.cancelado_solicitado:
+            texto = "Cancelando..."
+        self.lbl_estado.configure(text=texto)
+
+    def _cancelar(self):
+        if self.trabajo.terminado:
+            self.destroy()
+            return
+        self.trabajo.cancelar()
+        self.btn_cancelar.configure(state="disabled")
+        self.lbl_estado.configure(text="Cancelando...")
+
+
+def exportar_en_segundo_plano(
+    master,
+    tipo: str,
+    generar: Callable[[TrabajoExportacion], Any],
+    ruta_salida: Optional[str] = None,
+    parametros: Optional[Dict[str, Any]] = None,
+    periodo=None,
+    titulo: str = "Exportando",
+    al_completar: Optional[Callable[[TrabajoExportacion], None]] = None,
+) -> TrabajoExportacion:
+    """
+    Encola la exportación, muestra el diálogo de progreso y avisa al terminar.
+
+    al_completar se llama en el hilo de Tk solo si la exportación terminó bien;
+    si no se da, se muestra un mensaje con la ruta generada.
+    """
+    trabajo = get_export_queue().enviar(tipo, generar, ruta_salida, parametros, periodo)
+    dialogo: Optional[DialogoProgresoExportacion] = None
+    try:
+        dialogo = DialogoProgresoExportacion(master, trabajo, titulo)
+    except Exception as e:
+        logger.warning(f"No se pudo mostrar progreso de exportación: {e}")
+
+    def _progreso(t: TrabajoExportacion):
+        if dialogo is not None and dialogo.winfo_exists():
+            dialogo.actualizar(t)
+
+    def _terminar(t: TrabajoExportacion):
+        if dialogo is not None and dialogo.winfo_exists():
+            dialogo.destroy()
+        if t.estado == COMPLETADO:
+            if al_completar is not None:
+                al_completar(t)
+            else:
+                origen = " (desde cache)" if t.desde_cache else ""
+                messagebox.showinfo("Exportar", f"Archivo generado{origen}:\n{t.resultado}")
+        elif t.estado == CANCELADO:
+            messagebox.showinfo("Exportar", "Exportación cancelada")
+        else:
+            messagebox.showerror("Exportar", f"No se pudo exportar:\n{t.error}")
+
+    seguir_en_ui(master, trabajo, al_progreso=_progreso, al_terminar=_terminar)
+    return trabajo
@@ -0,0 +1,260 @@
+"""
+Treeview virtual: solo las filas visibles existen como ítems.
+
+Con miles de filas, borrar e insertar todo el conjunto en un ttk.Treeview
+en cada filtro tarda segundos y ocupa mucha memoria. TablaVirtual mantiene
+un número fijo de ítems (los que caben en pantalla) y al desplazarse les
+cambia los valores con los de la ventana visible, que pide a una
+FuentePaginada (src/database/consulta_paginada.py). La barra de
+desplazamiento, la rueda del mouse y las flechas mueven la ventana; los
+encabezados ordenan en SQL; la selección se guarda por clave, así sigue
+aunque la fila salga de la ventana o cambie el orden.
+
+    tabla = TablaVirtual(self.tree, vsb, formatear=self._valores_animal,
+                         al_seleccionar=self._on_tree_select)
+    tabla.cargar(FuentePaginada(get_db_connection, sql, params, columnas_orden, orden="codigo"))
+    animal = tabla.seleccion()   # dict de la fila seleccionada o None
+
+formatear(fila, indice) devuelve (values, tags) para el ítem. El Treeview
+debe crearse con selectmode="browse"; el ancho de columnas, encabezados y
+tags se configuran como siempre.
+"""
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from tkinter import ttk
+
+FLECHAS_ORDEN = {False: " ▲", True: " ▼"}
+
+
+class TablaVirtual:
+    """Adaptador de desplazamiento virtual para un ttk.Treeview."""
+
+    def __init__(
+        self,
+        tree: ttk.Treeview,
+        scrollbar: Optional[ttk.Scrollbar],
+        formatear: Callable[[Dict[str, Any], int], Tuple[Sequence[Any], Sequence[str]]],
+        al_seleccionar: Optional[Callable[[Optional[Dict[str, Any]]], None]] = None,
+    ):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.formatear = formatear
+        self.al_seleccionar = al_seleccionar
+        self.fuente = None
+        self.inicio = 0
+        self._visibles = max(1, int(tree.cget("height") or 10))
+        self._items: List[str] = []
+        self._claves: Dict[str, Any] = {}  # ítem -> clave de la fila que muestra
+        self._clave_seleccionada: Any = None
+        self._pintando = False
+        self._textos_encabezado = {col: tree.heading(col, "text") for col in tree["columns"]}
+
+        if scrollbar is not None:
+            scrollbar.configure(command=self._yview)
+            tree.configure(yscrollcommand=lambda *_: None)
+        tree.bind("<<TreeviewSelect>>", self._al_cambiar_seleccion, add="+")
+        tree.bind("<MouseWheel>", self._rueda, add="+")
+        tree.bind("<Button-4>", lambda e: self.desplazar(-3), add="+")
+        tree.bind("<Button-5>", lambda e: self.desplazar(3), add="+")
+        tree.bind("<Configure>", self._al_redimensionar, add="+")
+        for tecla, paso in (("<Up>", -1), ("<Down>", 1), ("<Prior>", "-pagina"), ("<Next>", "pagina"),
+                            ("<Home>", "inicio"), ("<End>", "fin")):
+            tree.bind(tecla, lambda e, p=paso: self._tecla(p))
+
+    # ==================== DATOS ====================
+
+    def cargar(self, fuente) -> None:
+        """
+        Muestra otra fuente (nuevo filtro): vuelve al inicio y limpia la selección.
+
+        Con None la tabla queda vacía.
+        """
+        self.fuente = fuente
+        self.inicio = 0
+        self._clave_seleccionada = None
+        if fuente is None:
+            for item in self._items:
+                self.tree.delete(item)
+            self._items.clear()
+            self._claves.clear()
+            if self.scrollbar is not None:
+                self.scrollbar.set(0.0, 1.0)
+        else:
+            self._configurar_encabezados()
+            self._pintar()
+        self._notificar_seleccion()
+
+    def refrescar(self) -> None:
+        """Relee la fuente (tras editar o borrar) manteniendo posición y selección."""
+        if self.fuente is None:
+            return
+        self.fuente.invalidar()
+        if self._clave_seleccionada is not None and self.fuente.buscar_por_clave(self._clave_seleccionada) is None:
+            self._clave_seleccionada = None
+            self._notificar_seleccion()
+        self._pintar()
+
+    @property
+    def total(self) -> int:
+        return self.fuente.total if self.fuente is not None else 0
+
+    # ==================== SELECCIÓN ====================
+
+    def seleccion(self) -> Optional[Dict[str, Any]]:
+        """Fila seleccionada (aunque no esté en la ventana visible) o None."""
+        if self.fuente is None or self._clave_seleccionada is None:
+            return None
+        return self.fuente.buscar_por_clave(self._clave_seleccionada)
+
+    def seleccionar(self, clave: Any) -> None:
+        """Selecciona la fila con esa clave y la desplaza a la vista."""
+        if self.fuente is None:
+            return
+        posicion = self.fuente.posicion_de(clave)
+        if posicion is None:
+            return
+        self._clave_seleccionada = clave
+        if not self.inicio <= posicion < self.inicio + self._visibles:
+            self.inicio = posicion - self._visibles // 2
+        self._pintar()
+        self._notificar_seleccion()
+
+    def _al_cambiar_seleccion(self, _evento=None) -> None:
+        if self._pintando:
+            return
+        seleccion = self.tree.selection()
+        # Vacía = la fila salió de la ventana al desplazar: se conserva la clave
+        if seleccion and seleccion[0] in self._claves:
+            clave = self._claves[seleccion[0]]
+            if clave != self._clave_seleccionada:
+                self._clave_seleccionada = clave
+                self._notificar_seleccion()
+
+    def _notificar_seleccion(self) -> None:
+        if self.al_seleccionar is not None:
+            self.al_seleccionar(self.seleccion())
+
+    # ==================== ORDEN ====================
+
+    def _configurar_encabezados(self) -> None:
+        for col, texto in self._textos_encabezado.items():
+            ordenable = col in self.fuente.columnas_orden
+            flecha = FLECHAS_ORDEN[self.fuente.descendente] if col == self.fuente.orden else ""
+            self.tree.heading(col, text=texto + flecha,
+                              command=(lambda c=col: self.ordenar(c)) if ordenable else "")
+
+    def ordenar(self, columna: str) -> None:
+        """Ordena por la columna (clic repetido invierte); mantiene visible la selección."""
+        if self.fuente is None:
+            return
+        descendente = not self.fuente.descendente if self.fuente.orden == columna else False
+        self.fuente.ordenar(columna, descendente)
+        self._configurar_encabezados()
+        self.inicio = 0
+        if self._clave_seleccionada is not None:
+            self.seleccionar(self._clave_seleccionada)
+        else:
+            self._pintar()
+
+    # ==================== DESPLAZAMIENTO ====================
+
+    def desplazar(self, filas: int) -> str:
+        self.inicio += int(filas)
+        self._pintar()
+        return "break"
+
+    def _yview(self, *args) -> None:
+        """Comando de la Scrollbar: ('moveto', fracción) o ('scroll', n, 'units'|'pages')."""
+        if not args:
+            return
+        if args[0] == "moveto":
+            self.inicio = int(round(float(args[1]) * self.total))
+            self._pintar()
+        elif args[0] == "scroll":
+            paso = int(args[1]) * (self._visibles if args[2] == "pages" else 1)
+            self.desplazar(paso)
+
+    def _rueda(self, evento) -> str:
+        # Windows: múltiplos de 120; macOS: pasos pequeños
+        delta = evento.delta // 120 if abs(evento.delta) >= 120 else evento.delta
+        return self.desplazar(-3 * delta)
+
+    def _tecla(self, paso) -> str:
+        """Mueve la selección con el teclado, desplazando la ventana si hace falta."""
+        if self.fuente is None or not self.total:
+            return "break"
+        actual = None
+        if self._clave_seleccionada is not None:
+            actual = next((i for i, item in enumerate(self._items)
+                           if self._claves.get(item) == self._clave_seleccionada), None)
+        if paso == "inicio":
+            destino = 0
+        elif paso == "fin":
+            destino = self.total - 1
+        else:
+            paso = {"pagina": self._visibles, "-pagina": -self._visibles}.get(paso, paso)
+            base = self.inicio + actual if actual is not None else self.inicio - (1 if paso > 0 else 0)
+            destino = base + paso
+        destino = max(0, min(self.total - 1, destino))
+        if destino < self.inicio:
+            self.inicio = destino
+        elif destino >= self.inicio + self._visibles:
+            self.inicio = destino - self._visibles + 1
+        fila = self.fuente.fila(destino)
+        if fila is not None:
+            self._clave_seleccionada = fila.get(self.fuente.clave)
+            self._pintar()
+            self._notificar_seleccion()
+        return "break"
+
+    def _al_redimensionar(self, evento) -> None:
+        alto_fila = int(ttk.Style().lookup("Treeview", "rowheight") or 20)
+        # Una fila menos por el encabezado
+        visibles = max(1, evento.height // alto_fila - 1)
+        if visibles != self._visibles:
+            self._visibles = visibles
+            self._pintar()
+
+    # ==================== PINTADO ====================
+
+    def _pintar(self) -> None:
+        """Pone en los ítems fijos los valores de la ventana [inicio, inicio + visibles)."""
+        if self.fuente is None:
+            return
+        total = self.total
+        self.inicio = max(0, min(self.inicio, total - self._visibles))
+        filas = self.fuente.filas(self.inicio, self._visibles)
+
+        self._pintando = True
+        try:
+            # Ajustar cuántos ítems existen (solo crece hasta las filas visibles)
+            while len(self._items) < len(filas):
+                self._items.append(self.tree.insert("", "end", iid=f"v{len(self._items)}"))
+            while len(self._items) > len(filas):
+                item = self._items.pop()
+                self._claves.pop(item, None)
+                self.tree.delete(item)
+
+            seleccionado = ()
+            for posicion, (item, fila) in enumerate(zip(self._items, filas)):
+                valores, tags = self.formatear(fila, self.inicio + posicion)
+                self.tree.item(item, values=list(valores), tags=tuple(tags))
+                self._claves[item] = fila.get(self.fuente.clave)
+                if self._clave_seleccionada is not None and self._claves[item] == self._clave_seleccionada:
+                    seleccionado = (item,)
+            self.tree.selection_set(seleccionado)
+        finally:
+            # <<TreeviewSelect>> llega después: se ignora el que provoca el pintado
+            self.tree.after_idle(self._fin_pintado)
+
+        if self.scrollbar is not None:
+            if total:
+                self.scrollbar.set(self.inicio / total, min(1.0, (self.inicio + len(filas)) / total))
+            else:
+                self.scrollbar.set(0.0, 1.0)
+
+    def _fin_pintado(self) -> None:
+        self._pintando = False
+
+
+__all__ = ["TablaVirtual"]
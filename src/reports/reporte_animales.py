@@ -9,7 +9,9 @@ Genera reportes de inventario y movimientos de animales.
 from datetime import date
 from typing import Dict, Any
 import logging
+from src.database import herd_summary
 from src.database.database import get_db_connection
+from src.database.rango_fechas import rango_semiabierto
 
 
 class ReporteAnimales:
@@ -54,30 +56,17 @@ class ReporteAnimales:
         with get_db_connection() as conn:
             cursor = conn.cursor()
             
-            # Total por estado
-            cursor.execute("""
-                SELECT 
-                    estado,
-                    COUNT(*) as cantidad,
-                    COUNT(CASE WHEN sexo = 'Macho' THEN 1 END) as machos,
-                    COUNT(CASE WHEN sexo = 'Hembra' THEN 1 END) as hembras
-                FROM animal
-                GROUP BY estado
-            """)
-            
+            # Total por estado y sexo (herd_summary, sin recorrer animal)
             por_estado = {}
-            total_activos = 0
-            
-            for row in cursor.fetchall():
-                estado, cantidad, machos, hembras = row
-                por_estado[estado] = {
-                    'cantidad': cantidad,
-                    'machos': machos,
-                    'hembras': hembras
-                }
-                
-                if estado == 'Activo':
-                    total_activos = cantidad
+            for (estado, sexo), cantidad in herd_summary.conteo_por(conn, "estado", "sexo").items():
+                fila = por_estado.setdefault(estado, {'cantidad': 0, 'machos': 0, 'hembras': 0})
+                fila['cantidad'] += cantidad
+                if sexo == 'Macho':
+                    fila['machos'] += cantidad
+                elif sexo == 'Hembra':
+                    fila['hembras'] += cantidad
+            
+            total_activos = por_estado.get('Activo', {}).get('cantidad', 0)
             
             # Gestantes actuales
             cursor.execute("""
@@ -121,9 +110,9 @@ class ReporteAnimales:
                     tipo_ingreso,
                     COUNT(*) as cantidad
                 FROM animal
-                WHERE DATE(fecha_nacimiento) BETWEEN ? AND ?
+                WHERE fecha_nacimiento >= ? AND fecha_nacimiento < ?
                 GROUP BY tipo_ingreso
-            """, (fecha_inicio, fecha_fin))
+            """, rango_semiabierto(fecha_inicio, fecha_fin))
             
             altas_rows = cursor.fetchall()
             total_altas = sum(row[2] for row in altas_rows)
@@ -137,8 +126,8 @@ class ReporteAnimales:
                 SELECT COUNT(DISTINCT id_animal)
                 FROM venta
                 WHERE tipo = 'animal'
-                  AND DATE(fecha) BETWEEN ? AND ?
-            """, (fecha_inicio, fecha_fin))
+                  AND fecha >= ? AND fecha < ?
+            """, rango_semiabierto(fecha_inicio, fecha_fin))
             
             total_ventas = cursor.fetchone()[0]
             
@@ -147,8 +136,8 @@ class ReporteAnimales:
                 SELECT COUNT(*)
                 FROM animal
                 WHERE estado = 'Muerto'
-                  AND DATE(fecha_muerte) BETWEEN ? AND ?
-            """, (fecha_inicio, fecha_fin))
+                  AND fecha_muerte >= ? AND fecha_muerte < ?
+            """, rango_semiabierto(fecha_inicio, fecha_fin))
             
             total_muertes = cursor.fetchone()[0]
             
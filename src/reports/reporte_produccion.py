@@ -10,6 +10,7 @@ from datetime import date, timedelta
 from typing import Dict, Any, List
 import logging
 from src.database.database import get_db_connection
+from src.database.rango_fechas import rango_semiabierto
 
 
 class ReporteProduccion:
@@ -54,8 +55,8 @@ class ReporteProduccion:
                     COUNT(DISTINCT DATE(fecha)) as dias_produccion,
                     COUNT(DISTINCT animal_id) as vacas_productivas
                 FROM produccion_leche
-                WHERE DATE(fecha) BETWEEN ? AND ?
-            """, (fecha_inicio, fecha_fin))
+                WHERE fecha >= ? AND fecha < ?
+            """, rango_semiabierto(fecha_inicio, fecha_fin))
             
             row = cursor.fetchone()
             litros_totales, dias_produccion, vacas = row
@@ -66,8 +67,8 @@ class ReporteProduccion:
                     COALESCE(SUM(litros_am), 0) as am,
                     COALESCE(SUM(litros_pm), 0) as pm
                 FROM produccion_leche
-                WHERE DATE(fecha) BETWEEN ? AND ?
-            """, (fecha_inicio, fecha_fin))
+                WHERE fecha >= ? AND fecha < ?
+            """, rango_semiabierto(fecha_inicio, fecha_fin))
             
             am, pm = cursor.fetchone()
             
@@ -95,11 +96,11 @@ class ReporteProduccion:
                     COALESCE(AVG(p.litros_am + p.litros_pm), 0) as promedio_diario
                 FROM animal a
                 JOIN produccion_leche p ON a.id = p.animal_id
-                WHERE DATE(p.fecha) BETWEEN ? AND ?
+                WHERE p.fecha >= ? AND p.fecha < ?
                 GROUP BY a.id, a.codigo, a.nombre
                 ORDER BY litros_totales DESC
                 LIMIT 20
-            """, (fecha_inicio, fecha_fin))
+            """, rango_semiabierto(fecha_inicio, fecha_fin))
             
             return [
                 {
@@ -123,9 +124,9 @@ class ReporteProduccion:
                     DATE(fecha) as dia,
                     SUM(litros_am + litros_pm) as litros
                 FROM produccion_leche
-                WHERE DATE(fecha) BETWEEN ? AND ?
+                WHERE fecha >= ? AND fecha < ?
                 GROUP BY DATE(fecha)
-            """, (fecha_inicio, fecha_fin))
+            """, rango_semiabierto(fecha_inicio, fecha_fin))
             
             dias_data = cursor.fetchall()
             
@@ -144,10 +145,10 @@ class ReporteProduccion:
                         animal_id,
                         AVG(litros_am + litros_pm) as promedio_vaca
                     FROM produccion_leche
-                    WHERE DATE(fecha) BETWEEN ? AND ?
+                    WHERE fecha >= ? AND fecha < ?
                     GROUP BY animal_id
                 )
-            """, (fecha_inicio, fecha_fin))
+            """, rango_semiabierto(fecha_inicio, fecha_fin))
             
             promedio_vaca = cursor.fetchone()[0] or 0
             
@@ -10,6 +10,7 @@ from datetime import date, timedelta
 from typing import Dict, Any
 import logging
 from src.database.database import get_db_connection
+from src.database.rango_fechas import rango_semiabierto
 
 
 class ReporteReproduccion:
@@ -57,9 +58,9 @@ class ReporteReproduccion:
                     tipo_servicio,
                     COUNT(*) as cantidad
                 FROM servicio
-                WHERE DATE(fecha_servicio) BETWEEN ? AND ?
+                WHERE fecha_servicio >= ? AND fecha_servicio < ?
                 GROUP BY tipo_servicio
-            """, (fecha_inicio, fecha_fin))
+            """, rango_semiabierto(fecha_inicio, fecha_fin))
             
             rows = cursor.fetchall()
             total = sum(row[2] for row in rows)
@@ -117,9 +118,9 @@ class ReporteReproduccion:
             cursor.execute("""
                 SELECT COUNT(*)
                 FROM animal
-                WHERE DATE(fecha_nacimiento) BETWEEN ? AND ?
+                WHERE fecha_nacimiento >= ? AND fecha_nacimiento < ?
                   AND tipo_ingreso = 'Nacimiento'
-            """, (fecha_inicio, fecha_fin))
+            """, rango_semiabierto(fecha_inicio, fecha_fin))
             
             total_partos = cursor.fetchone()[0]
             
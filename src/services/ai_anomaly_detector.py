@@ -2,8 +2,8 @@
 AI Anomaly Detector (FASE 3)
 
 Detecta comportamientos anómalos en métricas clave usando heurísticas y estadística básica.
-- Sin ML ni dependencias externas
-- Lectura SOLO desde snapshots: bi_snapshots_mensual
+- Sin ML; cálculo vectorizado con NumPy (anomaly_engine)
+- Lectura SOLO desde snapshots, vía el almacén compartido de series (kpi_series_store)
 - Score 0–100, nivel BAJO/MEDIO/ALTO, explicación textual
 - Integración con cache y auditoría
 - Generación de alertas (cooldown anti-duplicados)
@@ -16,8 +16,12 @@ from datetime import datetime, timedelta
 import logging
 import json
 
-from src.database.database import get_db_connection
-from src.services.analytics_cache_service import get_analytics_cache
+import numpy as np
+
+from src.database.kpi_fact import Periodo, periodos_entre
+from src.services.analytics_cache_service import Dependencia, get_analytics_cache
+from src.services.anomaly_engine import NIVELES, MatrizAnomalias, MotorAnomalias
+from src.services.kpi_series_store import get_kpi_series_store
 from src.services.alert_rules_service import get_alert_rules_service
 from src.services.system_metrics_service import get_system_metrics_service
 from src.core.audit_service import log_event
@@ -53,6 +57,7 @@ class AiAnomalyDetectorService:
     def __init__(self) -> None:
         self._cache = get_analytics_cache()
         self._alert_rules = get_alert_rules_service()
+        self._motor = MotorAnomalias(ventana=6)
 
     def evaluar_anomalias(
         self,
@@ -66,7 +71,11 @@ class AiAnomalyDetectorService:
         inicio = datetime.now()
         cache_key = "ai_anomalies_6m"
 
-        cached = self._cache.get_or_calculate(cache_key, lambda: self._compute_all())
+        cached = self._cache.get_or_calculate(
+            cache_key,
+            lambda: self._compute_all(),
+            depende_de=[Dependencia("bi_snapshots_mensual")],
+        )
         if isinstance(cached, str):
             cached = json.loads(cached)
         resultados = [AnomalyResult(**r) for r in cached]
@@ -105,101 +114,73 @@ class AiAnomalyDetectorService:
     # ==================== IMPLEMENTACIÓN PRIVADA ====================
 
     def _compute_all(self) -> List[Dict[str, Any]]:
-        """Calcula anomalías para todas las métricas objetivo."""
+        """Calcula anomalías del último mes para todas las métricas objetivo."""
         fin = datetime.now()
         inicio = fin - timedelta(days=180)
-        snapshots = self._obtener_snapshots_rango(inicio, fin)
-        if not snapshots:
+        meses, series = self._obtener_series(inicio, fin)
+        if not meses:
             return []
 
+        # Hasta 7 meses: 6 previos + actual; el actual es el último mes con dato de cada métrica
+        meses = meses[-7:]
+        valores = np.array(
+            [[series.get(m, {}).get(p, np.nan) for p in meses] for m in self.METRICAS_OBJETIVO]
+        )
+        matriz = self._motor.evaluar(valores)
+
         resultados: List[Dict[str, Any]] = []
-        for metrica in self.METRICAS_OBJETIVO:
-            res = self._evaluar_metrica(metrica, snapshots)
-            if res is not None:
-                resultados.append(res)
+        for i, metrica in enumerate(self.METRICAS_OBJETIVO):
+            con_dato = np.flatnonzero(~np.isnan(valores[i]))
+            if len(con_dato) == 0 or not matriz.evaluado[i, con_dato[-1]]:
+                continue
+            t = con_dato[-1]
+            año, mes = meses[t]
+            resultados.append(self._resultado(metrica, f"{año}-{mes:02d}", matriz, (i, t)))
         return resultados
 
-    def _obtener_snapshots_rango(self, inicio: datetime, fin: datetime) -> List[Dict[str, Any]]:
-        """Obtiene snapshots entre fechas (incluye año/mes al filtrar)."""
-        try:
-            with get_db_connection() as conn:
-                cur = conn.cursor()
-                # Suponemos columnas: año (int), mes (int), data_json (text)
-                cur.execute(
-                    """
-                    SELECT año, mes, data_json
-                    FROM bi_snapshots_mensual
-                    WHERE date(año || '-' || printf('%02d', mes) || '-01') BETWEEN ? AND ?
-                    ORDER BY año ASC, mes ASC
-                    """,
-                    (inicio.date(), fin.date()),
-                )
-                rows = cur.fetchall()
-                out: List[Dict[str, Any]] = []
-                for año, mes, data_json in rows:
-                    try:
-                        data = json.loads(data_json)
-                        out.append({"año": año, "mes": mes, "data": data})
-                    except Exception:
-                        continue
-                return out
-        except Exception as e:
-            logger.error(f"Error obteniendo snapshots: {e}")
-            return []
+    def matriz_anomalias(
+        self,
+        desde: Periodo,
+        hasta: Periodo,
+        ventana: int = 6,
+        fincas: Optional[List[int]] = None,
+        metricas: Optional[List[str]] = None,
+    ) -> Tuple[List[int], List[Periodo], List[str], MatrizAnomalias]:
+        """
+        Anomalías de todos los meses de [desde, hasta], por finca y métrica,
+        en una sola pasada (para backtesting de umbrales o muchas fincas).
 
-    def _extraer_metrica(self, snap: Dict[str, Any], metrica: str) -> Optional[float]:
-        """Extrae valor de métrica desde estructura JSON conocida."""
-        data = snap.get("data", {})
+        Returns:
+            (fincas, periodos, metricas, matriz) con matriz.score.shape ==
+            (len(fincas), len(metricas), len(periodos))
+        """
+        metricas = list(metricas or self.METRICAS_OBJETIVO)
+        fincas, periodos, valores = get_kpi_series_store().cubo(metricas, desde, hasta, fincas)
+        motor = self._motor if ventana == self._motor.ventana else MotorAnomalias(ventana=ventana)
+        return fincas, periodos, metricas, motor.evaluar(valores)
+
+    def _obtener_series(
+        self, inicio: datetime, fin: datetime
+    ) -> Tuple[List[Periodo], Dict[str, Dict[Periodo, float]]]:
+        """Meses con snapshot entre fechas y valores de las métricas objetivo (almacén de series)."""
         try:
-            if "resumen_mensual" in data and "kpis" in data["resumen_mensual"]:
-                kpis = data["resumen_mensual"]["kpis"]
-                if metrica in kpis:
-                    return float(kpis[metrica])
-            if "kpis" in data and metrica in data["kpis"]:
-                return float(data["kpis"][metrica])
-            return None
-        except Exception:
-            return None
-
-    def _evaluar_metrica(self, metrica: str, snaps: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
-        """Calcula score y explicación para una métrica contra 6 meses previos."""
-        # Tomar últimos 6 y el último como "actual"
-        valores: List[Tuple[str, float]] = []
-        for s in snaps[-7:]:  # hasta 7 meses para tener 6 previos + actual
-            val = self._extraer_metrica(s, metrica)
-            if val is not None:
-                etiqueta = f"{s['año']}-{s['mes']:02d}"
-                valores.append((etiqueta, float(val)))
-
-        if len(valores) < 3:
-            return None
-
-        # Separar actual vs históricos (previos 6)
-        actual_etq, actual = valores[-1]
-        previos = [v for _, v in valores[:-1]][-6:]
-        if len(previos) == 0:
-            return None
-
-        promedio = sum(previos) / len(previos)
-        varianza = sum((v - promedio) ** 2 for v in previos) / len(previos)
-        std = varianza ** 0.5
-
-        # z-score del actual
-        z = 0.0 if std == 0 else (actual - promedio) / std
-
-        # desviación porcentual
-        pct = 0.0 if promedio == 0 else ((actual - promedio) / abs(promedio)) * 100
-
-        # score heurístico 0–100 (combinando magnitud de z y %)
-        score_raw = abs(z) * 20 + abs(pct) * 0.5  # ponderación balanceada
-        score = max(0, min(100, int(round(score_raw))))
-
-        if score < 30:
-            nivel = "BAJO"
-        elif score < 60:
-            nivel = "MEDIO"
-        else:
-            nivel = "ALTO"
+            store = get_kpi_series_store()
+            meses = store.meses(*periodos_entre(inicio.date(), fin.date()))
+            if not meses:
+                return [], {}
+            return meses, store.series(self.METRICAS_OBJETIVO, meses[0], meses[-1])
+        except Exception as e:
+            logger.error(f"Error obteniendo series de KPIs: {e}")
+            return [], {}
+
+    def _resultado(
+        self, metrica: str, etiqueta: str, matriz: MatrizAnomalias, pos: Tuple[int, ...]
+    ) -> Dict[str, Any]:
+        """Arma el resultado (con explicación) de una celda evaluada de la matriz."""
+        actual = float(matriz.valor[pos])
+        promedio = float(matriz.promedio[pos])
+        z = float(matriz.z[pos])
+        pct = float(matriz.pct[pos])
 
         direccion = "aumentó" if actual >= promedio else "disminuyó"
         explicacion = (
@@ -209,14 +190,14 @@ class AiAnomalyDetectorService:
 
         return {
             "metrica": metrica,
-            "score": score,
-            "nivel": nivel,
+            "score": int(matriz.score[pos]),
+            "nivel": NIVELES[matriz.nivel[pos]],
             "explicacion": explicacion,
-            "valor_actual": float(actual),
-            "promedio_6m": float(promedio),
-            "desviacion_std_6m": float(std),
-            "z_score": float(z),
-            "fecha": actual_etq,
+            "valor_actual": actual,
+            "promedio_6m": promedio,
+            "desviacion_std_6m": float(matriz.std[pos]),
+            "z_score": z,
+            "fecha": etiqueta,
         }
 
     def _convertir_a_alertas(self, resultados: List[AnomalyResult]) -> List[Dict[str, Any]]:
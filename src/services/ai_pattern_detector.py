@@ -3,20 +3,21 @@ AI Pattern Detector (FASE 3)
 
 Detecta patrones recurrentes y explicables en KPIs usando snapshots.
 - Sin ML
-- Lectura SOLO desde bi_snapshots_mensual
+- Lectura SOLO desde snapshots, vía el almacén compartido de series (kpi_series_store)
 - Explicación textual con evidencia
 - Integración con cache, auditoría y alertas
 """
 
 from __future__ import annotations
 from dataclasses import dataclass, asdict
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime, timedelta
 import logging
 import json
 
-from src.database.database import get_db_connection
-from src.services.analytics_cache_service import get_analytics_cache
+from src.database.kpi_fact import Periodo, periodos_entre
+from src.services.analytics_cache_service import Dependencia, get_analytics_cache
+from src.services.kpi_series_store import get_kpi_series_store
 from src.services.alert_rules_service import get_alert_rules_service
 from src.services.system_metrics_service import get_system_metrics_service
 from src.core.audit_service import log_event
@@ -50,7 +51,11 @@ class AiPatternDetectorService:
     ) -> List[PatternInsight]:
         inicio = datetime.now()
         cache_key = "ai_patterns_12m"
-        cached = self._cache.get_or_calculate(cache_key, lambda: self._compute_patterns())
+        cached = self._cache.get_or_calculate(
+            cache_key,
+            lambda: self._compute_patterns(),
+            depende_de=[Dependencia("bi_snapshots_mensual")],
+        )
         if isinstance(cached, str):
             cached = json.loads(cached)
         insights = [PatternInsight(**i) for i in cached]
@@ -89,66 +94,43 @@ class AiPatternDetectorService:
         """Detecta patrones usando últimos 12 meses de snapshots."""
         fin = datetime.now()
         inicio = fin - timedelta(days=365)
-        snaps = self._obtener_snapshots_rango(inicio, fin)
-        if not snaps:
+        meses, series = self._obtener_series(inicio, fin)
+        if not meses:
             return []
 
         out: List[Dict[str, Any]] = []
         for metrica in self.METRICAS:
-            p1 = self._estacionalidad_mes(metrica, snaps)
+            serie = series.get(metrica, {})
+            p1 = self._estacionalidad_mes(metrica, meses, serie)
             if p1:
                 out.append(p1)
-            p2 = self._rampa_consecutiva(metrica, snaps, tipo="rampa_costos" if metrica == "costo_total" else "rampa_produccion")
+            p2 = self._rampa_consecutiva(metrica, meses, serie, tipo="rampa_costos" if metrica == "costo_total" else "rampa_produccion")
             if p2:
                 out.append(p2)
         return out
 
-    def _obtener_snapshots_rango(self, inicio: datetime, fin: datetime) -> List[Dict[str, Any]]:
+    def _obtener_series(
+        self, inicio: datetime, fin: datetime
+    ) -> Tuple[List[Periodo], Dict[str, Dict[Periodo, float]]]:
         try:
-            with get_db_connection() as conn:
-                cur = conn.cursor()
-                cur.execute(
-                    """
-                    SELECT año, mes, data_json
-                    FROM bi_snapshots_mensual
-                    WHERE date(año || '-' || printf('%02d', mes) || '-01') BETWEEN ? AND ?
-                    ORDER BY año ASC, mes ASC
-                    """,
-                    (inicio.date(), fin.date()),
-                )
-                rows = cur.fetchall()
-                snaps: List[Dict[str, Any]] = []
-                for año, mes, data_json in rows:
-                    try:
-                        data = json.loads(data_json)
-                        snaps.append({"año": año, "mes": mes, "data": data})
-                    except Exception:
-                        continue
-                return snaps
+            store = get_kpi_series_store()
+            meses = store.meses(*periodos_entre(inicio.date(), fin.date()))
+            if not meses:
+                return [], {}
+            return meses, store.series(self.METRICAS, meses[0], meses[-1])
         except Exception as e:
-            logger.error(f"Error obteniendo snapshots: {e}")
-            return []
-
-    def _extraer_metrica(self, snap: Dict[str, Any], metrica: str) -> Optional[float]:
-        data = snap.get("data", {})
-        try:
-            kpis = data.get("resumen_mensual", {}).get("kpis", {})
-            if metrica in kpis:
-                return float(kpis[metrica])
-            if "kpis" in data and metrica in data["kpis"]:
-                return float(data["kpis"][metrica])
-            return None
-        except Exception:
-            return None
+            logger.error(f"Error obteniendo series de KPIs: {e}")
+            return [], {}
 
-    def _estacionalidad_mes(self, metrica: str, snaps: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    def _estacionalidad_mes(
+        self, metrica: str, meses: List[Periodo], serie: Dict[Periodo, float]
+    ) -> Optional[Dict[str, Any]]:
         """Detecta si el mes actual está consistentemente por debajo del promedio del mes en años previos."""
         # agrupar por mes
         por_mes: Dict[int, List[float]] = {m: [] for m in range(1, 13)}
-        for s in snaps:
-            v = self._extraer_metrica(s, metrica)
-            if v is not None:
-                por_mes[s["mes"]].append(float(v))
+        for periodo in meses:
+            if periodo in serie:
+                por_mes[periodo[1]].append(float(serie[periodo]))
 
         # promedio por mes
         promedios_mes: Dict[int, float] = {m: (sum(vals) / len(vals) if vals else 0.0) for m, vals in por_mes.items()}
@@ -156,9 +138,8 @@ class AiPatternDetectorService:
             return None
 
         # mes actual
-        actual = snaps[-1]
-        mes_actual = actual["mes"]
-        valor_actual = float(self._extraer_metrica(actual, metrica) or 0.0)
+        año_actual, mes_actual = meses[-1]
+        valor_actual = float(serie.get((año_actual, mes_actual)) or 0.0)
         prom_mes = promedios_mes.get(mes_actual, 0.0)
         if prom_mes <= 0:
             return None
@@ -178,15 +159,14 @@ class AiPatternDetectorService:
             "nivel": nivel,
             "descripcion": desc,
             "evidencia": evidencia,
-            "fecha": f"{actual['año']}-{actual['mes']:02d}",
+            "fecha": f"{año_actual}-{mes_actual:02d}",
         }
 
-    def _rampa_consecutiva(self, metrica: str, snaps: List[Dict[str, Any]], tipo: str) -> Optional[Dict[str, Any]]:
+    def _rampa_consecutiva(
+        self, metrica: str, meses: List[Periodo], serie: Dict[Periodo, float], tipo: str
+    ) -> Optional[Dict[str, Any]]:
         """Detecta 3 meses consecutivos de aumento (costos) o caída (producción)."""
-        vals: List[float] = []
-        for s in snaps[-6:]:  # últimos 6 meses
-            v = self._extraer_metrica(s, metrica)
-            vals.append(float(v or 0))
+        vals: List[float] = [float(serie.get(periodo) or 0) for periodo in meses[-6:]]  # últimos 6 meses
         if len(vals) < 4:
             return None
 
@@ -208,14 +188,14 @@ class AiPatternDetectorService:
             return None
 
         evidencia = [f"Serie: {', '.join(f'{v:.0f}' for v in vals)}"]
-        actual = snaps[-1]
+        año_actual, mes_actual = meses[-1]
         return {
             "tipo": tipo,
             "metrica": metrica,
             "nivel": nivel,
             "descripcion": desc,
             "evidencia": evidencia,
-            "fecha": f"{actual['año']}-{actual['mes']:02d}",
+            "fecha": f"{año_actual}-{mes_actual:02d}",
         }
 
     def _convertir_a_alertas(self, insights: List[PatternInsight]) -> List[Dict[str, Any]]:
@@ -430,7 +430,8 @@ class AlertRulesService:
     def guardar_alertas_en_bd(
         self,
         alertas: List[Dict[str, Any]],
-        usuario: str = "Sistema"
+        usuario: str = "Sistema",
+        por_entidad: bool = False
     ) -> int:
         """
         Guarda las alertas generadas en la base de datos.
@@ -438,6 +439,8 @@ class AlertRulesService:
         Args:
             alertas: Lista de alertas a guardar
             usuario: Usuario que generó las alertas
+            por_entidad: Si True, el filtro de duplicados distingue entidad_id
+                (p. ej. una alerta por animal en lugar de una por tipo)
         
         Returns:
             Número de alertas guardadas
@@ -450,13 +453,18 @@ class AlertRulesService:
             for alerta in alertas:
                 try:
                     # Verificar si ya existe alerta similar reciente (últimos 7 días)
-                    cursor.execute("""
+                    sql_duplicado = """
                         SELECT id FROM alertas
                         WHERE tipo = ?
                         AND entidad_tipo = ?
                         AND fecha_deteccion > date('now', '-7 days')
                         AND estado = 'activa'
-                    """, (alerta['tipo'], alerta['entidad_tipo']))
+                    """
+                    params_duplicado = [alerta['tipo'], alerta['entidad_tipo']]
+                    if por_entidad:
+                        sql_duplicado += " AND entidad_id IS ?"
+                        params_duplicado.append(alerta.get('entidad_id'))
+                    cursor.execute(sql_duplicado, params_duplicado)
                     
                     if cursor.fetchone():
                         self.logger.debug(f"Alerta duplicada ignorada: {alerta['tipo']}")
@@ -3,13 +3,33 @@
 ║       SERVICIO DE CACHE ANALÍTICO - FASE 1 BI/ANALYTICS                 ║
 ╚══════════════════════════════════════════════════════════════════════════╝
 
-Cache distribuido en BD para análisis costosos.
+Cache de dos niveles para análisis costosos.
+
+Niveles:
+  1. Memoria del proceso: LRU acotado por entradas y bytes, con TTL.
+     Un hit aquí no toca la BD.
+  2. Tabla analytics_cache: compartida entre procesos y persistente.
+     Un hit aquí promueve la entrada a memoria.
 
 Responsabilidades:
 - Almacenar resultados de cálculos costosos (tendencias, comparativos)
 - Invalidación inteligente (expira automáticamente o si hay nuevos KPIs)
 - Fallback a cálculo si cache expirado
-- Tracking de hits para optimización
+- Tracking de hits para optimización: se acumulan en memoria y se
+  vuelcan en lote (un UPDATE + commit cada LOTE_HITS hits o
+  INTERVALO_FLUSH_S segundos, y al salir del proceso)
+- Invalidación por dependencias: cada entrada puede declarar las tablas y
+  rangos de fechas de los que depende (Dependencia). Los triggers de las
+  tablas rastreadas (migraciones.TABLAS_RASTREADAS_CACHE) borran solo las
+  entradas afectadas y lo anotan en cache_invalidacion, que el nivel en
+  memoria consulta cada INTERVALO_SINCRONIZACION_S segundos.
+- Single-flight: llamadas concurrentes por la misma clave (en este proceso)
+  esperan a un único cálculo en curso en vez de repetirlo.
+- Stale-while-revalidate (opcional por llamada): un valor vencido hace menos
+  de MAX_STALE_S se sirve de inmediato mientras un hilo lo recalcula.
+- Meses cerrados: una entrada cuyas dependencias caen por completo en meses
+  con cierre_mensual 'Completado' se guarda sin vencimiento (TTL_PERMANENTE);
+  revertir el cierre la invalida por el trigger de cierre_mensual.
 
 Cache keys pattern:
   trend_{kpi}_{periodo}       - Ej: trend_produccion_6m
@@ -18,17 +38,76 @@ Cache keys pattern:
 """
 
 from __future__ import annotations
+from collections import OrderedDict
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+import atexit
+import copy
 import json
 import logging
 import hashlib
+import re
+import threading
+import time
 from src.database.database import get_db_connection
+from src.database.rango_fechas import rango_mes
 from src.services.system_metrics_service import get_system_metrics_service
 
 logger = logging.getLogger("analytics_cache")
 
 
+@dataclass
+class _EntradaMemoria:
+    """Entrada del nivel en memoria (JSON serializado: cada hit retorna una copia nueva)"""
+    valor_json: str
+    expira_mono: float
+
+
+@dataclass(frozen=True)
+class Dependencia:
+    """Tabla de origen y rango [desde, hasta) de fechas ISO del que depende una entrada.
+
+    Sin rango: cualquier escritura en la tabla invalida la entrada.
+    """
+    tabla: str
+    desde: Optional[str] = None
+    hasta: Optional[str] = None
+
+    @classmethod
+    def meses(
+        cls,
+        tabla: str,
+        año: int,
+        mes: int,
+        año_fin: Optional[int] = None,
+        mes_fin: Optional[int] = None,
+    ) -> "Dependencia":
+        """Dependencia de los meses año/mes .. año_fin/mes_fin (inclusive)."""
+        desde, _ = rango_mes(año, mes)
+        _, hasta = rango_mes(año_fin or año, mes_fin or mes)
+        return cls(tabla, desde, hasta)
+
+    def meses_cubiertos(self) -> List[Tuple[int, int]]:
+        """(año, mes) de cada mes que toca el rango; vacío si no tiene límites."""
+        if not self.desde or not self.hasta:
+            return []
+        año, mes = int(self.desde[:4]), int(self.desde[5:7])
+        resultado = []
+        while rango_mes(año, mes)[0] < self.hasta:
+            resultado.append((año, mes))
+            año, mes = (año + 1, 1) if mes == 12 else (año, mes + 1)
+        return resultado
+
+
+@dataclass
+class _Vuelo:
+    """Cálculo en curso de una clave; los demás llamadores esperan su evento"""
+    evento: threading.Event
+    valor: Any = None
+    error: Optional[BaseException] = None
+
+
 class AnalyticsCacheService:
     """Servicio de cache inteligente para análisis"""
     
@@ -37,18 +116,53 @@ class AnalyticsCacheService:
     TTL_TRENDS = 7200  # 2 horas (cálculos más pesados)
     TTL_INSIGHTS = 3600  # 1 hora
     TTL_COMPARATIVES = 5400  # 1.5 horas
+    TTL_PERMANENTE = 10 * 365 * 86400  # Meses cerrados: solo se invalida por triggers
+    
+    # Revisión de cache_invalidacion desde el nivel en memoria
+    INTERVALO_SINCRONIZACION_S = 1.0
+    
+    # Antigüedad máxima (tras vencer) de un valor servido con stale_while_revalidate
+    MAX_STALE_S = 86400
+    
+    # Nivel en memoria
+    MAX_ENTRADAS_MEMORIA = 256
+    MAX_BYTES_MEMORIA = 16 * 1024 * 1024
     
-    def __init__(self):
+    # Volcado de hits acumulados
+    LOTE_HITS = 50
+    INTERVALO_FLUSH_S = 30.0
+    
+    def __init__(
+        self,
+        max_entradas: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+    ):
         self.logger = logger
+        self._max_entradas = max_entradas or self.MAX_ENTRADAS_MEMORIA
+        self._max_bytes = max_bytes or self.MAX_BYTES_MEMORIA
+        self._lock = threading.RLock()
+        self._memoria: "OrderedDict[str, _EntradaMemoria]" = OrderedDict()
+        self._bytes_memoria = 0
+        self._hits_pendientes: Dict[str, int] = {}
+        self._ultimo_flush = time.monotonic()
+        self._en_vuelo: Dict[str, _Vuelo] = {}
+        self._stats = {
+            "hits_memoria": 0, "hits_bd": 0, "misses": 0, "evictions": 0,
+            "expiradas": 0, "invalidadas_por_dependencia": 0,
+            "coalescidas": 0, "servidas_vencidas": 0, "revalidaciones": 0,
+        }
+        self._ultima_invalidacion = 0
+        self._ultima_sincronizacion = time.monotonic()
         self._asegurar_tabla()
     
     def _asegurar_tabla(self):
-        """Verifica que la tabla existe"""
+        """Verifica que la tabla existe y toma la marca actual de invalidaciones"""
         try:
             with get_db_connection() as conn:
                 conn.execute("SELECT 1 FROM analytics_cache LIMIT 1")
         except Exception as e:
             self.logger.warning(f"Tabla analytics_cache no disponible: {e}")
+        self._ultima_invalidacion = self._marca_invalidaciones()
     
     def get_or_calculate(
         self,
@@ -57,38 +171,134 @@ class AnalyticsCacheService:
         *args,
         ttl: Optional[int] = None,
         tags: Optional[list[str]] = None,
+        depende_de: Optional[Iterable[Dependencia]] = None,
+        stale_while_revalidate: bool = False,
         **kwargs
     ) -> Any:
         """
         Obtiene valor de cache o calcula si no existe/expiró.
         
+        Si otro hilo ya está calculando la misma clave, espera ese cálculo
+        (single-flight) en lugar de ejecutar calculator_func de nuevo.
+        
         Args:
             cache_key: Clave única del cache
             calculator_func: Función que calcula el valor
             ttl: Tiempo de vida en segundos (default según tipo)
             tags: Tags para invalidación grupal
+            depende_de: Tablas/rangos de origen; escribir en ellos invalida
+                la entrada. Si todos caen en meses cerrados no vence.
+            stale_while_revalidate: Si el valor venció (hace menos de
+                MAX_STALE_S), retornarlo ya y recalcular en segundo plano
             args, kwargs: Argumentos para calculator_func
         
         Returns:
             Valor cacheado o calculado
         """
-        # Intentar obtener del cache
-        cached = self._get_from_cache(cache_key)
+        # Intentar obtener del cache (memoria y luego BD)
+        cached, vencido = self._leer_memoria(cache_key, stale_while_revalidate)
+        if cached is None:
+            cached, vencido = self._leer_bd(cache_key, stale_while_revalidate)
+        
+        def calcular():
+            return self._calcular_y_guardar(
+                cache_key, calculator_func, args, kwargs, ttl, tags, depende_de
+            )
+        
         if cached is not None:
+            if vencido:
+                with self._lock:
+                    self._stats["servidas_vencidas"] += 1
+                self._revalidar_en_segundo_plano(cache_key, calcular)
             return cached
         
-        # Calcular
+        return self._calcular_una_vez(cache_key, calcular)
+    
+    def _calcular_y_guardar(self, cache_key, calculator_func, args, kwargs, ttl, tags, depende_de) -> Any:
+        """Calcula el valor y lo guarda con sus dependencias."""
+        with self._lock:
+            self._stats["misses"] += 1
         self.logger.debug(f"Cache miss: {cache_key}, calculando...")
+        dependencias = list(depende_de or [])
+        if dependencias and self._rango_cerrado(dependencias):
+            ttl = self.TTL_PERMANENTE
+            dependencias += [Dependencia("cierre_mensual", d.desde, d.hasta) for d in dependencias]
+        
+        # Las dependencias se registran antes de calcular: una escritura
+        # concurrente en el origen queda anotada y el valor no se guarda
+        marca = self._registrar_dependencias(cache_key, dependencias) if dependencias else None
         valor = calculator_func(*args, **kwargs)
         
         # Guardar en cache
         if ttl is None:
             ttl = self.TTL_DEFAULT
         
-        self._save_to_cache(cache_key, valor, ttl, tags)
+        self._save_to_cache(cache_key, valor, ttl, tags, dependencias, marca)
+        
+        return valor
+    
+    # ------------------------------------------------------------------
+    # Single-flight y revalidación en segundo plano
+    # ------------------------------------------------------------------
+    def _calcular_una_vez(self, cache_key: str, calcular) -> Any:
+        """Ejecuta calcular() salvo que ya haya un cálculo en curso para la clave."""
+        with self._lock:
+            vuelo = self._en_vuelo.get(cache_key)
+            lider = vuelo is None
+            if lider:
+                vuelo = _Vuelo(threading.Event())
+                self._en_vuelo[cache_key] = vuelo
+            else:
+                self._stats["coalescidas"] += 1
+        
+        if not lider:
+            vuelo.evento.wait()
+            if vuelo.error is not None:
+                raise vuelo.error
+            # Copia propia: el líder y los demás llamadores pueden mutar su resultado
+            return copy.deepcopy(vuelo.valor)
         
+        # Otro líder pudo terminar entre la lectura del cache y el registro del vuelo
+        cached = self._get_from_memoria(cache_key)
+        if cached is not None:
+            self._terminar_vuelo(cache_key, vuelo, valor=cached)
+            return cached
+        return self._ejecutar_vuelo(cache_key, vuelo, calcular)
+    
+    def _ejecutar_vuelo(self, cache_key: str, vuelo: _Vuelo, calcular) -> Any:
+        try:
+            valor = calcular()
+        except BaseException as e:
+            self._terminar_vuelo(cache_key, vuelo, error=e)
+            raise
+        self._terminar_vuelo(cache_key, vuelo, valor=copy.deepcopy(valor))
         return valor
     
+    def _terminar_vuelo(self, cache_key: str, vuelo: _Vuelo, valor: Any = None, error: Optional[BaseException] = None) -> None:
+        vuelo.valor, vuelo.error = valor, error
+        with self._lock:
+            if self._en_vuelo.get(cache_key) is vuelo:
+                del self._en_vuelo[cache_key]
+        vuelo.evento.set()
+    
+    def _revalidar_en_segundo_plano(self, cache_key: str, calcular) -> bool:
+        """Lanza un hilo que recalcula la clave, salvo que ya haya un cálculo en curso."""
+        with self._lock:
+            if cache_key in self._en_vuelo:
+                return False
+            vuelo = _Vuelo(threading.Event())
+            self._en_vuelo[cache_key] = vuelo
+            self._stats["revalidaciones"] += 1
+        
+        def _refrescar():
+            try:
+                self._ejecutar_vuelo(cache_key, vuelo, calcular)
+            except Exception as e:
+                self.logger.error(f"Error revalidando cache {cache_key}: {e}")
+        
+        threading.Thread(target=_refrescar, name=f"cache-swr-{cache_key}", daemon=True).start()
+        return True
+    
     def _get_from_cache(self, cache_key: str) -> Optional[Any]:
         """
         Obtiene valor del cache si existe y no expiró.
@@ -99,6 +309,10 @@ class AnalyticsCacheService:
         Returns:
             Valor deserializado o None si no existe/expiró
         """
+        return self._leer_bd(cache_key)[0]
+    
+    def _leer_bd(self, cache_key: str, permitir_vencido: bool = False) -> Tuple[Optional[Any], bool]:
+        """(valor, vencido) desde analytics_cache; valor None si no hay o venció."""
         try:
             with get_db_connection() as conn:
                 cursor = conn.cursor()
@@ -111,7 +325,7 @@ class AnalyticsCacheService:
                 
                 row = cursor.fetchone()
                 if not row:
-                    return None
+                    return None, False
                 
                 valor_json, fecha_calculo, expira_en = row
                 
@@ -119,40 +333,215 @@ class AnalyticsCacheService:
                 fecha_calc = datetime.fromisoformat(fecha_calculo)
                 ahora = datetime.now()
                 
-                if (ahora - fecha_calc).total_seconds() > expira_en:
+                restante = expira_en - (ahora - fecha_calc).total_seconds()
+                if restante <= 0:
                     self.logger.debug(f"Cache expirado: {cache_key}")
-                    return None
-                
-                # Registrar cache hit
-                try:
-                    metrics = get_system_metrics_service()
-                    metrics.registrar_cache_hit("analytics_cache", cache_key)
-                except Exception:
-                    pass  # No bloquear cache por error de métricas
-                
-                # Incrementar hits
-                cursor.execute("""
-                    UPDATE analytics_cache
-                    SET hits = hits + 1
-                    WHERE cache_key = ?
-                """, (cache_key,))
-                conn.commit()
-                
-                # Deserializar
-                valor = json.loads(valor_json)
-                self.logger.debug(f"Cache hit: {cache_key}")
-                return valor
-                
+                    if permitir_vencido and -restante <= self.MAX_STALE_S:
+                        return json.loads(valor_json), True
+                    return None, False
+            
+            # Deserializar y promover al nivel en memoria
+            valor = json.loads(valor_json)
+            with self._lock:
+                self._stats["hits_bd"] += 1
+                self._guardar_en_memoria(cache_key, valor_json, restante)
+            self._registrar_hit(cache_key)
+            self.logger.debug(f"Cache hit (BD): {cache_key}")
+            return valor, False
+            
         except Exception as e:
             self.logger.error(f"Error leyendo cache {cache_key}: {e}")
-            return None
+            return None, False
+    
+    # ------------------------------------------------------------------
+    # Nivel en memoria (LRU + TTL)
+    # ------------------------------------------------------------------
+    def _get_from_memoria(self, cache_key: str) -> Optional[Any]:
+        """Valor del nivel en memoria si existe y no expiró (sin tocar la BD)."""
+        return self._leer_memoria(cache_key)[0]
+    
+    def _leer_memoria(self, cache_key: str, permitir_vencido: bool = False) -> Tuple[Optional[Any], bool]:
+        """(valor, vencido) desde el nivel en memoria."""
+        if time.monotonic() - self._ultima_sincronizacion >= self.INTERVALO_SINCRONIZACION_S:
+            self.sincronizar_invalidaciones()
+        with self._lock:
+            entrada = self._memoria.get(cache_key)
+            if entrada is None:
+                return None, False
+            vencida_hace = time.monotonic() - entrada.expira_mono
+            if vencida_hace >= 0:
+                if permitir_vencido and vencida_hace <= self.MAX_STALE_S:
+                    return json.loads(entrada.valor_json), True
+                self._quitar_de_memoria(cache_key)
+                self._stats["expiradas"] += 1
+                return None, False
+            self._memoria.move_to_end(cache_key)
+            self._stats["hits_memoria"] += 1
+            valor_json = entrada.valor_json
+        self._registrar_hit(cache_key)
+        return json.loads(valor_json), False
+    
+    def _guardar_en_memoria(self, cache_key: str, valor_json: str, ttl: float) -> None:
+        """Inserta/reemplaza una entrada y desaloja las menos usadas (llamar con _lock)."""
+        tamano = len(valor_json)
+        if tamano > self._max_bytes:
+            self._quitar_de_memoria(cache_key)
+            return
+        self._quitar_de_memoria(cache_key)
+        self._memoria[cache_key] = _EntradaMemoria(valor_json, time.monotonic() + ttl)
+        self._bytes_memoria += tamano
+        while len(self._memoria) > self._max_entradas or self._bytes_memoria > self._max_bytes:
+            _, entrada = self._memoria.popitem(last=False)
+            self._bytes_memoria -= len(entrada.valor_json)
+            self._stats["evictions"] += 1
+    
+    def _quitar_de_memoria(self, cache_key: str) -> bool:
+        """Elimina una entrada del nivel en memoria (llamar con _lock)."""
+        entrada = self._memoria.pop(cache_key, None)
+        if entrada is None:
+            return False
+        self._bytes_memoria -= len(entrada.valor_json)
+        return True
+    
+    def _quitar_de_memoria_si(self, predicado) -> int:
+        with self._lock:
+            claves = [k for k in self._memoria if predicado(k)]
+            for clave in claves:
+                self._quitar_de_memoria(clave)
+            return len(claves)
+    
+    # ------------------------------------------------------------------
+    # Hits acumulados
+    # ------------------------------------------------------------------
+    def _registrar_hit(self, cache_key: str) -> None:
+        with self._lock:
+            self._hits_pendientes[cache_key] = self._hits_pendientes.get(cache_key, 0) + 1
+            pendientes = sum(self._hits_pendientes.values())
+            vencido = time.monotonic() - self._ultimo_flush >= self.INTERVALO_FLUSH_S
+        if pendientes >= self.LOTE_HITS or vencido:
+            self.flush_hits()
+    
+    def flush_hits(self) -> int:
+        """
+        Vuelca los hits acumulados en memoria a analytics_cache y a
+        system_metrics en una sola transacción.
+        
+        Returns:
+            Número de hits volcados
+        """
+        with self._lock:
+            pendientes, self._hits_pendientes = self._hits_pendientes, {}
+            self._ultimo_flush = time.monotonic()
+        if not pendientes:
+            return 0
+        total = sum(pendientes.values())
+        try:
+            with get_db_connection() as conn:
+                conn.executemany(
+                    "UPDATE analytics_cache SET hits = hits + ? WHERE cache_key = ?",
+                    [(n, clave) for clave, n in pendientes.items()],
+                )
+                conn.commit()
+        except Exception as e:
+            self.logger.error(f"Error volcando hits de cache: {e}")
+        
+        # Registrar cache hits
+        try:
+            metrics = get_system_metrics_service()
+            metrics.registrar_cache_hit("analytics_cache", cantidad=total)
+        except Exception:
+            pass  # No bloquear cache por error de métricas
+        return total
+    
+    # ------------------------------------------------------------------
+    # Dependencias
+    # ------------------------------------------------------------------
+    def _marca_invalidaciones(self) -> int:
+        """Último id de cache_invalidacion (0 si la tabla no existe)."""
+        try:
+            with get_db_connection() as conn:
+                row = conn.execute("SELECT COALESCE(MAX(id), 0) FROM cache_invalidacion").fetchone()
+                return int(row[0])
+        except Exception:
+            return 0
+    
+    def _registrar_dependencias(self, cache_key: str, dependencias: List[Dependencia]) -> int:
+        """Reemplaza las dependencias de la clave; retorna la marca de invalidaciones."""
+        try:
+            with get_db_connection() as conn:
+                marca = conn.execute("SELECT COALESCE(MAX(id), 0) FROM cache_invalidacion").fetchone()[0]
+                self._escribir_dependencias(conn, cache_key, dependencias)
+                conn.commit()
+                return int(marca)
+        except Exception as e:
+            self.logger.debug(f"Dependencias de cache no disponibles ({cache_key}): {e}")
+            return 0
+    
+    @staticmethod
+    def _escribir_dependencias(conn, cache_key: str, dependencias: List[Dependencia]) -> None:
+        conn.execute("DELETE FROM cache_dependencia WHERE cache_key = ?", (cache_key,))
+        conn.executemany(
+            "INSERT INTO cache_dependencia (cache_key, tabla, desde, hasta) VALUES (?, ?, ?, ?)",
+            [(cache_key, d.tabla, d.desde, d.hasta) for d in dict.fromkeys(dependencias)],
+        )
+    
+    def _rango_cerrado(self, dependencias: List[Dependencia]) -> bool:
+        """True si todas las dependencias tienen rango y todos sus meses están cerrados."""
+        meses = set()
+        for dep in dependencias:
+            cubiertos = dep.meses_cubiertos()
+            if not cubiertos:
+                return False
+            meses.update(cubiertos)
+        try:
+            with get_db_connection() as conn:
+                cerrados = {
+                    (row[0], row[1]) for row in conn.execute(
+                        "SELECT año, mes FROM cierre_mensual WHERE estado = 'Completado'"
+                    ).fetchall()
+                }
+        except Exception:
+            return False
+        return meses <= cerrados
+    
+    def sincronizar_invalidaciones(self) -> int:
+        """
+        Quita del nivel en memoria las claves invalidadas por triggers
+        (en este u otro proceso) desde la última revisión.
+        
+        Returns:
+            Número de entradas quitadas de memoria
+        """
+        self._ultima_sincronizacion = time.monotonic()
+        try:
+            with get_db_connection() as conn:
+                filas = conn.execute(
+                    "SELECT id, cache_key FROM cache_invalidacion WHERE id > ? ORDER BY id",
+                    (self._ultima_invalidacion,),
+                ).fetchall()
+        except Exception:
+            return 0
+        if not filas:
+            return 0
+        quitadas = 0
+        with self._lock:
+            self._ultima_invalidacion = max(self._ultima_invalidacion, filas[-1][0])
+            for _, clave in filas:
+                if self._quitar_de_memoria(clave):
+                    quitadas += 1
+            self._stats["invalidadas_por_dependencia"] += quitadas
+        if quitadas:
+            self.logger.debug(f"Cache en memoria invalidado por dependencias: {quitadas} entradas")
+        return quitadas
     
     def _save_to_cache(
         self,
         cache_key: str,
         valor: Any,
         ttl: int,
-        tags: Optional[list[str]] = None
+        tags: Optional[list[str]] = None,
+        dependencias: Optional[List[Dependencia]] = None,
+        marca: Optional[int] = None,
     ) -> None:
         """
         Guarda valor en cache.
@@ -162,6 +551,9 @@ class AnalyticsCacheService:
             valor: Valor a cachear
             ttl: Tiempo de vida en segundos
             tags: Tags para invalidación
+            dependencias: Tablas/rangos de origen de la entrada
+            marca: Marca de cache_invalidacion tomada antes de calcular;
+                si la clave se invalidó después, el valor no se guarda
         """
         try:
             valor_json = json.dumps(valor, ensure_ascii=False)
@@ -169,6 +561,15 @@ class AnalyticsCacheService:
             with get_db_connection() as conn:
                 cursor = conn.cursor()
                 
+                if dependencias:
+                    if marca is not None and cursor.execute(
+                        "SELECT 1 FROM cache_invalidacion WHERE id > ? AND cache_key = ? LIMIT 1",
+                        (marca, cache_key),
+                    ).fetchone():
+                        self.logger.debug(f"Origen modificado durante el cálculo, no se cachea: {cache_key}")
+                        return
+                    self._escribir_dependencias(conn, cache_key, dependencias)
+                
                 # Verificar si existe
                 cursor.execute("""
                     SELECT id FROM analytics_cache
@@ -195,10 +596,23 @@ class AnalyticsCacheService:
                 
                 conn.commit()
                 self.logger.debug(f"Valor cacheado: {cache_key} (TTL: {ttl}s)")
+            
+            with self._lock:
+                # La fila reinicia hits = 0: descartar los pendientes de la versión anterior
+                self._hits_pendientes.pop(cache_key, None)
+                self._guardar_en_memoria(cache_key, valor_json, ttl)
                 
         except Exception as e:
             self.logger.error(f"Error guardando cache {cache_key}: {e}")
     
+    @staticmethod
+    def _borrar_dependencias(cursor, condicion: str, params: tuple) -> None:
+        """Borra dependencias huérfanas (tolerante a BD sin cache_dependencia)."""
+        try:
+            cursor.execute(f"DELETE FROM cache_dependencia WHERE {condicion}", params)
+        except Exception:
+            pass
+    
     def invalidar(self, cache_key: str) -> bool:
         """
         Invalida una entrada de cache específica.
@@ -209,6 +623,9 @@ class AnalyticsCacheService:
         Returns:
             True si se eliminó, False si no existía
         """
+        with self._lock:
+            self._quitar_de_memoria(cache_key)
+            self._hits_pendientes.pop(cache_key, None)
         try:
             with get_db_connection() as conn:
                 cursor = conn.cursor()
@@ -219,6 +636,7 @@ class AnalyticsCacheService:
                 """, (cache_key,))
                 
                 eliminado = cursor.rowcount > 0
+                self._borrar_dependencias(cursor, "cache_key = ?", (cache_key,))
                 conn.commit()
                 
                 if eliminado:
@@ -240,6 +658,8 @@ class AnalyticsCacheService:
         Returns:
             Número de entradas eliminadas
         """
+        regex = _like_a_regex(patron)
+        self._quitar_de_memoria_si(regex.match)
         try:
             with get_db_connection() as conn:
                 cursor = conn.cursor()
@@ -250,6 +670,7 @@ class AnalyticsCacheService:
                 """, (patron,))
                 
                 eliminadas = cursor.rowcount
+                self._borrar_dependencias(cursor, "cache_key LIKE ?", (patron,))
                 conn.commit()
                 
                 if eliminadas > 0:
@@ -273,6 +694,7 @@ class AnalyticsCacheService:
         Returns:
             Número de entradas invalidadas
         """
+        self._quitar_de_memoria_si(lambda k: k.startswith(("trend_", "comp_", "insights_")))
         try:
             with get_db_connection() as conn:
                 cursor = conn.cursor()
@@ -307,6 +729,11 @@ class AnalyticsCacheService:
         Returns:
             Número de entradas eliminadas
         """
+        ahora = time.monotonic()
+        with self._lock:
+            vencidas = [k for k, e in self._memoria.items() if ahora >= e.expira_mono]
+            for clave in vencidas:
+                self._quitar_de_memoria(clave)
         try:
             with get_db_connection() as conn:
                 cursor = conn.cursor()
@@ -317,6 +744,15 @@ class AnalyticsCacheService:
                 """)
                 
                 eliminadas = cursor.rowcount
+                self._borrar_dependencias(
+                    cursor, "cache_key NOT IN (SELECT cache_key FROM analytics_cache)", ()
+                )
+                try:
+                    cursor.execute(
+                        "DELETE FROM cache_invalidacion WHERE fecha < datetime('now', '-1 day')"
+                    )
+                except Exception:
+                    pass
                 conn.commit()
                 
                 if eliminadas > 0:
@@ -335,11 +771,16 @@ class AnalyticsCacheService:
         Returns:
             Número de entradas eliminadas
         """
+        with self._lock:
+            self._memoria.clear()
+            self._bytes_memoria = 0
+            self._hits_pendientes.clear()
         try:
             with get_db_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute("DELETE FROM analytics_cache")
                 eliminadas = cursor.rowcount
+                self._borrar_dependencias(cursor, "1 = 1", ())
                 conn.commit()
                 
                 self.logger.info(f"Cache completo eliminado: {eliminadas} entradas")
@@ -354,8 +795,10 @@ class AnalyticsCacheService:
         Obtiene estadísticas del cache.
         
         Returns:
-            Diccionario con stats
+            Diccionario con stats de la tabla y, en 'memoria', del nivel
+            en memoria (entradas, bytes, hit_ratio, evictions...)
         """
+        self.flush_hits()
         try:
             with get_db_connection() as conn:
                 cursor = conn.cursor()
@@ -374,12 +817,43 @@ class AnalyticsCacheService:
                     'total_entradas': row[0] or 0,
                     'total_hits': row[1] or 0,
                     'hits_promedio': round(row[2], 2) if row[2] else 0,
-                    'hits_maximo': row[3] or 0
+                    'hits_maximo': row[3] or 0,
+                    'memoria': self.estadisticas_memoria(),
                 }
                 
         except Exception as e:
             self.logger.error(f"Error obteniendo estadísticas: {e}")
-            return {}
+            return {'memoria': self.estadisticas_memoria()}
+    
+    def estadisticas_memoria(self) -> Dict[str, Any]:
+        """Estadísticas del nivel en memoria desde el arranque del proceso."""
+        with self._lock:
+            stats = dict(self._stats)
+            consultas = stats["hits_memoria"] + stats["hits_bd"] + stats["misses"]
+            stats.update({
+                'entradas': len(self._memoria),
+                'bytes': self._bytes_memoria,
+                'max_entradas': self._max_entradas,
+                'max_bytes': self._max_bytes,
+                'hit_ratio': round(stats["hits_memoria"] / consultas, 4) if consultas else 0.0,
+                'hit_ratio_total': round((stats["hits_memoria"] + stats["hits_bd"]) / consultas, 4) if consultas else 0.0,
+                'hits_pendientes': sum(self._hits_pendientes.values()),
+                'en_vuelo': len(self._en_vuelo),
+            })
+            return stats
+
+
+def _like_a_regex(patron: str) -> "re.Pattern[str]":
+    """Traduce un patrón LIKE de SQLite (%, _) a regex (sin distinguir mayúsculas, como LIKE)."""
+    partes = []
+    for c in patron:
+        if c == "%":
+            partes.append(".*")
+        elif c == "_":
+            partes.append(".")
+        else:
+            partes.append(re.escape(c))
+    return re.compile("".join(partes) + r"\Z", re.IGNORECASE | re.DOTALL)
 
 
 # Singleton
@@ -391,4 +865,5 @@ def get_analytics_cache() -> AnalyticsCacheService:
     global _analytics_cache_instance
     if _analytics_cache_instance is None:
         _analytics_cache_instance = AnalyticsCacheService()
+        atexit.register(_analytics_cache_instance.flush_hits)
     return _analytics_cache_instance
@@ -21,7 +21,7 @@ Salida:
 
 Regla CRÍTICA:
     ⚠️ NUNCA leer tablas operativas
-    ✅ SOLO leer bi_snapshots_mensual
+    ✅ SOLO leer datos de snapshots (almacén compartido kpi_series_store)
 
 Auditoría:
     - CONSULTA_ANALITICA: tipo=COMPARATIVO
@@ -39,8 +39,9 @@ import json
 import logging
 from enum import Enum
 
-from src.database.database import get_db_connection
-from src.services.analytics_cache_service import get_analytics_cache
+from src.services.analytics_cache_service import Dependencia, get_analytics_cache
+from src.services.closed_period_store import get_closed_period_store
+from src.services.kpi_series_store import get_kpi_series_store
 from src.core.audit_service import log_event
 
 logger = logging.getLogger("AnalyticsComparative")
@@ -126,9 +127,10 @@ class AnalyticsComparativeService:
 
         # Consultar cache
         cache_key = f"comp_mes_{metrica}_{año_actual}_{mes_actual}"
-        cached = self._cache.get_or_calculate(
-            cache_key,
-            lambda: self._comparar_meses(metrica, mes_actual, año_actual)
+        desde = (año_actual if mes_actual > 1 else año_actual - 1, mes_actual - 1 if mes_actual > 1 else 12)
+        cached = self._obtener(
+            cache_key, desde, (año_actual, mes_actual),
+            lambda: self._comparar_meses(metrica, mes_actual, año_actual),
         )
 
         if isinstance(cached, str):
@@ -168,9 +170,13 @@ class AnalyticsComparativeService:
             año_actual = hoy.year
 
         cache_key = f"comp_trim_{metrica}_{año_actual}_{trimestre_actual}"
-        cached = self._cache.get_or_calculate(
-            cache_key,
-            lambda: self._comparar_trimestres(metrica, trimestre_actual, año_actual)
+        desde = (
+            año_actual if trimestre_actual > 1 else año_actual - 1,
+            (trimestre_actual - 2) * 3 + 1 if trimestre_actual > 1 else 10,
+        )
+        cached = self._obtener(
+            cache_key, desde, (año_actual, trimestre_actual * 3),
+            lambda: self._comparar_trimestres(metrica, trimestre_actual, año_actual),
         )
 
         if isinstance(cached, str):
@@ -204,9 +210,9 @@ class AnalyticsComparativeService:
             año_actual = datetime.now().year
 
         cache_key = f"comp_año_{metrica}_{año_actual}"
-        cached = self._cache.get_or_calculate(
-            cache_key,
-            lambda: self._comparar_años(metrica, año_actual)
+        cached = self._obtener(
+            cache_key, (año_actual - 1, 1), (año_actual, 12),
+            lambda: self._comparar_años(metrica, año_actual),
         )
 
         if isinstance(cached, str):
@@ -229,6 +235,22 @@ class AnalyticsComparativeService:
 
     # ==================== IMPLEMENTACIÓN PRIVADA ====================
 
+    def _obtener(self, cache_key: str, desde: tuple, hasta: tuple, calcular) -> Any:
+        """
+        Comparativo de los meses [desde, hasta]: si están todos cerrados es una
+        lectura del almacén de períodos cerrados; si no, pasa por el cache
+        analítico con dependencia en los snapshots de esos meses.
+        """
+        return get_closed_period_store().obtener_o_calcular(
+            cache_key, desde, hasta, None,
+            lambda: self._cache.get_or_calculate(
+                cache_key,
+                calcular,
+                depende_de=[Dependencia.meses("bi_snapshots_mensual", desde[0], desde[1], hasta[0], hasta[1])],
+            ),
+        )
+
+
     def _comparar_meses(self, metrica: str, mes: int, año: int) -> Dict[str, Any]:
         """Implementa comparación mes vs mes."""
         # Snapshot actual
@@ -303,53 +325,22 @@ class AnalyticsComparativeService:
 
     def _obtener_valor_mes(self, metrica: str, mes: int, año: int) -> float:
         """Obtiene valor de métrica para mes específico."""
+        return self._valores_meses(metrica, [mes], año).get(mes, 0.0)
+
+    def _valores_meses(self, metrica: str, meses: list, año: int) -> Dict[int, float]:
+        """Valores de la métrica en los meses pedidos del año ({mes: valor}), en una consulta."""
         try:
-            with get_db_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute("""
-                    SELECT data_json
-                    FROM bi_snapshots_mensual
-                    WHERE año = ? AND mes = ?
-                    LIMIT 1
-                """, (año, mes))
-
-                row = cursor.fetchone()
-                if row:
-                    data = json.loads(row[0])
-                    valor = self._extraer_metrica(data, metrica)
-                    return float(valor) if valor is not None else 0.0
-
-            return 0.0
+            serie = get_kpi_series_store().series([metrica], (año, min(meses)), (año, max(meses)))[metrica]
+            return {mes: float(serie[(año, mes)]) for mes in meses if (año, mes) in serie}
         except Exception as e:
-            logger.error(f"Error obteniendo valor {mes}/{año}: {e}")
-            return 0.0
+            logger.error(f"Error obteniendo {metrica} de {año} meses {meses}: {e}")
+            return {}
 
     def _promedio_meses(self, metrica: str, meses: list, año: int) -> float:
         """Calcula promedio de métrica para varios meses."""
-        valores = []
-        for mes in meses:
-            val = self._obtener_valor_mes(metrica, mes, año)
-            if val > 0:
-                valores.append(val)
-
+        valores = [v for v in self._valores_meses(metrica, meses, año).values() if v > 0]
         return sum(valores) / len(valores) if valores else 0.0
 
-    def _extraer_metrica(self, snapshot: Dict[str, Any], metrica: str) -> Optional[float]:
-        """Extrae métrica del snapshot JSON."""
-        try:
-            if "resumen_mensual" in snapshot and "kpis" in snapshot["resumen_mensual"]:
-                kpis = snapshot["resumen_mensual"]["kpis"]
-                if metrica in kpis:
-                    return float(kpis[metrica])
-
-            if "kpis" in snapshot and metrica in snapshot["kpis"]:
-                return float(snapshot["kpis"][metrica])
-
-            return None
-        except Exception as e:
-            logger.warning(f"Error extrayendo {metrica}: {e}")
-            return None
-
     def _variacion_porcentual(self, valor_anterior: float, valor_actual: float) -> float:
         """Calcula variación porcentual."""
         if valor_anterior == 0:
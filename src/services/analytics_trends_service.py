@@ -17,7 +17,7 @@ Flujo:
 
 Regla CRÍTICA:
     ⚠️ NUNCA leer tablas operativas
-    ✅ SOLO leer bi_snapshots_mensual
+    ✅ SOLO leer datos de snapshots (almacén compartido kpi_series_store)
     ✅ USAR analytics_cache para velocidad
 
 Auditoría:
@@ -36,8 +36,9 @@ import json
 import logging
 from enum import Enum
 
-from src.database.database import get_db_connection
-from src.services.analytics_cache_service import get_analytics_cache
+from src.database.rango_fechas import rango_semiabierto
+from src.services.analytics_cache_service import Dependencia, get_analytics_cache
+from src.services.kpi_series_store import get_kpi_series_store
 from src.core.audit_service import log_event
 
 logger = logging.getLogger("AnalyticsTrends")
@@ -114,7 +115,9 @@ class AnalyticsTrendsService:
         cache_key = f"trend_{metrica}_{periodo.value}"
         cached = self._cache.get_or_calculate(
             cache_key,
-            lambda: self._compute_trend(metrica, periodo)
+            lambda: self._compute_trend(metrica, periodo),
+            depende_de=[Dependencia("bi_snapshots_mensual")],
+            stale_while_revalidate=True,
         )
 
         # 2. Parsear resultado
@@ -152,8 +155,8 @@ class AnalyticsTrendsService:
 
         Flujo:
             1. Determinar rango de fechas según período
-            2. Consultar snapshots en rango
-            3. Extraer métrica de JSON
+            2. Consultar snapshots en rango con el valor de kpi_fact
+            3. Descartar snapshots sin la métrica
             4. Calcular:
                - Promedio móvil (3 períodos)
                - Variación porcentual
@@ -164,10 +167,10 @@ class AnalyticsTrendsService:
         hoy = datetime.now()
         fecha_inicio = self._calcular_fecha_inicio(hoy, periodo)
 
-        # 2. Consultar snapshots
-        snapshots = self._obtener_snapshots_rango(fecha_inicio, hoy)
+        # 2. Consultar snapshots del rango con el valor de la métrica
+        filas = self._obtener_valores_rango(metrica, fecha_inicio, hoy)
 
-        if not snapshots:
+        if not filas:
             # Retornar tendencia vacía
             return {
                 "puntos": [],
@@ -177,15 +180,12 @@ class AnalyticsTrendsService:
                 "variacion_total_pct": 0
             }
 
-        # 3. Extraer métrica
-        puntos_brutos = []
-        for snapshot in snapshots:
-            valor = self._extraer_metrica(snapshot, metrica)
-            if valor is not None:
-                puntos_brutos.append({
-                    "fecha": snapshot["fecha_snapshot"][:10],
-                    "valor": float(valor)
-                })
+        # 3. Puntos con valor (snapshots donde existe la métrica)
+        puntos_brutos = [
+            {"fecha": fecha_snapshot[:10], "valor": float(valor)}
+            for fecha_snapshot, valor in filas
+            if valor is not None
+        ]
 
         if not puntos_brutos:
             return {
@@ -222,51 +222,25 @@ class AnalyticsTrendsService:
         elif periodo == TrendPeriod.YEARLY:
             return hoy - timedelta(days=365)
 
-    def _obtener_snapshots_rango(self, fecha_inicio: datetime, fecha_fin: datetime) -> List[Dict[str, Any]]:
-        """Consulta snapshots en rango de fechas."""
+    def _obtener_valores_rango(
+        self, metrica: str, fecha_inicio: datetime, fecha_fin: datetime
+    ) -> List[tuple]:
+        """
+        Snapshots generados en el rango con el valor de la métrica:
+        [(fecha_snapshot, valor o None)] en orden cronológico.
+        """
         try:
-            with get_db_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute("""
-                    SELECT data_json, fecha_snapshot
-                    FROM bi_snapshots_mensual
-                    WHERE DATE(fecha_snapshot) >= ? AND DATE(fecha_snapshot) <= ?
-                    ORDER BY fecha_snapshot ASC
-                """, (fecha_inicio.date(), fecha_fin.date()))
-
-                snapshots = []
-                for row in cursor.fetchall():
-                    try:
-                        data = json.loads(row[0])
-                        data["fecha_snapshot"] = row[1]
-                        snapshots.append(data)
-                    except json.JSONDecodeError:
-                        logger.warning(f"No se pudo parsear snapshot: {row}")
-                        continue
-
-                return snapshots
+            store = get_kpi_series_store()
+            snapshots = store.snapshots_entre(*rango_semiabierto(fecha_inicio.date(), fecha_fin.date()))
+            if not snapshots:
+                return []
+            periodos = [p for _, p in snapshots]
+            serie = store.series([metrica], min(periodos), max(periodos))[metrica]
+            return [(fecha, serie.get(periodo)) for fecha, periodo in snapshots]
         except Exception as e:
             logger.error(f"Error consultando snapshots: {e}")
             return []
 
-    def _extraer_metrica(self, snapshot: Dict[str, Any], metrica: str) -> Optional[float]:
-        """Extrae métrica del snapshot JSON."""
-        try:
-            # Buscar en resumen_mensual.kpis
-            if "resumen_mensual" in snapshot and "kpis" in snapshot["resumen_mensual"]:
-                kpis = snapshot["resumen_mensual"]["kpis"]
-                if metrica in kpis:
-                    return float(kpis[metrica])
-
-            # Buscar en kpis root
-            if "kpis" in snapshot and metrica in snapshot["kpis"]:
-                return float(snapshot["kpis"][metrica])
-
-            return None
-        except Exception as e:
-            logger.warning(f"Error extrayendo métrica {metrica}: {e}")
-            return None
-
     def _calcular_estadisticas(self, puntos_brutos: List[Dict]) -> List[TrendPoint]:
         """Calcula promedio móvil y variación porcentual."""
         puntos = []
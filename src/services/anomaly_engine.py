@@ -0,0 +1,135 @@
+"""
+Motor vectorizado de anomalías sobre series mensuales de KPIs.
+
+Calcula para cada mes de la historia, cada métrica y cada finca, en una sola
+pasada NumPy, lo mismo que AiAnomalyDetectorService hacía para el último mes:
+promedio y desviación estándar (poblacional) de los `ventana` meses previos
+con dato, z-score, desviación porcentual, score 0–100 y nivel.
+
+    motor = MotorAnomalias(ventana=6)
+    fincas, periodos, valores = get_kpi_series_store().cubo(metricas, desde, hasta)
+    matriz = motor.evaluar(valores)          # valores.shape == (fincas, metricas, meses)
+    matriz.score[0, 1]                       # scores históricos de la métrica 1, finca 0
+
+La ventana se mide en posiciones del eje (meses con datos), igual que el
+detector original, que tomaba los últimos snapshots sin mirar huecos de
+calendario. Las posiciones sin valor actual o con menos de `min_previos`
+valores previos quedan en NaN (score = -1, nivel = "").
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, Iterable, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+NIVELES = ("BAJO", "MEDIO", "ALTO")
+SIN_SCORE = -1
+
+
+@dataclass
+class MatrizAnomalias:
+    """Resultado por (…, métrica, mes); todas las matrices tienen la forma de la entrada."""
+    ventana: int
+    valor: np.ndarray
+    promedio: np.ndarray
+    std: np.ndarray
+    z: np.ndarray
+    pct: np.ndarray
+    score: np.ndarray  # int, SIN_SCORE donde no hay evaluación
+    nivel: np.ndarray  # índice en NIVELES, -1 donde no hay evaluación
+
+    @property
+    def evaluado(self) -> np.ndarray:
+        return self.score != SIN_SCORE
+
+    def niveles(self) -> np.ndarray:
+        """Nivel como texto ('BAJO' | 'MEDIO' | 'ALTO' | '')."""
+        etiquetas = np.array(NIVELES + ("",), dtype=object)
+        return etiquetas[self.nivel]
+
+
+class MotorAnomalias:
+    """Z-scores y scores móviles de anomalías para matrices de series mensuales."""
+
+    def __init__(
+        self,
+        ventana: int = 6,
+        min_previos: int = 2,
+        peso_z: float = 20.0,
+        peso_pct: float = 0.5,
+        umbrales: Tuple[int, int] = (30, 60),
+    ):
+        if ventana < 1 or min_previos < 1 or min_previos > ventana:
+            raise ValueError(f"Ventana inválida: ventana={ventana}, min_previos={min_previos}")
+        self.ventana = ventana
+        self.min_previos = min_previos
+        self.peso_z = peso_z
+        self.peso_pct = peso_pct
+        self.umbrales = umbrales
+
+    def evaluar(self, valores: np.ndarray) -> MatrizAnomalias:
+        """
+        Evalúa todos los meses de una matriz de series (NaN = sin dato).
+
+        Args:
+            valores: arreglo (..., meses); típicamente (métricas, meses) o
+                (fincas, métricas, meses)
+        """
+        x = np.asarray(valores, dtype=np.float64)
+        w = self.ventana
+
+        # Ventana de los w meses previos a cada posición: se rellena el inicio con NaN
+        relleno = np.full(x.shape[:-1] + (w,), np.nan)
+        ventanas = sliding_window_view(np.concatenate([relleno, x], axis=-1), w, axis=-1)[..., :-1, :]
+
+        presentes = ~np.isnan(ventanas)
+        n = presentes.sum(axis=-1)
+        con_previos = n >= self.min_previos
+        divisor = np.where(n > 0, n, 1)
+        promedio = np.where(presentes, ventanas, 0.0).sum(axis=-1) / divisor
+        # Dos pasadas (desvíos respecto al promedio): una serie constante da std 0 exacto
+        desvios = np.where(presentes, ventanas - promedio[..., None], 0.0)
+        std = np.sqrt((desvios ** 2).sum(axis=-1) / divisor)
+
+        evaluado = con_previos & ~np.isnan(x)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            z = np.where(std == 0, 0.0, (x - promedio) / std)
+            pct = np.where(promedio == 0, 0.0, (x - promedio) / np.abs(promedio) * 100)
+
+        score_raw = np.abs(z) * self.peso_z + np.abs(pct) * self.peso_pct
+        score = np.clip(np.round(np.nan_to_num(score_raw, nan=0.0)), 0, 100).astype(np.int64)
+        nivel = np.searchsorted(np.asarray(self.umbrales), score, side="right")
+
+        promedio = np.where(con_previos, promedio, np.nan)
+        std = np.where(con_previos, std, np.nan)
+        return MatrizAnomalias(
+            ventana=w,
+            valor=x,
+            promedio=promedio,
+            std=std,
+            z=np.where(evaluado, z, np.nan),
+            pct=np.where(evaluado, pct, np.nan),
+            score=np.where(evaluado, score, SIN_SCORE),
+            nivel=np.where(evaluado, nivel, -1),
+        )
+
+
+def evaluar_ventanas(valores: np.ndarray, ventanas: Iterable[int], **opciones) -> Dict[int, MatrizAnomalias]:
+    """Evalúa la misma matriz con varias longitudes de ventana."""
+    return {w: MotorAnomalias(ventana=w, **opciones).evaluar(valores) for w in ventanas}
+
+
+def backtest_umbrales(matriz: MatrizAnomalias, umbrales: Iterable[int]) -> Dict[int, np.ndarray]:
+    """
+    Meses marcados por cada umbral de score, por serie.
+
+    Returns:
+        {umbral: conteos con la forma de matriz.score sin el eje de meses}
+    """
+    return {u: (matriz.score >= u).sum(axis=-1) for u in umbrales}
+
+
+__all__ = ["NIVELES", "SIN_SCORE", "MatrizAnomalias", "MotorAnomalias", "evaluar_ventanas", "backtest_umbrales"]
@@ -8,6 +8,7 @@ Captura estado completo del negocio al final de cada mes.
 Responsabilidades:
 - Generar snapshot mensual con todos los KPIs y estado
 - Persistir en tabla bi_snapshots_mensual para historial
+- Escribir las métricas numéricas en kpi_fact (una fila por métrica y mes)
 - NO recalcular: usar datos ya persistidos
 - Base para análisis histórico y tendencias
 
@@ -15,7 +16,7 @@ Flow:
 1. on_monthly_close() llama a generar_snapshot()
 2. Snapshot contiene: resumen, KPIs, alertas, tendencias
 3. Se persiste en JSON comprimido para consultas ágiles
-4. Analytics services leen snapshots sin cálculos costosos
+4. Analytics services leen kpi_fact (solo las métricas y meses que usan)
 """
 
 from __future__ import annotations
@@ -25,6 +26,8 @@ import json
 import logging
 from pathlib import Path
 from src.database.database import get_db_connection
+from src.database.kpi_fact import escribir_kpis, metricas_de_snapshot
+from src.services.kpi_series_store import get_kpi_series_store
 from src.services.system_metrics_service import get_system_metrics_service
 
 logger = logging.getLogger("bi_snapshot")
@@ -193,7 +196,7 @@ class BISnapshotService:
         snapshot: Dict[str, Any],
         usuario: str
     ) -> None:
-        """Guarda snapshot serializado en BD"""
+        """Guarda snapshot serializado y sus métricas en kpi_fact (misma transacción)"""
         import hashlib
         
         snapshot_json = json.dumps(snapshot, ensure_ascii=False)
@@ -229,7 +232,9 @@ class BISnapshotService:
                 """, (año, mes, snapshot_json, md5_hash, usuario))
                 self.logger.debug(f"Snapshot {año}-{mes:02d} insertado")
             
+            escribir_kpis(conn, año, mes, metricas_de_snapshot(snapshot))
             conn.commit()
+        get_kpi_series_store().invalidar()
     
     def obtener_snapshot(self, año: int, mes: int) -> Dict[str, Any]:
         """
@@ -295,7 +300,8 @@ class BISnapshotService:
     
     def limpiar_snapshots_antiguos(self, meses_retener: int = 24) -> int:
         """
-        Limpia snapshots más antiguos que el período especificado.
+        Limpia snapshots más antiguos que el período especificado, junto con
+        sus métricas en kpi_fact (misma transacción).
         
         Args:
             meses_retener: Número de meses a mantener (default 24 = 2 años)
@@ -306,6 +312,13 @@ class BISnapshotService:
         with get_db_connection() as conn:
             cursor = conn.cursor()
             
+            cursor.execute("""
+                DELETE FROM kpi_fact
+                WHERE (año, mes) IN (
+                    SELECT año, mes FROM bi_snapshots_mensual
+                    WHERE fecha_snapshot < date('now', '-' || ? || ' months')
+                )
+            """, (meses_retener,))
             cursor.execute("""
                 DELETE FROM bi_snapshots_mensual
                 WHERE fecha_snapshot < date('now', '-' || ? || ' months')
@@ -315,6 +328,7 @@ class BISnapshotService:
             conn.commit()
             
             if eliminados > 0:
+                get_kpi_series_store().invalidar()
                 self.logger.info(f"Snapshots antiguos eliminados: {eliminados}")
             
             return eliminados
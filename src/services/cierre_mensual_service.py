@@ -16,6 +16,7 @@ from src.services.reportes_service import reportes_service
 from src.services.data_lock_service import get_data_lock_service
 from src.services.bi_snapshot_service import get_bi_snapshot_service
 from src.services.analytics_cache_service import get_analytics_cache
+from src.services.kpi_series_store import get_kpi_series_store
 from src.services.ai_anomaly_detector import get_ai_anomaly_detector_service
 from src.services.ai_pattern_detector import get_ai_pattern_detector_service
 from src.services.system_metrics_service import get_system_metrics_service
@@ -232,6 +233,7 @@ class CierreMensualService:
             
             resumen['id'] = cursor.lastrowid
             conn.commit()
+        get_kpi_series_store().invalidar()
         
         # Bloquear ediciones del período cerrado
         lock_service = get_data_lock_service()
@@ -0,0 +1,229 @@
+"""
+Almacén permanente de resultados de períodos contables cerrados.
+
+Un mes con cierre_mensual 'Completado' está bloqueado por DataLockService:
+sus reportes, KPIs y comparativos ya no pueden cambiar, así que se calculan
+una vez y se guardan sin vencimiento en resultado_periodo_cerrado, con
+clave (tipo, mes desde, mes hasta, hash de filtros):
+
+    store = get_closed_period_store()
+    reporte = store.obtener_o_calcular(
+        "financiero_mensual", (2025, 3), (2025, 3), {}, lambda: calcular(2025, 3)
+    )
+
+Si algún mes del rango no está cerrado se llama a `calcular` sin guardar
+nada. Un comparativo año contra año sobre dos años cerrados queda en una
+sola lectura por clave primaria (y en memoria después de la primera).
+
+Invalidación: solo DataLockService.unblock_period, con invalidar_mes().
+Como red de seguridad entre procesos, cada resultado guarda la firma de
+los cierres que cubre (id y fecha_cierre); si un mes se revierte y se
+vuelve a cerrar desde otro proceso, la firma cambia y el resultado viejo
+no se sirve. Los cierres se releen cada INTERVALO_VERIFICACION_S.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from src.database.database import get_db_connection
+from src.database.periodos import Periodo, meses_entre, texto_mes
+
+logger = logging.getLogger(__name__)
+
+
+def hash_filtros(filtros: Optional[Dict[str, Any]]) -> str:
+    """Hash estable de los filtros (orden de claves indiferente)."""
+    texto = json.dumps(filtros or {}, sort_keys=True, default=str)
+    return hashlib.sha1(texto.encode("utf-8")).hexdigest()[:16]
+
+
+class ClosedPeriodStore:
+    """Resultados inmutables de meses cerrados, en BD y en un LRU en memoria."""
+
+    INTERVALO_VERIFICACION_S = 5.0
+    MAX_MEMORIA = 512  # entradas
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._memoria: "OrderedDict[tuple, Tuple[str, str]]" = OrderedDict()  # clave -> (firma, json)
+        self._cierres: Optional[Dict[Periodo, str]] = None
+        self._ultima_verificacion = 0.0
+        self._stats = {"hits_memoria": 0, "hits_bd": 0, "guardados": 0, "abiertos": 0, "invalidados": 0}
+
+    # ==================== CIERRES ====================
+
+    def meses_cerrados(self) -> Dict[Periodo, str]:
+        """{(año, mes): firma del cierre} de los meses con cierre 'Completado'."""
+        with self._lock:
+            ahora = time.monotonic()
+            if self._cierres is not None and ahora - self._ultima_verificacion < self.INTERVALO_VERIFICACION_S:
+                return self._cierres
+        try:
+            with get_db_connection() as conn:
+                filas = conn.execute(
+                    "SELECT año, mes, id, fecha_cierre FROM cierre_mensual WHERE estado = 'Completado'"
+                ).fetchall()
+            cierres = {(int(a), int(m)): f"{i}:{f}" for a, m, i, f in filas}
+        except Exception as e:
+            logger.debug(f"No se pudieron leer cierres mensuales: {e}")
+            cierres = {}
+        with self._lock:
+            self._cierres = cierres
+            self._ultima_verificacion = time.monotonic()
+        return cierres
+
+    def firma(self, desde: Periodo, hasta: Periodo) -> Optional[str]:
+        """Firma de los cierres del rango, o None si algún mes no está cerrado."""
+        cierres = self.meses_cerrados()
+        partes = []
+        for periodo in meses_entre(desde, hasta):
+            marca = cierres.get(periodo)
+            if marca is None:
+                return None
+            partes.append(marca)
+        return "|".join(partes) if partes else None
+
+    def esta_cerrado(self, desde: Periodo, hasta: Optional[Periodo] = None) -> bool:
+        return self.firma(desde, hasta or desde) is not None
+
+    # ==================== LECTURA / ESCRITURA ====================
+
+    def obtener_o_calcular(
+        self,
+        tipo: str,
+        desde: Periodo,
+        hasta: Periodo,
+        filtros: Optional[Dict[str, Any]],
+        calcular: Callable[[], Any],
+    ) -> Any:
+        """
+        Resultado guardado del rango cerrado, o calcular() (y guardarlo si el
+        rango está cerrado). El valor debe ser serializable a JSON; cada
+        lectura devuelve una copia nueva.
+        """
+        firma = self.firma(desde, hasta)
+        if firma is None:
+            with self._lock:
+                self._stats["abiertos"] += 1
+            return calcular()
+
+        clave = (tipo, texto_mes(desde), texto_mes(hasta), hash_filtros(filtros))
+        valor_json = self._leer(clave, firma)
+        if valor_json is not None:
+            return json.loads(valor_json)
+
+        valor = calcular()
+        try:
+            valor_json = json.dumps(valor, default=str)
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Resultado de {tipo} no serializable, no se guarda: {e}")
+            return valor
+        self._guardar(clave, firma, valor_json)
+        # Se devuelve lo mismo que devolverá un hit (fechas/decimales como texto)
+        return json.loads(valor_json)
+
+    def _leer(self, clave: tuple, firma: str) -> Optional[str]:
+        with self._lock:
+            en_memoria = self._memoria.get(clave)
+            if en_memoria is not None and en_memoria[0] == firma:
+                self._memoria.move_to_end(clave)
+                self._stats["hits_memoria"] += 1
+                return en_memoria[1]
+        try:
+            with get_db_connection() as conn:
+                fila = conn.execute(
+                    """
+                    SELECT firma, valor FROM resultado_periodo_cerrado
+                    WHERE tipo = ? AND desde = ? AND hasta = ? AND filtros_hash = ?
+                    """,
+                    clave,
+                ).fetchone()
+        except Exception as e:
+            logger.debug(f"No se pudo leer resultado cerrado {clave}: {e}")
+            return None
+        if fila is None or fila[0] != firma:
+            return None
+        with self._lock:
+            self._stats["hits_bd"] += 1
+            self._recordar(clave, firma, fila[1])
+        return fila[1]
+
+    def _guardar(self, clave: tuple, firma: str, valor_json: str) -> None:
+        try:
+            with get_db_connection() as conn:
+                conn.execute(
+                    """
+                    INSERT OR REPLACE INTO resultado_periodo_cerrado
+                    (tipo, desde, hasta, filtros_hash, firma, valor)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    """,
+                    clave + (firma, valor_json),
+                )
+                conn.commit()
+        except Exception as e:
+            logger.debug(f"No se pudo guardar resultado cerrado {clave}: {e}")
+        with self._lock:
+            self._stats["guardados"] += 1
+            self._recordar(clave, firma, valor_json)
+
+    def _recordar(self, clave: tuple, firma: str, valor_json: str) -> None:
+        self._memoria[clave] = (firma, valor_json)
+        self._memoria.move_to_end(clave)
+        while len(self._memoria) > self.MAX_MEMORIA:
+            self._memoria.popitem(last=False)
+
+    # ==================== INVALIDACIÓN ====================
+
+    def invalidar_mes(self, año: int, mes: int) -> int:
+        """
+        Borra los resultados cuyo rango incluye el mes (al revertir su cierre).
+
+        Returns:
+            Filas eliminadas de la BD
+        """
+        mes_txt = texto_mes((año, mes))
+        with self._lock:
+            for clave in [c for c in self._memoria if c[1] <= mes_txt <= c[2]]:
+                del self._memoria[clave]
+            self._cierres = None
+        try:
+            with get_db_connection() as conn:
+                cursor = conn.execute(
+                    "DELETE FROM resultado_periodo_cerrado WHERE desde <= ? AND hasta >= ?",
+                    (mes_txt, mes_txt),
+                )
+                conn.commit()
+                eliminadas = cursor.rowcount
+        except Exception as e:
+            logger.warning(f"No se pudieron invalidar resultados de {mes_txt}: {e}")
+            return 0
+        with self._lock:
+            self._stats["invalidados"] += eliminadas
+        if eliminadas:
+            logger.info(f"Resultados de período cerrado invalidados para {mes_txt}: {eliminadas}")
+        return eliminadas
+
+    def estadisticas(self) -> Dict[str, int]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["en_memoria"] = len(self._memoria)
+        return stats
+
+
+# Singleton
+_closed_store_instance: Optional[ClosedPeriodStore] = None
+
+
+def get_closed_period_store() -> ClosedPeriodStore:
+    """Obtiene la instancia singleton del almacén de períodos cerrados"""
+    global _closed_store_instance
+    if _closed_store_instance is None:
+        _closed_store_instance = ClosedPeriodStore()
+    return _closed_store_instance
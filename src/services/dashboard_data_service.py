@@ -0,0 +1,339 @@
+"""
+Datos del Dashboard principal, leídos fuera del hilo de Tk.
+
+Antes DashboardModule.actualizar_estadisticas hacía un COUNT(*) por estado de
+animal, tratamientos, reproducción y leche en el hilo de la UI, y los paneles
+de eventos y alertas otra docena de consultas. Aquí los conteos por estado
+salen de herd_summary (src/database/herd_summary.py), los faltantes de datos
+de un solo recorrido de `animal` con agregados condicionales (SUM(CASE ...)),
+los de tratamientos de uno de `tratamiento`, y los eventos recientes de una
+sola consulta UNION ALL.
+
+La carga se hace por secciones en un hilo de trabajo; cada sección terminada
+se deja en una cola y la UI la recoge con after() (seguir_carga_en_ui), así
+las tarjetas se pintan a medida que llegan y la ventana sigue respondiendo:
+
+    carga = CargaDashboard(secciones_dashboard(dias_produccion=30))
+    carga.iniciar()
+    seguir_carga_en_ui(widget, carga, al_seccion=pintar, al_terminar=listo)
+"""
+
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.database import herd_summary
+from src.database.database import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+INTERVALO_UI_MS = 50
+
+ACTIVO = "(estado = 'Activo' OR estado IS NULL)"
+
+# Faltantes de datos de animales activos: un recorrido de animal, con
+# anti-join al índice idx_tratamiento_animal_fecha para la vacunación
+SQL_FALTANTES_ANIMALES = f"""
+    SELECT
+        SUM(CASE WHEN raza_id IS NULL THEN 1 ELSE 0 END),
+        SUM(CASE WHEN lote_id IS NULL THEN 1 ELSE 0 END),
+        SUM(CASE WHEN salud IN ('Enfermo', 'En cuarentena') THEN 1 ELSE 0 END),
+        SUM(CASE WHEN NOT EXISTS (
+            SELECT 1 FROM tratamiento t
+            WHERE t.id_animal = a.id AND t.tipo_tratamiento = 'Vacunación'
+        ) THEN 1 ELSE 0 END)
+    FROM animal a
+    WHERE {ACTIVO}
+"""
+CAMPOS_FALTANTES = ("sin_raza", "sin_lote", "enfermos", "sin_vacuna")
+
+# Un recorrido de tratamiento
+SQL_RESUMEN_TRATAMIENTOS = """
+    SELECT
+        COUNT(DISTINCT CASE WHEN fecha_inicio >= date('now', '-30 days') AND en_curso THEN id_animal END),
+        SUM(CASE WHEN fecha_fin BETWEEN date('now') AND date('now', '+3 days') AND en_curso THEN 1 ELSE 0 END)
+    FROM (
+        SELECT id_animal, fecha_inicio, fecha_fin,
+               (estado = 'En curso' OR estado = 'Activo' OR estado IS NULL) AS en_curso
+        FROM tratamiento
+    )
+"""
+
+SQL_ALERTAS_ACTIVAS = """
+    SELECT
+        SUM(CASE WHEN tipo LIKE 'anomalia_%' OR tipo LIKE 'patron_%' THEN 1 ELSE 0 END),
+        MAX(CASE WHEN tipo LIKE 'anomalia_%' OR tipo LIKE 'patron_%' THEN fecha_deteccion END),
+        COUNT(*)
+    FROM alertas
+    WHERE estado = 'activa'
+"""
+
+SQL_EVENTOS_RECIENTES = """
+    SELECT fecha, tipo, descripcion FROM (
+        SELECT * FROM (
+            SELECT date(fecha_creacion) AS fecha, 'Animal' AS tipo,
+                   'Nuevo animal: ' || codigo || ' - ' || COALESCE(nombre, 'Sin nombre') AS descripcion
+            FROM animal WHERE fecha_creacion IS NOT NULL
+            ORDER BY fecha_creacion DESC LIMIT 3
+        )
+        UNION ALL
+        SELECT * FROM (
+            SELECT date(t.fecha_inicio), 'Tratamiento', 'Tratamiento: ' || t.producto || ' - ' || a.codigo
+            FROM tratamiento t JOIN animal a ON t.id_animal = a.id
+            WHERE t.fecha_inicio IS NOT NULL
+            ORDER BY t.fecha_inicio DESC LIMIT 2
+        )
+        UNION ALL
+        SELECT * FROM (
+            SELECT date(fecha), 'Producción', 'Producción: ' || animal_id || ' L'
+            FROM produccion_leche WHERE fecha IS NOT NULL
+            ORDER BY fecha DESC LIMIT 2
+        )
+        UNION ALL
+        SELECT * FROM (
+            SELECT date(v.fecha), 'Venta', 'Venta: ' || a.codigo || ' - $' || CAST(v.precio_total AS INT)
+            FROM venta v JOIN animal a ON v.animal_id = a.id
+            WHERE v.fecha IS NOT NULL
+            ORDER BY v.fecha DESC LIMIT 2
+        )
+        UNION ALL
+        SELECT * FROM (
+            SELECT date(fecha_nacimiento), 'Nacimiento', 'Nacimiento: ' || codigo
+            FROM animal WHERE fecha_nacimiento >= date('now', 'start of month')
+            ORDER BY fecha_nacimiento DESC LIMIT 2
+        )
+    )
+    ORDER BY COALESCE(fecha, '1900-01-01') DESC
+    LIMIT 10
+"""
+
+
+# ==================== CONSULTAS ====================
+
+def resumen_animales(conn) -> Dict[str, int]:
+    """
+    Conteos de animales por estado y nacimientos del mes.
+
+    Los estados salen de herd_summary (unas pocas filas, sin importar el
+    tamaño del hato); los nacimientos, del índice de fecha_nacimiento.
+    """
+    por_estado = herd_summary.conteo_por(conn, "estado")
+    nacimientos = conn.execute(
+        "SELECT COUNT(*) FROM animal WHERE fecha_nacimiento >= date('now', 'start of month')"
+    ).fetchone()[0]
+    return {
+        "total": sum(por_estado.values()),
+        "activos": por_estado.get("Activo", 0) + por_estado.get(None, 0),
+        "muertos": por_estado.get("Muerto", 0),
+        "vendidos": por_estado.get("Vendido", 0),
+        "perdidos": por_estado.get("Perdido", 0),
+        "nacimientos_mes": int(nacimientos or 0),
+    }
+
+
+def faltantes_animales(conn) -> Dict[str, int]:
+    """Animales activos sin raza, sin lote, enfermos o sin vacunación (un recorrido)."""
+    fila = conn.execute(SQL_FALTANTES_ANIMALES).fetchone()
+    return {campo: int(valor or 0) for campo, valor in zip(CAMPOS_FALTANTES, fila)}
+
+
+def resumen_actividad(conn) -> Dict[str, Any]:
+    """Tratamientos, gestantes, leche de hoy y alertas activas."""
+    en_tratamiento, por_vencer = conn.execute(SQL_RESUMEN_TRATAMIENTOS).fetchone()
+    gestantes = conn.execute(
+        "SELECT COUNT(DISTINCT animal_id) FROM reproduccion WHERE estado = 'Gestante'"
+    ).fetchone()[0]
+    produccion_hoy = conn.execute("""
+        SELECT COALESCE(SUM(COALESCE(litros_manana, 0) + COALESCE(litros_tarde, 0) + COALESCE(litros_noche, 0)), 0)
+        FROM produccion_leche
+        WHERE fecha = date('now')
+    """).fetchone()[0]
+
+    ai_activas, ai_ultima, alertas_totales = 0, None, 0
+    try:
+        ai_activas, ai_ultima, alertas_totales = conn.execute(SQL_ALERTAS_ACTIVAS).fetchone()
+    except Exception as e:
+        # La tabla alertas puede no existir en bases antiguas
+        logger.debug(f"Sin tabla de alertas: {e}")
+
+    return {
+        "en_tratamiento": int(en_tratamiento or 0),
+        "tratamientos_por_vencer": int(por_vencer or 0),
+        "gestantes": int(gestantes or 0),
+        "produccion_hoy": float(produccion_hoy or 0),
+        "ai_activas": int(ai_activas or 0),
+        "ai_ultima": ai_ultima or "--",
+        "alertas_totales": int(alertas_totales or 0),
+    }
+
+
+def produccion_diaria(conn, dias: int) -> List[Tuple[str, float]]:
+    """Litros por día de los últimos `dias` días."""
+    filas = conn.execute("""
+        SELECT fecha,
+               SUM(COALESCE(litros_manana, 0) + COALESCE(litros_tarde, 0) + COALESCE(litros_noche, 0)) AS total
+        FROM produccion_leche
+        WHERE fecha >= date('now', ?)
+        GROUP BY fecha
+        ORDER BY fecha
+    """, (f"-{int(dias)} days",)).fetchall()
+    return [(f, float(t or 0)) for f, t in filas]
+
+
+def eventos_recientes(conn) -> List[Tuple[Optional[str], str, str]]:
+    """Últimos 10 eventos (altas, tratamientos, leche, ventas, nacimientos)."""
+    return [tuple(f) for f in conn.execute(SQL_EVENTOS_RECIENTES).fetchall()]
+
+
+def estados_animales(animales: Dict[str, int]) -> List[Tuple[str, int]]:
+    """Barras del gráfico de estados (sin consulta: salen del resumen)."""
+    estados = [
+        ("Activo", animales["activos"]),
+        ("Muerto", animales["muertos"]),
+        ("Vendido", animales["vendidos"]),
+        ("Perdido", animales["perdidos"]),
+    ]
+    return sorted([e for e in estados if e[1] > 0], key=lambda e: e[1], reverse=True)
+
+
+def armar_alertas(faltantes: Dict[str, int], actividad: Dict[str, Any]) -> List[Tuple[str, str, str]]:
+    """Alertas (prioridad, título, descripción) a partir de los resúmenes ya leídos."""
+    alertas = []
+    if faltantes["sin_raza"] > 0:
+        alertas.append(("alta", "🔴 CRIANZA", f"{faltantes['sin_raza']} animal(es) sin raza asignada"))
+    if faltantes["sin_lote"] > 0:
+        alertas.append(("media", "🟡 ORGANIZACIÓN", f"{faltantes['sin_lote']} animal(es) sin lote asignado"))
+    if faltantes["sin_vacuna"] > 0:
+        alertas.append(("alta", "⚕️ SALUD", f"{faltantes['sin_vacuna']} animal(es) sin vacunación registrada"))
+    if actividad["gestantes"] > 0:
+        alertas.append(("media", "🤰 REPRODUCCIÓN", f"{actividad['gestantes']} animal(es) gestante(s) registrado(s)"))
+    if actividad["tratamientos_por_vencer"] > 0:
+        alertas.append((
+            "alta", "💊 MEDICINAS",
+            f"{actividad['tratamientos_por_vencer']} tratamiento(s) por vencer en 3 días",
+        ))
+    if faltantes["enfermos"] > 0:
+        alertas.append(("alta", "🏥 SALUD CRÍTICA", f"{faltantes['enfermos']} animal(es) con problemas de salud"))
+    return alertas
+
+
+Seccion = Tuple[str, Callable[[Any, Dict[str, Any]], Any]]
+
+
+def secciones_dashboard(dias_produccion: int = 30) -> List[Seccion]:
+    """
+    Secciones del dashboard en el orden en que se pintan.
+
+    Cada función recibe la conexión y los resultados previos (por nombre);
+    'alertas' consulta solo los faltantes y reutiliza el resumen de actividad.
+    """
+    return [
+        ("animales", lambda conn, previos: resumen_animales(conn)),
+        ("actividad", lambda conn, previos: resumen_actividad(conn)),
+        ("produccion", lambda conn, previos: produccion_diaria(conn, dias_produccion)),
+        ("eventos", lambda conn, previos: eventos_recientes(conn)),
+        ("alertas", lambda conn, previos: armar_alertas(faltantes_animales(conn), previos["actividad"])),
+    ]
+
+
+# ==================== CARGA EN SEGUNDO PLANO ====================
+
+class CargaDashboard:
+    """
+    Ejecuta las secciones en un hilo propio con una sola conexión y deja cada
+    resultado (nombre, datos, error) en una cola para el hilo de Tk.
+
+    Una sección que falla se entrega con error y las siguientes que dependen
+    de ella también fallan; el resto sigue.
+    """
+
+    def __init__(self, secciones: List[Seccion]):
+        self.secciones = secciones
+        self._cola: "queue.Queue[Tuple[str, Any, Optional[str]]]" = queue.Queue()
+        self._cancelada = threading.Event()
+        self._terminada = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+
+    def iniciar(self) -> "CargaDashboard":
+        self._hilo = threading.Thread(target=self._ejecutar, name="carga-dashboard", daemon=True)
+        self._hilo.start()
+        return self
+
+    def _ejecutar(self) -> None:
+        resultados: Dict[str, Any] = {}
+        try:
+            with get_db_connection() as conn:
+                for nombre, funcion in self.secciones:
+                    if self._cancelada.is_set():
+                        return
+                    try:
+                        resultados[nombre] = funcion(conn, resultados)
+                        self._cola.put((nombre, resultados[nombre], None))
+                    except Exception as e:
+                        logger.error(f"Error cargando sección {nombre} del dashboard: {e}")
+                        self._cola.put((nombre, None, str(e)))
+        except Exception as e:
+            logger.error(f"Error cargando dashboard: {e}")
+            self._cola.put(("conexion", None, str(e)))
+        finally:
+            self._terminada.set()
+
+    def cancelar(self) -> None:
+        """Descarta lo que quede por cargar (p.ej. al pedir otra actualización)."""
+        self._cancelada.set()
+
+    @property
+    def cancelada(self) -> bool:
+        return self._cancelada.is_set()
+
+    @property
+    def terminada(self) -> bool:
+        return self._terminada.is_set()
+
+    def pendientes(self) -> List[Tuple[str, Any, Optional[str]]]:
+        """Secciones terminadas desde la última llamada (no bloquea)."""
+        entregas = []
+        while True:
+            try:
+                entregas.append(self._cola.get_nowait())
+            except queue.Empty:
+                return entregas
+
+    def esperar(self, timeout: Optional[float] = None) -> bool:
+        return self._terminada.wait(timeout)
+
+
+def seguir_carga_en_ui(
+    widget: Any,
+    carga: CargaDashboard,
+    al_seccion: Callable[[str, Any, Optional[str]], None],
+    al_terminar: Optional[Callable[[], None]] = None,
+    intervalo_ms: int = INTERVALO_UI_MS,
+) -> None:
+    """
+    Sondea la carga con widget.after() y entrega cada sección en el hilo de Tk.
+
+    Si la carga se cancela se deja de entregar; si el widget se destruye, se
+    deja de sondear.
+    """
+    def _tick():
+        try:
+            if carga.cancelada:
+                return
+            # Se mira antes de vaciar la cola para no perder la última sección
+            terminada = carga.terminada
+            for nombre, datos, error in carga.pendientes():
+                al_seccion(nombre, datos, error)
+            if terminada:
+                if al_terminar is not None:
+                    al_terminar()
+                return
+            widget.after(intervalo_ms, _tick)
+        except Exception as e:
+            # TclError si la ventana ya no existe
+            logger.debug(f"Seguimiento de carga del dashboard detenido: {e}")
+
+    widget.after(0, _tick)
@@ -162,6 +162,24 @@ class DataLockService:
                 conn.commit()
                 logger.warning(f"⚠️ Período desbloqueado: {mes}/{año}")
                 
+                try:
+                    from src.services.kpi_series_store import get_kpi_series_store
+                    get_kpi_series_store().invalidar()
+                except Exception as e:
+                    logger.debug(f"No se pudo invalidar series de KPIs: {e}")
+                
+                try:
+                    from src.services.closed_period_store import get_closed_period_store
+                    get_closed_period_store().invalidar_mes(año, mes)
+                except Exception as e:
+                    logger.debug(f"No se pudo invalidar resultados de período cerrado: {e}")
+                
+                try:
+                    from src.jobs.export_queue import invalidar_artefactos_periodo
+                    invalidar_artefactos_periodo(año, mes)
+                except Exception as e:
+                    logger.debug(f"No se pudo invalidar exportaciones cacheadas: {e}")
+                
                 # Invalidar cache
                 cache_key = f"{año}-{mes:02d}"
                 if cache_key in self.cache_cierres:
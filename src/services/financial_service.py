@@ -24,6 +24,8 @@ from typing import Dict, List, Optional, Tuple, Any
 from decimal import Decimal
 import logging
 from src.database.database import get_db_connection
+from src.database.rango_fechas import rango_semiabierto
+from src.services.closed_period_store import get_closed_period_store
 
 
 class FinancialService:
@@ -70,8 +72,8 @@ class FinancialService:
                 SELECT COALESCE(SUM(precio), 0)
                 FROM venta
                 WHERE tipo = 'animal'
-                AND DATE(fecha) BETWEEN ? AND ?
-            """, (fecha_inicio, fecha_fin))
+                AND fecha >= ? AND fecha < ?
+            """, rango_semiabierto(fecha_inicio, fecha_fin))
             ventas_animales = float(cursor.fetchone()[0])
             
             # Ingresos por ventas de leche
@@ -79,8 +81,8 @@ class FinancialService:
                 SELECT COALESCE(SUM(precio * cantidad), 0)
                 FROM venta
                 WHERE tipo = 'leche'
-                AND DATE(fecha) BETWEEN ? AND ?
-            """, (fecha_inicio, fecha_fin))
+                AND fecha >= ? AND fecha < ?
+            """, rango_semiabierto(fecha_inicio, fecha_fin))
             ventas_leche = float(cursor.fetchone()[0])
             
             total = ventas_animales + ventas_leche
@@ -121,8 +123,8 @@ class FinancialService:
                 SELECT AVG(precio), COUNT(*)
                 FROM venta
                 WHERE tipo = 'animal'
-                AND DATE(fecha) BETWEEN ? AND ?
-            """, (fecha_inicio, fecha_fin))
+                AND fecha >= ? AND fecha < ?
+            """, rango_semiabierto(fecha_inicio, fecha_fin))
             
             row = cursor.fetchone()
             promedio, cantidad = row if row else (None, 0)
@@ -157,8 +159,8 @@ class FinancialService:
                 SELECT AVG(precio), COUNT(*)
                 FROM venta
                 WHERE tipo = 'leche'
-                AND DATE(fecha) BETWEEN ? AND ?
-            """, (fecha_inicio, fecha_fin))
+                AND fecha >= ? AND fecha < ?
+            """, rango_semiabierto(fecha_inicio, fecha_fin))
             
             row = cursor.fetchone()
             promedio, cantidad = row if row else (None, 0)
@@ -197,16 +199,16 @@ class FinancialService:
             cursor.execute("""
                 SELECT COALESCE(SUM(monto), 0)
                 FROM pago_nomina
-                WHERE DATE(fecha_pago) BETWEEN ? AND ?
-            """, (fecha_inicio, fecha_fin))
+                WHERE fecha_pago >= ? AND fecha_pago < ?
+            """, rango_semiabierto(fecha_inicio, fecha_fin))
             nomina = float(cursor.fetchone()[0])
             
             # Costos de tratamientos veterinarios
             cursor.execute("""
                 SELECT COALESCE(SUM(costo), 0)
                 FROM tratamiento
-                WHERE DATE(fecha) BETWEEN ? AND ?
-            """, (fecha_inicio, fecha_fin))
+                WHERE fecha >= ? AND fecha < ?
+            """, rango_semiabierto(fecha_inicio, fecha_fin))
             tratamientos = float(cursor.fetchone()[0])
             
             # Costos de insumos (salidas)
@@ -215,8 +217,8 @@ class FinancialService:
                 FROM movimiento_insumo mi
                 INNER JOIN insumo i ON mi.insumo_id = i.id
                 WHERE mi.tipo = 'salida'
-                AND DATE(mi.fecha) BETWEEN ? AND ?
-            """, (fecha_inicio, fecha_fin))
+                AND mi.fecha >= ? AND mi.fecha < ?
+            """, rango_semiabierto(fecha_inicio, fecha_fin))
             insumos = float(cursor.fetchone()[0])
             
             total = nomina + tratamientos + insumos
@@ -264,8 +266,8 @@ class FinancialService:
             cursor.execute("""
                 SELECT COALESCE(SUM(litros_am + litros_pm), 0)
                 FROM produccion_leche
-                WHERE DATE(fecha) BETWEEN ? AND ?
-            """, (fecha_inicio, fecha_fin))
+                WHERE fecha >= ? AND fecha < ?
+            """, rango_semiabierto(fecha_inicio, fecha_fin))
             litros_producidos = float(cursor.fetchone()[0])
             
             if litros_producidos == 0:
@@ -322,8 +324,8 @@ class FinancialService:
                 SELECT COALESCE(SUM(costo), 0)
                 FROM tratamiento
                 WHERE animal_id = ?
-                AND DATE(fecha) BETWEEN ? AND ?
-            """, (animal_id, fecha_inicio, fecha_fin))
+                AND fecha >= ? AND fecha < ?
+            """, (animal_id, *rango_semiabierto(fecha_inicio, fecha_fin)))
             tratamientos = float(cursor.fetchone()[0])
             
             # Estimación de alimentación: $5,000 COP por día
@@ -415,8 +417,8 @@ class FinancialService:
             cursor.execute("""
                 SELECT COALESCE(SUM(litros_am + litros_pm), 0)
                 FROM produccion_leche
-                WHERE DATE(fecha) BETWEEN ? AND ?
-            """, (fecha_inicio, fecha_fin))
+                WHERE fecha >= ? AND fecha < ?
+            """, rango_semiabierto(fecha_inicio, fecha_fin))
             litros_producidos = float(cursor.fetchone()[0])
             
             if litros_producidos == 0:
@@ -429,8 +431,8 @@ class FinancialService:
                     COALESCE(SUM(cantidad * precio), 0)
                 FROM venta
                 WHERE tipo = 'leche'
-                AND DATE(fecha) BETWEEN ? AND ?
-            """, (fecha_inicio, fecha_fin))
+                AND fecha >= ? AND fecha < ?
+            """, rango_semiabierto(fecha_inicio, fecha_fin))
             
             row = cursor.fetchone()
             litros_vendidos, ingresos = float(row[0]), float(row[1])
@@ -485,6 +487,10 @@ class FinancialService:
             fecha_fin = hoy
             fecha_inicio = hoy - timedelta(days=30)
         
+        return self._kpis_periodo(fecha_inicio, fecha_fin, periodo)
+    
+    def _kpis_periodo(self, fecha_inicio: date, fecha_fin: date, periodo: str) -> Dict[str, Any]:
+        """KPIs financieros de un rango de fechas (estructura de get_dashboard_kpis)."""
         # Calcular todos los KPIs
         ingresos = self.calculate_total_revenue(fecha_inicio, fecha_fin)
         costos = self.calculate_total_costs(fecha_inicio, fecha_fin)
@@ -599,7 +605,16 @@ class FinancialService:
         
         Returns:
             Diccionario con reporte detallado
+        
+        Un mes cerrado se genera una sola vez: el resultado queda en el
+        almacén de períodos cerrados hasta que se revierta el cierre.
         """
+        return get_closed_period_store().obtener_o_calcular(
+            "financiero_mensual", (year, month), (year, month), None,
+            lambda: self._generar_reporte_mensual(year, month),
+        )
+    
+    def _generar_reporte_mensual(self, year: int, month: int) -> Dict[str, Any]:
         # Calcular fechas
         fecha_inicio = date(year, month, 1)
         if month == 12:
@@ -618,8 +633,8 @@ class FinancialService:
                     COUNT(*) FILTER (WHERE tipo = 'leche') as ventas_leche,
                     COALESCE(SUM(cantidad) FILTER (WHERE tipo = 'leche'), 0) as litros_vendidos
                 FROM venta
-                WHERE DATE(fecha) BETWEEN ? AND ?
-            """, (fecha_inicio, fecha_fin))
+                WHERE fecha >= ? AND fecha < ?
+            """, rango_semiabierto(fecha_inicio, fecha_fin))
             
             row = cursor.fetchone()
             ventas_animales_count, ventas_leche_count, litros_vendidos = row
@@ -630,13 +645,14 @@ class FinancialService:
                     COALESCE(SUM(litros_am + litros_pm), 0) as litros_producidos,
                     COUNT(DISTINCT animal_id) as vacas_produciendo
                 FROM produccion_leche
-                WHERE DATE(fecha) BETWEEN ? AND ?
-            """, (fecha_inicio, fecha_fin))
+                WHERE fecha >= ? AND fecha < ?
+            """, rango_semiabierto(fecha_inicio, fecha_fin))
             
             row = cursor.fetchone()
             litros_producidos, vacas_produciendo = row
         
-        kpis = self.get_dashboard_kpis('mes_actual')  # Usaremos esta estructura
+        # KPIs del mes pedido (antes se tomaban los del mes en curso)
+        kpis = self._kpis_periodo(fecha_inicio, fecha_fin, f"{year}-{month:02d}")
         
         reporte = {
             'periodo': f"{year}-{month:02d}",
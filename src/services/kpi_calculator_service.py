@@ -13,6 +13,13 @@ KPIs implementados:
 - Eficiencia reproductiva
 - Mortalidad animal (%)
 - Rotación de empleados (%)
+
+Las sumas y conteos salen de las fuentes de src/database/kpi_incremental.py
+(FUENTES_KPI); en modo incremental (calcular_kpis_mes) se leen de los
+agregados mensuales que mantienen sus triggers, así recalcular el mes en curso
+solo consolida las filas nuevas.
+reconstruir_incremental() y verificar_incremental() rehacen y comparan contra
+un cálculo completo.
 """
 
 from __future__ import annotations
@@ -20,10 +27,64 @@ from datetime import datetime, date, timedelta
 from typing import Dict, Any, Optional, List
 import logging
 from src.database.database import get_db_connection
+from src.database import kpi_incremental
+from src.database.rango_fechas import rango_semiabierto
 
 logger = logging.getLogger("kpi_calculator")
 
 
+# Fórmulas compartidas por el cálculo completo y el incremental
+
+def _kpis_financieros(
+    ventas_animales: float, ventas_leche: float, gastos: float, nomina: float, tratamientos: float
+) -> Dict[str, float]:
+    ingresos_totales = ventas_animales + ventas_leche
+    costos_totales = gastos + nomina + tratamientos
+    margen_bruto = ingresos_totales - costos_totales
+    margen_porcentaje = (margen_bruto / ingresos_totales * 100) if ingresos_totales > 0 else 0
+    return {
+        'margen_neto_pct': round(margen_porcentaje, 2),
+        'margen_neto_valor': round(margen_bruto, 2),
+        'ingresos_totales': round(ingresos_totales, 2),
+        'costos_totales': round(costos_totales, 2),
+        'roi_porcentaje': round((margen_bruto / costos_totales * 100) if costos_totales > 0 else 0, 2)
+    }
+
+
+def _kpis_produccion(
+    litros_totales: float, dias_registrados: int, vacas_productivas: int, costos_produccion: float
+) -> Dict[str, float]:
+    produccion_diaria = litros_totales / dias_registrados if dias_registrados > 0 else 0
+    produccion_por_vaca = litros_totales / vacas_productivas if vacas_productivas > 0 else 0
+    costo_por_litro = costos_produccion / litros_totales if litros_totales > 0 else 0
+    return {
+        'produccion_diaria_promedio': round(produccion_diaria, 2),
+        'produccion_por_vaca_promedio': round(produccion_por_vaca, 2),
+        'costo_por_litro': round(costo_por_litro, 2),
+        'litros_totales_periodo': round(litros_totales, 2),
+        'vacas_productivas': vacas_productivas
+    }
+
+
+def _kpis_reproduccion(
+    servicios_totales: int, servicios_exitosos: int, partos_periodo: int, intervalo_partos: float
+) -> Dict[str, float]:
+    tasa_prenez = (servicios_exitosos / servicios_totales * 100) if servicios_totales > 0 else 0
+    return {
+        'tasa_prenez_pct': round(tasa_prenez, 2),
+        'servicios_realizados': servicios_totales,
+        'servicios_exitosos': servicios_exitosos,
+        'partos_periodo': partos_periodo,
+        'intervalo_partos_promedio_dias': round(intervalo_partos, 1) if intervalo_partos else 0
+    }
+
+
+def _limites_mes(año: int, mes: int) -> tuple[date, date]:
+    inicio = date(año, mes, 1)
+    siguiente = date(año + 1, 1, 1) if mes == 12 else date(año, mes + 1, 1)
+    return inicio, siguiente - timedelta(days=1)
+
+
 class KPICalculatorService:
     """Servicio para calcular KPIs del negocio"""
     
@@ -88,52 +149,11 @@ class KPICalculatorService:
     ) -> Dict[str, float]:
         """Calcula KPIs financieros"""
         with get_db_connection() as conn:
-            cursor = conn.cursor()
-            
-            # Ingresos totales
-            cursor.execute("""
-                SELECT 
-                    COALESCE(SUM(CASE WHEN v.precio_total IS NOT NULL THEN v.precio_total ELSE 0 END), 0) as ventas_animales,
-                    COALESCE(SUM(CASE WHEN vl.precio_total IS NOT NULL THEN vl.precio_total ELSE 0 END), 0) as ventas_leche
-                FROM (SELECT 1) dummy
-                LEFT JOIN venta v ON v.fecha BETWEEN ? AND ?
-                LEFT JOIN venta_leche vl ON vl.fecha BETWEEN ? AND ?
-            """, (fecha_inicio, fecha_fin, fecha_inicio, fecha_fin))
-            
-            row = cursor.fetchone()
-            ventas_animales = row[0] if row else 0
-            ventas_leche = row[1] if row else 0
-            ingresos_totales = ventas_animales + ventas_leche
-            
-            # Costos totales
-            cursor.execute("""
-                SELECT 
-                    COALESCE(SUM(CASE WHEN g.monto IS NOT NULL THEN g.monto ELSE 0 END), 0) as gastos,
-                    COALESCE(SUM(CASE WHEN p.total_pagado IS NOT NULL THEN p.total_pagado ELSE 0 END), 0) as nomina,
-                    COALESCE(SUM(CASE WHEN t.costo IS NOT NULL THEN t.costo ELSE 0 END), 0) as tratamientos
-                FROM (SELECT 1) dummy
-                LEFT JOIN gasto g ON g.fecha BETWEEN ? AND ?
-                LEFT JOIN pago_nomina p ON p.fecha_pago BETWEEN ? AND ?
-                LEFT JOIN tratamiento t ON t.fecha BETWEEN ? AND ?
-            """, (fecha_inicio, fecha_fin, fecha_inicio, fecha_fin, fecha_inicio, fecha_fin))
-            
-            row = cursor.fetchone()
-            gastos = row[0] if row else 0
-            nomina = row[1] if row else 0
-            tratamientos = row[2] if row else 0
-            costos_totales = gastos + nomina + tratamientos
-            
-            # Cálculos
-            margen_bruto = ingresos_totales - costos_totales
-            margen_porcentaje = (margen_bruto / ingresos_totales * 100) if ingresos_totales > 0 else 0
-            
-            return {
-                'margen_neto_pct': round(margen_porcentaje, 2),
-                'margen_neto_valor': round(margen_bruto, 2),
-                'ingresos_totales': round(ingresos_totales, 2),
-                'costos_totales': round(costos_totales, 2),
-                'roi_porcentaje': round((margen_bruto / costos_totales * 100) if costos_totales > 0 else 0, 2)
-            }
+            t = kpi_incremental.totales_periodo(conn, fecha_inicio, fecha_fin)
+        return _kpis_financieros(
+            t.get('ventas_animales', 0), t.get('ventas_leche', 0),
+            t.get('gastos', 0), t.get('nomina', 0), t.get('tratamientos', 0)
+        )
     
     def _calcular_kpis_produccion(
         self, 
@@ -142,45 +162,11 @@ class KPICalculatorService:
     ) -> Dict[str, float]:
         """Calcula KPIs de producción lechera"""
         with get_db_connection() as conn:
-            cursor = conn.cursor()
-            
-            # Producción total
-            cursor.execute("""
-                SELECT 
-                    COALESCE(SUM(cantidad_litros), 0) as litros_totales,
-                    COUNT(DISTINCT fecha) as dias_registrados,
-                    COUNT(DISTINCT animal_id) as vacas_productivas
-                FROM produccion_leche
-                WHERE fecha BETWEEN ? AND ?
-            """, (fecha_inicio, fecha_fin))
-            
-            row = cursor.fetchone()
-            litros_totales = row[0] if row else 0
-            dias_registrados = row[1] if row else 1
-            vacas_productivas = row[2] if row else 0
-            
-            # Costos de producción
-            cursor.execute("""
-                SELECT COALESCE(SUM(monto), 0)
-                FROM gasto
-                WHERE categoria IN ('Alimentación', 'Insumos', 'Veterinario')
-                AND fecha BETWEEN ? AND ?
-            """, (fecha_inicio, fecha_fin))
-            
-            costos_produccion = cursor.fetchone()[0] or 0
-            
-            # Cálculos
-            produccion_diaria = litros_totales / dias_registrados if dias_registrados > 0 else 0
-            produccion_por_vaca = litros_totales / vacas_productivas if vacas_productivas > 0 else 0
-            costo_por_litro = costos_produccion / litros_totales if litros_totales > 0 else 0
-            
-            return {
-                'produccion_diaria_promedio': round(produccion_diaria, 2),
-                'produccion_por_vaca_promedio': round(produccion_por_vaca, 2),
-                'costo_por_litro': round(costo_por_litro, 2),
-                'litros_totales_periodo': round(litros_totales, 2),
-                'vacas_productivas': vacas_productivas
-            }
+            t = kpi_incremental.totales_periodo(conn, fecha_inicio, fecha_fin)
+        return _kpis_produccion(
+            t.get('litros', 0), int(t.get('dias_leche', 0)),
+            int(t.get('vacas_leche', 0)), t.get('gastos_produccion', 0)
+        )
     
     def _calcular_kpis_reproduccion(
         self, 
@@ -189,49 +175,25 @@ class KPICalculatorService:
     ) -> Dict[str, float]:
         """Calcula KPIs de reproducción"""
         with get_db_connection() as conn:
-            cursor = conn.cursor()
-            
-            # Servicios y preñeces
-            cursor.execute("""
-                SELECT 
-                    COUNT(*) as servicios_totales,
-                    SUM(CASE WHEN confirmacion_prenez = 'Positivo' THEN 1 ELSE 0 END) as servicios_exitosos
-                FROM servicio
-                WHERE fecha BETWEEN ? AND ?
-            """, (fecha_inicio, fecha_fin))
-            
-            row = cursor.fetchone()
-            servicios_totales = row[0] if row else 0
-            servicios_exitosos = row[1] if row else 0
-            
-            tasa_prenez = (servicios_exitosos / servicios_totales * 100) if servicios_totales > 0 else 0
-            
-            # Partos
-            cursor.execute("""
-                SELECT COUNT(*) FROM parto
-                WHERE fecha BETWEEN ? AND ?
-            """, (fecha_inicio, fecha_fin))
-            
-            partos_periodo = cursor.fetchone()[0] or 0
-            
-            # Intervalo entre partos (promedio)
-            cursor.execute("""
-                SELECT AVG(julianday(p2.fecha) - julianday(p1.fecha)) as dias_promedio
-                FROM parto p1
-                JOIN parto p2 ON p1.animal_id = p2.animal_id AND p2.fecha > p1.fecha
-                WHERE p1.fecha BETWEEN ? AND ?
-                AND p2.fecha <= ?
-            """, (fecha_inicio, fecha_fin, fecha_fin))
-            
-            intervalo_partos = cursor.fetchone()[0] or 0
-            
-            return {
-                'tasa_prenez_pct': round(tasa_prenez, 2),
-                'servicios_realizados': servicios_totales,
-                'servicios_exitosos': servicios_exitosos,
-                'partos_periodo': partos_periodo,
-                'intervalo_partos_promedio_dias': round(intervalo_partos, 1) if intervalo_partos else 0
-            }
+            t = kpi_incremental.totales_periodo(conn, fecha_inicio, fecha_fin)
+            intervalo_partos = self._intervalo_partos(conn.cursor(), fecha_inicio, fecha_fin)
+        return _kpis_reproduccion(
+            int(t.get('servicios', 0)), int(t.get('servicios_exitosos', 0)),
+            int(t.get('partos', 0)), intervalo_partos
+        )
+    
+    def _intervalo_partos(self, cursor, fecha_inicio: date, fecha_fin: date) -> float:
+        """Intervalo promedio entre partos (no es aditivo: siempre se consulta)"""
+        desde, hasta = rango_semiabierto(fecha_inicio, fecha_fin)
+        cursor.execute("""
+            SELECT AVG(julianday(p2.fecha_parto_real) - julianday(p1.fecha_parto_real)) as dias_promedio
+            FROM servicio p1
+            JOIN servicio p2 ON p1.id_hembra = p2.id_hembra AND p2.fecha_parto_real > p1.fecha_parto_real
+            WHERE p1.fecha_parto_real >= ? AND p1.fecha_parto_real < ?
+            AND p2.fecha_parto_real < ?
+        """, (desde, hasta, hasta))
+        
+        return cursor.fetchone()[0] or 0
     
     def _calcular_kpis_animales(
         self, 
@@ -289,6 +251,87 @@ class KPICalculatorService:
                 'crecimiento_rebano_neto': nacimientos_periodo - muertes_periodo - ventas_periodo
             }
     
+    # ==================== MODO INCREMENTAL ====================
+    
+    def calcular_kpis_mes(
+        self,
+        año: int,
+        mes: int,
+        categoria: str = "general",
+        incremental: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Calcula los KPIs de un mes calendario.
+        
+        En modo incremental las sumas y conteos salen de los agregados
+        mensuales (consolidando antes solo los deltas nuevos); el intervalo
+        entre partos y los KPIs de gestión animal dependen del estado del
+        rebaño y se consultan igual que en calcular_kpis_periodo.
+        
+        Args:
+            año: Año del período
+            mes: Mes del período (1-12)
+            categoria: Categoría del KPI (general, financiero, produccion, reproduccion, animales)
+            incremental: False para recalcular desde las tablas fuente
+        
+        Returns:
+            Diccionario con los mismos KPIs que calcular_kpis_periodo
+        """
+        fecha_inicio, fecha_fin = _limites_mes(año, mes)
+        if not incremental:
+            return self.calcular_kpis_periodo(fecha_inicio, fecha_fin, categoria)
+        
+        with get_db_connection() as conn:
+            aplicados = kpi_incremental.aplicar_deltas(conn)
+            conn.commit()
+            agregados = kpi_incremental.leer_agregados(conn, año, mes)
+            
+            kpis = {}
+            if categoria in ["general", "financiero"]:
+                kpis.update(_kpis_financieros(
+                    agregados.get('ventas_animales', 0), agregados.get('ventas_leche', 0),
+                    agregados.get('gastos', 0), agregados.get('nomina', 0), agregados.get('tratamientos', 0)
+                ))
+            if categoria in ["general", "produccion"]:
+                kpis.update(_kpis_produccion(
+                    agregados.get('litros', 0), int(agregados.get('dias_leche', 0)),
+                    int(agregados.get('vacas_leche', 0)), agregados.get('gastos_produccion', 0)
+                ))
+            if categoria in ["general", "reproduccion"]:
+                kpis.update(_kpis_reproduccion(
+                    int(agregados.get('servicios', 0)), int(agregados.get('servicios_exitosos', 0)),
+                    int(agregados.get('partos', 0)),
+                    self._intervalo_partos(conn.cursor(), fecha_inicio, fecha_fin)
+                ))
+        
+        if categoria in ["general", "animales"]:
+            kpis.update(self._calcular_kpis_animales(fecha_inicio, fecha_fin))
+        
+        self.logger.debug(f"KPIs {año}-{mes:02d} incrementales ({aplicados} deltas consolidados)")
+        return kpis
+    
+    def reconstruir_incremental(self) -> Dict[str, Any]:
+        """Rehace los agregados incrementales desde las tablas fuente (incluye las fuentes omitidas)."""
+        with get_db_connection() as conn:
+            totales = kpi_incremental.reconstruir(conn)
+            conn.commit()
+        self.logger.info(f"Agregados KPI reconstruidos: {totales}")
+        return totales
+    
+    def fuentes_omitidas(self) -> Dict[str, List[str]]:
+        """Fuentes de KPIs sin tabla o columnas en la BD ({fuente: columnas faltantes})."""
+        with get_db_connection() as conn:
+            return kpi_incremental.fuentes_omitidas(conn)
+    
+    def verificar_incremental(self) -> List[Dict[str, Any]]:
+        """Diferencias entre los agregados mantenidos y un cálculo completo (vacía si coinciden)."""
+        with get_db_connection() as conn:
+            diferencias = kpi_incremental.verificar(conn)
+            conn.commit()
+        if diferencias:
+            self.logger.warning(f"Agregados KPI con {len(diferencias)} diferencias")
+        return diferencias
+    
     def guardar_kpis_en_bd(
         self,
         año: int,
@@ -0,0 +1,234 @@
+"""
+Almacén compartido de series mensuales de KPIs en arreglos NumPy.
+
+Tendencias, comparativos, anomalías y patrones piden las mismas métricas de
+los mismos meses; antes cada servicio releía y parseaba los snapshots. El
+almacén carga kpi_fact y los meses de bi_snapshots_mensual una sola vez por
+proceso, alineados a un eje común de meses, con una serie por (métrica, finca):
+
+    store = get_kpi_series_store()
+    periodos, valores = store.matriz(["costo_total", "ingreso_total"], (2025, 1), (2025, 12))
+    # valores.shape == (2, len(periodos)); NaN donde el mes no tiene dato
+
+Invalidación:
+- En proceso: BISnapshotService al guardar un snapshot, CierreMensualService
+  al registrar un cierre y DataLockService.unblock_period al revertirlo
+  llaman a invalidar().
+- Otros procesos: cada INTERVALO_VERIFICACION_S se compara una firma barata
+  (conteos, versiones y últimas fechas) de bi_snapshots_mensual y
+  cierre_mensual; si cambió, la siguiente lectura recarga.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from src.database.database import get_db_connection
+from src.database.kpi_fact import FINCA_TODAS
+from src.database.periodos import Periodo, codigo_mes, periodo_de_codigo
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Datos:
+    """Estado cargado e inmutable: se reemplaza entero al recargar."""
+    eje: np.ndarray  # códigos de mes ordenados (int64)
+    con_snapshot: np.ndarray  # bool, alineado a eje
+    fechas_snapshot: List[Tuple[str, int]]  # (fecha_snapshot, código) ordenado por fecha
+    series: Dict[Tuple[str, int], np.ndarray] = field(default_factory=dict)  # float64 con NaN
+
+    def rango(self, desde: Periodo, hasta: Periodo) -> slice:
+        return slice(
+            int(np.searchsorted(self.eje, codigo_mes(desde), side="left")),
+            int(np.searchsorted(self.eje, codigo_mes(hasta), side="right")),
+        )
+
+
+class KPISeriesStore:
+    """Series mensuales de KPIs por (métrica, finca) compartidas por los servicios de analytics."""
+
+    INTERVALO_VERIFICACION_S = 5.0
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._datos: Optional[_Datos] = None
+        self._firma: Optional[tuple] = None
+        self._ultima_verificacion = 0.0
+        self._stats = {"cargas": 0, "invalidaciones": 0, "lecturas": 0}
+
+    # ==================== CARGA E INVALIDACIÓN ====================
+
+    def invalidar(self) -> None:
+        """Descarta las series cargadas; la próxima lectura recarga desde la BD."""
+        with self._lock:
+            if self._datos is not None:
+                self._stats["invalidaciones"] += 1
+            self._datos = None
+
+    def _leer_firma(self, conn) -> tuple:
+        firma = []
+        for sql in (
+            "SELECT COUNT(*), COALESCE(SUM(version), 0), MAX(fecha_snapshot) FROM bi_snapshots_mensual",
+            "SELECT COUNT(*), SUM(estado = 'Completado'), MAX(fecha_cierre) FROM cierre_mensual",
+        ):
+            try:
+                firma.append(tuple(conn.execute(sql).fetchone()))
+            except Exception:
+                firma.append(None)
+        return tuple(firma)
+
+    def _cargar(self, conn) -> _Datos:
+        inicio = time.perf_counter()
+        snaps = conn.execute("SELECT año, mes, fecha_snapshot FROM bi_snapshots_mensual").fetchall()
+        hechos = conn.execute("SELECT metrica, finca_id, año, mes, valor FROM kpi_fact").fetchall()
+
+        cod_snaps = np.array([codigo_mes((a, m)) for a, m, _ in snaps], dtype=np.int64)
+        cod_hechos = np.array([codigo_mes((f[2], f[3])) for f in hechos], dtype=np.int64)
+        eje = np.unique(np.concatenate([cod_snaps, cod_hechos]))
+        con_snapshot = np.zeros(len(eje), dtype=bool)
+        con_snapshot[np.searchsorted(eje, cod_snaps)] = True
+
+        # Agrupar por (métrica, finca) y asignar en bloque sobre el eje común
+        posiciones = np.searchsorted(eje, cod_hechos)
+        grupos: Dict[Tuple[str, int], List[int]] = {}
+        for i, fila in enumerate(hechos):
+            grupos.setdefault((fila[0], fila[1]), []).append(i)
+        valores = np.array([f[4] for f in hechos], dtype=np.float64)
+        series: Dict[Tuple[str, int], np.ndarray] = {}
+        for clave, indices in grupos.items():
+            arr = np.full(len(eje), np.nan)
+            arr[posiciones[indices]] = valores[indices]
+            arr.flags.writeable = False
+            series[clave] = arr
+
+        fechas = sorted((str(f), codigo_mes((a, m))) for a, m, f in snaps if f is not None)
+        self._stats["cargas"] += 1
+        logger.debug(
+            f"Series KPI cargadas: {len(series)} series x {len(eje)} meses "
+            f"en {(time.perf_counter() - inicio) * 1000:.1f} ms"
+        )
+        return _Datos(eje=eje, con_snapshot=con_snapshot, fechas_snapshot=fechas, series=series)
+
+    def _obtener(self) -> _Datos:
+        with self._lock:
+            self._stats["lecturas"] += 1
+            ahora = time.monotonic()
+            if self._datos is not None and ahora - self._ultima_verificacion < self.INTERVALO_VERIFICACION_S:
+                return self._datos
+            with get_db_connection() as conn:
+                firma = self._leer_firma(conn)
+                self._ultima_verificacion = ahora
+                if self._datos is not None and firma == self._firma:
+                    return self._datos
+                if self._datos is not None:
+                    self._stats["invalidaciones"] += 1
+                self._datos = self._cargar(conn)
+                self._firma = firma
+            return self._datos
+
+    # ==================== LECTURA ====================
+
+    def meses(self, desde: Periodo, hasta: Periodo) -> List[Periodo]:
+        """Meses de [desde, hasta] que tienen snapshot, en orden."""
+        datos = self._obtener()
+        r = datos.rango(desde, hasta)
+        return [periodo_de_codigo(c) for c in datos.eje[r][datos.con_snapshot[r]]]
+
+    def matriz(
+        self,
+        metricas: Iterable[str],
+        desde: Periodo,
+        hasta: Periodo,
+        finca_id: int = FINCA_TODAS,
+    ) -> Tuple[List[Periodo], np.ndarray]:
+        """
+        Valores de las métricas en los meses con datos de [desde, hasta].
+
+        Returns:
+            (periodos, valores) con valores.shape == (len(metricas), len(periodos))
+        """
+        datos = self._obtener()
+        r = datos.rango(desde, hasta)
+        metricas = list(metricas)
+        valores = np.full((len(metricas), r.stop - r.start), np.nan)
+        for i, metrica in enumerate(metricas):
+            serie = datos.series.get((metrica, finca_id))
+            if serie is not None:
+                valores[i] = serie[r]
+        return [periodo_de_codigo(c) for c in datos.eje[r]], valores
+
+    def cubo(
+        self,
+        metricas: Iterable[str],
+        desde: Periodo,
+        hasta: Periodo,
+        fincas: Optional[Iterable[int]] = None,
+    ) -> Tuple[List[int], List[Periodo], np.ndarray]:
+        """
+        Valores de varias fincas a la vez (por defecto todas las que tienen datos).
+
+        Returns:
+            (fincas, periodos, valores) con valores.shape == (len(fincas), len(metricas), len(periodos))
+        """
+        datos = self._obtener()
+        r = datos.rango(desde, hasta)
+        metricas = list(metricas)
+        fincas = sorted({f for _, f in datos.series}) if fincas is None else list(fincas)
+        valores = np.full((len(fincas), len(metricas), r.stop - r.start), np.nan)
+        for i, finca_id in enumerate(fincas):
+            for j, metrica in enumerate(metricas):
+                serie = datos.series.get((metrica, finca_id))
+                if serie is not None:
+                    valores[i, j] = serie[r]
+        return fincas, [periodo_de_codigo(c) for c in datos.eje[r]], valores
+
+    def series(
+        self,
+        metricas: Iterable[str],
+        desde: Periodo,
+        hasta: Periodo,
+        finca_id: int = FINCA_TODAS,
+    ) -> Dict[str, Dict[Periodo, float]]:
+        """Mismo resultado que kpi_fact.leer_kpis, servido desde memoria."""
+        metricas = list(dict.fromkeys(metricas))
+        periodos, valores = self.matriz(metricas, desde, hasta, finca_id)
+        salida: Dict[str, Dict[Periodo, float]] = {}
+        for metrica, fila in zip(metricas, valores):
+            presentes = np.flatnonzero(~np.isnan(fila))
+            salida[metrica] = {periodos[i]: float(fila[i]) for i in presentes}
+        return salida
+
+    def snapshots_entre(self, desde: str, hasta: str) -> List[Tuple[str, Periodo]]:
+        """Snapshots con desde <= fecha_snapshot < hasta: [(fecha_snapshot, (año, mes))]."""
+        datos = self._obtener()
+        return [(f, periodo_de_codigo(c)) for f, c in datos.fechas_snapshot if desde <= f < hasta]
+
+    def claves(self) -> List[Tuple[str, int]]:
+        """(métrica, finca_id) disponibles."""
+        return sorted(self._obtener().series)
+
+    def estadisticas(self) -> Dict[str, int]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["series"] = len(self._datos.series) if self._datos else 0
+            stats["meses"] = len(self._datos.eje) if self._datos else 0
+        return stats
+
+
+# Singleton
+_kpi_store_instance: Optional[KPISeriesStore] = None
+
+
+def get_kpi_series_store() -> KPISeriesStore:
+    """Obtiene la instancia singleton del almacén de series de KPIs"""
+    global _kpi_store_instance
+    if _kpi_store_instance is None:
+        _kpi_store_instance = KPISeriesStore()
+    return _kpi_store_instance
@@ -0,0 +1,282 @@
+"""
+Detector en línea de caídas de producción de leche por vaca (EWMA + CUSUM).
+
+Una vaca enferma aparece primero como una caída de litros diarios, semanas
+antes de notarse en los agregados mensuales. Por cada animal se mantiene:
+
+- EWMA de los litros diarios y de su varianza (nivel esperado y dispersión)
+- CUSUM inferior sobre el residuo estandarizado (caídas sostenidas)
+
+El estado vive en arreglos NumPy paralelos indexados por una posición por
+animal (≈ 20 bytes por vaca), así que cada registro es una actualización
+O(1) y el detector escala a decenas de miles de animales:
+
+    detector = get_milk_stream_detector()
+    detector.registrar(animal_id, "2025-06-01", litros_totales)   # desde el formulario
+    detector.registrar_lote(filas)                                 # importaciones
+
+Los registros deben llegar en orden de fecha por animal; uno con fecha igual
+o anterior al último procesado (corrección del mismo día o carga atrasada)
+se ignora: el estado es un flujo, no se rehace. Cuando un animal aparece por
+primera vez en el proceso se calienta con sus últimos DIAS_CALENTAMIENTO
+pesajes; reconstruir() rehace todo desde produccion_leche.
+
+Las alertas ('caida_produccion_leche', una por animal en ALERTA) se guardan
+con AlertRulesService.guardar_alertas_en_bd en la tabla de alertas.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from src.database.database import get_db_connection
+
+logger = logging.getLogger("MilkStreamDetector")
+
+TIPO_ALERTA = "caida_produccion_leche"
+SQL_LITROS = "COALESCE(litros_manana, 0) + COALESCE(litros_tarde, 0) + COALESCE(litros_noche, 0)"
+
+
+def _dia(fecha: Any) -> int:
+    """Fecha (date o 'YYYY-MM-DD...') como ordinal de día."""
+    if isinstance(fecha, date):
+        return fecha.toordinal()
+    return date.fromisoformat(str(fecha)[:10]).toordinal()
+
+
+class MilkStreamDetector:
+    """Estado EWMA/CUSUM por animal en arreglos compactos."""
+
+    ALFA = 0.2  # peso del último registro en la EWMA
+    MIN_REGISTROS = 7  # registros antes de evaluar
+    K_CUSUM = 0.5  # holgura del CUSUM (en desviaciones estándar)
+    H_CUSUM = 5.0  # umbral del CUSUM
+    Z_CAIDA = -4.0  # caída brusca de un solo día
+    SIGMA_MIN_L = 0.5  # piso de dispersión en litros...
+    SIGMA_MIN_PCT = 0.05  # ...o como fracción del nivel esperado
+    DIAS_CALENTAMIENTO = 60
+    CAPACIDAD_INICIAL = 1024
+
+    def __init__(self, guardar_alertas: bool = True):
+        self.guardar_alertas = guardar_alertas
+        self._lock = threading.Lock()
+        self._reiniciar()
+        self._stats = {"registros": 0, "ignorados": 0, "alertas": 0}
+
+    # ==================== ESTADO ====================
+
+    _ARREGLOS = ("_media", "_varianza", "_cusum", "_n", "_ultimo_dia", "_en_alerta")
+
+    def _reiniciar(self) -> None:
+        self._posicion: Dict[int, int] = {}
+        for nombre in self._ARREGLOS:
+            setattr(self, nombre, None)
+        self._reservar(self.CAPACIDAD_INICIAL)
+
+    def _reservar(self, capacidad: int) -> None:
+        """Crea o amplía (x2) los arreglos de estado conservando lo cargado."""
+        nuevos = {
+            "_media": np.zeros(capacidad, dtype=np.float32),
+            "_varianza": np.zeros(capacidad, dtype=np.float32),
+            "_cusum": np.zeros(capacidad, dtype=np.float32),
+            "_n": np.zeros(capacidad, dtype=np.uint16),
+            "_ultimo_dia": np.zeros(capacidad, dtype=np.int32),
+            "_en_alerta": np.zeros(capacidad, dtype=np.bool_),
+        }
+        for nombre, arr in nuevos.items():
+            anterior = getattr(self, nombre, None)
+            if anterior is not None:
+                arr[: len(anterior)] = anterior
+            setattr(self, nombre, arr)
+
+    def _slot(self, animal_id: int) -> Tuple[int, bool]:
+        """Posición del animal en los arreglos (y si es nueva)."""
+        i = self._posicion.get(animal_id)
+        if i is not None:
+            return i, False
+        i = len(self._posicion)
+        if i >= len(self._media):
+            self._reservar(len(self._media) * 2)
+        self._posicion[animal_id] = i
+        return i, True
+
+    def bytes_por_animal(self) -> int:
+        return sum(getattr(self, n).itemsize for n in self._ARREGLOS)
+
+    # ==================== ACTUALIZACIÓN ====================
+
+    def _actualizar(self, i: int, dia: int, litros: float) -> Optional[Dict[str, Any]]:
+        """
+        Procesa un registro del animal en la posición i (O(1)).
+
+        Returns:
+            dict con el diagnóstico si el registro dispara una alerta nueva
+        """
+        if self._n[i] and dia <= self._ultimo_dia[i]:
+            self._stats["ignorados"] += 1
+            return None
+        self._stats["registros"] += 1
+        self._ultimo_dia[i] = dia
+
+        n = int(self._n[i])
+        if n == 0:
+            self._media[i] = litros
+            self._n[i] = 1
+            return None
+
+        media = float(self._media[i])
+        sigma = max(float(self._varianza[i]) ** 0.5, self.SIGMA_MIN_L, self.SIGMA_MIN_PCT * abs(media))
+        z = (litros - media) / sigma
+
+        alerta = None
+        if n >= self.MIN_REGISTROS:
+            cusum = max(0.0, float(self._cusum[i]) - z - self.K_CUSUM)
+            if (cusum > self.H_CUSUM or z < self.Z_CAIDA) and not self._en_alerta[i]:
+                self._en_alerta[i] = True
+                alerta = {"litros": litros, "esperado": media, "z": z, "cusum": cusum}
+                cusum = 0.0
+            elif z > -1.0:
+                # Recuperada: puede volver a alertar en una próxima caída
+                self._en_alerta[i] = False
+            self._cusum[i] = cusum
+
+        # EWMA de nivel y varianza (la varianza usa el residuo previo a actualizar)
+        delta = litros - media
+        self._media[i] = media + self.ALFA * delta
+        self._varianza[i] = (1 - self.ALFA) * (float(self._varianza[i]) + self.ALFA * delta * delta)
+        if n < np.iinfo(np.uint16).max:
+            self._n[i] = n + 1
+        return alerta
+
+    def _calentar(self, conn, animal_id: int, i: int, antes_de: int) -> None:
+        """Reproduce los últimos pesajes del animal anteriores al día dado."""
+        filas = conn.execute(
+            f"""
+            SELECT fecha, {SQL_LITROS} FROM produccion_leche
+            WHERE animal_id = ? AND fecha < ?
+            ORDER BY fecha DESC LIMIT ?
+            """,
+            (animal_id, date.fromordinal(antes_de).isoformat(), self.DIAS_CALENTAMIENTO),
+        ).fetchall()
+        for fecha, litros in reversed(filas):
+            self._actualizar(i, _dia(fecha), float(litros or 0))
+        self._en_alerta[i] = False
+
+    def registrar(self, animal_id: int, fecha: Any, litros: float) -> Optional[Dict[str, Any]]:
+        """Procesa el pesaje de un animal; devuelve la alerta generada, si hay."""
+        alertas = self.registrar_lote([(animal_id, fecha, litros)])
+        return alertas[0] if alertas else None
+
+    def registrar_lote(self, filas: Iterable[Tuple[int, Any, float]]) -> List[Dict[str, Any]]:
+        """
+        Procesa pesajes (animal_id, fecha, litros_totales), p. ej. de una importación.
+        Se ordenan por fecha antes de procesar.
+        """
+        filas = sorted(((int(a), _dia(f), float(l or 0)) for a, f, l in filas), key=lambda r: r[1])
+        alertas: List[Dict[str, Any]] = []
+        with self._lock:
+            nuevos = [(a, d) for a, d, _ in filas if a not in self._posicion]
+            if nuevos:
+                primero: Dict[int, int] = {}
+                for a, d in nuevos:
+                    primero.setdefault(a, d)
+                try:
+                    with get_db_connection() as conn:
+                        for a, d in primero.items():
+                            self._calentar(conn, a, self._slot(a)[0], d)
+                except Exception as e:
+                    logger.warning(f"No se pudo calentar historial de leche: {e}")
+            for animal_id, dia, litros in filas:
+                i, _ = self._slot(animal_id)
+                diag = self._actualizar(i, dia, litros)
+                if diag is not None:
+                    alertas.append(self._alerta(animal_id, dia, diag))
+            self._stats["alertas"] += len(alertas)
+        if alertas and self.guardar_alertas:
+            self._guardar(alertas)
+        return alertas
+
+    def reconstruir(self, desde: Optional[Any] = None) -> int:
+        """Descarta el estado y reprocesa produccion_leche (desde una fecha, opcional)."""
+        sql = f"SELECT animal_id, fecha, {SQL_LITROS} FROM produccion_leche"
+        params: tuple = ()
+        if desde is not None:
+            sql += " WHERE fecha >= ?"
+            params = (date.fromordinal(_dia(desde)).isoformat(),)
+        sql += " ORDER BY fecha, animal_id"
+        with self._lock:
+            self._reiniciar()
+            with get_db_connection() as conn:
+                filas = conn.execute(sql, params).fetchall()
+            for animal_id, fecha, litros in filas:
+                self._actualizar(self._slot(animal_id)[0], _dia(fecha), float(litros or 0))
+            # Reconstruir no vuelve a alertar lo histórico
+            self._en_alerta[: len(self._posicion)] = False
+        logger.info(f"Detector de leche reconstruido: {len(filas)} pesajes, {len(self._posicion)} animales")
+        return len(filas)
+
+    # ==================== CONSULTA Y ALERTAS ====================
+
+    def estado(self, animal_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            i = self._posicion.get(animal_id)
+            if i is None:
+                return None
+            return {
+                "media": float(self._media[i]),
+                "desviacion": float(self._varianza[i]) ** 0.5,
+                "cusum": float(self._cusum[i]),
+                "registros": int(self._n[i]),
+                "ultima_fecha": date.fromordinal(int(self._ultimo_dia[i])).isoformat(),
+                "en_alerta": bool(self._en_alerta[i]),
+            }
+
+    def estadisticas(self) -> Dict[str, int]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["animales"] = len(self._posicion)
+            stats["en_alerta"] = int(self._en_alerta[: len(self._posicion)].sum())
+        stats["bytes_por_animal"] = self.bytes_por_animal()
+        return stats
+
+    def _alerta(self, animal_id: int, dia: int, diag: Dict[str, Any]) -> Dict[str, Any]:
+        caida = 0.0 if diag["esperado"] == 0 else (1 - diag["litros"] / diag["esperado"]) * 100
+        motivo = "caída brusca" if diag["z"] < self.Z_CAIDA else "caída sostenida"
+        return {
+            "tipo": TIPO_ALERTA,
+            "prioridad": "alta" if caida >= 30 else "media",
+            "titulo": f"Producción de leche en descenso (animal {animal_id})",
+            "descripcion": (
+                f"{motivo.capitalize()} el {date.fromordinal(dia).isoformat()}: "
+                f"{diag['litros']:.1f} L vs {diag['esperado']:.1f} L esperados ({caida:.0f}% menos). "
+                f"z={diag['z']:.2f}, CUSUM={diag['cusum']:.2f}"
+            ),
+            "entidad_tipo": "animal",
+            "entidad_id": animal_id,
+            "valor_actual": diag["litros"],
+            "valor_referencia": diag["esperado"],
+        }
+
+    def _guardar(self, alertas: List[Dict[str, Any]]) -> None:
+        try:
+            from src.services.alert_rules_service import get_alert_rules_service
+            get_alert_rules_service().guardar_alertas_en_bd(alertas, por_entidad=True)
+        except Exception as e:
+            logger.warning(f"No se pudieron guardar alertas de leche: {e}")
+
+
+# Singleton
+_milk_detector_instance: Optional[MilkStreamDetector] = None
+
+
+def get_milk_stream_detector() -> MilkStreamDetector:
+    """Obtiene la instancia singleton del detector de leche"""
+    global _milk_detector_instance
+    if _milk_detector_instance is None:
+        _milk_detector_instance = MilkStreamDetector()
+    return _milk_detector_instance
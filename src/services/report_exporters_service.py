@@ -374,6 +374,42 @@ class ReportExportersService:
         
         self.logger.info(f"Exportación completa: {len(archivos)} archivo(s) generado(s)")
         return archivos
+    
+    def exportar_todos_formatos_async(
+        self,
+        año: int,
+        mes: int
+    ) -> Dict[str, Any]:
+        """
+        Encola cada reporte del período en la cola de exportaciones (sin
+        bloquear el hilo de la UI); seguir con seguir_en_ui o trabajo.esperar().
+        
+        Solo el resumen mensual depende únicamente del mes y se cachea cuando
+        el período está cerrado; KPIs, alertas activas y el resumen ejecutivo
+        (que incluye alertas activas) se regeneran siempre.
+        
+        Returns:
+            Diccionario con los TrabajoExportacion por reporte
+        """
+        from src.jobs.export_queue import get_export_queue
+        
+        cola = get_export_queue()
+        parametros = {"año": año, "mes": mes}
+        resumen_path = str(self.exports_dir / f"resumen_mensual_{año}_{mes:02d}.csv")
+        return {
+            'resumen_csv': cola.enviar(
+                "resumen_mensual_csv",
+                lambda t: self.exportar_resumen_mensual_csv(año, mes, resumen_path),
+                resumen_path, parametros, periodo=((año, mes), (año, mes)),
+            ),
+            'kpis_csv': cola.enviar("kpis_csv", lambda t: self.exportar_kpis_csv()),
+            'alertas_csv': cola.enviar("alertas_csv", lambda t: self.exportar_alertas_csv()),
+            'resumen_ejecutivo': cola.enviar(
+                "resumen_ejecutivo_txt",
+                lambda t: self.exportar_resumen_ejecutivo_txt(año, mes),
+                parametros=parametros,
+            ),
+        }
 
 
 # Singleton
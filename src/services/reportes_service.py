@@ -18,14 +18,17 @@ Autor: Arquitecto Senior - Fase 3
 Fecha: Diciembre 2025
 """
 
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
 from datetime import datetime, date, timedelta
-from typing import Dict, List, Optional, Any
+from typing import Callable, Dict, List, Optional, Any
 import logging
+import time
 
 from src.reports.reporte_animales import ReporteAnimales
 from src.reports.reporte_reproduccion import ReporteReproduccion
 from src.reports.reporte_produccion import ReporteProduccion
 from src.reports.reporte_finanzas import ReporteFinanzas
+from src.services.closed_period_store import get_closed_period_store
 
 
 class ReportesService:
@@ -47,6 +50,17 @@ class ReportesService:
         'completo'  # Todos los reportes
     ]
     
+    # Reporte completo: las secciones son consultas independientes de solo
+    # lectura y se generan en paralelo (cada hilo usa su propia conexión del pool)
+    MAX_HILOS_SECCIONES = 4
+    TIMEOUT_SECCION_S = 120.0  # límite por defecto de cada sección
+    TIMEOUTS_SECCION_S: Dict[str, float] = {}  # límites específicos por sección
+    
+    # Secciones que dependen solo del período: con todos sus meses cerrados se
+    # leen del almacén permanente. Animales y reproducción incluyen el estado
+    # actual del hato (inventario, gestantes, tasas) y se recalculan siempre.
+    SECCIONES_PERIODO = ('produccion', 'finanzas')
+    
     def __init__(self):
         self.logger = logging.getLogger(__name__)
         
@@ -98,6 +112,11 @@ class ReportesService:
         # Normalizar fechas
         fecha_inicio, fecha_fin = self._normalizar_fechas(fecha_inicio, fecha_fin)
         
+        return self._generar(tipo, fecha_inicio, fecha_fin, filtros)
+    
+    def _generar(self, tipo: str, fecha_inicio: date, fecha_fin: date,
+                 filtros: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Genera el reporte; las secciones de SECCIONES_PERIODO pasan por el almacén."""
         # Logging
         self.logger.info(
             f"Generando reporte: {tipo} "
@@ -109,15 +128,8 @@ class ReportesService:
             return self._generar_reporte_completo(fecha_inicio, fecha_fin, filtros)
         
         # Delegar a generador específico
-        generadores = {
-            'animales': self.reporte_animales.generar,
-            'reproduccion': self.reporte_reproduccion.generar,
-            'produccion': self.reporte_produccion.generar,
-            'finanzas': self.reporte_finanzas.generar
-        }
-        
         try:
-            datos = generadores[tipo](fecha_inicio, fecha_fin, filtros or {})
+            datos = self._generadores()[tipo](fecha_inicio, fecha_fin, filtros or {})
             
             return {
                 'tipo': tipo,
@@ -235,23 +247,83 @@ class ReportesService:
         
         return fecha_inicio, fecha_fin
     
+    def _generadores(self) -> Dict[str, Callable[..., Dict[str, Any]]]:
+        """Generador de cada sección, en el orden del reporte completo."""
+        generadores = {
+            'animales': self.reporte_animales.generar,
+            'reproduccion': self.reporte_reproduccion.generar,
+            'produccion': self.reporte_produccion.generar,
+            'finanzas': self.reporte_finanzas.generar
+        }
+        for nombre in self.SECCIONES_PERIODO:
+            generadores[nombre] = self._con_almacen(nombre, generadores[nombre])
+        return generadores
+    
+    def _con_almacen(self, nombre: str,
+                     generador: Callable[..., Dict[str, Any]]) -> Callable[..., Dict[str, Any]]:
+        """
+        Envuelve el generador de una sección: si todos los meses del período
+        están cerrados la sección es inmutable y se lee del almacén permanente
+        (o se genera una vez y se guarda).
+        """
+        def generar(fecha_inicio: date, fecha_fin: date, filtros: Dict[str, Any]) -> Dict[str, Any]:
+            return get_closed_period_store().obtener_o_calcular(
+                f"seccion_{nombre}",
+                (fecha_inicio.year, fecha_inicio.month),
+                (fecha_fin.year, fecha_fin.month),
+                {'inicio': fecha_inicio.isoformat(), 'fin': fecha_fin.isoformat(), 'filtros': filtros or {}},
+                lambda: generador(fecha_inicio, fecha_fin, filtros),
+            )
+        return generar
+    
     def _generar_reporte_completo(self, fecha_inicio: date, fecha_fin: date,
-                                 filtros: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+                                 filtros: Optional[Dict[str, Any]],
+                                 timeouts: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
         """
         Genera un reporte completo con todas las secciones.
         
+        Las secciones corren en paralelo en un pool acotado de hilos; el
+        reporte tarda lo que su sección más lenta. Si una sección falla o
+        supera su límite (timeouts > TIMEOUTS_SECCION_S > TIMEOUT_SECCION_S,
+        contado desde el inicio del reporte) se propaga el error, igual que
+        en la generación secuencial.
+        
         Returns:
-            Diccionario con todas las secciones de reportes
+            Diccionario con todas las secciones de reportes; metadatos incluye
+            la duración de cada sección (tiempos_ms) y la total (duracion_ms)
         """
         self.logger.info("Generando reporte completo (todas las secciones)...")
         
+        generadores = self._generadores()
+        limites = {**self.TIMEOUTS_SECCION_S, **(timeouts or {})}
+        tiempos_ms: Dict[str, float] = {}
+        inicio = time.perf_counter()
+        
+        def _generar(nombre: str, generador: Callable[..., Dict[str, Any]]) -> Dict[str, Any]:
+            t0 = time.perf_counter()
+            try:
+                return generador(fecha_inicio, fecha_fin, dict(filtros or {}))
+            finally:
+                tiempos_ms[nombre] = round((time.perf_counter() - t0) * 1000, 1)
+        
+        hilos = max(1, min(self.MAX_HILOS_SECCIONES, len(generadores)))
+        executor = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="reporte-seccion")
         try:
-            reportes = {
-                'animales': self.reporte_animales.generar(fecha_inicio, fecha_fin, filtros or {}),
-                'reproduccion': self.reporte_reproduccion.generar(fecha_inicio, fecha_fin, filtros or {}),
-                'produccion': self.reporte_produccion.generar(fecha_inicio, fecha_fin, filtros or {}),
-                'finanzas': self.reporte_finanzas.generar(fecha_inicio, fecha_fin, filtros or {})
-            }
+            futuros = {nombre: executor.submit(_generar, nombre, g) for nombre, g in generadores.items()}
+            reportes = {}
+            for nombre, futuro in futuros.items():
+                limite = limites.get(nombre, self.TIMEOUT_SECCION_S)
+                restante = None if limite is None else max(0.0, inicio + limite - time.perf_counter())
+                try:
+                    reportes[nombre] = futuro.result(timeout=restante)
+                except FuturesTimeoutError:
+                    raise TimeoutError(f"Sección '{nombre}' excedió {limite:.1f}s") from None
+            
+            duracion_ms = round((time.perf_counter() - inicio) * 1000, 1)
+            self.logger.info(
+                f"Reporte completo en {duracion_ms:.0f} ms "
+                f"({', '.join(f'{n}={t:.0f}' for n, t in tiempos_ms.items())} ms)"
+            )
             
             return {
                 'tipo': 'completo',
@@ -263,13 +335,20 @@ class ReportesService:
                 'secciones': reportes,
                 'metadatos': {
                     'secciones_incluidas': list(reportes.keys()),
-                    'total_secciones': len(reportes)
+                    'total_secciones': len(reportes),
+                    'ejecucion': 'paralela',
+                    'hilos': hilos,
+                    'tiempos_ms': {n: tiempos_ms[n] for n in reportes},
+                    'duracion_ms': duracion_ms
                 }
             }
         
         except Exception as e:
             self.logger.error(f"Error generando reporte completo: {e}", exc_info=True)
             raise
+        finally:
+            # Una sección vencida sigue en su hilo; no se la espera
+            executor.shutdown(wait=False, cancel_futures=True)
 
 
 # Singleton global
@@ -108,7 +108,8 @@ class SystemMetricsService:
         self,
         cache_name: str,
         clave: Optional[str] = None,
-        tiempo_recuperacion_ms: Optional[float] = None
+        tiempo_recuperacion_ms: Optional[float] = None,
+        cantidad: int = 1,
     ) -> bool:
         """
         Registra un hit de cache.
@@ -117,13 +118,14 @@ class SystemMetricsService:
             cache_name: Nombre del cache (ej: "analytics_cache")
             clave: Clave accedida (opcional)
             tiempo_recuperacion_ms: Tiempo tomado (opcional)
+            cantidad: Hits acumulados que representa el registro (lotes)
 
         Returns:
             True si se registró
         """
         return self._registrar_metrica(
             tipo="cache_hit",
-            valor=1.0,
+            valor=float(cantidad),
             unidad="count",
             componente=cache_name,
             detalles={"clave": clave, "tiempo_ms": tiempo_recuperacion_ms},
@@ -313,8 +315,8 @@ class SystemMetricsService:
                 cursor.execute(
                     """
                     SELECT 
-                        SUM(CASE WHEN tipo = 'cache_hit' THEN 1 ELSE 0 END) as hits,
-                        SUM(CASE WHEN tipo = 'cache_miss' THEN 1 ELSE 0 END) as misses
+                        CAST(SUM(CASE WHEN tipo = 'cache_hit' THEN valor ELSE 0 END) AS INTEGER) as hits,
+                        CAST(SUM(CASE WHEN tipo = 'cache_miss' THEN valor ELSE 0 END) AS INTEGER) as misses
                     FROM system_metrics
                     WHERE componente = ? AND timestamp >= datetime('now', ?)
                     """,
@@ -0,0 +1,8 @@
+"""
+Gráficos: reducción de series (LTTB) y render reutilizable fuera del hilo de Tk
+"""
+
+from .lttb import lttb_indices, reducir_serie
+from .grafico_agg import GraficoAgg
+
+__all__ = ['lttb_indices', 'reducir_serie', 'GraficoAgg']
@@ -0,0 +1,308 @@
+"""
+Gráfico matplotlib reutilizable, renderizado fuera del hilo de Tk.
+
+Los módulos creaban en cada refresco una Figure y un FigureCanvasTkAgg
+nuevos (o limpiaban los ejes y volvían a trazar todo) y dibujaban en el
+hilo de la UI, con todos los puntos de la historia. GraficoAgg mantiene una
+sola figura por gráfico y:
+
+- reutiliza los artistas: linea()/relleno()/linea_horizontal()/barras()/
+  texto() actualizan por nombre el artista existente (set_data, set_height,
+  set_text) en lugar de recrearlo;
+- reduce las series largas con LTTB al ancho en píxeles de los ejes, así el
+  costo de redibujar no crece con la historia;
+- dibuja en un hilo de trabajo sobre el canvas Agg y solo vuelca el buffer
+  RGBA resultante en un Label de Tk (PhotoImage) mediante widget.after().
+
+Uso desde la UI:
+
+    grafico = GraficoAgg(frame, ancho_px=650, alto_px=400)
+    grafico.widget.pack(fill="both", expand=True)
+
+    def dibujar(g):                         # corre en el hilo de trabajo
+        g.linea("litros", fechas, totales, color="#1E88E5")
+        g.linea_horizontal("promedio", promedio, linestyle="--")
+        g.ejes.set_title("Producción")
+        g.ajustar()
+
+    grafico.solicitar(dibujar, clave="produccion")
+
+dibujar() no debe tocar widgets de Tk: recibe los datos ya leídos. Con la
+misma clave que el render anterior los artistas se reutilizan; si la clave
+cambia (otro tipo de gráfico) o es None, los ejes se limpian antes de
+dibujar. Si dibujar() llama a g.limpiar() (p.ej. para un 'Sin datos'), el
+render siguiente también parte de ejes limpios. Si llegan varias
+solicitudes mientras se dibuja, solo se renderiza la última.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Sequence
+
+import numpy as np
+
+from .lttb import reducir_serie
+
+logger = logging.getLogger(__name__)
+
+INTERVALO_UI_MS = 30
+ESPERA_REDIMENSION_MS = 150
+MAX_HILOS = 2
+
+_SIN_CLAVE = object()
+_ejecutor: Optional[ThreadPoolExecutor] = None
+_ejecutor_lock = threading.Lock()
+
+
+def _get_ejecutor() -> ThreadPoolExecutor:
+    """Hilos compartidos por todos los gráficos (se crean al primer uso)."""
+    global _ejecutor
+    with _ejecutor_lock:
+        if _ejecutor is None:
+            _ejecutor = ThreadPoolExecutor(max_workers=MAX_HILOS, thread_name_prefix="graficas")
+        return _ejecutor
+
+
+def _x_graficable(x: Sequence[Any]) -> Any:
+    """Fechas en texto ('YYYY-MM-DD') como datetime64 para que el eje sea de fechas."""
+    if len(x) and isinstance(x[0], str):
+        return np.array(x, dtype="datetime64")
+    return x
+
+
+class GraficoAgg:
+    """Figura con artistas reutilizables, dibujada en segundo plano y mostrada en un Label."""
+
+    def __init__(
+        self,
+        master: Any,
+        ancho_px: int = 640,
+        alto_px: int = 400,
+        dpi: int = 100,
+        fondo: Optional[str] = None,
+        fondo_ejes: Optional[str] = None,
+    ):
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+
+        self.figura = Figure(figsize=(ancho_px / dpi, alto_px / dpi), dpi=dpi, facecolor=fondo)
+        self._lienzo = FigureCanvasAgg(self.figura)
+        self.ejes = self.figura.add_subplot(111)
+        if fondo_ejes:
+            self.ejes.set_facecolor(fondo_ejes)
+        color_fondo = self.figura.get_facecolor()
+        color_tk = "#%02x%02x%02x" % tuple(int(c * 255) for c in color_fondo[:3])
+
+        self.widget = tk.Frame(master, width=ancho_px, height=alto_px, bg=color_tk, highlightthickness=0)
+        self._etiqueta = tk.Label(self.widget, bd=0, bg=color_tk)
+        self._etiqueta.place(x=0, y=0, relwidth=1, relheight=1)
+        self._foto: Optional[tk.PhotoImage] = None
+
+        self._artistas: Dict[str, Any] = {}
+        self._clave: Any = _SIN_CLAVE
+        self._limpiado = False
+        self._tamano = (ancho_px, alto_px)
+        self._render_lock = threading.Lock()   # una figura no se dibuja en dos hilos a la vez
+        self._estado_lock = threading.Lock()   # protege _pedido y _listo
+        self._pedido: Optional[tuple] = None
+        self._listo: Optional[tuple] = None
+        self._generacion = 0
+        self._ultimo: Optional[tuple] = None
+        self._sondeando = False
+        self._espera_redimension = None
+        self.widget.bind("<Configure>", self._al_redimensionar)
+
+    # ==================== HILO DE UI ====================
+
+    def solicitar(self, dibujar: Callable[["GraficoAgg"], None], clave: Any = None) -> None:
+        """Programa un render con dibujar(self) en segundo plano (llamar desde Tk)."""
+        self._generacion += 1
+        self._ultimo = (dibujar, clave)
+        with self._estado_lock:
+            self._pedido = (self._generacion, dibujar, clave, self._tamano)
+        _get_ejecutor().submit(self._renderizar)
+        self._sondear()
+
+    def cancelar(self) -> None:
+        """Descarta el render pendiente y deja de actualizar la imagen."""
+        with self._estado_lock:
+            self._pedido = None
+            self._listo = None
+        self._ultimo = None
+        self._generacion += 1
+
+    def _sondear(self) -> None:
+        if self._sondeando:
+            return
+        self._sondeando = True
+        try:
+            self.widget.after(INTERVALO_UI_MS, self._tick)
+        except tk.TclError:
+            self._sondeando = False
+
+    def _tick(self) -> None:
+        if self._ultimo is None:
+            self._sondeando = False  # cancelado
+            return
+        with self._estado_lock:
+            listo, self._listo = self._listo, None
+        try:
+            if listo is not None:
+                generacion, ppm = listo
+                if ppm is not None:
+                    self._foto = tk.PhotoImage(master=self.widget, data=ppm, format="PPM")
+                    self._etiqueta.configure(image=self._foto)
+                if generacion >= self._generacion:
+                    self._sondeando = False
+                    return
+            self.widget.after(INTERVALO_UI_MS, self._tick)
+        except tk.TclError as e:
+            # El widget ya no existe
+            self._sondeando = False
+            logger.debug(f"Gráfico destruido antes de mostrarse: {e}")
+
+    def _al_redimensionar(self, evento: Any) -> None:
+        ancho, alto = int(evento.width), int(evento.height)
+        if ancho < 20 or alto < 20:
+            return
+        if abs(ancho - self._tamano[0]) < 3 and abs(alto - self._tamano[1]) < 3:
+            return
+        self._tamano = (ancho, alto)
+        if self._ultimo is None:
+            return
+        if self._espera_redimension is not None:
+            self.widget.after_cancel(self._espera_redimension)
+        self._espera_redimension = self.widget.after(ESPERA_REDIMENSION_MS, self._redibujar)
+
+    def _redibujar(self) -> None:
+        self._espera_redimension = None
+        if self._ultimo is not None:
+            self.solicitar(*self._ultimo)
+
+    # ==================== HILO DE TRABAJO ====================
+
+    def _renderizar(self) -> None:
+        with self._render_lock:
+            with self._estado_lock:
+                pedido, self._pedido = self._pedido, None
+            if pedido is None:
+                return  # ya lo tomó un render anterior
+            generacion, dibujar, clave, (ancho, alto) = pedido
+            try:
+                if clave is None or clave != self._clave:
+                    self.limpiar()
+                self._clave = clave
+                self._limpiado = False
+                dpi = self.figura.dpi
+                self.figura.set_size_inches(ancho / dpi, alto / dpi)
+                dibujar(self)
+                if self._limpiado:
+                    # dibujar() dejó contenido sin nombre (p.ej. 'Sin datos'): el próximo parte de cero
+                    self._clave = _SIN_CLAVE
+                self._lienzo.draw()
+                rgba = np.asarray(self._lienzo.buffer_rgba())
+                ppm = b"P6 %d %d 255\n" % (rgba.shape[1], rgba.shape[0]) + rgba[..., :3].tobytes()
+            except Exception as e:
+                logger.error(f"Error dibujando gráfico: {e}")
+                self._clave = _SIN_CLAVE
+                ppm = None
+        with self._estado_lock:
+            self._listo = (generacion, ppm)
+
+    # ==================== ARTISTAS (dentro de dibujar) ====================
+
+    def ancho_ejes_px(self) -> int:
+        """Ancho actual de los ejes en píxeles (límite de puntos por serie)."""
+        return max(3, int(self.ejes.get_position().width * self.figura.get_figwidth() * self.figura.dpi))
+
+    def limpiar(self) -> None:
+        """Limpia los ejes y olvida los artistas con nombre."""
+        self.ejes.clear()
+        self._artistas.clear()
+        self._limpiado = True
+
+    def _quitar(self, nombre: str) -> None:
+        artista = self._artistas.pop(nombre, None)
+        if artista is not None:
+            artista.remove()
+
+    def linea(self, nombre: str, x: Sequence[Any], y: Sequence[float],
+              max_puntos: Optional[int] = None, **estilo: Any) -> Any:
+        """Serie de línea (reducida con LTTB); reutiliza el Line2D con set_data."""
+        xs, ys = reducir_serie(x, y, max_puntos or self.ancho_ejes_px())
+        xs = _x_graficable(xs)
+        artista = self._artistas.get(nombre)
+        if artista is None:
+            artista, = self.ejes.plot(xs, ys, **estilo)
+            self._artistas[nombre] = artista
+        else:
+            artista.set_data(xs, ys)
+            if estilo:
+                artista.set(**estilo)
+        return artista
+
+    def relleno(self, nombre: str, x: Sequence[Any], y: Sequence[float],
+                max_puntos: Optional[int] = None, **estilo: Any) -> Any:
+        """Área bajo la serie (reducida); el polígono se reemplaza en cada render."""
+        xs, ys = reducir_serie(x, y, max_puntos or self.ancho_ejes_px())
+        self._quitar(nombre)
+        artista = self.ejes.fill_between(_x_graficable(xs), ys, **estilo)
+        self._artistas[nombre] = artista
+        return artista
+
+    def linea_horizontal(self, nombre: str, y: float, **estilo: Any) -> Any:
+        """Línea de referencia horizontal (promedio, límites)."""
+        artista = self._artistas.get(nombre)
+        if artista is None:
+            artista = self.ejes.axhline(y=y, **estilo)
+            self._artistas[nombre] = artista
+        else:
+            artista.set_ydata([y, y])
+            if estilo:
+                artista.set(**estilo)
+        return artista
+
+    def barras(self, nombre: str, etiquetas: Sequence[Any], valores: Sequence[float],
+               horizontal: bool = False, **estilo: Any) -> Any:
+        """
+        Barras en posiciones 0..n-1 con las etiquetas como ticks; con las mismas
+        etiquetas solo se cambia el largo de cada barra.
+        """
+        anterior = self._artistas.get(nombre)
+        if anterior is not None and getattr(anterior, "_etiquetas", None) == list(etiquetas):
+            for barra, valor in zip(anterior.patches, valores):
+                barra.set_width(valor) if horizontal else barra.set_height(valor)
+            return anterior
+        self._quitar(nombre)
+        posiciones = range(len(etiquetas))
+        contenedor = (self.ejes.barh if horizontal else self.ejes.bar)(posiciones, valores, **estilo)
+        contenedor._etiquetas = list(etiquetas)
+        if horizontal:
+            self.ejes.set_yticks(posiciones, labels=[str(e) for e in etiquetas])
+        else:
+            self.ejes.set_xticks(posiciones, labels=[str(e) for e in etiquetas])
+        self._artistas[nombre] = contenedor
+        return contenedor
+
+    def texto(self, nombre: str, x: float, y: float, texto: str, **estilo: Any) -> Any:
+        """Texto/anotación con nombre; se actualiza con set_text."""
+        artista = self._artistas.get(nombre)
+        if artista is None:
+            artista = self.ejes.text(x, y, texto, **estilo)
+            self._artistas[nombre] = artista
+        else:
+            artista.set_text(texto)
+            artista.set_position((x, y))
+        return artista
+
+    def ajustar(self) -> None:
+        """Recalcula límites de los ejes tras set_data."""
+        self.ejes.relim()
+        self.ejes.autoscale_view()
+
+
+__all__ = ["GraficoAgg"]
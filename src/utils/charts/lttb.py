@@ -0,0 +1,83 @@
+"""
+Reducción de series largas para graficar (Largest-Triangle-Three-Buckets).
+
+Graficar cada punto diario de varios años dibuja miles de vértices en unos
+cientos de píxeles: el costo crece con la historia y no se ve más detalle.
+LTTB divide la serie en tantos tramos como puntos de salida y en cada tramo
+conserva el punto que forma el triángulo de mayor área con el punto elegido
+antes y el promedio del tramo siguiente; así se mantienen picos, caídas y
+la forma general:
+
+    x, y = reducir_serie(fechas, litros, max_puntos=600)   # <= 600 puntos
+
+Los extremos siempre se conservan. Las x pueden ser números, fechas
+(date/datetime/'YYYY-MM-DD') o datetime64; se devuelven los valores
+originales de los puntos elegidos.
+"""
+
+from __future__ import annotations
+
+from datetime import date
+from typing import Any, Sequence, Tuple
+
+import numpy as np
+
+
+def _como_numeros(x: Sequence[Any]) -> np.ndarray:
+    """Eje x como float64 (las fechas en milisegundos)."""
+    arreglo = np.asarray(x)
+    if arreglo.dtype.kind in "iuf":
+        return arreglo.astype(np.float64)
+    if arreglo.dtype.kind == "M" or (len(arreglo) and isinstance(arreglo.flat[0], (date, str))):
+        return arreglo.astype("datetime64[ms]").astype(np.int64).astype(np.float64)
+    return arreglo.astype(np.float64)
+
+
+def lttb_indices(x: Sequence[Any], y: Sequence[float], n_salida: int) -> np.ndarray:
+    """
+    Índices (ordenados) de los puntos que conserva LTTB.
+
+    Si la serie ya tiene n_salida puntos o menos (o n_salida < 3) devuelve
+    todos. Los puntos con y no finita se descartan antes de reducir.
+    """
+    xs = _como_numeros(x)
+    ys = np.asarray(y, dtype=np.float64)
+    validos = np.flatnonzero(np.isfinite(ys) & np.isfinite(xs))
+    n = len(validos)
+    if n_salida >= n or n_salida < 3:
+        return validos
+    xs, ys = xs[validos], ys[validos]
+
+    elegidos = np.empty(n_salida, dtype=np.int64)
+    elegidos[0], elegidos[-1] = 0, n - 1
+    # n_salida - 2 tramos sobre los puntos interiores 1 .. n-2
+    bordes = np.linspace(1, n - 1, n_salida - 1).astype(np.int64)
+    anterior = 0
+    for i in range(n_salida - 2):
+        inicio, fin = bordes[i], bordes[i + 1]
+        if i + 2 < len(bordes):
+            sig_inicio, sig_fin = bordes[i + 1], bordes[i + 2]
+        else:
+            sig_inicio, sig_fin = n - 1, n
+        cx, cy = xs[sig_inicio:sig_fin].mean(), ys[sig_inicio:sig_fin].mean()
+        ax, ay = xs[anterior], ys[anterior]
+        areas = np.abs((ax - cx) * (ys[inicio:fin] - ay) - (ax - xs[inicio:fin]) * (cy - ay))
+        anterior = inicio + int(np.argmax(areas))
+        elegidos[i + 1] = anterior
+    return validos[elegidos]
+
+
+def reducir_serie(x: Sequence[Any], y: Sequence[float], max_puntos: int) -> Tuple[list, list]:
+    """
+    Serie reducida a lo sumo a max_puntos con LTTB.
+
+    Returns:
+        (x, y) como listas con los valores originales de los puntos elegidos
+    """
+    indices = lttb_indices(x, y, max_puntos)
+    if len(indices) == len(x):
+        return list(x), list(y)
+    return [x[i] for i in indices], [y[i] for i in indices]
+
+
+__all__ = ["lttb_indices", "reducir_serie"]
@@ -5,5 +5,9 @@ Exportadores - FASE 3
 from .export_pdf import PDFExporter
 from .export_excel import ExcelExporter
 from .export_csv import CSVExporter
+from .export_stream import ExportacionCancelada, exportar_consulta, exportar_csv_stream, exportar_excel_stream, filas_consulta
 
-__all__ = ['PDFExporter', 'ExcelExporter', 'CSVExporter']
+__all__ = [
+    'PDFExporter', 'ExcelExporter', 'CSVExporter',
+    'ExportacionCancelada', 'exportar_consulta', 'exportar_csv_stream', 'exportar_excel_stream', 'filas_consulta',
+]
@@ -9,9 +9,10 @@ Exporta reportes a formato CSV para respaldo y análisis externo.
 import csv
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterable, List, Optional, Sequence
 import logging
 from src.core.audit_service import log_event
+from src.utils.export.export_stream import ExportacionCancelada, Progreso, exportar_csv_stream
 
 
 class CSVExporter:
@@ -71,6 +72,44 @@ class CSVExporter:
                 pass
             raise
 
+    def exportar_filas(
+        self,
+        columnas: Sequence[str],
+        filas: Iterable[Any],
+        ruta_salida: str,
+        progreso: Optional[Progreso] = None,
+        total: Optional[int] = None,
+    ) -> str:
+        """
+        Exporta filas en streaming sin cargarlas en memoria.
+
+        Args:
+            columnas: Encabezados
+            filas: Iterable de tuplas o diccionarios (p. ej. filas_consulta(sql))
+            ruta_salida: Ruta del archivo CSV de salida
+            progreso: Callback (filas_escritas, total); si devuelve False cancela
+
+        Returns:
+            Ruta del archivo generado
+        """
+        try:
+            n = exportar_csv_stream(ruta_salida, columnas, filas, progreso, total)
+            try:
+                log_event(usuario=None, modulo="export", accion="EXPORTAR", entidad="filas", resultado="OK", mensaje=f"CSV stream ({n} filas) -> {ruta_salida}")
+            except Exception:
+                pass
+            return ruta_salida
+        except ExportacionCancelada:
+            self.logger.info(f"Exportación CSV cancelada: {ruta_salida}")
+            raise
+        except Exception as e:
+            self.logger.error(f"Error exportando CSV en streaming: {e}", exc_info=True)
+            try:
+                log_event(usuario=None, modulo="export", accion="EXPORTAR", entidad="filas", resultado="ERROR", mensaje=str(e))
+            except Exception:
+                pass
+            raise
+
     def exportar_analitico(self, datos: Dict[str, Any], destino: Path) -> Path:
         """Exporta datos analíticos (KPIs, tendencias, insights) a CSV."""
         destino.parent.mkdir(parents=True, exist_ok=True)
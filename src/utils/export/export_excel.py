@@ -9,9 +9,10 @@ Requiere: openpyxl (pip install openpyxl)
 
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, Iterable, Optional, Sequence
 import logging
 from src.core.audit_service import log_event
+from src.utils.export.export_stream import ExportacionCancelada, Progreso, exportar_excel_stream
 
 
 class ExcelExporter:
@@ -103,6 +104,47 @@ class ExcelExporter:
                 pass
             raise
 
+    def exportar_filas(
+        self,
+        columnas: Sequence[str],
+        filas: Iterable[Any],
+        ruta_salida: str,
+        nombre_hoja: str = "Datos",
+        progreso: Optional[Progreso] = None,
+        total: Optional[int] = None,
+    ) -> str:
+        """
+        Exporta filas en streaming (openpyxl write-only) sin cargarlas en memoria.
+
+        Args:
+            columnas: Encabezados
+            filas: Iterable de tuplas o diccionarios (p. ej. filas_consulta(sql))
+            ruta_salida: Ruta del archivo Excel de salida
+            progreso: Callback (filas_escritas, total); si devuelve False cancela
+
+        Returns:
+            Ruta del archivo generado
+        """
+        if not self._Workbook:
+            raise ImportError("openpyxl no está instalado. Instalar con: pip install openpyxl")
+        try:
+            n = exportar_excel_stream(ruta_salida, columnas, filas, nombre_hoja, progreso, total)
+            try:
+                log_event(usuario=None, modulo="export", accion="EXPORTAR", entidad=nombre_hoja, resultado="OK", mensaje=f"Excel stream ({n} filas) -> {ruta_salida}")
+            except Exception:
+                pass
+            return ruta_salida
+        except ExportacionCancelada:
+            self.logger.info(f"Exportación Excel cancelada: {ruta_salida}")
+            raise
+        except Exception as e:
+            self.logger.error(f"Error exportando Excel en streaming: {e}", exc_info=True)
+            try:
+                log_event(usuario=None, modulo="export", accion="EXPORTAR", entidad=nombre_hoja, resultado="ERROR", mensaje=str(e))
+            except Exception:
+                pass
+            raise
+
     def exportar_analitico(self, datos: Dict[str, Any], destino: Path) -> Path:
         if not self._Workbook or not self._Font:
             raise ImportError("openpyxl no está instalado. Instalar con: pip install openpyxl")
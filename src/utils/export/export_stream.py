@@ -0,0 +1,278 @@
+"""
+Exportación en streaming (CSV / Excel) para conjuntos de datos grandes.
+
+ExcelExporter y ExportadorDatos arman el libro completo en memoria a partir
+de listas de diccionarios; con el historial de leche o el inventario completo
+eso son cientos de MB. Aquí las filas salen de un cursor por lotes
+(fetchmany) y se escriben a medida que llegan, así que la memoria no depende
+del número de filas:
+
+    columnas, sql = CONSULTAS["historial_leche"]
+    filas = filas_consulta(sql)
+    exportar_csv_stream("leche.csv", columnas, filas, progreso=callback)
+    exportar_excel_stream("leche.xlsx", columnas, filas_consulta(sql))  # openpyxl write-only
+
+El callback de progreso recibe (filas_escritas, total) cada CADA_PROGRESO
+filas y al terminar; total es None si no se conoce (ver contar_consulta).
+Se invoca en el hilo que exporta: la UI debe pasarlo por after(). Si
+devuelve False la exportación se cancela (ExportacionCancelada).
+
+Se escribe sobre '<ruta>.parcial' y se renombra al final: un error o una
+cancelación nunca dejan un archivo a medias con el nombre final.
+"""
+
+from __future__ import annotations
+
+import csv
+import logging
+import os
+from itertools import chain, islice
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+from src.database.database import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+Progreso = Callable[[int, Optional[int]], Optional[bool]]
+Ruta = Union[str, Path]
+
+TAMANO_LOTE = 1000  # filas por fetchmany
+CADA_PROGRESO = 1000  # filas entre avisos de progreso
+MUESTRA_ANCHO = 100  # filas usadas para estimar el ancho de columnas en Excel
+ANCHO_MAXIMO = 50
+
+# Consultas de exportación masiva: nombre -> (columnas, sql)
+CONSULTAS: Dict[str, Tuple[List[str], str]] = {
+    "historial_leche": (
+        ["Fecha", "Código", "Animal", "Mañana", "Tarde", "Noche", "Total", "Observaciones"],
+        """
+        SELECT p.fecha, a.codigo, a.nombre,
+               p.litros_manana, p.litros_tarde, p.litros_noche,
+               COALESCE(p.litros_manana, 0) + COALESCE(p.litros_tarde, 0) + COALESCE(p.litros_noche, 0),
+               p.observaciones
+        FROM produccion_leche p
+        LEFT JOIN animal a ON a.id = p.animal_id
+        ORDER BY p.fecha, a.codigo
+        """,
+    ),
+    "inventario_animales": (
+        ["Código", "Nombre", "Sexo", "Finca", "Raza", "Fecha nacimiento", "Estado", "Salud"],
+        """
+        SELECT a.codigo, a.nombre, a.sexo, f.nombre, r.nombre,
+               a.fecha_nacimiento, a.estado, a.salud
+        FROM animal a
+        LEFT JOIN finca f ON f.id = a.id_finca
+        LEFT JOIN raza r ON r.id = a.raza_id
+        ORDER BY a.codigo
+        """,
+    ),
+}
+
+
+class ExportacionCancelada(Exception):
+    """El callback de progreso pidió detener la exportación."""
+
+
+# ==================== ORIGEN DE FILAS ====================
+
+def filas_consulta(sql: str, params: Sequence[Any] = (), tamano_lote: int = TAMANO_LOTE) -> Iterator[tuple]:
+    """
+    Genera las filas de una consulta leyendo el cursor por lotes.
+
+    La conexión queda abierta mientras se consume el generador y se libera al
+    agotarlo o cerrarlo.
+    """
+    with get_db_connection() as conn:
+        cursor = conn.execute(sql, tuple(params))
+        while True:
+            lote = cursor.fetchmany(tamano_lote)
+            if not lote:
+                break
+            for fila in lote:
+                yield tuple(fila)
+
+
+def contar_consulta(sql: str, params: Sequence[Any] = ()) -> Optional[int]:
+    """Número de filas de la consulta (para el total del progreso); None si falla."""
+    try:
+        with get_db_connection() as conn:
+            return int(conn.execute(f"SELECT COUNT(*) FROM ({sql})", tuple(params)).fetchone()[0])
+    except Exception as e:
+        logger.warning(f"No se pudo contar filas de exportación: {e}")
+        return None
+
+
+def _valores(fila: Any, columnas: Sequence[str]) -> List[Any]:
+    """Fila (dict, tupla o sqlite3.Row) como lista alineada a las columnas."""
+    if isinstance(fila, dict):
+        return [fila.get(c, "") for c in columnas]
+    return list(fila)
+
+
+# ==================== ESCRITURA ====================
+
+class _Avance:
+    """Cuenta filas y avisa al callback cada `cada` filas."""
+
+    def __init__(self, progreso: Optional[Progreso], total: Optional[int], cada: int):
+        self.progreso = progreso
+        self.total = total
+        self.cada = max(1, cada)
+        self.filas = 0
+
+    def _avisar(self) -> None:
+        if self.progreso is not None and self.progreso(self.filas, self.total) is False:
+            raise ExportacionCancelada(f"Exportación cancelada tras {self.filas} filas")
+
+    def sumar(self) -> None:
+        self.filas += 1
+        if self.filas % self.cada == 0:
+            self._avisar()
+
+    def terminar(self) -> None:
+        if self.filas % self.cada != 0 or self.filas == 0:
+            self._avisar()
+
+
+def _escribir_atomico(ruta: Ruta, escribir: Callable[[Path], int]) -> int:
+    """Ejecuta escribir(ruta_parcial) y renombra al destino solo si termina bien."""
+    destino = Path(ruta)
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    parcial = destino.with_name(destino.name + ".parcial")
+    try:
+        filas = escribir(parcial)
+        os.replace(parcial, destino)
+        return filas
+    except BaseException:
+        try:
+            parcial.unlink()
+        except OSError:
+            pass
+        raise
+
+
+def exportar_csv_stream(
+    ruta: Ruta,
+    columnas: Sequence[str],
+    filas: Iterable[Any],
+    progreso: Optional[Progreso] = None,
+    total: Optional[int] = None,
+    cada: int = CADA_PROGRESO,
+    encoding: str = "utf-8",
+) -> int:
+    """
+    Escribe las filas a CSV a medida que llegan ('utf-8-sig' para abrir en Excel).
+
+    Returns:
+        Número de filas de datos escritas
+    """
+    def escribir(parcial: Path) -> int:
+        avance = _Avance(progreso, total, cada)
+        with open(parcial, "w", newline="", encoding=encoding) as f:
+            writer = csv.writer(f)
+            writer.writerow(columnas)
+            for fila in filas:
+                writer.writerow(_valores(fila, columnas))
+                avance.sumar()
+        avance.terminar()
+        return avance.filas
+
+    n = _escribir_atomico(ruta, escribir)
+    logger.info(f"CSV en streaming: {n} filas -> {ruta}")
+    return n
+
+
+def exportar_excel_stream(
+    ruta: Ruta,
+    columnas: Sequence[str],
+    filas: Iterable[Any],
+    nombre_hoja: str = "Datos",
+    progreso: Optional[Progreso] = None,
+    total: Optional[int] = None,
+    cada: int = CADA_PROGRESO,
+) -> int:
+    """
+    Escribe las filas a Excel con openpyxl en modo write-only.
+
+    El ancho de columnas se estima con el encabezado y las primeras
+    MUESTRA_ANCHO filas (en write-only no se puede recorrer la hoja después).
+
+    Returns:
+        Número de filas de datos escritas
+
+    Raises:
+        ImportError: si openpyxl no está instalado
+    """
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Alignment, Font, PatternFill
+    from openpyxl.utils import get_column_letter
+
+    def escribir(parcial: Path) -> int:
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet(title=nombre_hoja)
+
+        iterador = iter(filas)
+        muestra = [_valores(f, columnas) for f in islice(iterador, MUESTRA_ANCHO)]
+        for i, columna in enumerate(columnas):
+            largo = max([len(str(columna))] + [len(str(v[i])) for v in muestra if i < len(v) and v[i] is not None])
+            ws.column_dimensions[get_column_letter(i + 1)].width = min(largo + 2, ANCHO_MAXIMO)
+
+        fill = PatternFill(start_color="1976D2", end_color="1976D2", fill_type="solid")
+        font = Font(bold=True, color="FFFFFF", size=12)
+        alineacion = Alignment(horizontal="center", vertical="center")
+        encabezado = []
+        for columna in columnas:
+            celda = WriteOnlyCell(ws, value=columna)
+            celda.fill, celda.font, celda.alignment = fill, font, alineacion
+            encabezado.append(celda)
+        ws.append(encabezado)
+
+        avance = _Avance(progreso, total, cada)
+        for valores in chain(muestra, (_valores(f, columnas) for f in iterador)):
+            ws.append(valores)
+            avance.sumar()
+        wb.save(parcial)
+        avance.terminar()
+        return avance.filas
+
+    n = _escribir_atomico(ruta, escribir)
+    logger.info(f"Excel en streaming: {n} filas -> {ruta}")
+    return n
+
+
+def exportar_consulta(
+    ruta: Ruta,
+    sql: str,
+    params: Sequence[Any] = (),
+    columnas: Optional[Sequence[str]] = None,
+    progreso: Optional[Progreso] = None,
+    nombre_hoja: str = "Datos",
+) -> int:
+    """
+    Exporta una consulta según la extensión de la ruta (.xlsx o .csv).
+
+    Si no se dan columnas se usan los nombres del cursor. El total del
+    progreso se obtiene con contar_consulta cuando hay callback.
+    """
+    if columnas is None:
+        with get_db_connection() as conn:
+            cursor = conn.execute(f"SELECT * FROM ({sql}) LIMIT 0", tuple(params))
+            columnas = [d[0] for d in cursor.description]
+    total = contar_consulta(sql, params) if progreso is not None else None
+    filas = filas_consulta(sql, params)
+    if str(ruta).lower().endswith(".xlsx"):
+        return exportar_excel_stream(ruta, columnas, filas, nombre_hoja, progreso, total)
+    return exportar_csv_stream(ruta, columnas, filas, progreso, total)
+
+
+__all__ = [
+    "CONSULTAS",
+    "ExportacionCancelada",
+    "filas_consulta",
+    "contar_consulta",
+    "exportar_csv_stream",
+    "exportar_excel_stream",
+    "exportar_consulta",
+]
@@ -0,0 +1,264 @@
+"""
+Tests del cache analítico de dos niveles (src/services/analytics_cache_service.py)
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+import pytest
+
+from src.database.migraciones import MIGRACIONES_SISTEMA, instalar_triggers_cache
+from src.database.pool import ConnectionPool
+from src.services import analytics_cache_service
+from src.services.analytics_cache_service import AnalyticsCacheService, Dependencia
+
+
+class _Metricas:
+    def __init__(self):
+        self.hits = []
+
+    def registrar_cache_hit(self, cache_name, clave=None, tiempo_recuperacion_ms=None, cantidad=1):
+        self.hits.append(cantidad)
+
+
+@pytest.fixture
+def entorno(tmp_path, monkeypatch):
+    pool = ConnectionPool(tmp_path / "cache.db")
+    with pool.connection() as conn:
+        conn.execute("CREATE TABLE usuario (id INTEGER PRIMARY KEY)")
+        for sql in MIGRACIONES_SISTEMA:
+            if "analytics_cache" in sql or "cierre_mensual" in sql:
+                conn.executescript(sql)
+        conn.execute("CREATE TABLE venta (id INTEGER PRIMARY KEY, fecha DATE, total REAL)")
+        instalar_triggers_cache(conn)
+    aperturas = []
+
+    @contextmanager
+    def conexion():
+        aperturas.append(1)
+        with pool.connection() as conn:
+            yield conn
+
+    metricas = _Metricas()
+    monkeypatch.setattr(analytics_cache_service, "get_db_connection", conexion)
+    monkeypatch.setattr(analytics_cache_service, "get_system_metrics_service", lambda: metricas)
+    yield pool, aperturas, metricas
+    pool.close_all()
+
+
+def _hits_en_bd(pool, clave):
+    with pool.connection() as conn:
+        return conn.execute("SELECT hits FROM analytics_cache WHERE cache_key = ?", (clave,)).fetchone()[0]
+
+
+def test_hits_en_memoria_no_tocan_la_bd(entorno):
+    pool, aperturas, metricas = entorno
+    cache = AnalyticsCacheService()
+    calculos = []
+    cache.get_or_calculate("trend_x_6m", lambda: calculos.append(1) or {"v": [1, 2]})
+    antes = len(aperturas)
+
+    for _ in range(10):
+        assert cache.get_or_calculate("trend_x_6m", lambda: calculos.append(1)) == {"v": [1, 2]}
+
+    assert calculos == [1]
+    assert len(aperturas) == antes
+    assert _hits_en_bd(pool, "trend_x_6m") == 0
+
+    stats = cache.obtener_estadisticas()
+    assert stats["total_hits"] == 10
+    assert metricas.hits == [10]
+    assert stats["memoria"]["hits_memoria"] == 10
+    assert stats["memoria"]["hit_ratio"] == pytest.approx(10 / 11, abs=1e-4)
+
+
+def test_hits_se_vuelcan_en_lotes(entorno):
+    pool, _, metricas = entorno
+    cache = AnalyticsCacheService()
+    cache.LOTE_HITS = 4
+    cache.get_or_calculate("k", lambda: 1)
+    for _ in range(9):
+        cache.get_or_calculate("k", lambda: 1)
+    assert metricas.hits == [4, 4]
+    assert _hits_en_bd(pool, "k") == 8
+
+
+def test_lru_acotado_por_entradas_y_bytes(entorno):
+    cache = AnalyticsCacheService(max_entradas=2, max_bytes=1000)
+    cache.get_or_calculate("a", lambda: "a")
+    cache.get_or_calculate("b", lambda: "b")
+    cache.get_or_calculate("a", lambda: "a")  # "b" queda como menos usada
+    cache.get_or_calculate("c", lambda: "c")
+    assert list(cache._memoria) == ["a", "c"]
+
+    cache.get_or_calculate("grande", lambda: "x" * 990)
+    mem = cache.estadisticas_memoria()
+    assert mem["bytes"] <= 1000
+    assert mem["evictions"] >= 2
+
+    # Una entrada desalojada de memoria se sigue leyendo de la BD
+    assert cache.get_or_calculate("b", lambda: pytest.fail("no debe recalcular")) == "b"
+
+
+def test_ttl_e_invalidacion_en_memoria(entorno, monkeypatch):
+    cache = AnalyticsCacheService()
+    cache.get_or_calculate("comp_a_b", lambda: 1, ttl=60)
+    cache.get_or_calculate("trend_z", lambda: 2, ttl=60)
+
+    reloj = [analytics_cache_service.time.monotonic() + 61]
+    monkeypatch.setattr(analytics_cache_service.time, "monotonic", lambda: reloj[0])
+    assert cache._get_from_memoria("comp_a_b") is None
+    assert cache.estadisticas_memoria()["expiradas"] == 1
+
+    monkeypatch.undo()
+    cache.get_or_calculate("trend_z", lambda: 2, ttl=60)
+    cache.invalidar_patron("TREND_%")
+    assert "trend_z" not in cache._memoria
+    assert cache.get_or_calculate("trend_z", lambda: 3) == 3
+
+
+def _en_bd(pool, clave):
+    with pool.connection() as conn:
+        return conn.execute("SELECT expira_en FROM analytics_cache WHERE cache_key = ?", (clave,)).fetchone()
+
+
+def _escribir(pool, sql, params=()):
+    with pool.connection() as conn:
+        conn.execute(sql, params)
+        conn.commit()
+
+
+def test_escritura_invalida_solo_entradas_del_rango(entorno):
+    pool, _, _ = entorno
+    cache = AnalyticsCacheService()
+    cache.INTERVALO_SINCRONIZACION_S = 0
+    cache.get_or_calculate("ventas_ene", lambda: 1, depende_de=[Dependencia.meses("venta", 2025, 1)])
+    cache.get_or_calculate("ventas_feb", lambda: 2, depende_de=[Dependencia.meses("venta", 2025, 2)])
+    cache.get_or_calculate("ventas_todo", lambda: 3, depende_de=[Dependencia("venta")])
+    cache.get_or_calculate("sin_deps", lambda: 4)
+
+    _escribir(pool, "INSERT INTO venta (fecha, total) VALUES ('2025-02-14', 10)")
+
+    assert _en_bd(pool, "ventas_ene") and _en_bd(pool, "sin_deps")
+    assert _en_bd(pool, "ventas_feb") is None and _en_bd(pool, "ventas_todo") is None
+    # El nivel en memoria también se entera (vía cache_invalidacion)
+    assert cache.get_or_calculate("ventas_feb", lambda: 20) == 20
+    assert cache.get_or_calculate("ventas_ene", lambda: pytest.fail("no debe recalcular")) == 1
+    assert cache.estadisticas_memoria()["invalidadas_por_dependencia"] == 2
+
+
+def test_update_invalida_rango_anterior_y_nuevo(entorno):
+    pool, _, _ = entorno
+    _escribir(pool, "INSERT INTO venta (id, fecha, total) VALUES (1, '2025-01-10', 5)")
+    cache = AnalyticsCacheService()
+    cache.get_or_calculate("ene", lambda: 1, depende_de=[Dependencia.meses("venta", 2025, 1)])
+    cache.get_or_calculate("mar", lambda: 3, depende_de=[Dependencia.meses("venta", 2025, 3)])
+    _escribir(pool, "UPDATE venta SET fecha = '2025-03-02' WHERE id = 1")
+    assert _en_bd(pool, "ene") is None and _en_bd(pool, "mar") is None
+
+
+def test_meses_cerrados_no_vencen_hasta_revertir_cierre(entorno):
+    pool, _, _ = entorno
+    for mes in (1, 2):
+        _escribir(pool, "INSERT INTO cierre_mensual (año, mes) VALUES (2025, ?)", (mes,))
+    cache = AnalyticsCacheService()
+    cache.get_or_calculate("cerrado", lambda: 1, depende_de=[Dependencia.meses("venta", 2025, 1, 2025, 2)])
+    cache.get_or_calculate("abierto", lambda: 1, depende_de=[Dependencia.meses("venta", 2025, 2, 2025, 3)])
+    assert _en_bd(pool, "cerrado")[0] == AnalyticsCacheService.TTL_PERMANENTE
+    assert _en_bd(pool, "abierto")[0] == AnalyticsCacheService.TTL_DEFAULT
+
+    _escribir(pool, "UPDATE cierre_mensual SET estado = 'Revertido' WHERE mes = 2")
+    assert _en_bd(pool, "cerrado") is None
+
+
+def test_escritura_durante_el_calculo_no_se_cachea(entorno):
+    pool, _, _ = entorno
+    cache = AnalyticsCacheService()
+
+    def calcular():
+        _escribir(pool, "INSERT INTO venta (fecha, total) VALUES ('2025-01-05', 1)")
+        return "viejo"
+
+    dep = [Dependencia.meses("venta", 2025, 1)]
+    assert cache.get_or_calculate("k", calcular, depende_de=dep) == "viejo"
+    assert _en_bd(pool, "k") is None
+    assert cache.get_or_calculate("k", lambda: "nuevo", depende_de=dep) == "nuevo"
+
+
+def test_single_flight_un_solo_calculo_concurrente(entorno):
+    cache = AnalyticsCacheService()
+    liberar = threading.Event()
+    llamadas = []
+
+    def lento():
+        llamadas.append(1)
+        liberar.wait(5)
+        return {"serie": [1, 2, 3]}
+
+    resultados = []
+    hilos = [
+        threading.Thread(target=lambda: resultados.append(cache.get_or_calculate("trend_pesado", lento)))
+        for _ in range(8)
+    ]
+    for h in hilos:
+        h.start()
+    while cache.estadisticas_memoria()["coalescidas"] < 7:
+        time.sleep(0.01)
+    liberar.set()
+    for h in hilos:
+        h.join(5)
+
+    assert llamadas == [1]
+    assert resultados == [{"serie": [1, 2, 3]}] * 8
+    assert len({id(r) for r in resultados}) == 8  # cada llamador recibe su copia
+
+
+def test_single_flight_propaga_el_error(entorno):
+    cache = AnalyticsCacheService()
+    liberar = threading.Event()
+
+    def falla():
+        liberar.wait(5)
+        raise RuntimeError("boom")
+
+    errores = []
+
+    def llamar():
+        try:
+            cache.get_or_calculate("k", falla)
+        except RuntimeError as e:
+            errores.append(str(e))
+
+    hilos = [threading.Thread(target=llamar) for _ in range(3)]
+    for h in hilos:
+        h.start()
+    while cache.estadisticas_memoria()["coalescidas"] < 2:
+        time.sleep(0.01)
+    liberar.set()
+    for h in hilos:
+        h.join(5)
+    assert errores == ["boom"] * 3
+    assert cache.get_or_calculate("k", lambda: "ok") == "ok"
+
+
+def test_stale_while_revalidate(entorno):
+    cache = AnalyticsCacheService()
+    cache.get_or_calculate("comp_x", lambda: "v1", ttl=60)
+    cache._memoria["comp_x"].expira_mono -= 120
+    liberar = threading.Event()
+
+    def recalcular():
+        liberar.wait(5)
+        return "v2"
+
+    # Se sirve el vencido sin esperar; un solo refresco aunque se pida dos veces
+    assert cache.get_or_calculate("comp_x", recalcular, stale_while_revalidate=True) == "v1"
+    assert cache.get_or_calculate("comp_x", recalcular, stale_while_revalidate=True) == "v1"
+    vuelo = cache._en_vuelo["comp_x"]
+    liberar.set()
+    vuelo.evento.wait(5)
+
+    assert cache.get_or_calculate("comp_x", lambda: pytest.fail("no debe recalcular")) == "v2"
+    mem = cache.estadisticas_memoria()
+    assert mem["servidas_vencidas"] == 2 and mem["revalidaciones"] == 1
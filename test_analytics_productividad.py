@@ -0,0 +1,118 @@
+"""
+Tests de la agregación por rango de BuildProductivityAnalyticsJob
+"""
+
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+from src.database.database import SCHEMA_COMPLETO
+from src.database.migraciones import instalar_subtipo_evento
+from src.database.pool import ConnectionPool
+from src.jobs import analytics_jobs_v2
+from src.jobs.analytics_jobs_v2 import BuildProductivityAnalyticsJob
+from src.infraestructura.analytics import analytics_repository
+from src.infraestructura.analytics.analytics_service import AnalyticsService
+
+
+@pytest.fixture
+def entorno(tmp_path, monkeypatch):
+    pool = ConnectionPool(tmp_path / "prod.db")
+    consultas = []
+
+    @contextmanager
+    def conexion():
+        with pool.connection() as conn:
+            yield conn
+
+    def ejecutar_consulta(query, parametros=None, fetch=False):
+        consultas.append(query)
+        with pool.connection() as conn:
+            cursor = conn.execute(query, parametros or ())
+            if fetch:
+                return [dict(r) for r in cursor.fetchall()]
+            conn.commit()
+
+    monkeypatch.setattr(analytics_jobs_v2, "ejecutar_consulta", ejecutar_consulta)
+    monkeypatch.setattr(analytics_repository, "ejecutar_consulta", ejecutar_consulta)
+    monkeypatch.setattr(analytics_repository, "get_db_connection", conexion)
+
+    with pool.connection() as conn:
+        conn.executescript(SCHEMA_COMPLETO)
+        instalar_subtipo_evento(conn)
+        conn.execute("INSERT INTO lote (id, codigo, nombre) VALUES (1, 'L1', 'Lote 1')")
+        conn.executemany(
+            "INSERT INTO animal (id, codigo) VALUES (?, ?)", [(1, "A1"), (2, "A2"), (3, "A3")]
+        )
+        conn.executemany(
+            "INSERT INTO evento (tipo_evento, titulo, descripcion, fecha_evento) VALUES (?, ?, ?, ?)",
+            [
+                ("Reproductivo", "Cría", "Registro de nacimiento", "2025-01-01"),
+                ("Reproductivo", "Cría", "nacimiento gemelar", "2025-01-01 06:30:00"),
+                ("Reproductivo", "Cubrición", "Primer servicio", "2025-01-02"),
+                ("Reproductivo", "Parto", "parto normal", "2025-01-03"),
+                ("Sanitario", "Revisión", "nacimiento", "2025-01-01"),
+                ("Reproductivo", "Cría", "nacimiento", "2025-01-04"),
+            ],
+        )
+        conn.executemany(
+            "INSERT INTO muerte (animal_id, fecha, causa) VALUES (?, ?, ?)",
+            [(1, "2025-01-03", "Accidente"), (3, "2024-12-31", "Enfermedad")],
+        )
+        conn.executemany(
+            "INSERT INTO movimiento (animal_id, lote_destino_id, tipo_movimiento, fecha_movimiento) "
+            "VALUES (?, 1, ?, ?)",
+            [(1, "Traslado", "2025-01-03"), (2, "Traslado", "2025-01-03"), (2, "Entrada", "2025-01-03")],
+        )
+        conn.commit()
+
+    job = BuildProductivityAnalyticsJob(AnalyticsService())
+    consultas.clear()
+    yield pool, job, consultas
+    pool.close_all()
+
+
+def _filas(pool):
+    with pool.connection() as conn:
+        return {
+            r["fecha"]: (r["nacimientos"], r["destetes"], r["muertes"], r["traslados"], r["servicios"], r["partos"])
+            for r in conn.execute("SELECT * FROM analytics_productividad WHERE empresa_id = 1")
+        }
+
+
+def test_rango_en_una_pasada_por_tabla(entorno):
+    pool, job, consultas = entorno
+    resultado = job.ejecutar_rango(1, "2025-01-01", "2025-01-03")
+
+    assert resultado["status"] == "success" and resultado["filas"] == 3
+    assert len(consultas) == 3  # evento, muerte, movimiento
+    assert _filas(pool) == {
+        "2025-01-01": (2, 0, 0, 0, 0, 0),
+        "2025-01-02": (0, 0, 0, 0, 1, 0),
+        "2025-01-03": (0, 0, 1, 2, 0, 1),
+    }
+
+
+def test_rango_equivale_a_dia_a_dia(entorno):
+    pool, job, _ = entorno
+    job.ejecutar_rango(1, "2025-01-01", "2025-01-04")
+    por_rango = _filas(pool)
+    for dia in ("2025-01-01", "2025-01-02", "2025-01-03", "2025-01-04"):
+        assert job.ejecutar(1, dia)["status"] == "success"
+    assert _filas(pool) == por_rango
+
+
+def test_reproceso_no_duplica_filas(entorno):
+    pool, job, _ = entorno
+    job.ejecutar_rango(1, "2025-01-01", "2025-01-03")
+    with pool.connection() as conn:
+        conn.execute("DELETE FROM evento WHERE fecha_evento LIKE '2025-01-01%'")
+        conn.commit()
+    job.ejecutar_rango(1, "2025-01-01", "2025-01-03")
+    with pool.connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM analytics_productividad").fetchone()[0] == 3
+    assert _filas(pool)["2025-01-01"] == (0, 0, 0, 0, 0, 0)
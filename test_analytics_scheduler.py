@@ -0,0 +1,148 @@
+"""
+Tests del planificador de jobs de analytics (src/jobs/scheduler.py)
+"""
+
+import sys
+from contextlib import contextmanager
+from datetime import date
+from pathlib import Path
+
+import pytest
+
+from src.database.migraciones import ESQUEMA_JOBS_ANALYTICS
+from src.database.pool import ConnectionPool
+from src.jobs import scheduler
+from src.jobs.scheduler import AnalyticsJobScheduler
+
+# analytics_service importa database.* relativo a src (como en la app)
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+HOY = date(2025, 3, 10)
+
+
+class JobDiario:
+    def __init__(self, falla_en=None):
+        self.dias = []
+        self.falla_en = falla_en
+
+    def ejecutar(self, empresa_id, fecha):
+        if fecha == self.falla_en:
+            return {"status": "error", "mensaje": "sin datos"}
+        self.dias.append((empresa_id, fecha))
+        return {"status": "success", "fecha": fecha}
+
+
+class JobPorRango:
+    def __init__(self):
+        self.rangos = []
+
+    def ejecutar_rango(self, empresa_id, desde, hasta):
+        self.rangos.append((desde, hasta))
+        return {"status": "success", "filas": 42}
+
+
+@pytest.fixture
+def pool(tmp_path, monkeypatch):
+    p = ConnectionPool(tmp_path / "jobs.db")
+    with p.connection() as conn:
+        conn.executescript(ESQUEMA_JOBS_ANALYTICS)
+
+    @contextmanager
+    def conexion():
+        with p.connection() as conn:
+            yield conn
+
+    monkeypatch.setattr(scheduler, "get_db_connection", conexion)
+    yield p
+    p.close_all()
+
+
+def test_incremental_procesa_solo_dias_nuevos(pool):
+    job = JobDiario()
+    plan = AnalyticsJobScheduler({"prod": job}, empresas=[1, 2], dias_iniciales=3)
+
+    plan.ejecutar_pendientes(hoy=HOY)
+    assert [f for e, f in job.dias if e == 1] == ["2025-03-08", "2025-03-09", "2025-03-10"]
+    # Hoy sigue abierto: la marca queda en ayer
+    assert plan.obtener_marca("prod", 1) == date(2025, 3, 9)
+
+    job.dias.clear()
+    plan.ejecutar_pendientes(hoy=date(2025, 3, 12))
+    assert job.dias == [(1, "2025-03-10"), (1, "2025-03-11"), (1, "2025-03-12"),
+                        (2, "2025-03-10"), (2, "2025-03-11"), (2, "2025-03-12")]
+    assert plan.obtener_marca("prod", 2) == date(2025, 3, 11)
+
+
+def test_fallo_detiene_y_marca_queda_en_ultimo_dia_bueno(pool):
+    job = JobDiario(falla_en="2025-03-09")
+    plan = AnalyticsJobScheduler({"prod": job}, dias_iniciales=4)
+    (res,) = plan.ejecutar_pendientes(hoy=HOY)
+    assert res.estado == "error" and res.dias == 2
+    assert plan.obtener_marca("prod", 1) == date(2025, 3, 8)
+
+    job.falla_en = None
+    job.dias.clear()
+    plan.ejecutar_pendientes(hoy=HOY)
+    assert [f for _, f in job.dias] == ["2025-03-09", "2025-03-10"]
+
+
+def test_backfill_por_rango_y_registro(pool):
+    rango = JobPorRango()
+    plan = AnalyticsJobScheduler({"prod": rango})
+    (res,) = plan.backfill("2024-01-01", "2024-12-31", hoy=HOY)
+    assert rango.rangos == [("2024-01-01", "2024-12-31")]
+    assert res.dias == 366 and res.filas == 42
+    assert plan.obtener_marca("prod", 1) == date(2024, 12, 31)
+
+    # Un backfill antiguo no retrocede la marca
+    plan.backfill("2023-06-01", "2023-06-30", hoy=HOY)
+    assert plan.obtener_marca("prod", 1) == date(2024, 12, 31)
+
+    historial = plan.historial()
+    assert [h["desde"] for h in historial] == ["2023-06-01", "2024-01-01"]
+    assert historial[1]["modo"] == "backfill" and historial[1]["estado"] == "ok"
+    assert historial[1]["filas"] == 42 and historial[1]["duracion_ms"] >= 0
+
+
+def test_excepcion_del_job_se_registra(pool):
+    class Roto:
+        def ejecutar(self, empresa_id, fecha):
+            raise RuntimeError("boom")
+
+    plan = AnalyticsJobScheduler({"roto": Roto()}, dias_iniciales=1)
+    (res,) = plan.ejecutar_pendientes(hoy=HOY)
+    assert res.estado == "error" and "boom" in res.error
+    assert plan.obtener_marca("roto", 1) is None
+    assert plan.historial("roto")[0]["estado"] == "error"
+
+
+def test_hilo_en_segundo_plano(pool):
+    job = JobDiario()
+    plan = AnalyticsJobScheduler({"prod": job}, dias_iniciales=1)
+    plan.iniciar(intervalo_s=60)
+    try:
+        for _ in range(200):
+            if job.dias:
+                break
+            import time
+            time.sleep(0.01)
+    finally:
+        plan.detener()
+    assert job.dias == [(1, date.today().isoformat())]
+
+
+def test_jobs_default_omite_los_que_no_tienen_tablas_fuente(pool, monkeypatch):
+    from src.infraestructura.analytics import analytics_service
+
+    monkeypatch.setattr(analytics_service, "AnalyticsService", lambda: object())
+    with pool.connection() as conn:
+        conn.executescript(
+            "CREATE TABLE evento (id INTEGER); CREATE TABLE muerte (id INTEGER);"
+            "CREATE TABLE movimiento (id INTEGER); CREATE TABLE alerta (id INTEGER);"
+        )
+
+    jobs = scheduler.crear_jobs_default()
+    assert sorted(jobs) == ["BuildAlertAnalyticsJob", "BuildProductivityAnalyticsJob"]
+
+    plan = AnalyticsJobScheduler({"prod": JobDiario()}, empresas=[1], dias_iniciales=1)
+    assert plan.ejecutar_pendientes(jobs=["BuildIAAnalyticsJob"], hoy=HOY) == []
@@ -0,0 +1,72 @@
+"""
+Tests del motor vectorizado de anomalías
+"""
+
+import numpy as np
+import pytest
+
+from src.services.anomaly_engine import NIVELES, SIN_SCORE, MotorAnomalias, backtest_umbrales, evaluar_ventanas
+
+
+def _referencia(serie, ventana, min_previos=2):
+    """Cálculo escalar equivalente al del detector original, mes a mes."""
+    salida = []
+    for t, actual in enumerate(serie):
+        previos = [v for v in serie[max(0, t - ventana):t] if not np.isnan(v)]
+        if np.isnan(actual) or len(previos) < min_previos:
+            salida.append(None)
+            continue
+        promedio = sum(previos) / len(previos)
+        std = (sum((v - promedio) ** 2 for v in previos) / len(previos)) ** 0.5
+        z = 0.0 if std == 0 else (actual - promedio) / std
+        pct = 0.0 if promedio == 0 else (actual - promedio) / abs(promedio) * 100
+        score = max(0, min(100, int(round(abs(z) * 20 + abs(pct) * 0.5))))
+        salida.append((promedio, std, z, pct, score))
+    return salida
+
+
+@pytest.mark.parametrize("ventana", [1, 3, 6, 12])
+def test_coincide_con_calculo_escalar(ventana):
+    rng = np.random.default_rng(ventana)
+    valores = rng.normal(100, 15, size=(3, 4, 30))
+    valores[rng.random(valores.shape) < 0.2] = np.nan
+    valores[0, 0, :] = 50.0  # serie constante: std 0 y z 0
+
+    matriz = MotorAnomalias(ventana=ventana, min_previos=1).evaluar(valores)
+
+    for f in range(3):
+        for m in range(4):
+            for t, esperado in enumerate(_referencia(valores[f, m], ventana, min_previos=1)):
+                if esperado is None:
+                    assert matriz.score[f, m, t] == SIN_SCORE and np.isnan(matriz.z[f, m, t])
+                    continue
+                promedio, std, z, pct, score = esperado
+                assert matriz.promedio[f, m, t] == pytest.approx(promedio)
+                assert matriz.std[f, m, t] == pytest.approx(std, abs=1e-9)
+                assert matriz.z[f, m, t] == pytest.approx(z, abs=1e-9)
+                assert matriz.pct[f, m, t] == pytest.approx(pct)
+                assert matriz.score[f, m, t] == score
+    assert (matriz.z[0, 0, 1:] == 0).all()
+
+
+def test_niveles_y_minimo_de_previos():
+    matriz = MotorAnomalias(ventana=6).evaluar(np.array([[100, np.nan, 100, 100, 100, 100, 100, 160.0]]))
+    assert list(matriz.score[0, :3]) == [SIN_SCORE, SIN_SCORE, SIN_SCORE]
+    assert matriz.score[0, -1] == 30 and matriz.niveles()[0, -1] == "MEDIO"
+    assert matriz.niveles()[0, 3] == NIVELES[0] and matriz.niveles()[0, 0] == ""
+    assert matriz.promedio[0, -1] == 100
+
+
+def test_ventanas_y_backtest():
+    valores = np.array([[10, 10, 10, 10, 30, 10, 10, 10, 10, 60.0]])
+    por_ventana = evaluar_ventanas(valores, [2, 4])
+    assert set(por_ventana) == {2, 4}
+    conteos = backtest_umbrales(por_ventana[4], [30, 60, 101])
+    assert conteos[101].tolist() == [0]
+    assert conteos[30].tolist() == [2] and conteos[60].tolist() == [2]
+    assert por_ventana[4].score[0, 5] == 28 and por_ventana[2].score[0, 5] == 45
+
+
+def test_ventana_invalida():
+    with pytest.raises(ValueError):
+        MotorAnomalias(ventana=2, min_previos=3)
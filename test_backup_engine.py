@@ -0,0 +1,170 @@
+"""
+Tests del motor de backups incrementales (src/core/backup_engine.py)
+"""
+
+import hashlib
+import json
+import sqlite3
+import zlib
+from types import SimpleNamespace
+
+import pytest
+
+from src.core import backup_engine
+from src.core.backup_engine import MotorBackup, directorio_backups
+
+
+@pytest.fixture
+def db(tmp_path):
+    ruta = tmp_path / "finca.db"
+    conn = sqlite3.connect(ruta)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, dato TEXT)")
+    conn.executemany("INSERT INTO t (dato) VALUES (?)", [(f"fila-{i:05d}" * 20,) for i in range(5000)])
+    conn.commit()
+    yield ruta, conn
+    conn.close()
+
+
+@pytest.fixture
+def motor(db, tmp_path):
+    return MotorBackup(db[0], tmp_path / "backup", paginas_por_paso=16, paginas_por_bloque=8)
+
+
+def _objetos(motor):
+    return {p.name for p in motor.dir_objetos.glob("*/*")}
+
+
+def test_incluye_paginas_del_wal_sin_checkpoint(db, motor, tmp_path):
+    ruta, conn = db
+    conn.execute("PRAGMA wal_autocheckpoint=0")
+    conn.execute("INSERT INTO t (dato) VALUES ('solo-en-wal')")
+    conn.commit()
+    assert (tmp_path / "finca.db-wal").stat().st_size > 0
+
+    manifiesto = motor.crear_backup("test")
+    destino = motor.restaurar(manifiesto, tmp_path / "restaurada.db")
+    with sqlite3.connect(destino) as r:
+        assert r.execute("PRAGMA integrity_check").fetchone()[0] == "ok"
+        assert r.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 5001
+        assert r.execute("SELECT 1 FROM t WHERE dato = 'solo-en-wal'").fetchone()
+
+
+def test_segundo_backup_solo_guarda_bloques_cambiados(db, motor):
+    _, conn = db
+    primero = motor.leer_manifiesto(motor.crear_backup("a"))
+    antes = _objetos(motor)
+
+    conn.execute("UPDATE t SET dato = 'cambio' WHERE id = 4999")
+    conn.commit()
+    segundo = motor.leer_manifiesto(motor.crear_backup("b"))
+    nuevos = _objetos(motor) - antes
+
+    assert len(primero["bloques"]) > 10
+    assert 0 < len(nuevos) <= 3
+    assert set(segundo["bloques"]) - set(primero["bloques"]) == nuevos
+
+
+def test_progreso_y_backup_en_segundo_plano(motor):
+    avances = []
+    tarea = motor.crear_backup_async("async", progreso=lambda c, t: avances.append((c, t)))
+    manifiesto = tarea.esperar(timeout=30)
+    assert manifiesto.exists()
+    assert len(avances) > 1
+    assert avances[-1][0] == avances[-1][1] and tarea.fraccion == 1.0
+
+
+def test_retencion_elimina_bloques_huerfanos(db, motor, tmp_path):
+    _, conn = db
+    for i in range(3):
+        conn.execute("UPDATE t SET dato = ? WHERE id = 1", (f"v{i}",))
+        conn.commit()
+        motor.crear_backup(f"r{i}")
+    assert len(motor.listar_backups()) == 3
+
+    assert motor.aplicar_retencion(1) > 0
+    (ultimo,) = motor.listar_backups()
+    assert _objetos(motor) == set(motor.leer_manifiesto(ultimo)["bloques"])
+    motor.restaurar(ultimo, tmp_path / "ok.db")
+
+
+def test_backup_en_segundo_plano_aplica_retencion(db, motor):
+    _, conn = db
+    for i in range(3):
+        conn.execute("UPDATE t SET dato = ? WHERE id = 2", (f"w{i}",))
+        conn.commit()
+        motor.crear_backup(f"s{i}")
+    manifiesto = motor.crear_backup_async("auto", retencion=2).esperar(timeout=30)
+    backups = motor.listar_backups()
+    assert len(backups) == 2 and manifiesto in backups
+    assert _objetos(motor) == {b for m in backups for b in motor.leer_manifiesto(m)["bloques"]}
+
+
+def test_carpeta_por_defecto_es_la_de_config(monkeypatch, tmp_path):
+    from config import config as app_config
+
+    monkeypatch.setattr(app_config, "BACKUP_DIR", tmp_path / "respaldos")
+    assert directorio_backups() == tmp_path / "respaldos"
+    assert backup_engine.get_backup_engine().backup_dir == tmp_path / "respaldos"
+
+
+def test_restaurar_detecta_bloque_corrupto(motor, tmp_path):
+    manifiesto = motor.crear_backup("x")
+    digest = motor.leer_manifiesto(manifiesto)["bloques"][0]
+    (motor.dir_objetos / digest[:2] / digest).write_bytes(zlib.compress(b"basura"))
+    destino = tmp_path / "destino.db"
+    with pytest.raises(ValueError):
+        motor.restaurar(manifiesto, destino)
+    assert not destino.exists()
+
+
+def test_backup_sin_cambios_no_copia_paginas(db, motor, tmp_path, monkeypatch):
+    _, conn = db
+    primero = motor.crear_backup("a")
+
+    def no_copiar(*args):
+        raise AssertionError("la BD no cambió: no debe copiarse")
+
+    copiar = motor._copiar_instantanea
+    monkeypatch.setattr(motor, "_copiar_instantanea", no_copiar)
+    avances = []
+    segundo = motor.crear_backup("b", progreso=lambda c, t: avances.append((c, t)))
+    assert motor.leer_manifiesto(segundo)["bloques"] == motor.leer_manifiesto(primero)["bloques"]
+    assert avances and avances[-1][0] == avances[-1][1]
+    motor.restaurar(segundo, tmp_path / "sin_cambios.db")
+
+    conn.execute("UPDATE t SET dato = 'otro' WHERE id = 10")
+    conn.commit()
+    monkeypatch.setattr(motor, "_copiar_instantanea", copiar)
+    tercero = motor.crear_backup("c")
+    assert motor.leer_manifiesto(tercero)["bloques"] != motor.leer_manifiesto(segundo)["bloques"]
+
+
+def test_solo_hashea_bloques_distintos_a_la_instantanea(db, motor, monkeypatch):
+    _, conn = db
+    primero = motor.leer_manifiesto(motor.crear_backup("a"))
+    conn.execute("UPDATE t SET dato = 'cambio' WHERE id = 4999")
+    conn.commit()
+
+    hasheados = []
+
+    def sha256(datos=b""):
+        hasheados.append(len(datos))
+        return hashlib.sha256(datos)
+
+    monkeypatch.setattr(backup_engine, "hashlib", SimpleNamespace(sha256=sha256))
+    segundo = motor.leer_manifiesto(motor.crear_backup("b"))
+    distintos = sum(1 for a, b in zip(primero["bloques"], segundo["bloques"]) if a != b)
+    distintos += abs(len(segundo["bloques"]) - len(primero["bloques"]))
+    # un hash por bloque distinto + el checksum de la lista de digests
+    assert 0 < distintos <= 3 and len(hasheados) == distintos + 1
+
+
+def test_restaura_manifiesto_formato_1(motor, tmp_path):
+    manifiesto = motor.crear_backup("v1")
+    datos = motor.leer_manifiesto(manifiesto)
+    copia = motor.restaurar(manifiesto, tmp_path / "v2.db")
+    datos.update(formato=1, sha256=hashlib.sha256(copia.read_bytes()).hexdigest())
+    manifiesto.write_text(json.dumps(datos), encoding="utf-8")
+    restaurada = motor.restaurar(manifiesto, tmp_path / "v1.db")
+    assert restaurada.read_bytes() == copia.read_bytes()
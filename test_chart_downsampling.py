@@ -0,0 +1,53 @@
+"""
+Tests de la reducción de series para gráficas (LTTB)
+"""
+
+from datetime import date, timedelta
+
+import numpy as np
+
+from src.utils.charts.lttb import lttb_indices, reducir_serie
+
+
+def test_serie_corta_no_se_reduce():
+    x, y = list(range(50)), [float(i % 7) for i in range(50)]
+    assert reducir_serie(x, y, 600) == (x, y)
+    assert list(lttb_indices(x, y, 2)) == list(range(50))
+
+
+def test_reduce_conserva_extremos_y_picos():
+    rnd = np.random.default_rng(4)
+    n = 20_000
+    x = np.arange(n)
+    y = np.sin(x / 900.0) + rnd.normal(0, 0.05, n)
+    y[7_321] = 25.0   # pico aislado
+    y[15_002] = -30.0  # caída aislada
+
+    indices = lttb_indices(x, y, 500)
+    assert len(indices) == 500
+    assert indices[0] == 0 and indices[-1] == n - 1
+    assert np.all(np.diff(indices) > 0)
+    assert {7_321, 15_002} <= set(indices.tolist())
+
+
+def test_costo_acotado_por_el_ancho():
+    x = np.arange(200_000)
+    y = np.cumsum(np.random.default_rng(1).normal(size=200_000))
+    for ancho in (300, 800):
+        xs, ys = reducir_serie(x, y, ancho)
+        assert len(xs) == len(ys) == ancho
+        assert min(ys) >= y.min() and max(ys) <= y.max()
+
+
+def test_fechas_y_nulos():
+    fechas = [(date(2021, 1, 1) + timedelta(days=i)).isoformat() for i in range(3_000)]
+    litros = [None if i % 11 == 0 else float(i % 40) for i in range(3_000)]
+    xs, ys = reducir_serie(fechas, np.array(litros, dtype=float), 200)
+    assert len(xs) == 200
+    assert xs[0] == fechas[1] and xs[-1] == fechas[-1]  # el primero es nulo
+    assert xs == sorted(xs)
+    assert all(v == v for v in ys)  # sin NaN
+
+    dias = [date(2021, 1, 1) + timedelta(days=i) for i in range(1_000)]
+    xs, _ = reducir_serie(dias, list(range(1_000)), 100)
+    assert xs[0] == dias[0] and xs[-1] == dias[-1]
@@ -0,0 +1,194 @@
+"""
+Tests del almacén permanente de resultados de períodos cerrados
+"""
+
+from contextlib import contextmanager
+from dataclasses import asdict
+from datetime import date
+
+import pytest
+
+from src.database.migraciones import ESQUEMA_RESULTADOS_CERRADOS
+from src.database.pool import ConnectionPool
+from src.services import analytics_comparative_service, closed_period_store, financial_service, reportes_service
+from src.services.closed_period_store import ClosedPeriodStore
+
+
+@pytest.fixture
+def pool(tmp_path, monkeypatch):
+    p = ConnectionPool(tmp_path / "cerrados.db")
+    with p.connection() as conn:
+        conn.executescript(ESQUEMA_RESULTADOS_CERRADOS)
+        conn.executescript("""
+            CREATE TABLE cierre_mensual (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, año INTEGER, mes INTEGER,
+                fecha_cierre TIMESTAMP, estado TEXT DEFAULT 'Completado', UNIQUE(año, mes)
+            );
+        """)
+        conn.executemany(
+            "INSERT INTO cierre_mensual (año, mes, fecha_cierre) VALUES (?, ?, ?)",
+            [(a, m, f"{a}-{m:02d}-28 18:00:00") for a in (2024, 2025) for m in range(1, 13)
+             if (a, m) <= (2025, 6)],
+        )
+        conn.commit()
+
+    @contextmanager
+    def conexion():
+        with p.connection() as conn:
+            yield conn
+
+    monkeypatch.setattr(closed_period_store, "get_db_connection", conexion)
+    yield p
+    p.close_all()
+
+
+@pytest.fixture
+def store(pool, monkeypatch):
+    s = ClosedPeriodStore()
+    monkeypatch.setattr(s, "INTERVALO_VERIFICACION_S", 0.0)
+    for modulo in (reportes_service, financial_service, analytics_comparative_service):
+        monkeypatch.setattr(modulo, "get_closed_period_store", lambda: s)
+    return s
+
+
+class _Contador:
+    def __init__(self, valor):
+        self.valor = valor
+        self.llamadas = 0
+
+    def __call__(self, *args, **kwargs):
+        self.llamadas += 1
+        return self.valor
+
+
+def _filas(pool):
+    with pool.connection() as conn:
+        return [tuple(r) for r in conn.execute(
+            "SELECT tipo, desde, hasta FROM resultado_periodo_cerrado ORDER BY tipo, desde"
+        ).fetchall()]
+
+
+def test_mes_cerrado_se_calcula_una_vez(store, pool):
+    calcular = _Contador({"total": 10, "fecha": date(2025, 3, 1)})
+    primero = store.obtener_o_calcular("kpis", (2025, 3), (2025, 3), {"finca": 1}, calcular)
+    segundo = store.obtener_o_calcular("kpis", (2025, 3), (2025, 3), {"finca": 1}, calcular)
+
+    assert calcular.llamadas == 1
+    assert primero == segundo == {"total": 10, "fecha": "2025-03-01"}
+    primero["total"] = 99  # cada lectura es una copia
+    assert store.obtener_o_calcular("kpis", (2025, 3), (2025, 3), {"finca": 1}, calcular)["total"] == 10
+    assert _filas(pool) == [("kpis", "2025-03", "2025-03")]
+
+    # Otro proceso (instancia nueva): lectura desde la BD sin recalcular
+    otro = ClosedPeriodStore()
+    assert otro.obtener_o_calcular("kpis", (2025, 3), (2025, 3), {"finca": 1}, calcular)["total"] == 10
+    assert calcular.llamadas == 1
+    assert otro.estadisticas()["hits_bd"] == 1
+
+
+def test_filtros_distintos_son_claves_distintas(store):
+    calcular = _Contador(1)
+    store.obtener_o_calcular("kpis", (2025, 3), (2025, 3), {"finca": 1, "x": 2}, calcular)
+    store.obtener_o_calcular("kpis", (2025, 3), (2025, 3), {"x": 2, "finca": 1}, calcular)
+    store.obtener_o_calcular("kpis", (2025, 3), (2025, 3), {"finca": 2}, calcular)
+    assert calcular.llamadas == 2
+
+
+def test_rango_con_mes_abierto_no_se_guarda(store, pool):
+    calcular = _Contador(5)
+    for _ in range(2):
+        assert store.obtener_o_calcular("kpis", (2025, 6), (2025, 7), None, calcular) == 5
+    assert calcular.llamadas == 2
+    assert _filas(pool) == []
+    assert store.estadisticas()["abiertos"] == 2
+
+
+def test_invalidar_mes_borra_solo_rangos_que_lo_cubren(store, pool):
+    calcular = _Contador(1)
+    store.obtener_o_calcular("mes", (2025, 2), (2025, 2), None, calcular)
+    store.obtener_o_calcular("mes", (2025, 3), (2025, 3), None, calcular)
+    store.obtener_o_calcular("año", (2024, 1), (2025, 3), None, calcular)
+
+    assert store.invalidar_mes(2025, 3) == 2
+    assert _filas(pool) == [("mes", "2025-02", "2025-02")]
+    store.obtener_o_calcular("mes", (2025, 2), (2025, 2), None, calcular)
+    assert calcular.llamadas == 3
+
+    # Mes revertido: ya no está cerrado, se calcula siempre
+    with pool.connection() as conn:
+        conn.execute("UPDATE cierre_mensual SET estado = 'Revertido' WHERE año = 2025 AND mes = 3")
+        conn.commit()
+    store.obtener_o_calcular("mes", (2025, 3), (2025, 3), None, calcular)
+    store.obtener_o_calcular("mes", (2025, 3), (2025, 3), None, calcular)
+    assert calcular.llamadas == 5
+
+
+def test_recierre_desde_otro_proceso_cambia_la_firma(store, pool):
+    store.obtener_o_calcular("mes", (2025, 4), (2025, 4), None, _Contador("viejo"))
+    # Otro proceso revierte (sin pasar por este almacén), cambia datos y vuelve a cerrar
+    with pool.connection() as conn:
+        conn.execute("UPDATE cierre_mensual SET fecha_cierre = '2025-07-02 09:00:00' WHERE año = 2025 AND mes = 4")
+        conn.commit()
+    assert store.obtener_o_calcular("mes", (2025, 4), (2025, 4), None, _Contador("nuevo")) == "nuevo"
+    assert ClosedPeriodStore().obtener_o_calcular("mes", (2025, 4), (2025, 4), None, _Contador("x")) == "nuevo"
+
+
+def test_año_vs_año_cerrado_es_una_lectura(store, monkeypatch):
+    consultas = []
+
+    class _Cache:
+        def get_or_calculate(self, clave, calcular, depende_de=None):
+            consultas.append(clave)
+            return calcular()
+
+    monkeypatch.setattr(analytics_comparative_service, "get_analytics_cache", lambda: _Cache())
+    servicio = analytics_comparative_service.AnalyticsComparativeService()
+    calcular = _Contador(asdict(analytics_comparative_service.ComparativeResult(
+        metrica="ingreso_total", tipo_comparacion="año_vs_año", periodo_actual="2025",
+        periodo_anterior="2024", valor_actual=120.0, valor_anterior=100.0,
+        variacion_absoluta=20.0, variacion_pct=20.0,
+    )))
+    monkeypatch.setattr(servicio, "_comparar_años", calcular)
+
+    # 2025 no está cerrado completo: pasa por el cache analítico cada vez
+    servicio.comparar_año_vs_año("ingreso_total", 2025)
+    servicio.comparar_año_vs_año("ingreso_total", 2025)
+    assert calcular.llamadas == 2 and len(consultas) == 2
+
+    # 2024 vs 2023: 2023 no tiene cierre
+    servicio.comparar_año_vs_año("ingreso_total", 2024)
+    assert calcular.llamadas == 3
+
+    # Mes vs mes sobre meses cerrados: se calcula una vez y luego es lectura
+    monkeypatch.setattr(servicio, "_comparar_meses", calcular)
+    for _ in range(3):
+        resultado = servicio.comparar_mes_vs_mes("ingreso_total", 5, 2025)
+    assert calcular.llamadas == 4
+    assert resultado.categoria == "MEJORA"
+
+
+def test_reportes_y_financiero_leen_del_almacen(store, pool, monkeypatch):
+    servicio = reportes_service.ReportesService()
+    produccion = _Contador({"datos": {"litros": 10}, "totales": {}, "metadatos": {}})
+    animales = _Contador({"datos": {"inventario_actual": {}}, "totales": {}, "metadatos": {}})
+    monkeypatch.setattr(servicio.reporte_produccion, "generar", produccion)
+    monkeypatch.setattr(servicio.reporte_animales, "generar", animales)
+    for _ in range(2):
+        servicio.generar_reporte("produccion", date(2025, 1, 1), date(2025, 2, 28), {"finca": 1})
+    servicio.generar_reporte("produccion", date(2025, 6, 1), date(2025, 7, 31))
+    assert produccion.llamadas == 2
+
+    # El inventario es del hato actual: no se congela aunque el período esté cerrado
+    for _ in range(2):
+        servicio.generar_reporte("animales", date(2025, 1, 1), date(2025, 2, 28))
+    assert animales.llamadas == 2
+    assert [tipo for tipo, _, _ in _filas(pool)] == ["seccion_produccion"]
+
+    financiero = financial_service.FinancialService()
+    mensual = _Contador({"periodo": "2025-05"})
+    monkeypatch.setattr(financiero, "_generar_reporte_mensual", mensual)
+    assert financiero.generate_monthly_report(2025, 5) == financiero.generate_monthly_report(2025, 5)
+    assert mensual.llamadas == 1
+    financiero.generate_monthly_report(2025, 7)
+    financiero.generate_monthly_report(2025, 7)
+    assert mensual.llamadas == 3
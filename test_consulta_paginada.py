@@ -0,0 +1,107 @@
+"""
+Tests de la consulta paginada para grillas virtuales
+"""
+
+import random
+import sqlite3
+from contextlib import contextmanager
+
+import pytest
+
+from src.database.consulta_paginada import FuentePaginada
+
+SQL = "SELECT a.id, a.codigo, a.nombre, a.peso FROM animal a WHERE a.finca = ?"
+COLUMNAS = {"codigo": "codigo", "nombre": "nombre", "peso": "peso"}
+
+
+@pytest.fixture
+def conexion():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE animal (id INTEGER PRIMARY KEY, codigo TEXT, nombre TEXT, peso REAL, finca INTEGER)")
+    rnd = random.Random(11)
+    conn.executemany(
+        "INSERT INTO animal VALUES (?, ?, ?, ?, ?)",
+        [(i, f"A{i:05d}", rnd.choice([None, "Lola", "Manchas", "Pinta", "Estrella"]),
+          rnd.choice([None, 250.0, 310.5, 420.0, float(rnd.randint(100, 600))]), 1 if i % 4 else 2)
+         for i in range(1, 5001)],
+    )
+    consultas = []
+    conn.set_trace_callback(consultas.append)
+
+    @contextmanager
+    def _conexion():
+        yield conn
+
+    _conexion.consultas = consultas
+    yield _conexion
+    conn.close()
+
+
+def _esperado(conexion, columna, descendente):
+    """Mismo orden que la fuente, calculado con la lista completa."""
+    with conexion() as conn:
+        filas = conn.execute(SQL, (1,)).fetchall()
+    filas = [dict(zip(("id", "codigo", "nombre", "peso"), f)) for f in filas]
+    # NULL primero en ASC, último en DESC; la clave desempata en la misma dirección
+    filas.sort(key=lambda f: (f[columna] is not None, f[columna] if f[columna] is not None else 0, f["id"]),
+               reverse=descendente)
+    return [f["id"] for f in filas]
+
+
+def test_lee_solo_las_paginas_pedidas(conexion):
+    fuente = FuentePaginada(conexion, SQL, (1,), COLUMNAS, orden="codigo", tam_pagina=50)
+    assert fuente.total == 3750
+
+    conexion.consultas.clear()
+    ventana = fuente.filas(1_990, 30)
+    assert [f["codigo"] for f in ventana] == sorted(f["codigo"] for f in ventana)
+    assert len(ventana) == 30
+    assert len([c for c in conexion.consultas if "LIMIT" in c]) == 2  # páginas 39 y 40
+
+    conexion.consultas.clear()
+    assert fuente.filas(2_000, 10) == ventana[10:20]  # de la caché
+    assert conexion.consultas == []
+
+    assert len(fuente.filas(3_740, 100)) == 10
+    assert fuente.filas(10_000, 5) == []
+
+
+def test_cache_acotada(conexion):
+    fuente = FuentePaginada(conexion, SQL, (1,), COLUMNAS, tam_pagina=20, max_paginas=3)
+    for inicio in range(0, 400, 20):
+        fuente.filas(inicio, 20)
+    assert len(fuente._paginas) == 3
+
+
+@pytest.mark.parametrize("columna", ["nombre", "peso"])
+@pytest.mark.parametrize("descendente", [False, True])
+def test_orden_y_posicion_coinciden_con_la_lista_completa(conexion, columna, descendente):
+    fuente = FuentePaginada(conexion, SQL, (1,), COLUMNAS, tam_pagina=64)
+    fuente.ordenar(columna, descendente)
+    esperado = _esperado(conexion, columna, descendente)
+
+    assert [f["id"] for f in fuente.filas(0, fuente.total)] == esperado
+    for indice in random.Random(2).sample(range(len(esperado)), 40) + [0, len(esperado) - 1]:
+        assert fuente.posicion_de(esperado[indice]) == indice
+    assert [f["id"] for f in fuente.iterar(tam_lote=333)] == esperado
+
+
+def test_clave_y_orden_invalido(conexion):
+    fuente = FuentePaginada(conexion, SQL, (1,), COLUMNAS, tam_pagina=10)
+    assert fuente.buscar_por_clave(8) is None  # es de la finca 2
+    assert fuente.buscar_por_clave(7)["codigo"] == "A00007"
+    assert fuente.posicion_de(8) is None
+    assert fuente.posicion_de(7) == 5  # ids 1, 2, 3, 5, 6 van antes
+    with pytest.raises(ValueError):
+        fuente.ordenar("finca")
+
+
+def test_invalidar_relee_total_y_paginas(conexion):
+    fuente = FuentePaginada(conexion, SQL, (1,), COLUMNAS, orden="codigo", tam_pagina=25)
+    assert fuente.fila(0)["codigo"] == "A00001"
+    with conexion() as conn:
+        conn.execute("DELETE FROM animal WHERE id = 1")
+    assert fuente.fila(0)["codigo"] == "A00001"  # caché
+    fuente.invalidar()
+    assert fuente.fila(0)["codigo"] == "A00002"
+    assert fuente.total == 3749
@@ -0,0 +1,177 @@
+"""
+Tests de la carga del Dashboard en segundo plano (consultas consolidadas)
+"""
+
+import random
+import threading
+from contextlib import contextmanager
+
+import pytest
+
+from src.database import herd_summary
+from src.database.database import SCHEMA_COMPLETO
+from src.database.pool import ConnectionPool
+from src.services import dashboard_data_service as dds
+
+
+@pytest.fixture
+def pool(tmp_path, monkeypatch):
+    p = ConnectionPool(tmp_path / "dashboard.db")
+    rnd = random.Random(7)
+    with p.connection() as conn:
+        conn.executescript(SCHEMA_COMPLETO)
+        conn.execute("PRAGMA foreign_keys = OFF")
+        herd_summary.instalar(conn)
+        for i in range(1, 301):
+            conn.execute(
+                """INSERT INTO animal (id, codigo, nombre, estado, salud, raza_id, lote_id,
+                                       fecha_nacimiento, fecha_creacion)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, date('now', ?), datetime('now', ?))""",
+                (i, f"A{i:04d}", rnd.choice([None, f"Vaca {i}"]),
+                 rnd.choice(["Activo", None, "Muerto", "Vendido", "Perdido", "Otro"]),
+                 rnd.choice(["Sano", "Enfermo", "En cuarentena", None]),
+                 rnd.choice([None, 1]), rnd.choice([None, 2]),
+                 f"-{rnd.randint(0, 900)} days", f"-{rnd.randint(0, 400)} days"),
+            )
+        for i in range(200):
+            conn.execute(
+                """INSERT INTO tratamiento (id_animal, fecha_inicio, fecha_fin, tipo_tratamiento, producto, estado)
+                   VALUES (?, date('now', ?), date('now', ?), ?, 'Ivermectina', ?)""",
+                (rnd.randint(1, 300), f"-{rnd.randint(0, 90)} days", f"+{rnd.randint(-2, 6)} days",
+                 rnd.choice(["Vacunación", "Desparasitación"]),
+                 rnd.choice(["En curso", "Activo", None, "Finalizado"])),
+            )
+        for i in range(40):
+            conn.execute("INSERT INTO reproduccion (animal_id, estado) VALUES (?, ?)",
+                         (rnd.randint(1, 300), rnd.choice(["Gestante", "Vacía"])))
+        for d in range(60):
+            for a in range(1, 6):
+                conn.execute(
+                    "INSERT INTO produccion_leche (animal_id, fecha, litros_manana, litros_tarde) "
+                    "VALUES (?, date('now', ?), ?, ?)",
+                    (a, f"-{d} days", 10.0 + a, None if d % 3 else 4.5),
+                )
+        conn.execute("INSERT INTO venta (animal_id, fecha, precio_total) VALUES (3, date('now'), 1500000)")
+        conn.commit()
+
+    @contextmanager
+    def conexion():
+        with p.connection() as conn:
+            yield conn
+
+    monkeypatch.setattr(dds, "get_db_connection", conexion)
+    yield p
+    p.close_all()
+
+
+def _uno(conn, sql):
+    return conn.execute(sql).fetchone()[0]
+
+
+def test_resumen_coincide_con_conteos_individuales(pool):
+    with pool.connection() as conn:
+        animales = dds.resumen_animales(conn)
+        faltantes = dds.faltantes_animales(conn)
+        actividad = dds.resumen_actividad(conn)
+
+        # Consultas que hacía el Dashboard una por una
+        assert animales == {
+            "total": _uno(conn, "SELECT COUNT(*) FROM animal"),
+            "activos": _uno(conn, "SELECT COUNT(*) FROM animal WHERE estado = 'Activo' OR estado IS NULL"),
+            "muertos": _uno(conn, "SELECT COUNT(*) FROM animal WHERE estado = 'Muerto'"),
+            "vendidos": _uno(conn, "SELECT COUNT(*) FROM animal WHERE estado = 'Vendido'"),
+            "perdidos": _uno(conn, "SELECT COUNT(*) FROM animal WHERE estado = 'Perdido'"),
+            "nacimientos_mes": _uno(conn, "SELECT COUNT(*) FROM animal WHERE fecha_nacimiento >= date('now', 'start of month')"),
+        }
+        assert faltantes == {
+            "sin_raza": _uno(conn, "SELECT COUNT(*) FROM animal WHERE raza_id IS NULL AND (estado = 'Activo' OR estado IS NULL)"),
+            "sin_lote": _uno(conn, "SELECT COUNT(*) FROM animal WHERE lote_id IS NULL AND (estado = 'Activo' OR estado IS NULL)"),
+            "enfermos": _uno(conn, """SELECT COUNT(*) FROM animal WHERE (estado = 'Activo' OR estado IS NULL)
+                                      AND (salud = 'Enfermo' OR salud = 'En cuarentena')"""),
+            "sin_vacuna": _uno(conn, """SELECT COUNT(*) FROM animal a WHERE (estado = 'Activo' OR estado IS NULL)
+                                        AND NOT EXISTS (SELECT 1 FROM tratamiento
+                                                        WHERE id_animal = a.id AND tipo_tratamiento = 'Vacunación')"""),
+        }
+        assert actividad["en_tratamiento"] == _uno(conn, """
+            SELECT COUNT(DISTINCT id_animal) FROM tratamiento
+            WHERE fecha_inicio >= date('now', '-30 days')
+            AND (estado = 'En curso' OR estado = 'Activo' OR estado IS NULL)""")
+        assert actividad["tratamientos_por_vencer"] == _uno(conn, """
+            SELECT COUNT(*) FROM tratamiento
+            WHERE fecha_fin BETWEEN date('now') AND date('now', '+3 days')
+            AND (estado = 'En curso' OR estado = 'Activo' OR estado IS NULL)""")
+        assert actividad["gestantes"] == _uno(conn, "SELECT COUNT(DISTINCT animal_id) FROM reproduccion WHERE estado = 'Gestante'")
+        assert actividad["produccion_hoy"] == pytest.approx(sum(10.0 + a + 4.5 for a in range(1, 6)))
+        # Sin tabla alertas: ceros, no error
+        assert (actividad["ai_activas"], actividad["ai_ultima"], actividad["alertas_totales"]) == (0, "--", 0)
+
+        eventos = dds.eventos_recientes(conn)
+    assert 0 < len(eventos) <= 10
+    fechas = [e[0] or "1900-01-01" for e in eventos]
+    assert fechas == sorted(fechas, reverse=True)
+    assert {"Animal", "Venta"} <= {e[1] for e in eventos}
+
+
+def test_estados_y_alertas_salen_del_resumen():
+    animales = {"total": 9, "activos": 5, "muertos": 0, "vendidos": 3, "perdidos": 1, "nacimientos_mes": 0}
+    faltantes = {"sin_raza": 2, "sin_lote": 0, "enfermos": 1, "sin_vacuna": 0}
+    actividad = {"gestantes": 4, "tratamientos_por_vencer": 0}
+    assert dds.estados_animales(animales) == [("Activo", 5), ("Vendido", 3), ("Perdido", 1)]
+    assert [a[:2] for a in dds.armar_alertas(faltantes, actividad)] == [
+        ("alta", "🔴 CRIANZA"), ("media", "🤰 REPRODUCCIÓN"), ("alta", "🏥 SALUD CRÍTICA"),
+    ]
+
+
+class _WidgetFalso:
+    def __init__(self):
+        self.pendientes = []
+
+    def after(self, ms, funcion):
+        self.pendientes.append(funcion)
+
+    def bombear(self, carga):
+        while self.pendientes:
+            carga.esperar(0.01)
+            self.pendientes.pop(0)()
+
+
+def test_carga_entrega_secciones_en_orden_en_el_hilo_de_ui(pool):
+    widget = _WidgetFalso()
+    vistos, hilos, fin = [], set(), []
+    carga = dds.CargaDashboard(dds.secciones_dashboard(dias_produccion=7)).iniciar()
+    dds.seguir_carga_en_ui(
+        widget, carga,
+        al_seccion=lambda n, d, e: (vistos.append((n, e)), hilos.add(threading.current_thread())),
+        al_terminar=lambda: fin.append(True),
+    )
+    widget.bombear(carga)
+
+    assert vistos == [(n, None) for n in ("animales", "actividad", "produccion", "eventos", "alertas")]
+    assert hilos == {threading.current_thread()}
+    assert fin == [True]
+
+
+def test_seccion_fallida_no_detiene_las_demas(pool):
+    def falla(conn, previos):
+        raise RuntimeError("sin tabla")
+
+    secciones = [("animales", lambda c, p: dds.resumen_animales(c)), ("roto", falla),
+                 ("produccion", lambda c, p: dds.produccion_diaria(c, 7))]
+    carga = dds.CargaDashboard(secciones).iniciar()
+    assert carga.esperar(5)
+    entregas = carga.pendientes()
+    assert [(n, e) for n, _, e in entregas] == [("animales", None), ("roto", "sin tabla"), ("produccion", None)]
+    assert len(entregas[2][1]) == 8  # hoy y los 7 días anteriores
+
+
+def test_carga_cancelada_no_entrega(pool):
+    bloqueo = threading.Event()
+    secciones = [("lenta", lambda c, p: bloqueo.wait(5)), ("animales", lambda c, p: dds.resumen_animales(c))]
+    carga = dds.CargaDashboard(secciones).iniciar()
+    widget, vistos = _WidgetFalso(), []
+    dds.seguir_carga_en_ui(widget, carga, al_seccion=lambda n, d, e: vistos.append(n))
+    carga.cancelar()
+    bloqueo.set()
+    assert carga.esperar(5)
+    widget.bombear(carga)
+    assert vistos == []
@@ -0,0 +1,103 @@
+"""
+Tests del pool de conexiones SQLite (src/database/pool.py)
+"""
+
+import sqlite3
+import threading
+
+import pytest
+
+from src.database.pool import ConnectionPool
+
+
+@pytest.fixture
+def pool(tmp_path):
+    p = ConnectionPool(tmp_path / "pool.db", max_size=3)
+    with p.connection() as conn:
+        conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, v TEXT)")
+        conn.commit()
+    yield p
+    p.close_all()
+
+
+def test_reutiliza_conexion_en_mismo_hilo(pool):
+    with pool.connection() as c1:
+        pass
+    with pool.connection() as c2:
+        pass
+    assert c1 is c2
+    assert pool.stats()["reutilizadas"] >= 1
+
+
+def test_configuracion_aplicada(pool):
+    with pool.connection() as conn:
+        assert conn.row_factory is sqlite3.Row
+        assert conn.execute("PRAGMA foreign_keys").fetchone()[0] == 1
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+def test_bloques_anidados_no_comparten_conexion(pool):
+    with pool.connection() as externa:
+        with pool.connection() as interna:
+            assert externa is not interna
+
+
+def test_rollback_de_cambios_no_confirmados(pool):
+    with pool.connection() as conn:
+        conn.execute("INSERT INTO t (v) VALUES ('sin commit')")
+    with pool.connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+
+
+def test_restablece_row_factory_y_cierra_cursores(pool):
+    with pool.connection() as conn:
+        conn.row_factory = None
+        cur = conn.execute("SELECT 1")
+    with pytest.raises(sqlite3.ProgrammingError):
+        cur.fetchone()
+    with pool.connection() as conn:
+        assert conn.row_factory is sqlite3.Row
+
+
+def test_afinidad_por_hilo(pool):
+    with pool.connection() as principal:
+        pass
+    vistas = []
+
+    def trabajo():
+        with pool.connection() as conn:
+            vistas.append(conn)
+
+    hilo = threading.Thread(target=trabajo)
+    hilo.start()
+    hilo.join()
+    assert vistas and vistas[0] is not principal
+
+
+def test_overflow_sobre_max_size(pool):
+    with pool.connection(), pool.connection(), pool.connection():
+        with pool.connection() as extra:
+            extra.execute("SELECT 1").fetchall()
+        assert pool.stats()["overflow"] == 1
+    with pytest.raises(sqlite3.ProgrammingError):
+        extra.execute("SELECT 1")
+
+
+def test_descarta_conexion_si_se_reemplaza_el_archivo(pool, tmp_path):
+    with pool.connection() as c1:
+        pass
+    ruta = tmp_path / "pool.db"
+    reemplazo = tmp_path / "reemplazo.db"
+    sqlite3.connect(reemplazo).close()
+    reemplazo.replace(ruta)
+    with pool.connection() as c2:
+        assert c2 is not c1
+        assert c2.execute("SELECT name FROM sqlite_master WHERE name='t'").fetchone() is None
+
+
+def test_conexion_cerrada_por_el_llamador_se_descarta(pool):
+    with pool.connection() as c1:
+        c1.close()
+    with pool.connection() as c2:
+        assert c2 is not c1
+        c2.execute("SELECT 1").fetchall()
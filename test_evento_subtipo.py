@@ -0,0 +1,144 @@
+"""
+Tests de evento.subtipo: clasificador, migración, trigger y escritura tipada
+"""
+
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+from src.database.eventos import clasificar_subtipo_evento
+from src.database.migraciones import instalar_subtipo_evento
+from src.infraestructura.animales.animal_repository import AnimalRepository
+from src.infraestructura.reproduccion import reproduccion_repository
+from src.infraestructura.reproduccion.reproduccion_repository import ReproduccionRepository
+from src.infraestructura.reproduccion.reproduccion_service import ReproduccionService
+
+
+@pytest.mark.parametrize(
+    "tipo, titulo, descripcion, esperado",
+    [
+        ("Reproductivo", "Parto", "Parto normal", "parto"),
+        ("Reproductivo", None, "Registro de NACIMIENTO", "nacimiento"),
+        ("Reproductivo", "Inseminación", None, "servicio"),
+        ("Reproductivo", "Monta natural", "", "servicio"),
+        ("Reproductivo", "Cesárea", None, "parto"),
+        ("Reproductivo", "Nacimiento tras parto", None, "nacimiento"),
+        ("Sanitario", "Revisión post parto", None, None),
+        ("Reproductivo", "Palpación", "diagnóstico", None),
+    ],
+)
+def test_clasificador(tipo, titulo, descripcion, esperado):
+    assert clasificar_subtipo_evento(tipo, titulo, descripcion) == esperado
+
+
+@pytest.fixture
+def conn():
+    c = sqlite3.connect(":memory:")
+    c.execute(
+        "CREATE TABLE evento (id INTEGER PRIMARY KEY, titulo TEXT, descripcion TEXT, "
+        "fecha_evento DATE, tipo_evento TEXT, animal_id INTEGER)"
+    )
+    c.executemany(
+        "INSERT INTO evento (titulo, descripcion, fecha_evento, tipo_evento) VALUES (?, ?, ?, ?)",
+        [
+            ("Evento", "Primer servicio", "2025-01-01", "Reproductivo"),
+            ("Evento", "parto distócico", "2025-01-02", "Reproductivo"),
+            ("Vacuna", "aftosa", "2025-01-02", "Sanitario"),
+        ],
+    )
+    yield c
+    c.close()
+
+
+def _subtipos(conn):
+    return [r[0] for r in conn.execute("SELECT subtipo FROM evento ORDER BY id")]
+
+
+def test_migracion_clasifica_existentes_e_indexa(conn):
+    instalar_subtipo_evento(conn)
+    instalar_subtipo_evento(conn)  # idempotente
+    assert _subtipos(conn) == ["servicio", "parto", None]
+
+    plan = " ".join(
+        r[-1]
+        for r in conn.execute(
+            "EXPLAIN QUERY PLAN SELECT COUNT(*) FROM evento "
+            "WHERE subtipo = 'parto' AND fecha_evento >= '2025-01-01' AND fecha_evento < '2025-02-01'"
+        )
+    )
+    assert "idx_evento_subtipo_fecha" in plan
+
+
+def test_trigger_completa_inserciones_sin_subtipo(conn):
+    instalar_subtipo_evento(conn)
+    conn.execute(
+        "INSERT INTO evento (titulo, descripcion, fecha_evento, tipo_evento) "
+        "VALUES ('Nacimiento', NULL, '2025-01-03', 'Reproductivo')"
+    )
+    # Un subtipo explícito no se sobrescribe
+    conn.execute(
+        "INSERT INTO evento (titulo, descripcion, fecha_evento, tipo_evento, subtipo) "
+        "VALUES ('Servicio', 'parto previo: no', '2025-01-04', 'Reproductivo', 'servicio')"
+    )
+    assert _subtipos(conn)[-2:] == ["nacimiento", "servicio"]
+
+
+class _RepoFalso:
+    def __init__(self):
+        self.eventos = []
+
+    def __getattr__(self, nombre):
+        return lambda *a, **k: None
+
+    def insertar_evento(self, **kwargs):
+        self.eventos.append((kwargs["subtipo"], kwargs["fecha_evento"], kwargs["animal_id"]))
+
+    def obtener_ultimo_codigo_cria(self):
+        return None
+
+    def obtener_finca_de_animal(self, animal_id):
+        return 1
+
+    def contar_servicios_activos_hembra(self, hembra_id):
+        return 0
+
+    def contar_servicios_misma_fecha(self, hembra_id, fecha):
+        return 0
+
+
+def test_servicio_de_reproduccion_escribe_eventos_tipados():
+    repo = _RepoFalso()
+    servicio = ReproduccionService(repo)
+    servicio.registrar_servicio(7, None, "2025-01-01", "Inseminación Artificial")
+    servicio.registrar_parto(1, 7, "2025-10-08", "Normal", "Hembra")
+    servicio.registrar_parto(2, 8, "2025-10-09", "Normal", "Macho", estado_cria="Muerto al nacer")
+    assert repo.eventos == [
+        ("servicio", "2025-01-01", 7),
+        ("parto", "2025-10-08", 7),
+        ("nacimiento", "2025-10-08", 7),
+        ("parto", "2025-10-09", 8),
+    ]
+
+
+def test_repositorios_insertan_evento_con_el_mismo_helper(conn, monkeypatch):
+    instalar_subtipo_evento(conn)
+    conn.execute("ALTER TABLE evento ADD COLUMN completado BOOLEAN DEFAULT 0")
+
+    def ejecutar(sql, params=None, fetch=False):
+        conn.execute(sql, params or ())
+
+    monkeypatch.setattr(reproduccion_repository, "ejecutar_consulta", ejecutar)
+    AnimalRepository(executor=ejecutar).insertar_evento("Nacimiento", "2025-02-01", "nacimiento", animal_id=3)
+    ReproduccionRepository().insertar_evento("Parto", "2025-02-02", "parto", animal_id=4, descripcion="Normal")
+    filas = conn.execute(
+        "SELECT titulo, descripcion, fecha_evento, tipo_evento, subtipo, animal_id, completado "
+        "FROM evento WHERE id > 3 ORDER BY id"
+    ).fetchall()
+    assert filas == [
+        ("Nacimiento", None, "2025-02-01", "Reproductivo", "nacimiento", 3, 1),
+        ("Parto", "Normal", "2025-02-02", "Reproductivo", "parto", 4, 1),
+    ]
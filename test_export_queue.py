@@ -0,0 +1,238 @@
+"""
+Tests de la cola de exportaciones en segundo plano (progreso, cancelación, cache)
+"""
+
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+import pytest
+
+from src.database.migraciones import ESQUEMA_EXPORT_JOBS
+from src.database.pool import ConnectionPool
+from src.jobs import export_queue
+from src.jobs.export_queue import (
+    CANCELADO,
+    COMPLETADO,
+    ERROR,
+    ColaExportaciones,
+    directorio_cache,
+    invalidar_artefactos_periodo,
+    seguir_en_ui,
+)
+from src.utils.export import export_stream
+
+
+@pytest.fixture
+def pool(tmp_path, monkeypatch):
+    p = ConnectionPool(tmp_path / "cola.db")
+    with p.connection() as conn:
+        conn.executescript(ESQUEMA_EXPORT_JOBS)
+        conn.executescript("""
+            CREATE TABLE cierre_mensual (id INTEGER PRIMARY KEY, año INTEGER, mes INTEGER, estado TEXT);
+            INSERT INTO cierre_mensual (año, mes, estado) VALUES (2025, 4, 'Completado'), (2025, 5, 'Completado');
+        """)
+        conn.commit()
+
+    @contextmanager
+    def conexion():
+        with p.connection() as conn:
+            yield conn
+
+    monkeypatch.setattr(export_queue, "get_db_connection", conexion)
+    yield p
+    p.close_all()
+
+
+@pytest.fixture
+def cola(pool, tmp_path):
+    c = ColaExportaciones(max_hilos=2, dir_cache=tmp_path / "cache")
+    yield c
+    c.cerrar(esperar=False)
+
+
+def _escribir(ruta, texto, llamadas):
+    def generar(trabajo):
+        llamadas.append(ruta)
+        with open(ruta, "w", encoding="utf-8") as f:
+            f.write(texto)
+        trabajo.avanzar(1, 1)
+        return str(ruta)
+    return generar
+
+
+def _fila_job(pool, trabajo_id):
+    with pool.connection() as conn:
+        return tuple(conn.execute(
+            "SELECT tipo, estado, desde_cache, filas, error FROM export_job WHERE id = ?", (trabajo_id,)
+        ).fetchone())
+
+
+def test_trabajo_completado_queda_registrado(cola, pool, tmp_path):
+    llamadas = []
+    ruta = tmp_path / "a.csv"
+    trabajo = cola.enviar("prueba", _escribir(ruta, "x", llamadas), ruta)
+    assert trabajo.esperar(5)
+
+    assert trabajo.estado == COMPLETADO
+    assert trabajo.resultado == str(ruta)
+    assert trabajo.fraccion == 1.0
+    assert _fila_job(pool, trabajo.id) == ("prueba", COMPLETADO, 0, 1, None)
+    assert cola.historial()[0]["id"] == trabajo.id
+
+
+def test_error_se_reporta(cola, pool):
+    def generar(trabajo):
+        raise RuntimeError("disco lleno")
+
+    trabajo = cola.enviar("falla", generar)
+    assert trabajo.esperar(5)
+    assert trabajo.estado == ERROR
+    assert trabajo.error == "disco lleno"
+    assert _fila_job(pool, trabajo.id)[1:] == (ERROR, 0, 0, "disco lleno")
+
+
+def test_cancelacion_cooperativa_con_export_stream(cola, pool, tmp_path):
+    empezo = threading.Event()
+    seguir = threading.Event()
+    ruta = tmp_path / "grande.csv"
+
+    def filas():
+        for i in range(10_000):
+            if i == 500:
+                empezo.set()
+                seguir.wait(5)
+            yield (i,)
+
+    def generar(trabajo):
+        return export_stream.exportar_csv_stream(ruta, ["i"], filas(), progreso=trabajo.avanzar, cada=100)
+
+    trabajo = cola.enviar("grande", generar, ruta)
+    assert empezo.wait(5)
+    assert trabajo.hechas == 500
+    assert cola.cancelar(trabajo.id)
+    seguir.set()
+    assert trabajo.esperar(5)
+
+    assert trabajo.estado == CANCELADO
+    assert not ruta.exists()
+    assert _fila_job(pool, trabajo.id)[1] == CANCELADO
+    assert not cola.cancelar(trabajo.id)
+
+
+def test_periodo_cerrado_se_sirve_desde_cache(cola, pool, tmp_path):
+    llamadas = []
+    periodo = ((2025, 4), (2025, 5))
+    primero = cola.enviar("ventas", _escribir(tmp_path / "v1.csv", "abril-mayo", llamadas),
+                          tmp_path / "v1.csv", {"finca": 1}, periodo)
+    assert primero.esperar(5) and not primero.desde_cache
+
+    segundo = cola.enviar("ventas", _escribir(tmp_path / "v2.csv", "otro", llamadas),
+                          tmp_path / "v2.csv", {"finca": 1}, periodo)
+    assert segundo.esperar(5)
+    assert segundo.desde_cache
+    assert segundo.resultado == str(tmp_path / "v2.csv")
+    assert (tmp_path / "v2.csv").read_text(encoding="utf-8") == "abril-mayo"
+    assert llamadas == [tmp_path / "v1.csv"]
+    assert _fila_job(pool, segundo.id)[2] == 1
+
+    # Otros parámetros u otro formato: otra clave
+    tercero = cola.enviar("ventas", _escribir(tmp_path / "v3.csv", "finca 2", llamadas),
+                          tmp_path / "v3.csv", {"finca": 2}, periodo)
+    assert tercero.esperar(5) and not tercero.desde_cache
+
+
+def test_periodo_abierto_no_se_cachea(cola, pool, tmp_path):
+    llamadas = []
+    periodo = ((2025, 5), (2025, 6))  # junio no está cerrado
+    for nombre in ("a.csv", "b.csv"):
+        t = cola.enviar("ventas", _escribir(tmp_path / nombre, "x", llamadas), tmp_path / nombre, {}, periodo)
+        assert t.esperar(5) and not t.desde_cache
+    assert len(llamadas) == 2
+    with pool.connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM export_artefacto").fetchone()[0] == 0
+
+
+def test_invalidar_periodo_descarta_artefactos(cola, pool, tmp_path):
+    llamadas = []
+    periodo = ((2025, 4), (2025, 4))
+    t = cola.enviar("resumen", _escribir(tmp_path / "r.csv", "x", llamadas), tmp_path / "r.csv", {}, periodo)
+    assert t.esperar(5)
+
+    assert invalidar_artefactos_periodo(2025, 5, dir_cache=tmp_path / "cache") == 0
+    assert invalidar_artefactos_periodo(2025, 4, dir_cache=tmp_path / "cache") == 1
+    assert list((tmp_path / "cache").iterdir()) == []
+
+    t = cola.enviar("resumen", _escribir(tmp_path / "r.csv", "x", llamadas), tmp_path / "r.csv", {}, periodo)
+    assert t.esperar(5) and not t.desde_cache
+    assert len(llamadas) == 2
+
+
+def test_varios_archivos_en_cache(cola, pool, tmp_path):
+    def generar(trabajo):
+        rutas = {}
+        for nombre in ("csv", "txt"):
+            ruta = tmp_path / f"salida.{nombre}"
+            ruta.write_text(nombre, encoding="utf-8")
+            rutas[nombre] = str(ruta)
+        return rutas
+
+    periodo = ((2025, 5), (2025, 5))
+    assert cola.enviar("todos", generar, parametros={}, periodo=periodo).esperar(5)
+    (tmp_path / "salida.csv").unlink()
+
+    t = cola.enviar("todos", lambda t: pytest.fail("no debe regenerar"), parametros={}, periodo=periodo)
+    assert t.esperar(5)
+    assert t.estado == COMPLETADO and t.desde_cache
+    assert t.resultado == {"csv": str(tmp_path / "salida.csv"), "txt": str(tmp_path / "salida.txt")}
+    assert (tmp_path / "salida.csv").read_text(encoding="utf-8") == "csv"
+
+
+class _WidgetFalso:
+    """Registra los after() para ejecutarlos a mano, como haría el bucle de Tk."""
+
+    def __init__(self):
+        self.pendientes = []
+
+    def after(self, ms, funcion):
+        self.pendientes.append(funcion)
+
+    def bombear(self):
+        while self.pendientes:
+            self.pendientes.pop(0)()
+
+
+def test_seguir_en_ui_llama_callbacks_en_el_hilo_de_ui(cola, pool):
+    avanzo, liberar = threading.Event(), threading.Event()
+
+    def generar(trabajo):
+        trabajo.avanzar(3, 10)
+        avanzo.set()
+        liberar.wait(5)
+        return None
+
+    trabajo = cola.enviar("lento", generar)
+    widget = _WidgetFalso()
+    progresos, finales = [], []
+    seguir_en_ui(widget, trabajo, al_progreso=lambda t: progresos.append((t.hechas, t.total)),
+                 al_terminar=lambda t: finales.append((t.estado, threading.current_thread())))
+
+    assert avanzo.wait(5)
+    widget.pendientes.pop(0)()  # un tick mientras el trabajo sigue corriendo
+    assert finales == []
+    assert widget.pendientes  # se reprogramó
+
+    liberar.set()
+    assert trabajo.esperar(5)
+    widget.bombear()
+    assert finales == [(COMPLETADO, threading.current_thread())]
+    assert progresos[0] == (3, 10)
+    assert cola.estadisticas()["activos"] == 0
+
+
+def test_cache_por_defecto_en_data_dir(tmp_path, monkeypatch):
+    from config import config as app_config
+
+    monkeypatch.chdir(tmp_path)
+    assert directorio_cache() == Path(app_config.DATA_DIR) / "exports" / "cache"
+    assert ColaExportaciones().dir_cache == directorio_cache()
@@ -0,0 +1,154 @@
+"""
+Tests de la exportación en streaming (CSV / Excel write-only)
+"""
+
+import csv
+from contextlib import contextmanager
+
+import pytest
+
+from src.database.pool import ConnectionPool
+from src.modules.utils.exportador_datos import ExportadorDatos
+from src.utils.export import export_stream
+from src.utils.export.export_stream import (
+    CONSULTAS,
+    ExportacionCancelada,
+    contar_consulta,
+    exportar_consulta,
+    exportar_csv_stream,
+    exportar_excel_stream,
+    filas_consulta,
+)
+
+
+@pytest.fixture
+def pool(tmp_path, monkeypatch):
+    p = ConnectionPool(tmp_path / "export.db")
+    with p.connection() as conn:
+        conn.executescript("""
+            CREATE TABLE finca (id INTEGER PRIMARY KEY, nombre TEXT);
+            CREATE TABLE raza (id INTEGER PRIMARY KEY, nombre TEXT);
+            CREATE TABLE animal (
+                id INTEGER PRIMARY KEY, id_finca INTEGER, codigo TEXT, nombre TEXT, sexo TEXT,
+                raza_id INTEGER, fecha_nacimiento DATE, estado TEXT, salud TEXT
+            );
+            CREATE TABLE produccion_leche (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, animal_id INTEGER NOT NULL, fecha DATE NOT NULL,
+                litros_manana REAL DEFAULT 0, litros_tarde REAL DEFAULT 0, litros_noche REAL DEFAULT 0,
+                observaciones TEXT
+            );
+            INSERT INTO finca VALUES (1, 'El Prado');
+            INSERT INTO raza VALUES (1, 'Holstein');
+        """)
+        conn.executemany(
+            "INSERT INTO animal VALUES (?, 1, ?, ?, 'Hembra', 1, '2020-01-01', 'Activo', 'Sana')",
+            [(i, f"V{i:03d}", f"Vaca {i}") for i in range(1, 6)],
+        )
+        conn.executemany(
+            "INSERT INTO produccion_leche (animal_id, fecha, litros_manana, litros_tarde) VALUES (?, ?, ?, ?)",
+            [(a, f"2025-01-{d:02d}", 10.0, 5.0) for d in range(1, 31) for a in range(1, 6)],
+        )
+        conn.commit()
+
+    @contextmanager
+    def conexion():
+        with p.connection() as conn:
+            yield conn
+
+    monkeypatch.setattr(export_stream, "get_db_connection", conexion)
+    yield p
+    p.close_all()
+
+
+def _leer_csv(ruta):
+    with open(ruta, newline="", encoding="utf-8") as f:
+        return list(csv.reader(f))
+
+
+def test_filas_consulta_lee_por_lotes(pool):
+    columnas, sql = CONSULTAS["historial_leche"]
+    filas = filas_consulta(sql, tamano_lote=7)
+    primera = next(filas)
+    assert primera[:3] == ("2025-01-01", "V001", "Vaca 1")
+    assert primera[6] == 15.0
+    assert 1 + sum(1 for _ in filas) == 150
+    assert contar_consulta(sql) == 150
+
+
+def test_csv_stream_consume_el_generador_sin_materializar(tmp_path):
+    producidas = []
+
+    def generador():
+        for i in range(2500):
+            producidas.append(i)
+            yield (i, f"fila {i}")
+
+    avisos = []
+
+    def progreso(n, total):
+        # Al avisar, el generador va exactamente a la par de lo escrito
+        avisos.append((n, total, len(producidas)))
+
+    ruta = tmp_path / "salida" / "datos.csv"
+    n = exportar_csv_stream(ruta, ["id", "texto"], generador(), progreso=progreso, total=2500, cada=1000)
+
+    assert n == 2500
+    assert avisos == [(1000, 2500, 1000), (2000, 2500, 2000), (2500, 2500, 2500)]
+    filas = _leer_csv(ruta)
+    assert filas[0] == ["id", "texto"]
+    assert filas[-1] == ["2499", "fila 2499"]
+    assert len(filas) == 2501
+
+
+def test_csv_stream_acepta_diccionarios(tmp_path):
+    ruta = tmp_path / "dict.csv"
+    datos = [{"a": 1, "b": "x"}, {"b": "y"}]
+    assert exportar_csv_stream(ruta, ["a", "b"], datos) == 2
+    assert _leer_csv(ruta) == [["a", "b"], ["1", "x"], ["", "y"]]
+
+
+def test_cancelacion_no_deja_archivo(tmp_path):
+    ruta = tmp_path / "cancelado.csv"
+    with pytest.raises(ExportacionCancelada):
+        exportar_csv_stream(ruta, ["i"], ((i,) for i in range(5000)), progreso=lambda n, t: n < 2000, cada=1000)
+    assert not ruta.exists()
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_exportar_consulta_csv_con_progreso(pool, tmp_path):
+    columnas, sql = CONSULTAS["inventario_animales"]
+    avisos = []
+    ruta = tmp_path / "inventario.csv"
+    n = exportar_consulta(ruta, sql, columnas=columnas, progreso=lambda n, t: avisos.append((n, t)))
+    assert n == 5
+    assert avisos == [(5, 5)]
+    filas = _leer_csv(ruta)
+    assert filas[0] == columnas
+    assert filas[1][:5] == ["V001", "Vaca 1", "Hembra", "El Prado", "Holstein"]
+
+
+def test_exportar_consulta_usa_nombres_del_cursor(pool, tmp_path):
+    ruta = tmp_path / "simple.csv"
+    exportar_consulta(ruta, "SELECT codigo, estado FROM animal WHERE id <= ?", (2,))
+    assert _leer_csv(ruta) == [["codigo", "estado"], ["V001", "Activo"], ["V002", "Activo"]]
+
+
+def test_exportador_datos_csv_con_generador(tmp_path):
+    ruta = tmp_path / "gen.csv"
+    datos = ({"codigo": f"A{i}", "litros": i} for i in range(3))
+    assert ExportadorDatos.exportar_a_csv(datos, ["codigo", "litros"], ruta)
+    assert _leer_csv(ruta)[1:] == [["A0", "0"], ["A1", "1"], ["A2", "2"]]
+
+
+def test_excel_stream_write_only(tmp_path):
+    openpyxl = pytest.importorskip("openpyxl")
+    ruta = tmp_path / "datos.xlsx"
+    filas = ((i, f"animal {i}", i * 1.5) for i in range(300))
+    assert exportar_excel_stream(ruta, ["id", "nombre", "litros"], filas, nombre_hoja="Leche") == 300
+
+    wb = openpyxl.load_workbook(ruta)
+    ws = wb["Leche"]
+    assert [c.value for c in ws[1]] == ["id", "nombre", "litros"]
+    assert ws[1][0].font.bold
+    assert [c.value for c in ws[301]] == [299, "animal 299", 448.5]
+    assert ws.max_row == 301
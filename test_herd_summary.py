@@ -0,0 +1,127 @@
+"""
+Tests del resumen del hato mantenido por triggers (herd_summary)
+"""
+
+import random
+import sqlite3
+
+import pytest
+
+from src.database import herd_summary
+from src.database.database import SCHEMA_COMPLETO
+
+ESTADOS = ["Activo", None, "Muerto", "Vendido", "Perdido"]
+
+
+@pytest.fixture
+def conn():
+    c = sqlite3.connect(":memory:")
+    c.executescript(SCHEMA_COMPLETO)
+    c.execute("PRAGMA foreign_keys = OFF")
+    c.execute("ALTER TABLE animal ADD COLUMN categoria TEXT")
+    yield c
+    c.close()
+
+
+def _agregar(conn, rnd, n, inicio=1):
+    for i in range(inicio, inicio + n):
+        conn.execute(
+            "INSERT INTO animal (id, codigo, id_finca, estado, sexo, categoria) VALUES (?, ?, ?, ?, ?, ?)",
+            (i, f"A{i:05d}", rnd.choice([1, 2, None]), rnd.choice(ESTADOS),
+             rnd.choice(["Macho", "Hembra", None]), rnd.choice(["Vaca", "Novilla", "Ternero", None])),
+        )
+
+
+def test_triggers_mantienen_el_resumen_exacto(conn):
+    rnd = random.Random(3)
+    assert herd_summary.instalar(conn)
+    _agregar(conn, rnd, 500)
+    assert herd_summary.verificar(conn) == []
+
+    for _ in range(400):
+        accion = rnd.random()
+        animal_id = rnd.randint(1, 520)
+        if accion < 0.5:
+            conn.execute("UPDATE animal SET estado = ? WHERE id = ?", (rnd.choice(ESTADOS), animal_id))
+        elif accion < 0.65:
+            conn.execute("UPDATE animal SET id_finca = ?, categoria = ? WHERE id = ?",
+                         (rnd.choice([1, 2, None]), rnd.choice(["Vaca", None]), animal_id))
+        elif accion < 0.75:
+            conn.execute("UPDATE animal SET nombre = 'sin cambio de dimensión' WHERE id = ?", (animal_id,))
+        elif accion < 0.9:
+            conn.execute("DELETE FROM animal WHERE id = ?", (animal_id,))
+        else:
+            _agregar(conn, rnd, 1, inicio=conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM animal").fetchone()[0])
+
+    assert herd_summary.verificar(conn) == []
+    # Sin filas en cero
+    assert conn.execute("SELECT COUNT(*) FROM herd_summary WHERE n <= 0").fetchone()[0] == 0
+
+    # Un rollback deshace también el resumen
+    conn.commit()
+    conn.execute("DELETE FROM animal")
+    conn.rollback()
+    assert herd_summary.verificar(conn) == []
+
+
+def test_lecturas_coinciden_con_conteos_directos(conn):
+    rnd = random.Random(5)
+    herd_summary.instalar(conn)
+    _agregar(conn, rnd, 300)
+
+    def directo(sql):
+        return conn.execute(sql).fetchone()[0]
+
+    assert herd_summary.contar(conn) == 300
+    assert herd_summary.contar(conn, estados=("Activo", None)) == directo(
+        "SELECT COUNT(*) FROM animal WHERE estado = 'Activo' OR estado IS NULL")
+    assert herd_summary.contar(conn, estados=("Activo",), sexo="Hembra") == directo(
+        "SELECT COUNT(*) FROM animal WHERE estado = 'Activo' AND sexo = 'Hembra'")
+    assert herd_summary.contar(conn, id_finca=2, categoria="Vaca") == directo(
+        "SELECT COUNT(*) FROM animal WHERE id_finca = 2 AND categoria = 'Vaca'")
+    assert herd_summary.contar(conn, estados=()) == 0
+
+    por_estado = herd_summary.conteo_por(conn, "estado")
+    assert por_estado == {e: n for e, n in conn.execute("SELECT estado, COUNT(*) FROM animal GROUP BY estado")}
+    assert None in por_estado
+
+    por_estado_sexo = herd_summary.conteo_por(conn, "estado", "sexo", estados=("Vendido",))
+    assert por_estado_sexo == {
+        (e, s): n for e, s, n in conn.execute(
+            "SELECT estado, sexo, COUNT(*) FROM animal WHERE estado = 'Vendido' GROUP BY estado, sexo")
+    }
+    with pytest.raises(ValueError):
+        herd_summary.conteo_por(conn, "raza_id")
+
+
+def test_sin_instalar_lee_de_animal(conn):
+    _agregar(conn, random.Random(8), 50)
+    assert not herd_summary.instalado(conn)
+    assert herd_summary.contar(conn) == 50
+    assert sum(herd_summary.conteo_por(conn, "sexo").values()) == 50
+
+
+def test_verificar_detecta_y_reconstruir_corrige(conn):
+    herd_summary.instalar(conn)
+    _agregar(conn, random.Random(9), 100)
+    # Cambios hechos sin triggers (p.ej. restauración desde otra herramienta)
+    conn.execute("DROP TRIGGER trg_herd_summary_delete")
+    conn.execute("DELETE FROM animal WHERE id <= 10")
+    diferencias = herd_summary.verificar(conn)
+    assert diferencias
+    assert all(d["resumen"] > d["completo"] for d in diferencias)
+
+    assert herd_summary.reconstruir(conn) > 0
+    assert herd_summary.instalado(conn)
+    assert herd_summary.verificar(conn) == []
+    conn.execute("DELETE FROM animal WHERE id <= 20")
+    assert herd_summary.verificar(conn) == []
+
+
+def test_sin_columna_categoria(conn):
+    conn.execute("ALTER TABLE animal DROP COLUMN categoria")
+    herd_summary.instalar(conn)
+    conn.execute("INSERT INTO animal (codigo, estado, sexo) VALUES ('X1', 'Activo', 'Macho')")
+    conn.execute("UPDATE animal SET sexo = 'Hembra'")
+    assert herd_summary.conteo_por(conn, "sexo", "categoria") == {("Hembra", None): 1}
+    assert herd_summary.verificar(conn) == []
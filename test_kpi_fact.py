@@ -0,0 +1,229 @@
+"""
+Tests de la tabla de hechos kpi_fact, del almacén de series y de los servicios que lo leen
+"""
+
+import json
+from contextlib import contextmanager
+from datetime import date, datetime
+
+import numpy as np
+import pytest
+
+from src.database.kpi_fact import ESQUEMA_KPI_FACT, leer_kpis, metricas_de_snapshot, periodos_entre
+from src.database.migraciones import MIGRACIONES_SISTEMA, instalar_kpi_fact
+from src.database.pool import ConnectionPool
+from src.services import (
+    ai_anomaly_detector,
+    ai_pattern_detector,
+    analytics_comparative_service,
+    analytics_trends_service,
+    bi_snapshot_service,
+    kpi_series_store,
+)
+
+
+def _meses_atras(n):
+    hoy = date.today()
+    total = hoy.year * 12 + hoy.month - 1 - n
+    return total // 12, total % 12 + 1
+
+
+@pytest.fixture
+def pool(tmp_path, monkeypatch):
+    p = ConnectionPool(tmp_path / "bi.db")
+    with p.connection() as conn:
+        for sql in MIGRACIONES_SISTEMA:
+            if "bi_snapshots_mensual" in sql:
+                conn.executescript(sql)
+        conn.executescript(ESQUEMA_KPI_FACT)
+
+    @contextmanager
+    def conexion():
+        with p.connection() as conn:
+            yield conn
+
+    monkeypatch.setattr(kpi_series_store, "_kpi_store_instance", None)
+    for modulo in (
+        bi_snapshot_service,
+        kpi_series_store,
+        ai_anomaly_detector,
+        ai_pattern_detector,
+        analytics_trends_service,
+        analytics_comparative_service,
+    ):
+        if hasattr(modulo, "get_db_connection"):
+            monkeypatch.setattr(modulo, "get_db_connection", conexion)
+        if hasattr(modulo, "get_analytics_cache"):
+            monkeypatch.setattr(modulo, "get_analytics_cache", lambda: None)
+        if hasattr(modulo, "get_alert_rules_service"):
+            monkeypatch.setattr(modulo, "get_alert_rules_service", lambda: None)
+    yield p
+    p.close_all()
+
+
+def _snapshot(pool, año, mes, metricas, fecha_snapshot=None):
+    """Guarda un snapshot con data_json ilegible: los lectores solo deben usar kpi_fact."""
+    with pool.connection() as conn:
+        conn.execute(
+            "INSERT INTO bi_snapshots_mensual (año, mes, data_json, fecha_snapshot) VALUES (?, ?, 'no-json', ?)",
+            (año, mes, fecha_snapshot or f"{año}-{mes:02d}-28 23:00:00"),
+        )
+        conn.executemany(
+            "INSERT INTO kpi_fact (año, mes, finca_id, metrica, valor) VALUES (?, ?, 0, ?, ?)",
+            [(año, mes, k, v) for k, v in metricas.items()],
+        )
+        conn.commit()
+    kpi_series_store.get_kpi_series_store().invalidar()
+
+
+def test_metricas_de_snapshot():
+    data = {
+        "resumen_mensual": {"id": 3, "año": 2025, "mes": 1, "ingreso_total": 100, "nota": "x",
+                            "costo_total": 1, "kpis": {"costo_total": 60}},
+        "kpis": {"margen_bruto_pct": {"valor": 40.0, "categoria": "finanzas"}, "costo_total": 70,
+                 "activo": True},
+    }
+    assert metricas_de_snapshot(data) == {"ingreso_total": 100.0, "costo_total": 60.0, "margen_bruto_pct": 40.0}
+
+
+def test_guardar_snapshot_escribe_y_reemplaza_hechos(pool):
+    servicio = bi_snapshot_service.BISnapshotService()
+    servicio._guardar_snapshot_en_bd(2025, 3, {"kpis": {"a": 1, "b": {"valor": 2}}}, "test")
+    servicio._guardar_snapshot_en_bd(2025, 3, {"kpis": {"a": 5}}, "test")
+    with pool.connection() as conn:
+        assert [tuple(r) for r in conn.execute("SELECT metrica, valor FROM kpi_fact")] == [("a", 5.0)]
+
+
+def test_migracion_pobla_desde_snapshots(pool):
+    with pool.connection() as conn:
+        conn.execute(
+            "INSERT INTO bi_snapshots_mensual (año, mes, data_json) VALUES (2024, 12, ?)",
+            (json.dumps({"kpis": {"costo_total": {"valor": 9.5}}}),),
+        )
+        instalar_kpi_fact(conn)
+        series = leer_kpis(conn, ["costo_total", "otra"], (2024, 1), (2025, 1))
+        plan = " ".join(
+            r[-1] for r in conn.execute(
+                "EXPLAIN QUERY PLAN SELECT valor FROM kpi_fact WHERE metrica IN ('a', 'b') AND finca_id = 0 "
+                "AND (año, mes) >= (2024, 1) AND (año, mes) <= (2024, 6)"
+            )
+        )
+    assert series == {"costo_total": {(2024, 12): 9.5}, "otra": {}}
+    assert "PRIMARY KEY" in plan and "año" in plan
+
+
+def test_limpiar_snapshots_antiguos_borra_sus_hechos(pool):
+    _snapshot(pool, 2020, 1, {"costo_total": 5.0}, fecha_snapshot="2020-01-31 23:00:00")
+    _snapshot(pool, 2025, 3, {"costo_total": 7.0}, fecha_snapshot=datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+
+    assert bi_snapshot_service.BISnapshotService().limpiar_snapshots_antiguos(meses_retener=24) == 1
+    with pool.connection() as conn:
+        assert [tuple(r) for r in conn.execute("SELECT año, mes, valor FROM kpi_fact")] == [(2025, 3, 7.0)]
+
+
+def test_periodos_entre():
+    assert periodos_entre(date(2025, 1, 1), date(2025, 6, 15)) == ((2025, 1), (2025, 6))
+    assert periodos_entre(date(2024, 12, 2), date(2025, 6, 15)) == ((2025, 1), (2025, 6))
+
+
+def test_detectores_leen_solo_hechos(pool):
+    for i, costo in enumerate([100, 100, 100, 100, 100, 160]):
+        _snapshot(pool, *_meses_atras(5 - i), {"costo_total": costo, "produccion_total": 500 - i * 10})
+
+    anomalias = {r["metrica"]: r for r in ai_anomaly_detector.AiAnomalyDetectorService()._compute_all()}
+    assert set(anomalias) == {"costo_total", "produccion_total"}
+    assert anomalias["costo_total"]["valor_actual"] == 160 and anomalias["costo_total"]["promedio_6m"] == 100
+    assert anomalias["costo_total"]["fecha"] == "%d-%02d" % _meses_atras(0)
+
+    patrones = ai_pattern_detector.AiPatternDetectorService()._compute_patterns()
+    assert [(p["tipo"], p["metrica"]) for p in patrones if p["tipo"] != "estacionalidad"] == [
+        ("rampa_produccion", "produccion_total")
+    ]
+
+
+def test_comparativos_y_tendencias(pool):
+    _snapshot(pool, 2025, 1, {"ingreso_total": 100})
+    _snapshot(pool, 2025, 2, {"ingreso_total": 150})
+    _snapshot(pool, 2025, 3, {"otra": 1})
+    comparativo = analytics_comparative_service.AnalyticsComparativeService()
+    assert comparativo._comparar_meses("ingreso_total", 2, 2025)["variacion_pct"] == 50
+    assert comparativo._promedio_meses("ingreso_total", [1, 2, 3], 2025) == 125
+
+    hoy = datetime.now()
+    _snapshot(pool, *_meses_atras(1), {"ingreso_total": 10}, hoy.strftime("%Y-%m-%d 01:00:00"))
+    tendencias = analytics_trends_service.AnalyticsTrendsService()
+    resultado = tendencias._compute_trend("ingreso_total", analytics_trends_service.TrendPeriod.MONTHLY)
+    assert [p["valor"] for p in resultado["puntos"]] == [10.0]
+    assert tendencias._compute_trend("margen", analytics_trends_service.TrendPeriod.MONTHLY)[
+        "tendencia_general"
+    ] == "METRICA_NO_ENCONTRADA"
+
+
+def test_store_matriz_alinea_meses_y_finca(pool):
+    _snapshot(pool, 2025, 1, {"a": 1, "b": 10})
+    _snapshot(pool, 2025, 3, {"a": 3})
+    with pool.connection() as conn:
+        conn.execute("INSERT INTO kpi_fact (año, mes, finca_id, metrica, valor) VALUES (2025, 2, 7, 'a', 2)")
+        conn.commit()
+    store = kpi_series_store.get_kpi_series_store()
+    store.invalidar()
+
+    periodos, valores = store.matriz(["a", "b", "nada"], (2025, 1), (2025, 3))
+    assert periodos == [(2025, 1), (2025, 2), (2025, 3)]
+    np.testing.assert_array_equal(valores, [[1, np.nan, 3], [10, np.nan, np.nan], [np.nan] * 3])
+    assert store.meses((2024, 1), (2025, 12)) == [(2025, 1), (2025, 3)]
+    assert store.series(["a"], (2025, 1), (2025, 3), finca_id=7) == {"a": {(2025, 2): 2.0}}
+    with pool.connection() as conn:
+        assert store.series(["a", "b"], (2025, 1), (2025, 3)) == leer_kpis(conn, ["a", "b"], (2025, 1), (2025, 3))
+
+
+def test_store_carga_una_vez_para_todos_los_servicios(pool):
+    for i in range(6):
+        _snapshot(pool, *_meses_atras(5 - i), {"costo_total": 100, "ingreso_total": 200})
+    store = kpi_series_store.get_kpi_series_store()
+
+    ai_anomaly_detector.AiAnomalyDetectorService()._compute_all()
+    ai_pattern_detector.AiPatternDetectorService()._compute_patterns()
+    analytics_comparative_service.AnalyticsComparativeService()._promedio_meses("ingreso_total", [1, 2], 2025)
+    analytics_trends_service.AnalyticsTrendsService()._compute_trend(
+        "ingreso_total", analytics_trends_service.TrendPeriod.YEARLY
+    )
+    assert store.estadisticas()["cargas"] == 1
+
+
+def test_store_se_invalida_al_guardar_snapshot(pool):
+    store = kpi_series_store.get_kpi_series_store()
+    assert store.series(["a"], (2025, 1), (2025, 12)) == {"a": {}}
+    bi_snapshot_service.BISnapshotService()._guardar_snapshot_en_bd(2025, 4, {"kpis": {"a": 4}}, "test")
+    assert store.series(["a"], (2025, 1), (2025, 12)) == {"a": {(2025, 4): 4.0}}
+
+
+def test_store_detecta_cambios_de_otro_proceso_por_firma(pool, monkeypatch):
+    store = kpi_series_store.get_kpi_series_store()
+    monkeypatch.setattr(store, "INTERVALO_VERIFICACION_S", 0.0)
+    assert store.meses((2025, 1), (2025, 12)) == []
+    with pool.connection() as conn:
+        conn.execute("INSERT INTO bi_snapshots_mensual (año, mes, data_json) VALUES (2025, 5, '{}')")
+        conn.commit()
+    assert store.meses((2025, 1), (2025, 12)) == [(2025, 5)]
+    store.meses((2025, 1), (2025, 12))
+    assert store.estadisticas()["cargas"] == 2
+
+
+def test_matriz_anomalias_por_finca(pool):
+    for i, costo in enumerate([100, 100, 100, 100, 100, 160]):
+        _snapshot(pool, 2025, i + 1, {"costo_total": costo})
+    with pool.connection() as conn:
+        conn.executemany(
+            "INSERT INTO kpi_fact (año, mes, finca_id, metrica, valor) VALUES (2025, ?, 3, 'costo_total', ?)",
+            [(i + 1, v) for i, v in enumerate([10, 20, 10, 20, 10, 20])],
+        )
+        conn.commit()
+    kpi_series_store.get_kpi_series_store().invalidar()
+
+    servicio = ai_anomaly_detector.AiAnomalyDetectorService()
+    fincas, periodos, metricas, matriz = servicio.matriz_anomalias((2025, 1), (2025, 6), ventana=3)
+    assert fincas == [0, 3] and periodos[-1] == (2025, 6) and metricas[0] == "costo_total"
+    assert matriz.score.shape == (2, len(metricas), 6)
+    assert matriz.score[0, 0].tolist() == [-1, -1, 0, 0, 0, 30]
+    assert matriz.z[1, 0, 2] == pytest.approx(-1.0)
@@ -0,0 +1,174 @@
+"""
+Tests de los agregados incrementales de KPIs
+"""
+
+from contextlib import contextmanager
+
+import pytest
+
+from src.database import kpi_incremental
+from src.database.database import SCHEMA_COMPLETO
+from src.database.pool import ConnectionPool
+from src.services import kpi_calculator_service
+
+# Tablas que el cálculo de KPIs espera y el esquema base aún no crea
+ESQUEMA_EXTRA = """
+CREATE TABLE venta_leche (id INTEGER PRIMARY KEY, fecha TEXT, precio_total REAL);
+CREATE TABLE gasto (id INTEGER PRIMARY KEY, fecha TEXT, monto REAL, categoria TEXT);
+"""
+
+CATEGORIAS = ("financiero", "produccion", "reproduccion")
+
+
+@pytest.fixture
+def pool(tmp_path, monkeypatch):
+    p = ConnectionPool(tmp_path / "kpi.db")
+    with p.connection() as conn:
+        conn.executescript(SCHEMA_COMPLETO)
+        conn.executescript(ESQUEMA_EXTRA)
+        conn.executemany("INSERT INTO animal (id, codigo) VALUES (?, ?)", [(i, f"A{i}") for i in (1, 2, 3, 9)])
+        conn.executemany("INSERT INTO gasto (fecha, monto, categoria) VALUES (?, ?, ?)", [
+            ("2025-05-03", 100, "Insumos"), ("2025-06-02", 50, "Alimentación"), ("2025-06-10", 30, "Otros"),
+        ])
+        conn.executemany("INSERT INTO venta (animal_id, fecha, precio_total) VALUES (?, ?, ?)", [
+            (1, "2025-06-05", 400), (2, "2025-06-20", 600),
+        ])
+        conn.execute("INSERT INTO venta_leche (fecha, precio_total) VALUES ('2025-06-07', 90)")
+        conn.executemany(
+            "INSERT INTO produccion_leche (animal_id, fecha, litros_manana, litros_tarde) VALUES (?, ?, ?, ?)",
+            [(1, "2025-06-01", 10, None), (2, "2025-06-01", 6, 6), (1, "2025-06-02", 11, None)],
+        )
+        conn.executemany(
+            "INSERT INTO servicio (id_hembra, fecha_servicio, estado, fecha_parto_real) VALUES (?, ?, ?, ?)",
+            [(1, "2025-06-03", "Gestante", None), (2, "2025-06-04", "Vacía", None), (3, "2024-09-01", "Parida", "2025-06-12")],
+        )
+        conn.commit()
+
+    @contextmanager
+    def conexion():
+        with p.connection() as conn:
+            yield conn
+
+    monkeypatch.setattr(kpi_calculator_service, "get_db_connection", conexion)
+    yield p
+    p.close_all()
+
+
+def _kpis(servicio, año, mes, incremental=True):
+    kpis = {}
+    for categoria in CATEGORIAS:
+        kpis.update(servicio.calcular_kpis_mes(año, mes, categoria, incremental=incremental))
+    return kpis
+
+
+def _instalar(pool):
+    with pool.connection() as conn:
+        fuentes = kpi_incremental.instalar_triggers(conn)
+        kpi_incremental.reconstruir(conn)
+        conn.commit()
+    return fuentes
+
+
+def test_incremental_coincide_con_calculo_completo(pool):
+    assert _instalar(pool) == ["venta", "venta_leche", "gasto", "pago_nomina", "produccion_leche", "servicio", "servicio_parto"]
+    servicio = kpi_calculator_service.KPICalculatorService()
+    assert _kpis(servicio, 2025, 6) == _kpis(servicio, 2025, 6, incremental=False)
+
+    with pool.connection() as conn:
+        conn.execute("INSERT INTO produccion_leche (animal_id, fecha, litros_noche) VALUES (3, '2025-06-09', 8)")
+        conn.execute("UPDATE gasto SET fecha = '2025-06-15' WHERE fecha = '2025-05-03'")
+        conn.execute("DELETE FROM produccion_leche WHERE animal_id = 2")
+        conn.execute("UPDATE venta SET animal_id = 9")  # no toca columnas rastreadas
+        conn.commit()
+        assert conn.execute("SELECT COUNT(*) FROM kpi_delta").fetchone()[0] == 3 + 4 + 3
+
+    kpis = _kpis(servicio, 2025, 6)
+    assert kpis == _kpis(servicio, 2025, 6, incremental=False)
+    assert kpis["vacas_productivas"] == 2 and kpis["litros_totales_periodo"] == 29
+    assert kpis["costos_totales"] == 180 and kpis["ingresos_totales"] == 1090
+    assert (kpis["servicios_realizados"], kpis["servicios_exitosos"], kpis["partos_periodo"]) == (2, 1, 1)
+    assert servicio.calcular_kpis_mes(2025, 5, "financiero")["costos_totales"] == 0
+    assert servicio.verificar_incremental() == []
+
+
+def test_distintos_por_referencias(pool):
+    _instalar(pool)
+    with pool.connection() as conn:
+        conn.execute("DELETE FROM produccion_leche WHERE animal_id = 1 AND fecha = '2025-06-01'")
+        kpi_incremental.aplicar_deltas(conn)
+        valores = kpi_incremental.leer_agregados(conn, 2025, 6)
+        assert valores["vacas_leche"] == 2 and valores["dias_leche"] == 2
+        conn.execute("DELETE FROM produccion_leche WHERE animal_id = 1")
+        kpi_incremental.aplicar_deltas(conn)
+        valores = kpi_incremental.leer_agregados(conn, 2025, 6)
+        assert valores["vacas_leche"] == 1 and valores["dias_leche"] == 1
+        assert conn.execute("SELECT COUNT(*) FROM kpi_delta").fetchone()[0] == 0
+
+
+def test_verificar_detecta_desvio_y_reconstruir_lo_corrige(pool):
+    _instalar(pool)
+    servicio = kpi_calculator_service.KPICalculatorService()
+    with pool.connection() as conn:
+        conn.execute("UPDATE kpi_agregado SET valor = valor + 1 WHERE medida = 'gastos' AND mes = 6")
+        conn.commit()
+    diferencias = servicio.verificar_incremental()
+    assert [(d["mes"], d["medida"], d["completo"]) for d in diferencias] == [(6, "gastos", 80)]
+    servicio.reconstruir_incremental()
+    assert servicio.verificar_incremental() == []
+
+
+def test_parto_registrado_en_servicio_suma_partos(pool):
+    _instalar(pool)
+    servicio = kpi_calculator_service.KPICalculatorService()
+    with pool.connection() as conn:
+        conn.execute("UPDATE servicio SET estado = 'Parida', fecha_parto_real = '2025-07-02' WHERE id_hembra = 1")
+        conn.commit()
+    assert servicio.calcular_kpis_mes(2025, 7, "reproduccion")["partos_periodo"] == 1
+    assert servicio.calcular_kpis_mes(2025, 6, "reproduccion")["servicios_exitosos"] == 1
+    assert servicio.verificar_incremental() == []
+
+
+def test_esquema_completo_informa_fuentes_omitidas(tmp_path):
+    p = ConnectionPool(tmp_path / "real.db")
+    with p.connection() as conn:
+        conn.executescript(SCHEMA_COMPLETO)
+        assert kpi_incremental.instalar_triggers(conn) == [
+            "venta", "pago_nomina", "produccion_leche", "servicio", "servicio_parto"
+        ]
+        omitidas = {"venta_leche": ["fecha", "precio_total"], "gasto": ["fecha", "monto", "categoria"],
+                    "tratamiento": ["costo"]}
+        assert kpi_incremental.reconstruir(conn)["omitidas"] == omitidas
+        assert kpi_incremental.verificar(conn) == []
+    p.close_all()
+
+
+def test_verificar_cubre_fuentes_sin_triggers(pool):
+    _instalar(pool)
+    with pool.connection() as conn:
+        conn.execute("DROP TRIGGER trg_kpi_venta_leche_insert")
+        conn.execute("INSERT INTO venta_leche (fecha, precio_total) VALUES ('2025-06-08', 10)")
+        conn.commit()
+        diferencias = kpi_incremental.verificar(conn)
+    assert [(d["medida"], d["incremental"], d["completo"]) for d in diferencias] == [("ventas_leche", 90, 100)]
+
+
+def test_fuente_sin_columnas_no_instala_triggers(tmp_path):
+    p = ConnectionPool(tmp_path / "parcial.db")
+    with p.connection() as conn:
+        conn.execute("CREATE TABLE produccion_leche (id INTEGER PRIMARY KEY, animal_id INTEGER, fecha TEXT, litros_manana REAL)")
+        conn.execute("CREATE TABLE pago_nomina (id INTEGER PRIMARY KEY, fecha_pago TEXT, total_pagado REAL)")
+        assert kpi_incremental.instalar_triggers(conn) == ["pago_nomina"]
+        conn.execute("INSERT INTO produccion_leche (animal_id, fecha) VALUES (1, '2025-01-01')")
+        assert [f.tabla for f in kpi_incremental.fuentes_instaladas(conn)] == ["pago_nomina"]
+    p.close_all()
+
+
+def test_totales_periodo_filtra_con_rango_indexable(pool):
+    with pool.connection() as conn:
+        conn.execute("INSERT INTO gasto (fecha, monto, categoria) VALUES ('2025-06-30 18:00:00', 7, 'Otros')")
+        consultas = []
+        conn.set_trace_callback(consultas.append)
+        totales = kpi_incremental.totales_periodo(conn, "2025-06-01", "2025-06-30")
+        conn.set_trace_callback(None)
+    assert totales["gastos"] == 87
+    assert consultas and not any("date(" in sql for sql in consultas)
@@ -0,0 +1,123 @@
+"""
+Tests del detector en línea de caídas de leche por vaca (EWMA/CUSUM)
+"""
+
+import sys
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+import pytest
+
+from src.database.pool import ConnectionPool
+from src.services import alert_rules_service, milk_stream_detector, system_metrics_service
+from src.services.milk_stream_detector import TIPO_ALERTA, MilkStreamDetector
+
+
+@pytest.fixture(autouse=True)
+def bd_temporal(tmp_path, monkeypatch):
+    """Toda conexión por ruta por defecto va a tmp_path (no a src/database/fincafacil.db)."""
+    ruta = tmp_path / "leche.db"
+    for nombre in ("src.database.database", "database.database"):
+        modulo = sys.modules.get(nombre)
+        if modulo is not None:
+            monkeypatch.setattr(modulo, "get_db_path_safe", lambda: ruta)
+    # Los singletons que guardan alertas y métricas se recrean sobre la BD temporal
+    monkeypatch.setattr(alert_rules_service, "_alert_rules_instance", None)
+    monkeypatch.setattr(system_metrics_service, "_system_metrics_service", None)
+    return ruta
+
+
+@pytest.fixture
+def pool(bd_temporal, monkeypatch):
+    p = ConnectionPool(bd_temporal)
+    with p.connection() as conn:
+        conn.executescript("""
+            CREATE TABLE produccion_leche (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, animal_id INTEGER NOT NULL, fecha DATE NOT NULL,
+                litros_manana REAL DEFAULT 0, litros_tarde REAL DEFAULT 0, litros_noche REAL DEFAULT 0,
+                observaciones TEXT, UNIQUE(animal_id, fecha)
+            );
+            CREATE TABLE alertas (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, tipo TEXT, prioridad TEXT, titulo TEXT,
+                descripcion TEXT, entidad_tipo TEXT, entidad_id INTEGER, valor_actual REAL,
+                valor_referencia REAL, fecha_deteccion TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                estado TEXT DEFAULT 'activa'
+            );
+        """)
+
+    @contextmanager
+    def conexion():
+        with p.connection() as conn:
+            yield conn
+
+    monkeypatch.setattr(milk_stream_detector, "get_db_connection", conexion)
+    monkeypatch.setattr(alert_rules_service, "get_db_connection", conexion)
+    yield p
+    p.close_all()
+
+
+def _pesajes(pool, animal_id, inicio, litros):
+    with pool.connection() as conn:
+        conn.executemany(
+            "INSERT INTO produccion_leche (animal_id, fecha, litros_manana) VALUES (?, ?, ?)",
+            [(animal_id, (inicio + timedelta(days=i)).isoformat(), l) for i, l in enumerate(litros)],
+        )
+        conn.commit()
+
+
+def test_caida_sostenida_genera_una_alerta_por_animal(pool):
+    detector = MilkStreamDetector()
+    inicio = date(2025, 5, 1)
+    normal = [20, 21, 19, 20, 22, 20, 19, 21, 20, 20]
+    caida = [16, 15, 15, 14, 14]
+    filas = []
+    for animal_id in (1, 2):
+        filas += [(animal_id, inicio + timedelta(days=i), l) for i, l in enumerate(normal + caida)]
+    filas += [(3, inicio + timedelta(days=i), l) for i, l in enumerate(normal * 2)]
+
+    alertas = detector.registrar_lote(filas)
+
+    assert sorted(a["entidad_id"] for a in alertas) == [1, 2]
+    assert all(a["tipo"] == TIPO_ALERTA and a["entidad_tipo"] == "animal" for a in alertas)
+    assert detector.estado(1)["en_alerta"] and not detector.estado(3)["en_alerta"]
+    with pool.connection() as conn:
+        guardadas = [tuple(r) for r in conn.execute("SELECT tipo, entidad_id FROM alertas ORDER BY entidad_id")]
+    assert guardadas == [(TIPO_ALERTA, 1), (TIPO_ALERTA, 2)]
+
+    # Sigue bajo pero ya alertada: no repite
+    assert detector.registrar(1, inicio + timedelta(days=20), 13) is None
+
+
+def test_caida_brusca_y_registros_fuera_de_orden(pool):
+    detector = MilkStreamDetector(guardar_alertas=False)
+    inicio = date(2025, 5, 1)
+    detector.registrar_lote([(7, inicio + timedelta(days=i), 20 + (i % 2)) for i in range(10)])
+
+    assert detector.registrar(7, inicio + timedelta(days=5), 2) is None  # día ya procesado
+    assert detector.estadisticas()["ignorados"] == 1
+    alerta = detector.registrar(7, inicio + timedelta(days=10), 5)
+    assert alerta is not None and "brusca" in alerta["descripcion"] and alerta["prioridad"] == "alta"
+
+
+def test_calienta_con_historial_y_reconstruye(pool):
+    inicio = date(2025, 4, 1)
+    _pesajes(pool, 5, inicio, [30, 31, 29, 30, 30, 31, 29, 30])
+
+    detector = MilkStreamDetector(guardar_alertas=False)
+    detector.registrar(5, inicio + timedelta(days=8), 30)
+    estado = detector.estado(5)
+    assert estado["registros"] == 9 and estado["media"] == pytest.approx(30, abs=0.5)
+
+    otro = MilkStreamDetector(guardar_alertas=False)
+    assert otro.reconstruir() == 8
+    assert otro.estado(5)["registros"] == 8 and not otro.estado(5)["en_alerta"]
+
+
+def test_estado_compacto_y_crecimiento():
+    detector = MilkStreamDetector(guardar_alertas=False)
+    detector.CAPACIDAD_INICIAL = 4
+    detector._reiniciar()
+    for animal_id in range(10):
+        detector._actualizar(detector._slot(animal_id)[0], 1, 10.0)
+    assert len(detector._media) == 16 and detector.estado(9)["registros"] == 1
+    assert detector.bytes_por_animal() <= 24
@@ -0,0 +1,17 @@
+"""
+Tests de los períodos mensuales compartidos (src/database/periodos.py)
+"""
+
+from src.database.periodos import codigo_mes, meses_entre, periodo_de_codigo, texto_mes
+
+
+def test_meses_entre_cruza_el_año():
+    assert meses_entre((2024, 11), (2025, 2)) == [(2024, 11), (2024, 12), (2025, 1), (2025, 2)]
+    assert meses_entre((2025, 3), (2025, 3)) == [(2025, 3)]
+    assert meses_entre((2025, 3), (2025, 2)) == []
+
+
+def test_codigo_y_texto():
+    assert codigo_mes((2025, 1)) - codigo_mes((2024, 12)) == 1
+    assert periodo_de_codigo(codigo_mes((2025, 12))) == (2025, 12)
+    assert texto_mes(("2025", "3")) == "2025-03"
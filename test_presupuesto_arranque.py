@@ -0,0 +1,75 @@
+"""
+Presupuesto de arranque: imports de main.py (raíz, el que lanza iniciar.bat)
+y de src/main.py hasta la ventana de login.
+
+Importar `main` ejecuta exactamente la cadena de imports previa a
+mostrar_login(). El test falla si:
+- alguna librería pesada (gráficos, PDF, Excel) se carga antes del login
+- el tiempo de import supera el presupuesto configurado
+
+Presupuesto configurable con FINCAFACIL_PRESUPUESTO_ARRANQUE_MS (por defecto 700 ms).
+"""
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("customtkinter")
+
+RAIZ = Path(__file__).parent
+SRC_DIR = RAIZ / "src"
+PRESUPUESTO_MS = float(os.getenv("FINCAFACIL_PRESUPUESTO_ARRANQUE_MS", "700"))
+LIBRERIAS_PESADAS = ("matplotlib", "openpyxl", "reportlab", "pandas")
+
+SCRIPT = f"""
+import json, sys, time
+t0 = time.perf_counter()
+import main
+ms = (time.perf_counter() - t0) * 1000
+print("@@" + json.dumps({{"ms": ms, "pesadas": [m for m in {LIBRERIAS_PESADAS!r} if m in sys.modules]}}))
+"""
+
+
+def _importar_main(directorio):
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", SCRIPT],
+        cwd=directorio,
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+    assert proc.returncode == 0, proc.stdout[-2000:] + proc.stderr[-2000:]
+    linea = next(l for l in proc.stdout.splitlines() if l.startswith("@@"))
+    resultado = json.loads(linea[2:])
+
+    # Top de imports por tiempo acumulado, para el mensaje de error
+    filas = []
+    for l in proc.stderr.splitlines():
+        if l.startswith("import time:") and "|" in l:
+            _, acumulado, nombre = l[len("import time:"):].split("|")
+            if acumulado.strip().isdigit():
+                filas.append((int(acumulado) / 1000, nombre.strip()))
+    resultado["top"] = sorted(filas, reverse=True)[:15]
+    return resultado
+
+
+@pytest.fixture(scope="module", params=[RAIZ, SRC_DIR], ids=["main.py", "src/main.py"])
+def arranque(request):
+    # La primera corrida compila .pyc; se mide la segunda (arranque típico)
+    _importar_main(request.param)
+    return _importar_main(request.param)
+
+
+def test_sin_librerias_pesadas_antes_del_login(arranque):
+    assert arranque["pesadas"] == [], f"Cargadas antes del login: {arranque['pesadas']}\n{arranque['top']}"
+
+
+def test_presupuesto_de_import(arranque):
+    detalle = "\n".join(f"{ms:8.1f} ms  {nombre}" for ms, nombre in arranque["top"])
+    assert arranque["ms"] <= PRESUPUESTO_MS, (
+        f"Import de main: {arranque['ms']:.0f} ms > presupuesto {PRESUPUESTO_MS:.0f} ms\n{detalle}"
+    )
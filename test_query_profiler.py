@@ -0,0 +1,112 @@
+"""
+Tests del profiler de consultas SQL (src/database/profiler.py)
+"""
+
+import json
+import threading
+
+import pytest
+
+from src.database.pool import ConnectionPool
+from src.database.profiler import (
+    LatencyHistogram,
+    activar_profiler,
+    desactivar_profiler,
+    get_query_profiler,
+    instalar_si_habilitado,
+    normalizar_sql,
+)
+
+
+@pytest.fixture
+def profiler(tmp_path):
+    p = get_query_profiler()
+    p.reiniciar()
+    p.directorio = tmp_path
+    activar_profiler(umbral_lento_ms=0.0, muestreo_plan=1)
+    yield p
+    desactivar_profiler()
+    p.reiniciar()
+    p.directorio = None
+    p.umbral_lento_ms = 100.0
+
+
+@pytest.fixture
+def pool(tmp_path):
+    p = ConnectionPool(tmp_path / "prof.db", max_size=2)
+    yield p
+    p.close_all()
+
+
+def test_normaliza_literales_y_listas():
+    a = normalizar_sql("SELECT * FROM animal WHERE id IN (?, ?, ?) AND codigo = 'A1' -- x")
+    b = normalizar_sql("SELECT *  FROM animal\n WHERE id IN (?,?) AND codigo = 'B22'")
+    assert a == b
+    assert "(?+)" in a and "'A1'" not in a
+
+
+def test_percentiles_del_histograma():
+    h = LatencyHistogram()
+    for ms in [1.0] * 90 + [50.0] * 10:
+        h.registrar(ms)
+    assert h.percentil(50) < 2.0
+    assert 40.0 <= h.percentil(99) <= 70.0
+
+
+def test_registra_sentencias_filas_y_plan(profiler, pool):
+    with pool.connection() as conn:
+        conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, v INTEGER)")
+        conn.executemany("INSERT INTO t (v) VALUES (?)", [(i,) for i in range(20)])
+        conn.execute("SELECT * FROM t WHERE v > ?", (5,)).fetchall()
+        conn.execute("SELECT * FROM t WHERE v > ?", (15,)).fetchall()
+
+    stats = {s["sql"]: s for s in profiler.estadisticas()}
+    select = stats[normalizar_sql("SELECT * FROM t WHERE v > ?")]
+    assert select["ejecuciones"] == 2
+    assert select["filas"] == 14 + 4
+    assert select["plan"]
+    assert any("test_query_profiler" in punto for punto in select["puntos_llamada"])
+
+
+def test_consultas_lentas_y_snapshot(profiler, pool, caplog):
+    with caplog.at_level("INFO", logger="db.slow"), pool.connection() as conn:
+        conn.execute("SELECT 1").fetchall()
+
+    ruta = profiler.guardar_snapshot()
+    datos = json.loads(ruta.read_text(encoding="utf-8"))
+    assert any(s["sql"] == "SELECT ?" for s in datos["sentencias"])
+
+    lentas = [json.loads(r.getMessage()) for r in caplog.records if r.name == "db.slow"]
+    assert any(l["sql"] == "SELECT ?" and "punto_llamada" in l for l in lentas)
+
+
+def test_desactivado_no_registra(profiler, pool):
+    desactivar_profiler()
+    profiler.reiniciar()
+    with pool.connection() as conn:
+        conn.execute("SELECT 2").fetchall()
+    assert profiler.estadisticas() == []
+
+
+def test_cursor_liberado_con_el_lock_tomado(profiler, pool):
+    with pool.connection() as conn:
+        cursor = conn.execute("SELECT 3")
+        cursor.fetchall()
+        profiler._lock.acquire()
+        try:
+            hilo = threading.Thread(target=cursor.__del__)
+            hilo.start()
+            hilo.join(timeout=2)
+            assert not hilo.is_alive()
+        finally:
+            profiler._lock.release()
+    assert {s["sql"] for s in profiler.estadisticas()} >= {"SELECT ?"}
+
+
+def test_umbral_de_entorno_invalido(profiler, monkeypatch):
+    monkeypatch.setenv("FINCAFACIL_SQL_SLOW_MS", "rápido")
+    instalar_si_habilitado()
+    assert profiler.umbral_lento_ms == 0.0
+    monkeypatch.setenv("FINCAFACIL_SQL_SLOW_MS", "250")
+    instalar_si_habilitado()
+    assert profiler.umbral_lento_ms == 250.0
@@ -0,0 +1,128 @@
+"""
+Tests de rangos de fechas sargables (src/database/rango_fechas.py)
+"""
+
+import sqlite3
+from contextlib import contextmanager
+from datetime import date, datetime
+
+import pytest
+
+from src.analytics import analytics_repository
+from src.database.database import SCHEMA_COMPLETO
+from src.database.migraciones import migrar_fechas_canonicas
+from src.database.rango_fechas import (
+    canonicalizar_fechas,
+    filtro_fechas,
+    normalizar_fecha,
+    rango_mes,
+    rango_semiabierto,
+)
+
+
+@pytest.mark.parametrize("entrada, esperado", [
+    ("2025-01-15", "2025-01-15"),
+    ("2025-1-5", "2025-01-05"),
+    ("15/01/2025", "2025-01-15"),
+    ("2025/01/15", "2025-01-15"),
+    ("2025-01-15T08:30:00", "2025-01-15 08:30:00"),
+    ("2025-01-15 08:30", "2025-01-15 08:30:00"),
+    ("2025-01-15T08:30:00Z", "2025-01-15 08:30:00"),
+    (date(2025, 1, 15), "2025-01-15"),
+    (datetime(2025, 1, 15, 8, 30), "2025-01-15 08:30:00"),
+    ("", None),
+    ("sin fecha", None),
+])
+def test_normalizar_fecha(entrada, esperado):
+    assert normalizar_fecha(entrada) == esperado
+
+
+def test_rangos_semiabiertos():
+    assert rango_semiabierto("2025-01-01", "2025-01-31") == ("2025-01-01", "2025-02-01")
+    assert rango_semiabierto(date(2025, 2, 28)) == ("2025-02-28", "2025-03-01")
+    assert rango_mes(2024, 12) == ("2024-12-01", "2025-01-01")
+    sql, params = filtro_fechas("v.fecha", "2025-03-01", "2025-03-31")
+    assert sql == "v.fecha >= ? AND v.fecha < ?"
+    assert params == ("2025-03-01", "2025-04-01")
+
+
+def test_equivale_a_date_between():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE t (fecha TEXT)")
+    valores = ["2024-12-31 23:59:59", "2025-01-01", "2025-01-15 10:00:00",
+               "2025-01-31", "2025-01-31 18:00:00", "2025-02-01", "2025-02-01 00:00:00"]
+    conn.executemany("INSERT INTO t VALUES (?)", [(v,) for v in valores])
+    antes = conn.execute(
+        "SELECT fecha FROM t WHERE DATE(fecha) BETWEEN ? AND ? ORDER BY fecha", ("2025-01-01", "2025-01-31")
+    ).fetchall()
+    sql, params = filtro_fechas("fecha", "2025-01-01", "2025-01-31")
+    despues = conn.execute(f"SELECT fecha FROM t WHERE {sql} ORDER BY fecha", params).fetchall()
+    assert antes == despues and len(despues) == 4
+
+
+@pytest.fixture
+def bd(tmp_path):
+    conn = sqlite3.connect(tmp_path / "fechas.db")
+    conn.executescript(SCHEMA_COMPLETO)
+    conn.execute("CREATE TABLE IF NOT EXISTS app_settings (clave TEXT PRIMARY KEY, valor TEXT)")
+    conn.execute("INSERT INTO finca (nombre) VALUES ('Test')")
+    conn.execute("INSERT INTO animal (id_finca, codigo, sexo) VALUES (1, 'A1', 'Hembra')")
+    yield conn
+    conn.close()
+
+
+def test_canonicalizar_fechas(bd):
+    bd.executemany(
+        "INSERT INTO produccion_leche (animal_id, fecha, litros_manana) VALUES (1, ?, 5)",
+        [("15/01/2025",), ("2025-1-16",), ("2025-01-17",), ("2025-01-18T06:00:00",)],
+    )
+    resultado = canonicalizar_fechas(bd, {"produccion_leche": ("fecha",)})
+    assert resultado == {"produccion_leche.fecha": 3}
+    fechas = [r[0] for r in bd.execute("SELECT fecha FROM produccion_leche ORDER BY fecha")]
+    assert fechas == ["2025-01-15", "2025-01-16", "2025-01-17", "2025-01-18 06:00:00"]
+
+
+def test_canonicalizar_respeta_unique(bd):
+    bd.executemany(
+        "INSERT INTO produccion_leche (animal_id, fecha, litros_manana) VALUES (1, ?, 5)",
+        [("2025-01-15",), ("15/01/2025",)],
+    )
+    assert canonicalizar_fechas(bd, {"produccion_leche": ("fecha",)}) == {"produccion_leche.fecha": 0}
+
+
+def test_migracion_se_ejecuta_una_vez(bd):
+    bd.execute("INSERT INTO muerte (animal_id, fecha, causa) VALUES (1, '03/02/2025', 'x')")
+    migrar_fechas_canonicas(bd)
+    assert bd.execute("SELECT fecha FROM muerte").fetchone()[0] == "2025-02-03"
+    bd.execute("INSERT INTO animal (id_finca, codigo, sexo) VALUES (1, 'A2', 'Macho')")
+    bd.execute("INSERT INTO muerte (animal_id, fecha, causa) VALUES (2, '04/02/2025', 'x')")
+    migrar_fechas_canonicas(bd)
+    assert bd.execute("SELECT COUNT(*) FROM muerte WHERE fecha = '04/02/2025'").fetchone()[0] == 1
+
+
+def test_consultas_analytics_usan_indice(bd, monkeypatch):
+    """EXPLAIN QUERY PLAN de las consultas reales del repositorio: sin SCAN de tabla."""
+    migrar_fechas_canonicas(bd)
+    sentencias = []
+    bd.set_trace_callback(sentencias.append)
+
+    @contextmanager
+    def conexion_prueba():
+        yield bd
+
+    monkeypatch.setattr(analytics_repository, "get_db_connection", conexion_prueba)
+    analytics_repository.produccion_leche_total("2025-01-01", "2025-01-31")
+    analytics_repository.mortalidad_periodo("2025-01-01", "2025-01-31")
+    analytics_repository.gestaciones_periodo("2025-01-01", "2025-01-31")
+    analytics_repository.promedio_intervalo_partos_dias("2025-01-01", "2025-01-31")
+    analytics_repository.costos_nomina("2025-01-01", "2025-01-31")
+    analytics_repository.monthly_sum("produccion_leche", "litros_manana", "2025-01-01", "2025-06-30")
+    analytics_repository.monthly_sum("venta", "precio_total", "2025-01-01", "2025-06-30")
+    bd.set_trace_callback(None)
+
+    consultas = [s for s in sentencias if s.lstrip().upper().startswith("SELECT") and ">=" in s]
+    assert len(consultas) == 8
+    for sql in consultas:
+        plan = [fila[3] for fila in bd.execute(f"EXPLAIN QUERY PLAN {sql}")]
+        assert not any(paso.startswith("SCAN") for paso in plan), f"{sql}\n{plan}"
+        assert any(paso.startswith("SEARCH") and "INDEX" in paso for paso in plan), f"{sql}\n{plan}"
@@ -0,0 +1,62 @@
+"""
+Tests de la generación en paralelo del reporte completo
+"""
+
+import threading
+import time
+from datetime import date
+
+import pytest
+
+from src.services.reportes_service import ReportesService
+
+
+class _Seccion:
+    def __init__(self, espera=0.0, error=None):
+        self.espera = espera
+        self.error = error
+        self.hilos = []
+
+    def generar(self, fecha_inicio, fecha_fin, filtros):
+        self.hilos.append(threading.current_thread().name)
+        time.sleep(self.espera)
+        if self.error:
+            raise self.error
+        return {"datos": {}, "totales": {"espera": self.espera}, "metadatos": {}}
+
+
+@pytest.fixture
+def servicio():
+    s = ReportesService()
+    s.reporte_animales = _Seccion(0.3)
+    s.reporte_reproduccion = _Seccion(0.3)
+    s.reporte_produccion = _Seccion(0.3)
+    s.reporte_finanzas = _Seccion(0.3)
+    return s
+
+
+def test_secciones_en_paralelo_con_tiempos(servicio):
+    inicio = time.perf_counter()
+    reporte = servicio.generar_reporte("completo", date(2025, 1, 1), date(2025, 1, 31))
+    duracion = time.perf_counter() - inicio
+
+    assert duracion < 0.9
+    meta = reporte["metadatos"]
+    assert list(reporte["secciones"]) == ["animales", "reproduccion", "produccion", "finanzas"]
+    assert meta["secciones_incluidas"] == list(reporte["secciones"]) and meta["hilos"] == 4
+    assert set(meta["tiempos_ms"]) == set(reporte["secciones"])
+    assert all(t >= 290 for t in meta["tiempos_ms"].values())
+    assert meta["duracion_ms"] < 900
+    assert len({servicio.reporte_animales.hilos[0], servicio.reporte_finanzas.hilos[0]}) == 2
+
+
+def test_timeout_por_seccion(servicio):
+    servicio.reporte_produccion = _Seccion(1.0)
+    with pytest.raises(TimeoutError, match="produccion"):
+        servicio._generar_reporte_completo(date(2025, 1, 1), date(2025, 1, 31), None, timeouts={"produccion": 0.5})
+
+
+def test_error_de_seccion_se_propaga(servicio):
+    servicio.reporte_finanzas = _Seccion(error=ValueError("sin datos"))
+    with pytest.raises(ValueError, match="sin datos"):
+        servicio.generar_reporte("completo", date(2025, 1, 1), date(2025, 1, 31))
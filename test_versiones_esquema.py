@@ -0,0 +1,81 @@
+"""
+Tests del versionado de esquema con PRAGMA user_version (src/database/versiones_esquema.py)
+"""
+
+import sqlite3
+
+import pytest
+
+from src.database import versiones_esquema
+from src.database.database import SCHEMA_COMPLETO
+from src.database.versiones_esquema import (
+    VERSION_ESQUEMA,
+    PasoMigracion,
+    aplicar_migraciones,
+    asegurar_esquema,
+    esquema_actualizado,
+    version_actual,
+)
+
+
+@pytest.fixture
+def conn(tmp_path):
+    c = sqlite3.connect(tmp_path / "esquema.db")
+    c.executescript(SCHEMA_COMPLETO)
+    yield c
+    c.close()
+
+
+def test_aplica_todos_los_pasos_en_frio(conn):
+    assert version_actual(conn) == 0
+    assert aplicar_migraciones(conn) == list(range(1, VERSION_ESQUEMA + 1))
+    assert version_actual(conn) == VERSION_ESQUEMA
+    tablas = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    assert {"app_settings", "usuario", "audit_log", "reubicacion"} <= tablas
+
+
+def test_arranque_en_caliente_sin_ddl(conn):
+    aplicar_migraciones(conn)
+    sentencias = []
+    conn.set_trace_callback(sentencias.append)
+    assert aplicar_migraciones(conn) == []
+    assert sentencias == ["PRAGMA user_version"]
+
+
+def test_paso_fallido_no_avanza_version(conn, monkeypatch):
+    aplicar_migraciones(conn)
+    llamadas = []
+
+    def falla(c):
+        raise sqlite3.OperationalError("boom")
+
+    pasos = versiones_esquema.PASOS_MIGRACION + [
+        PasoMigracion(VERSION_ESQUEMA + 1, "falla", falla),
+        PasoMigracion(VERSION_ESQUEMA + 2, "posterior", llamadas.append),
+    ]
+    monkeypatch.setattr(versiones_esquema, "PASOS_MIGRACION", pasos)
+    monkeypatch.setattr(versiones_esquema, "VERSION_ESQUEMA", VERSION_ESQUEMA + 2)
+    assert aplicar_migraciones(conn) == []
+    assert version_actual(conn) == VERSION_ESQUEMA
+    assert llamadas == []
+
+
+def test_asegurar_esquema_por_ruta(tmp_path):
+    ruta = tmp_path / "nueva.db"
+    assert not esquema_actualizado(ruta)
+    with sqlite3.connect(ruta) as c:
+        c.executescript(SCHEMA_COMPLETO)
+    assert asegurar_esquema(ruta)
+    assert esquema_actualizado(ruta)
+
+
+def test_esquema_minimo_fallido_no_avanza_version(tmp_path):
+    # Sin tablas base, el paso 1 falla ("no such table: animal") y no debe darse por aplicado
+    c = sqlite3.connect(tmp_path / "vacia.db")
+    try:
+        assert aplicar_migraciones(c) == []
+        assert version_actual(c) == 0
+        c.executescript(SCHEMA_COMPLETO)
+        assert aplicar_migraciones(c) == list(range(1, VERSION_ESQUEMA + 1))
+    finally:
+        c.close()
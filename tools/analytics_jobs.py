@@ -0,0 +1,77 @@
+"""
+Ejecuta los jobs de analytics fuera de la aplicación
+
+Modos:
+- por defecto: corrida incremental (días desde la marca de agua hasta hoy)
+- --desde/--hasta: backfill del rango (inclusive)
+- --historial: muestra las últimas corridas registradas
+- --cada N: queda en primer plano repitiendo la corrida incremental cada N segundos
+
+Uso:
+    python tools/analytics_jobs.py [--job BuildProductivityAnalyticsJob] [--empresa 1]
+    python tools/analytics_jobs.py --desde 2025-01-01 --hasta 2025-12-31
+    python tools/analytics_jobs.py --historial [--limite 20] [--json]
+"""
+
+from __future__ import annotations
+import argparse
+import json
+import logging
+import sys
+import time
+from dataclasses import asdict
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from src.database.versiones_esquema import asegurar_esquema
+from src.jobs.scheduler import AnalyticsJobScheduler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Jobs de analytics con marcas de agua")
+    parser.add_argument("--job", action="append", help="Job a ejecutar (repetible; por defecto todos)")
+    parser.add_argument("--empresa", type=int, action="append", help="Empresa (repetible; por defecto 1)")
+    parser.add_argument("--desde", help="Inicio del backfill (YYYY-MM-DD)")
+    parser.add_argument("--hasta", help="Fin del backfill (YYYY-MM-DD, por defecto hoy)")
+    parser.add_argument("--historial", action="store_true", help="Mostrar corridas registradas")
+    parser.add_argument("--limite", type=int, default=20)
+    parser.add_argument("--cada", type=float, help="Repetir la corrida incremental cada N segundos")
+    parser.add_argument("--json", action="store_true", help="Salida en JSON")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    asegurar_esquema()
+    planificador = AnalyticsJobScheduler(empresas=args.empresa)
+
+    if args.historial:
+        filas = planificador.historial(args.job[0] if args.job else None, args.limite)
+        if args.json:
+            print(json.dumps(filas, indent=2, ensure_ascii=False, default=str))
+        else:
+            for f in filas:
+                print(
+                    f"{f['inicio']}  {f['job']:<32} emp={f['empresa_id']:<3} {f['modo']:<11} "
+                    f"{f['desde']}..{f['hasta']}  {f['estado']:<5} dias={f['dias']:<4} "
+                    f"filas={f['filas']:<5} {f['duracion_ms'] or 0:8.1f} ms  {f['error'] or ''}"
+                )
+        return 0
+
+    while True:
+        if args.desde:
+            resultados = planificador.backfill(args.desde, args.hasta or time.strftime("%Y-%m-%d"), args.job)
+        else:
+            resultados = planificador.ejecutar_pendientes(args.job)
+        if args.json:
+            print(json.dumps([{k: v for k, v in asdict(r).items() if k != "detalle"} for r in resultados],
+                             indent=2, ensure_ascii=False))
+        if not args.cada or args.desde:
+            break
+        time.sleep(args.cada)
+
+    return 0 if all(r.estado == "ok" for r in resultados) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
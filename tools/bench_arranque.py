@@ -0,0 +1,128 @@
+"""
+Benchmark del arranque: verificación de esquema antes/después de user_version
+
+Compara sobre una BD temporal:
+- legado: lo que hacía inicializar_sistema() en cada arranque
+  (asegurar_esquema_minimo + asegurar_esquema_completo + ensure_audit_schema)
+- en frío: aplicar_migraciones() sobre una BD con user_version = 0
+- en caliente: aplicar_migraciones() con el esquema al día
+
+Cuenta las sentencias ejecutadas (trace de SQLite) y falla con código 1 si
+el arranque en caliente ejecuta DDL o algo distinto de PRAGMA user_version.
+
+Uso:
+    python tools/bench_arranque.py [--iteraciones 20] [--json]
+"""
+
+from __future__ import annotations
+import argparse
+import contextlib
+import io
+import json
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.database.database import (
+    DATOS_BASICOS,
+    SCHEMA_COMPLETO,
+    _asegurar_esquema_minimo,
+    _migrar_esquema_basico,
+)
+from src.database.migraciones import ESQUEMA_AUDIT_LOG
+from src.database.versiones_esquema import VERSION_ESQUEMA, aplicar_migraciones, esquema_actualizado
+
+PREFIJOS_DDL = ("CREATE", "ALTER", "DROP")
+
+
+def _arranque_legado(conn: sqlite3.Connection) -> None:
+    conn.execute("SELECT name FROM sqlite_master WHERE type='table' AND name IN ('animal','finca','potrero','lote')").fetchall()
+    _asegurar_esquema_minimo(conn)
+    _migrar_esquema_basico(conn)
+    conn.executescript(ESQUEMA_AUDIT_LOG)
+
+
+def _arranque_versionado(conn: sqlite3.Connection) -> None:
+    aplicar_migraciones(conn)
+
+
+def _medir(func: Callable[[sqlite3.Connection], None], db_path: Path, iteraciones: int) -> Dict[str, Any]:
+    tiempos: List[float] = []
+    sentencias: List[str] = []
+    for i in range(iteraciones):
+        conn = sqlite3.connect(db_path)
+        if i == iteraciones - 1:
+            conn.set_trace_callback(sentencias.append)
+        with contextlib.redirect_stdout(io.StringIO()):
+            t0 = time.perf_counter()
+            func(conn)
+            tiempos.append((time.perf_counter() - t0) * 1000)
+        conn.close()
+    ddl = [s for s in sentencias if s.lstrip().upper().startswith(PREFIJOS_DDL)]
+    return {
+        "media_ms": round(statistics.mean(tiempos), 3),
+        "p50_ms": round(statistics.median(tiempos), 3),
+        "sentencias": len(sentencias),
+        "ddl": len(ddl),
+        "detalle": sentencias if len(sentencias) <= 5 else sentencias[:5] + ["..."],
+    }
+
+
+def run_benchmark(iteraciones: int) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "arranque.db"
+        conn = sqlite3.connect(db_path)
+        conn.executescript(SCHEMA_COMPLETO)
+        conn.executescript(DATOS_BASICOS)
+        conn.commit()
+        conn.close()
+
+        resultados: Dict[str, Any] = {"version_esquema": VERSION_ESQUEMA, "iteraciones": iteraciones}
+        resultados["legado"] = _medir(_arranque_legado, db_path, iteraciones)
+        # user_version sigue en 0: la primera pasada aplica todos los pasos
+        resultados["en_frio"] = _medir(_arranque_versionado, db_path, 1)
+        resultados["en_caliente"] = _medir(_arranque_versionado, db_path, iteraciones)
+
+        # Ruta real de inicializar_sistema(): conexión del pool + user_version
+        tiempos = []
+        for _ in range(iteraciones):
+            t0 = time.perf_counter()
+            assert esquema_actualizado(db_path)
+            tiempos.append((time.perf_counter() - t0) * 1000)
+        resultados["esquema_actualizado_ms"] = round(statistics.median(tiempos), 3)
+
+    caliente = resultados["en_caliente"]
+    resultados["sin_ddl_en_caliente"] = caliente["ddl"] == 0 and caliente["sentencias"] == 1
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de verificación de esquema al arrancar")
+    parser.add_argument("--iteraciones", type=int, default=20)
+    parser.add_argument("--json", action="store_true", help="Salida en JSON")
+    args = parser.parse_args()
+
+    res = run_benchmark(args.iteraciones)
+    if args.json:
+        print(json.dumps(res, indent=2, ensure_ascii=False))
+    else:
+        print(f"Benchmark arranque - esquema versión {res['version_esquema']}")
+        for etiqueta in ("legado", "en_frio", "en_caliente"):
+            r = res[etiqueta]
+            print(
+                f"{etiqueta:>12}: {r['media_ms']:8.2f} ms | "
+                f"{r['sentencias']:4d} sentencias | {r['ddl']:3d} DDL"
+            )
+        print(f"esquema_actualizado() (pool): {res['esquema_actualizado_ms']:.3f} ms")
+        print("Arranque en caliente sin DDL: " + ("SI" if res["sin_ddl_en_caliente"] else "NO"))
+    sys.exit(0 if res["sin_ddl_en_caliente"] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Benchmark del pool de conexiones (get_db_connection)
+
+Mide el costo de conexión antes (pool deshabilitado: connect + PRAGMAs por
+llamada) y después (pool habilitado) sobre la ruta de refresco del dashboard:
+las consultas de KPIs, eventos recientes y alertas, cada una en su propio
+bloque `with get_db_connection()` como hacen repositorios y servicios.
+
+Uso:
+    python tools/bench_db_pool.py [--animales 2000] [--iteraciones 50] [--json]
+"""
+
+from __future__ import annotations
+import argparse
+import json
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.database.database import SCHEMA_COMPLETO, get_db_connection
+from src.database.pool import close_all_pools, configurar_pool
+
+# Consultas de DashboardModule.actualizar_estadisticas, _actualizar_eventos_recientes
+# y _actualizar_alertas
+DASHBOARD_QUERIES: List[str] = [
+    "SELECT COUNT(*) FROM animal",
+    "SELECT COUNT(*) FROM animal WHERE estado = 'Activo' OR estado IS NULL",
+    "SELECT COUNT(*) FROM animal WHERE estado = 'Muerto'",
+    "SELECT COUNT(*) FROM animal WHERE estado = 'Vendido'",
+    """SELECT COUNT(DISTINCT id_animal) FROM tratamiento
+       WHERE fecha_inicio >= date('now', '-30 days')
+       AND (estado = 'En curso' OR estado = 'Activo' OR estado IS NULL)""",
+    "SELECT COUNT(DISTINCT animal_id) FROM reproduccion WHERE estado = 'Gestante'",
+    """SELECT COALESCE(SUM(COALESCE(litros_manana, 0) + COALESCE(litros_tarde, 0) + COALESCE(litros_noche, 0)), 0)
+       FROM produccion_leche WHERE fecha = date('now')""",
+    "SELECT COUNT(*) FROM animal WHERE fecha_nacimiento >= date('now', 'start of month')",
+    """SELECT fecha, SUM(COALESCE(litros_manana, 0) + COALESCE(litros_tarde, 0) + COALESCE(litros_noche, 0))
+       FROM produccion_leche WHERE fecha >= date('now', '-30 days') GROUP BY fecha ORDER BY fecha""",
+    """SELECT date(fecha_creacion), 'Animal', codigo FROM animal
+       WHERE fecha_creacion IS NOT NULL ORDER BY fecha_creacion DESC LIMIT 3""",
+    """SELECT date(t.fecha_inicio), 'Tratamiento', t.producto FROM tratamiento t
+       JOIN animal a ON t.id_animal = a.id WHERE t.fecha_inicio IS NOT NULL
+       ORDER BY t.fecha_inicio DESC LIMIT 2""",
+    "SELECT date(fecha), 'Producción', animal_id FROM produccion_leche WHERE fecha IS NOT NULL ORDER BY fecha DESC LIMIT 2",
+    """SELECT date(v.fecha), 'Venta', a.codigo FROM venta v JOIN animal a ON v.animal_id = a.id
+       WHERE v.fecha IS NOT NULL ORDER BY v.fecha DESC LIMIT 2""",
+    """SELECT COUNT(*), GROUP_CONCAT(codigo, ', ') FROM animal
+       WHERE raza_id IS NULL AND (estado = 'Activo' OR estado IS NULL)""",
+    """SELECT COUNT(*), GROUP_CONCAT(codigo, ', ') FROM animal
+       WHERE lote_id IS NULL AND (estado = 'Activo' OR estado IS NULL)""",
+    """SELECT COUNT(*) FROM tratamiento WHERE fecha_fin BETWEEN date('now') AND date('now', '+3 days')
+       AND (estado = 'En curso' OR estado = 'Activo' OR estado IS NULL)""",
+    """SELECT COUNT(*) FROM animal WHERE (estado = 'Activo' OR estado IS NULL)
+       AND (salud = 'Enfermo' OR salud = 'En cuarentena')""",
+]
+
+
+def preparar_bd(db_path: Path, n_animales: int) -> None:
+    """Crea una BD temporal con el esquema completo y datos sintéticos."""
+    rnd = random.Random(42)
+    hoy = date.today()
+    with get_db_connection(db_path) as conn:
+        conn.executescript(SCHEMA_COMPLETO)
+        conn.execute("INSERT INTO finca (nombre) VALUES ('Bench')")
+        estados = ["Activo"] * 8 + ["Vendido", "Muerto"]
+        conn.executemany(
+            "INSERT INTO animal (id_finca, codigo, sexo, estado, fecha_nacimiento) VALUES (1, ?, ?, ?, ?)",
+            [
+                (f"B{i:06d}", rnd.choice(["Hembra", "Macho"]), rnd.choice(estados),
+                 (hoy - timedelta(days=rnd.randint(0, 2000))).isoformat())
+                for i in range(n_animales)
+            ],
+        )
+        conn.executemany(
+            "INSERT INTO produccion_leche (animal_id, fecha, litros_manana, litros_tarde) VALUES (?, ?, ?, ?)",
+            [
+                (animal_id, (hoy - timedelta(days=d)).isoformat(), rnd.uniform(4, 12), rnd.uniform(3, 10))
+                for d in range(90) for animal_id in range(1, max(2, n_animales // 20))
+            ],
+        )
+        conn.commit()
+
+
+def _refresco(db_path: Path) -> None:
+    for sql in DASHBOARD_QUERIES:
+        with get_db_connection(db_path) as conn:
+            conn.execute(sql).fetchall()
+
+
+def _solo_conexion(db_path: Path) -> None:
+    with get_db_connection(db_path) as conn:
+        conn.execute("SELECT 1").fetchall()
+
+
+def _medir(func, db_path: Path, iteraciones: int) -> Dict[str, float]:
+    func(db_path)  # calentamiento
+    tiempos = []
+    for _ in range(iteraciones):
+        t0 = time.perf_counter()
+        func(db_path)
+        tiempos.append((time.perf_counter() - t0) * 1000)
+    return {
+        "media_ms": round(statistics.mean(tiempos), 3),
+        "p50_ms": round(statistics.median(tiempos), 3),
+        "max_ms": round(max(tiempos), 3),
+    }
+
+
+def run_benchmark(n_animales: int, iteraciones: int) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "bench.db"
+        preparar_bd(db_path, n_animales)
+
+        resultados: Dict[str, Any] = {
+            "animales": n_animales,
+            "iteraciones": iteraciones,
+            "consultas_por_refresco": len(DASHBOARD_QUERIES),
+        }
+        for etiqueta, habilitado in (("sin_pool", False), ("con_pool", True)):
+            configurar_pool(enabled=habilitado)
+            resultados[etiqueta] = {
+                "conexion": _medir(_solo_conexion, db_path, iteraciones * 10),
+                "refresco_dashboard": _medir(_refresco, db_path, iteraciones),
+            }
+        close_all_pools()
+
+    antes = resultados["sin_pool"]["refresco_dashboard"]["media_ms"]
+    despues = resultados["con_pool"]["refresco_dashboard"]["media_ms"]
+    resultados["aceleracion_refresco"] = round(antes / despues, 2) if despues else None
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del pool de conexiones")
+    parser.add_argument("--animales", type=int, default=2000)
+    parser.add_argument("--iteraciones", type=int, default=50)
+    parser.add_argument("--json", action="store_true", help="Salida en JSON")
+    args = parser.parse_args()
+
+    res = run_benchmark(args.animales, args.iteraciones)
+    if args.json:
+        print(json.dumps(res, indent=2, ensure_ascii=False))
+        return
+
+    print("Benchmark pool de conexiones - refresco del dashboard")
+    print(f"Animales: {res['animales']} | Consultas por refresco: {res['consultas_por_refresco']}")
+    for etiqueta in ("sin_pool", "con_pool"):
+        r = res[etiqueta]
+        print(
+            f"{etiqueta:>9}: conexión {r['conexion']['media_ms']:.3f} ms | "
+            f"refresco {r['refresco_dashboard']['media_ms']:.2f} ms (p50 {r['refresco_dashboard']['p50_ms']:.2f})"
+        )
+    print(f"Aceleración del refresco: x{res['aceleracion_refresco']}")
+
+
+if __name__ == "__main__":
+    main()
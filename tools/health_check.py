@@ -82,8 +82,8 @@ def check_ui_sql() -> Dict[str, Any]:
 
 def check_backup() -> Dict[str, Any]:
     try:
-        zip_path = backup_now("health_check")
-        return {"ok": True, "backup_created": str(zip_path)}
+        manifiesto = backup_now("health_check")
+        return {"ok": True, "backup_created": str(manifiesto)}
     except Exception as e:
         return {"ok": False, "error": str(e)}
 
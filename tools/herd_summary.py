@@ -0,0 +1,75 @@
+"""
+Mantenimiento del resumen del hato (herd_summary)
+
+Modos:
+- --verificar: compara herd_summary con un conteo completo de animal
+- --reconstruir: rehace herd_summary desde animal (y reinstala los triggers)
+- --mostrar: conteos por estado y sexo
+
+Uso:
+    python tools/herd_summary.py --verificar [--json]
+    python tools/herd_summary.py --reconstruir
+    python tools/herd_summary.py --mostrar
+"""
+
+from __future__ import annotations
+import argparse
+import json
+import logging
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from src.database import herd_summary
+from src.database.database import get_db_connection
+from src.database.versiones_esquema import asegurar_esquema
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resumen del hato mantenido por triggers")
+    parser.add_argument("--reconstruir", action="store_true", help="Rehacer herd_summary desde animal")
+    parser.add_argument("--verificar", action="store_true", help="Comparar contra un conteo completo")
+    parser.add_argument("--mostrar", action="store_true", help="Mostrar conteos por estado y sexo")
+    parser.add_argument("--json", action="store_true", help="Salida en JSON")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    asegurar_esquema()
+    salida = {}
+    codigo = 0
+
+    with get_db_connection() as conn:
+        if args.reconstruir:
+            salida["combinaciones"] = herd_summary.reconstruir(conn)
+            conn.commit()
+            if not args.json:
+                print(f"herd_summary reconstruido: {salida['combinaciones']} combinaciones")
+        if args.verificar:
+            diferencias = herd_summary.verificar(conn)
+            salida["diferencias"] = diferencias
+            codigo = 1 if diferencias else 0
+            if not args.json:
+                for d in diferencias:
+                    print(
+                        f"finca={d['id_finca']} estado={d['estado']} sexo={d['sexo']} "
+                        f"categoria={d['categoria']}: resumen={d['resumen']} completo={d['completo']}"
+                    )
+                print(f"{len(diferencias)} diferencias")
+        if args.mostrar:
+            conteos = herd_summary.conteo_por(conn, "estado", "sexo")
+            salida["por_estado_sexo"] = [
+                {"estado": e, "sexo": s, "cantidad": n} for (e, s), n in sorted(conteos.items(), key=str)
+            ]
+            if not args.json:
+                for fila in salida["por_estado_sexo"]:
+                    print(f"{str(fila['estado']):<12} {str(fila['sexo']):<8} {fila['cantidad']:>8}")
+
+    if args.json:
+        print(json.dumps(salida, indent=2, ensure_ascii=False, default=str))
+    return codigo
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+"""
+Mantenimiento de los agregados incrementales de KPIs
+
+Modos:
+- --verificar: compara los agregados mantenidos con un cálculo completo y
+  lista las fuentes omitidas (tabla o columnas inexistentes en la BD)
+- --reconstruir: rehace los agregados desde las tablas fuente (y reinstala triggers)
+- --mes YYYY-MM: muestra los KPIs del mes (incremental y, con --comparar, completo)
+
+Uso:
+    python tools/kpi_incremental.py --reconstruir
+    python tools/kpi_incremental.py --verificar [--json]
+    python tools/kpi_incremental.py --mes 2025-06 --comparar
+"""
+
+from __future__ import annotations
+import argparse
+import json
+import logging
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from src.database.versiones_esquema import asegurar_esquema
+from src.services.kpi_calculator_service import KPICalculatorService
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Agregados incrementales de KPIs")
+    parser.add_argument("--reconstruir", action="store_true", help="Rehacer los agregados desde cero")
+    parser.add_argument("--verificar", action="store_true", help="Comparar contra un cálculo completo")
+    parser.add_argument("--mes", help="Mostrar los KPIs de un mes (YYYY-MM)")
+    parser.add_argument("--comparar", action="store_true", help="Con --mes: calcular también sin agregados")
+    parser.add_argument("--json", action="store_true", help="Salida en JSON")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    asegurar_esquema()
+    servicio = KPICalculatorService()
+    salida = {}
+    codigo = 0
+
+    if args.reconstruir:
+        salida["reconstruccion"] = servicio.reconstruir_incremental()
+    if args.verificar:
+        diferencias = servicio.verificar_incremental()
+        salida["diferencias"] = diferencias
+        salida["omitidas"] = servicio.fuentes_omitidas()
+        codigo = 1 if diferencias else 0
+        if not args.json:
+            for d in diferencias:
+                print(f"{d['año']}-{d['mes']:02d} {d['medida']:<20} incremental={d['incremental']} completo={d['completo']}")
+            for fuente, faltantes in salida["omitidas"].items():
+                print(f"Fuente omitida {fuente}: faltan {', '.join(faltantes)}")
+            print(f"{len(diferencias)} diferencias, {len(salida['omitidas'])} fuentes omitidas")
+    if args.mes:
+        año, mes = (int(p) for p in args.mes.split("-"))
+        salida["incremental"] = servicio.calcular_kpis_mes(año, mes)
+        if args.comparar:
+            salida["completo"] = servicio.calcular_kpis_mes(año, mes, incremental=False)
+        if not args.json:
+            completo = salida.get("completo", {})
+            for nombre, valor in salida["incremental"].items():
+                extra = f"  (completo: {completo[nombre]})" if nombre in completo and completo[nombre] != valor else ""
+                print(f"{nombre:<32} {valor}{extra}")
+
+    if args.json:
+        print(json.dumps(salida, indent=2, ensure_ascii=False, default=str))
+    return codigo
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+"""
+Reporte de consultas SQL (profiler opt-in)
+
+Ordena las sentencias registradas por el profiler (FINCAFACIL_SQL_PROFILE=1)
+según su costo total. Fuentes:
+- logs/query_profile.json: snapshot de estadísticas (por defecto)
+- logs/slow_queries.log: consultas sobre el umbral (--lentas)
+
+Uso:
+    python tools/query_report.py [--top 20] [--orden total_ms|p95_ms|max_ms|ejecuciones]
+    python tools/query_report.py --lentas
+    python tools/query_report.py --json
+"""
+
+from __future__ import annotations
+import argparse
+import json
+import sys
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.database.profiler import ARCHIVO_LENTAS, ARCHIVO_SNAPSHOT, directorio_logs
+
+ORDENES = ("total_ms", "p95_ms", "p99_ms", "max_ms", "media_ms", "ejecuciones", "filas")
+
+
+def cargar_snapshot(ruta: Path) -> List[Dict[str, Any]]:
+    datos = json.loads(ruta.read_text(encoding="utf-8"))
+    return datos.get("sentencias", [])
+
+
+def agregar_lentas(ruta: Path) -> List[Dict[str, Any]]:
+    """Agrupa slow_queries.log (y sus rotaciones) por sentencia normalizada."""
+    grupos: Dict[str, Dict[str, Any]] = defaultdict(
+        lambda: {"ejecuciones": 0, "total_ms": 0.0, "max_ms": 0.0, "filas": 0, "puntos_llamada": {}}
+    )
+    archivos = sorted(ruta.parent.glob(ruta.name + "*"))
+    for archivo in archivos:
+        for linea in archivo.read_text(encoding="utf-8", errors="replace").splitlines():
+            try:
+                reg = json.loads(linea)
+            except ValueError:
+                continue
+            g = grupos[reg.get("sql", "?")]
+            g["ejecuciones"] += 1
+            g["total_ms"] += reg.get("ms", 0.0)
+            g["max_ms"] = max(g["max_ms"], reg.get("ms", 0.0))
+            g["filas"] += reg.get("filas", 0) or 0
+            punto = reg.get("punto_llamada", "?")
+            g["puntos_llamada"][punto] = g["puntos_llamada"].get(punto, 0) + 1
+
+    resultado = []
+    for sql, g in grupos.items():
+        g["sql"] = sql
+        g["total_ms"] = round(g["total_ms"], 3)
+        g["media_ms"] = round(g["total_ms"] / g["ejecuciones"], 3) if g["ejecuciones"] else 0.0
+        resultado.append(g)
+    return resultado
+
+
+def ranking(sentencias: List[Dict[str, Any]], orden: str, top: int) -> List[Dict[str, Any]]:
+    return sorted(sentencias, key=lambda s: s.get(orden, 0) or 0, reverse=True)[:top]
+
+
+def _recortar(texto: str, largo: int = 110) -> str:
+    return texto if len(texto) <= largo else texto[: largo - 3] + "..."
+
+
+def imprimir(sentencias: List[Dict[str, Any]], orden: str) -> None:
+    total = sum(s.get("total_ms", 0) for s in sentencias) or 1.0
+    print(f"{'#':>3} {'total ms':>10} {'%':>5} {'n':>7} {'media':>8} {'p95':>8} {'max':>9}  sentencia")
+    for i, s in enumerate(sentencias, 1):
+        print(
+            f"{i:>3} {s.get('total_ms', 0):>10.1f} {100 * s.get('total_ms', 0) / total:>5.1f} "
+            f"{s.get('ejecuciones', 0):>7} {s.get('media_ms', 0):>8.2f} "
+            f"{s.get('p95_ms', 0) or 0:>8.2f} {s.get('max_ms', 0):>9.2f}  {_recortar(s.get('sql', ''))}"
+        )
+        puntos = sorted(s.get("puntos_llamada", {}).items(), key=lambda kv: kv[1], reverse=True)[:3]
+        for punto, n in puntos:
+            print(f"{'':>45}↳ {punto} ({n})")
+        if s.get("plan"):
+            print(f"{'':>45}plan: {' | '.join(s['plan'])}")
+    print(f"\nOrden: {orden}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ranking de consultas SQL por costo")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--orden", choices=ORDENES, default="total_ms")
+    parser.add_argument("--lentas", action="store_true", help=f"Usar {ARCHIVO_LENTAS} en lugar del snapshot")
+    parser.add_argument("--archivo", type=Path, help="Ruta explícita al snapshot o log")
+    parser.add_argument("--json", action="store_true", help="Salida en JSON")
+    args = parser.parse_args()
+
+    logs = directorio_logs()
+    if args.lentas:
+        ruta = args.archivo or logs / ARCHIVO_LENTAS
+        sentencias = agregar_lentas(ruta) if ruta.parent.exists() else []
+    else:
+        ruta = args.archivo or logs / ARCHIVO_SNAPSHOT
+        if not ruta.exists():
+            print(f"No existe {ruta}. Ejecute la app con FINCAFACIL_SQL_PROFILE=1.")
+            sys.exit(1)
+        sentencias = cargar_snapshot(ruta)
+
+    top = ranking(sentencias, args.orden, args.top)
+    if args.json:
+        print(json.dumps(top, indent=2, ensure_ascii=False))
+    else:
+        print(f"Reporte de consultas - {ruta}")
+        imprimir(top, args.orden)
+
+
+if __name__ == "__main__":
+    main()